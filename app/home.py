@@ -22,7 +22,7 @@ page_header("Opyta - Gestão de Projetos (MVP)", "Ambiente de testes (MVP)", use
 #     logout()
 
 
-st.write("Use o menu à esquerda para navegar: Portfólio Gantt, Projetos e Tarefas.")
+st.write("Use o menu à esquerda para navegar: Portfólio Gantt, Projetos e Tarefas — ou a **Busca** para achar qualquer item de uma vez.")
 
 
 
@@ -1,14 +1,17 @@
 # app/pages/1_Portfolio_Gantt.py
 
-import re
 from datetime import date, timedelta
 
 import pandas as pd
 import plotly.express as px
 import streamlit as st
 
+from services.array_columns import MultiHot
 from services.auth import require_login
+from services.interval_index import DateIntervalIndex
+from services.schemas import apply_schema
 from services.supabase_client import get_authed_client
+from ui.fragments import fragment
 
 # Branding / Chrome
 try:
@@ -19,9 +22,9 @@ except Exception:
     def page_header(title, subtitle="", user_email=""):  # type: ignore
         st.title(title)
 try:
-    from ui.layout import filter_bar_start
+    from ui.layout import filter_form
 except Exception:
-    def filter_bar_start(): return st.container()  # type: ignore
+    def filter_form(key, **_k): return st.container()  # type: ignore
 
 
 # ==========================================================
@@ -73,10 +76,6 @@ def pt_weekday_letter(d: date) -> str:
     return letters[d.weekday()]
 
 
-def to_dt(x):
-    return pd.to_datetime(x, errors="coerce")
-
-
 def safe_text(x, default=""):
     if x is None or (isinstance(x, float) and pd.isna(x)):
         return default
@@ -90,85 +89,56 @@ def normalize_status(x):
     return safe_text(x).upper().strip()
 
 
-def split_people(assignee_names):
-    out = []
-    for p in str(assignee_names or "").split("+"):
-        t = p.strip()
-        if t:
-            out.append(t)
-    return out
-
-
 # ==========================================================
 # Load (view)
 # ==========================================================
 @st.cache_data(ttl=30)
 def fetch_portfolio_view(_cache_key: str):
+    """
+    Carrega a view e já devolve as datas parseadas + o índice de intervalos
+    + a matriz de pessoas. Frame e índices saem juntos do cache (mesma ordem
+    de linhas).
+    """
     res = sb.table("v_portfolio_tasks").select("*").execute()
-    return pd.DataFrame(res.data or [])
+    df = pd.DataFrame(res.data or [])
+    if df.empty:
+        return df, DateIntervalIndex([]), MultiHot([])
+
+    # assignee_names (padrão novo). Se vier assignee_name antigo, converte.
+    if "assignee_names" not in df.columns and "assignee_name" in df.columns:
+        df["assignee_names"] = df["assignee_name"]
+    apply_schema(df, "v_portfolio_tasks")
+
+    # Se end_date vazio, assume start_date
+    df["end_date"] = df["end_date"].fillna(df["start_date"])
+    df = df.dropna(subset=["start_date", "end_date"]).reset_index(drop=True)
+
+    # STATUS: regra final (anti-bug)
+    # 1) Preferir date_confidence (Status da data)
+    # 2) Se não existir, usar status
+    # (colunas ausentes/nulas já chegam como "" pelo schema)
+    date_conf = df["date_confidence"].astype(str)
+    df["status_display"] = date_conf.where(date_conf.str.strip().ne(""), df["status"].astype(str))
+    df["status_norm"] = df["status_display"].apply(normalize_status)
+
+    # Label no eixo Y
+    df["label"] = (
+        df["project_code"].astype(str).str.strip()
+        + " | "
+        + df["title"].astype(str).str.strip()
+    ).str.strip(" |")
+
+    # Pessoas: assignee_list (text[]) já veio como lista pelo schema
+    return df, DateIntervalIndex(df["start_date"], df["end_date"]), MultiHot(df["assignee_list"])
 
 
 with st.spinner("Carregando portfólio..."):
-    df = fetch_portfolio_view(cache_key)
-
-if df.empty:
-    st.warning("Nenhuma tarefa encontrada na view v_portfolio_tasks.")
-    st.stop()
-
-# Datas
-df["start_date"] = to_dt(df.get("start_date"))
-df["end_date"] = to_dt(df.get("end_date"))
+    df, window_index, people_hot = fetch_portfolio_view(cache_key)
 
-# Se end_date vazio, assume start_date
-df["end_date"] = df["end_date"].fillna(df["start_date"])
-df = df.dropna(subset=["start_date", "end_date"]).copy()
 if df.empty:
-    st.warning("Existem registros, mas sem start_date/end_date válidos.")
+    st.warning("Nenhuma tarefa com start_date/end_date válidos na view v_portfolio_tasks.")
     st.stop()
 
-# Fallbacks esperados
-if "project_code" not in df.columns:
-    df["project_code"] = ""
-if "title" not in df.columns:
-    df["title"] = ""
-if "tipo_atividade" not in df.columns:
-    df["tipo_atividade"] = "CAMPO"
-
-# assignee_names (padrão novo). Se vier assignee_name antigo, converte.
-if "assignee_names" not in df.columns:
-    if "assignee_name" in df.columns:
-        df["assignee_names"] = df["assignee_name"].fillna("Profissional")
-    else:
-        df["assignee_names"] = "Profissional"
-df["assignee_names"] = df["assignee_names"].fillna("Profissional")
-
-# ------------------------------
-# STATUS: regra final (anti-bug)
-# 1) Preferir date_confidence (Status da data)
-# 2) Se não existir, usar status
-# ------------------------------
-if "date_confidence" not in df.columns:
-    df["date_confidence"] = ""
-
-if "status" not in df.columns:
-    df["status"] = ""
-
-df["date_confidence"] = df["date_confidence"].fillna("")
-df["status"] = df["status"].fillna("")
-
-# Este é o status que o Gantt vai usar/mostrar
-df["status_display"] = df["date_confidence"]
-df.loc[df["status_display"].astype(str).str.strip().eq(""), "status_display"] = df["status"]
-
-df["status_norm"] = df["status_display"].apply(normalize_status)
-
-# Label no eixo Y
-df["label"] = (
-    df["project_code"].astype(str).fillna("").str.strip()
-    + " | "
-    + df["title"].astype(str).fillna("").str.strip()
-).str.strip(" |")
-
 
 # ==========================================================
 # Filtros
@@ -179,12 +149,7 @@ d0, d1 = month_range(today)
 projects = ["Todos"] + sorted([p for p in df["project_code"].dropna().unique().tolist() if safe_text(p)])
 types_all = sorted([t for t in df["tipo_atividade"].dropna().unique().tolist() if safe_text(t)])
 
-# Pessoas: assignee_names vem "A + B + C"
-people_set = set()
-for s in df["assignee_names"].dropna().astype(str).tolist():
-    for p in split_people(s):
-        people_set.add(p)
-people_all = sorted(people_set)
+people_all = people_hot.categories.tolist()
 
 default_types = [t for t in ["CAMPO", "RELATORIO", "ADMINISTRATIVO"] if t in types_all] or types_all
 
@@ -210,7 +175,7 @@ period_presets = [
 period_labels = [p[0] for p in period_presets]
 default_period_idx = 1 if len(period_labels) > 1 else 0
 
-with filter_bar_start():
+with filter_form("gantt_filters"):
     c1, c2, c3, c4, c5 = st.columns([1.2, 1.7, 2.2, 1.6, 1.3])
 
     with c1:
@@ -226,7 +191,6 @@ with filter_bar_start():
         sel_period = st.selectbox("Atalho (período)", period_labels, index=default_period_idx)
 
     with c5:
-        show_status = st.toggle("Status na barra", value=False)
         show_cancelled = st.toggle("Mostrar canceladas", value=True)
 
 # Período final (preset ou manual)
@@ -248,7 +212,8 @@ p_end_dt = pd.to_datetime(p_end) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1
 # ==========================================================
 # Aplicar filtros
 # ==========================================================
-f = df.copy()
+# interseção com janela primeiro (índice: O(log n + k)); o resto filtra só o recorte
+f = df.iloc[window_index.overlapping(p_start, p_end)]
 
 if sel_project != "Todos":
     f = f[f["project_code"] == sel_project]
@@ -258,11 +223,9 @@ if sel_types:
 else:
     f = f.iloc[0:0]
 
-# filtro por pessoas (regex seguro)
+# filtro por pessoas (matriz multi-hot; índice de df = posição)
 if sel_people:
-    patt = "|".join(re.escape(p.strip()) for p in sel_people if p and p.strip())
-    if patt:
-        f = f[f["assignee_names"].astype(str).str.contains(patt, regex=True, na=False)]
+    f = f[people_hot.any_of(sel_people)[f.index.to_numpy()]]
 else:
     f = f.iloc[0:0]
 
@@ -270,8 +233,7 @@ else:
 if not show_cancelled and "status_norm" in f.columns:
     f = f[f["status_norm"] != "CANCELADA"]
 
-# interseção com janela
-f = f[(f["start_date"] <= p_end_dt) & (f["end_date"] >= p_start_dt)].copy()
+f = f.copy()
 
 if f.empty:
     st.info("Ainda não há tarefas no portfólio (ou os filtros zeraram a lista).")
@@ -291,162 +253,167 @@ order = (
 )
 
 # ==========================================================
-# Texto dentro da barra (✅ CONFIRMADO – Felipe)
-# ==========================================================
-icon_map = {
-    "CONFIRMADO": "✅",
-    "PLANEJADO": "🕓",
-    "PLANEJADA": "🕓",
-    "AGUARDANDO_CONFIRMACAO": "⏳",
-    "CANCELADO": "❌",
-    "CANCELADA": "❌",
-}
-
-def build_bar_text(row) -> str:
-    status_norm = safe_text(row.get("status_norm"))
-    icon = icon_map.get(status_norm, "")
-    status_txt = safe_text(row.get("status_display")).upper()
-    assignees = safe_text(row.get("assignee_names"))
-    if not show_status:
-        return assignees
-    # formato pedido: ✅ CONFIRMADO – Felipe
-    return f"{icon} {status_txt} – {assignees}".strip()
-
-f["bar_text"] = f.apply(build_bar_text, axis=1)
-
-# Cor: admin diferente + cancelada cinza (se estiver visível)
-f["tipo_plot"] = f["tipo_atividade"].astype(str)
-if "status_norm" in f.columns:
-    f.loc[f["status_norm"] == "CANCELADA", "tipo_plot"] = "CANCELADA"
-
-color_map = {
-    "CAMPO": "#1B5E20",
-    "RELATORIO": "#66BB6A",
-    "ADMINISTRATIVO": "#2F6DAE",
-    "CANCELADA": "#9E9E9E",
-}
-
-# ==========================================================
-# Gantt
+# Gráfico — fragmento: "Status na barra" redesenha só o gráfico,
+# sem refazer load/filtros
 # ==========================================================
-fig = px.timeline(
-    f,
-    x_start="plot_start",
-    x_end="plot_end",
-    y="label",
-    color="tipo_plot",
-    color_discrete_map=color_map,
-    text="bar_text",
-    hover_data={
-        "project_code": True,
-        "title": True,
-        "assignee_names": True,
-        "tipo_atividade": True,
-        "date_confidence": True,
-        "status": True,
-        "status_display": True,
-        "start_date": True,
-        "end_date": True,
-        "label": False,
-        "plot_start": False,
-        "plot_end": False,
-        "tipo_plot": False,
-        "status_norm": False,
-    },
-)
+@fragment
+def gantt_chart(f: pd.DataFrame, order: list[str], p_start_dt: pd.Timestamp, p_end_dt: pd.Timestamp) -> None:
+    show_status = st.toggle("Status na barra", value=False, key="gantt_show_status")
+    f = f.copy()
+
+    # ==========================================================
+    # Texto dentro da barra (✅ CONFIRMADO – Felipe)
+    # ==========================================================
+    icon_map = {
+        "CONFIRMADO": "✅",
+        "PLANEJADO": "🕓",
+        "PLANEJADA": "🕓",
+        "AGUARDANDO_CONFIRMACAO": "⏳",
+        "CANCELADO": "❌",
+        "CANCELADA": "❌",
+    }
+
+    def build_bar_text(row) -> str:
+        status_norm = safe_text(row.get("status_norm"))
+        icon = icon_map.get(status_norm, "")
+        status_txt = safe_text(row.get("status_display")).upper()
+        assignees = safe_text(row.get("assignee_names"))
+        if not show_status:
+            return assignees
+        # formato pedido: ✅ CONFIRMADO – Felipe
+        return f"{icon} {status_txt} – {assignees}".strip()
+
+    f["bar_text"] = f.apply(build_bar_text, axis=1)
+
+    # Cor: admin diferente + cancelada cinza (se estiver visível)
+    f["tipo_plot"] = f["tipo_atividade"].astype(str)
+    if "status_norm" in f.columns:
+        f.loc[f["status_norm"] == "CANCELADA", "tipo_plot"] = "CANCELADA"
+
+    color_map = {
+        "CAMPO": "#1B5E20",
+        "RELATORIO": "#66BB6A",
+        "ADMINISTRATIVO": "#2F6DAE",
+        "CANCELADA": "#9E9E9E",
+    }
+
+    # ==========================================================
+    # Gantt
+    # ==========================================================
+    fig = px.timeline(
+        f,
+        x_start="plot_start",
+        x_end="plot_end",
+        y="label",
+        color="tipo_plot",
+        color_discrete_map=color_map,
+        text="bar_text",
+        hover_data={
+            "project_code": True,
+            "title": True,
+            "assignee_names": True,
+            "tipo_atividade": True,
+            "date_confidence": True,
+            "status": True,
+            "status_display": True,
+            "start_date": True,
+            "end_date": True,
+            "label": False,
+            "plot_start": False,
+            "plot_end": False,
+            "tipo_plot": False,
+            "status_norm": False,
+        },
+    )
 
-fig.update_yaxes(
-    categoryorder="array",
-    categoryarray=order,
-    title_text="Projeto / Tarefa",
-    autorange="reversed",
-)
+    fig.update_yaxes(
+        categoryorder="array",
+        categoryarray=order,
+        title_text="Projeto / Tarefa",
+        autorange="reversed",
+    )
 
-fig.update_traces(
-    textposition="inside",
-    insidetextanchor="middle",
-    cliponaxis=False,
-)
+    fig.update_traces(
+        textposition="inside",
+        insidetextanchor="middle",
+        cliponaxis=False,
+    )
 
-fig.update_xaxes(range=[p_start_dt, p_end_dt])
-
-# ticks diários
-days = pd.date_range(p_start_dt.date(), p_end_dt.date(), freq="D")
-tickvals = [pd.to_datetime(d) for d in days]
-ticktext = [f"{pt_weekday_letter(d.date())} {d.day:02d}/{d.month:02d}" for d in days]
-
-fig.update_xaxes(
-    tickmode="array",
-    tickvals=tickvals,
-    ticktext=ticktext,
-    tickangle=-90,
-    showgrid=True,
-    gridcolor="rgba(0,0,0,0.06)",
-    title_text="",
-)
+    fig.update_xaxes(range=[p_start_dt, p_end_dt])
+
+    # ticks diários
+    days = pd.date_range(p_start_dt.date(), p_end_dt.date(), freq="D")
+    tickvals = [pd.to_datetime(d) for d in days]
+    ticktext = [f"{pt_weekday_letter(d.date())} {d.day:02d}/{d.month:02d}" for d in days]
+
+    fig.update_xaxes(
+        tickmode="array",
+        tickvals=tickvals,
+        ticktext=ticktext,
+        tickangle=-90,
+        showgrid=True,
+        gridcolor="rgba(0,0,0,0.06)",
+        title_text="",
+    )
 
-# Shapes: fim de semana + linha do hoje
-shapes = []
+    # Shapes: fim de semana + linha do hoje
+    shapes = []
+
+    # fim de semana sombreado
+    for d in days:
+        if d.weekday() >= 5:
+            x0 = pd.to_datetime(d.date())
+            x1 = x0 + pd.Timedelta(days=1)
+            shapes.append(
+                dict(
+                    type="rect",
+                    xref="x",
+                    yref="paper",
+                    x0=x0,
+                    x1=x1,
+                    y0=0,
+                    y1=1,
+                    fillcolor="rgba(102,187,106,0.10)",
+                    line=dict(width=0),
+                    layer="below",
+                )
+            )
 
-# fim de semana sombreado
-for d in days:
-    if d.weekday() >= 5:
-        x0 = pd.to_datetime(d.date())
-        x1 = x0 + pd.Timedelta(days=1)
+    # linha do dia atual
+    today_dt = pd.to_datetime(date.today())
+    if p_start_dt <= today_dt <= p_end_dt:
         shapes.append(
             dict(
-                type="rect",
+                type="line",
                 xref="x",
                 yref="paper",
-                x0=x0,
-                x1=x1,
+                x0=today_dt,
+                x1=today_dt,
                 y0=0,
                 y1=1,
-                fillcolor="rgba(102,187,106,0.10)",
-                line=dict(width=0),
-                layer="below",
+                line=dict(color="rgba(220,0,0,0.75)", width=2),
+                layer="above",
             )
         )
 
-# linha do dia atual
-today_dt = pd.to_datetime(date.today())
-if p_start_dt <= today_dt <= p_end_dt:
-    shapes.append(
-        dict(
-            type="line",
-            xref="x",
-            yref="paper",
-            x0=today_dt,
-            x1=today_dt,
-            y0=0,
-            y1=1,
-            line=dict(color="rgba(220,0,0,0.75)", width=2),
-            layer="above",
-        )
-    )
-
-fig.update_layout(shapes=shapes)
-
-fig.update_layout(
-    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5, title_text=""),
-    margin=dict(l=10, r=10, t=60, b=40),
-)
-
-row_count = f["label"].nunique()
-fig.update_layout(height=max(420, 80 + row_count * 55))
+    fig.update_layout(shapes=shapes)
 
-st.plotly_chart(fig, use_container_width=True)
-
-with st.expander("Dados (opcional)"):
-    st.dataframe(
-        f.sort_values(["plot_start", "plot_end"], na_position="last"),
-        use_container_width=True,
-        hide_index=True,
+    fig.update_layout(
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5, title_text=""),
+        margin=dict(l=10, r=10, t=60, b=40),
     )
 
+    row_count = f["label"].nunique()
+    fig.update_layout(height=max(420, 80 + row_count * 55))
 
+    st.plotly_chart(fig, use_container_width=True)
 
+    with st.expander("Dados (opcional)"):
+        st.dataframe(
+            f.sort_values(["plot_start", "plot_end"], na_position="last"),
+            use_container_width=True,
+            hide_index=True,
+        )
 
 
-
-
+gantt_chart(f, order, p_start_dt, p_end_dt)
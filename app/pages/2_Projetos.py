@@ -5,6 +5,7 @@ import pandas as pd
 import streamlit as st
 
 from services.auth import require_login
+from services.normalize import clean_text, date_values, norm, text_list
 from services.supabase_client import get_authed_client
 
 # Branding (não pode quebrar o app se faltar algo)
@@ -58,31 +59,6 @@ def _api_error_message(e: Exception) -> str:
         return "Erro desconhecido."
 
 
-def to_date(x):
-    if pd.isna(x) or x is None:
-        return None
-    try:
-        return pd.to_datetime(x).date()
-    except Exception:
-        return None
-
-
-def norm(x) -> str:
-    return ("" if x is None else str(x)).strip()
-
-
-def safe_text_list(series: pd.Series, default: str = "") -> list[str]:
-    # converte para lista de strings sem virar "None"
-    out: list[str] = []
-    for v in series.tolist():
-        if v is None or (isinstance(v, float) and pd.isna(v)):
-            out.append(default)
-        else:
-            s = str(v).strip()
-            out.append("" if s in ("None", "nan", "NaT") else s)
-    return out
-
-
 @st.cache_data(ttl=30)
 def fetch_projects(_cache_key: str):
     res = (
@@ -165,16 +141,17 @@ if df.empty:
     st.stop()
 
 # monta DF por LISTAS (sem alinhamento por índice)
-ids = safe_text_list(df["id"])
+ids = text_list(df["id"])
+status = clean_text(df["status"], "ATIVO")
 df_show = pd.DataFrame(
     {
-        "Código": safe_text_list(df["project_code"]),
-        "Nome": safe_text_list(df["name"]),
-        "Cliente": safe_text_list(df["client"]),
-        "Status": [s if s in STATUS_OPTIONS else "ATIVO" for s in safe_text_list(df["status"], "ATIVO")],
-        "Início": [to_date(x) for x in df["start_date"].tolist()],
-        "Fim previsto": [to_date(x) for x in df["end_date_planned"].tolist()],
-        "Obs": safe_text_list(df["notes"]),
+        "Código": text_list(df["project_code"]),
+        "Nome": text_list(df["name"]),
+        "Cliente": text_list(df["client"]),
+        "Status": status.where(status.isin(STATUS_OPTIONS), "ATIVO").tolist(),
+        "Início": date_values(df["start_date"]),
+        "Fim previsto": date_values(df["end_date_planned"]),
+        "Obs": text_list(df["notes"]),
     },
     index=ids,
 )
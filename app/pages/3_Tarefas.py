@@ -1,13 +1,15 @@
 # app/pages/3_Tarefas.py
 
-import re
 from datetime import date
 
 import pandas as pd
 import streamlit as st
 
 from services.auth import require_login
+from services.normalize import norm, text_list
+from services.schemas import apply_schema, date_values
 from services.supabase_client import get_authed_client
+from ui.deep_link import take_deep_link
 
 # Branding (não pode quebrar o app se faltar algo)
 try:
@@ -69,42 +71,6 @@ def _api_error_message(e: Exception) -> str:
         return "Erro desconhecido."
 
 
-def to_date(x):
-    if pd.isna(x) or x is None:
-        return None
-    try:
-        return pd.to_datetime(x).date()
-    except Exception:
-        return None
-
-
-def normalize_str(x) -> str:
-    return ("" if x is None else str(x)).strip()
-
-
-def safe_text_list(series: pd.Series, default: str = "") -> list[str]:
-    out: list[str] = []
-    for v in series.tolist():
-        if v is None or (isinstance(v, float) and pd.isna(v)):
-            out.append(default)
-        else:
-            s = str(v).strip()
-            out.append("" if s in ("None", "nan", "NaT") else s)
-    return out
-
-
-def split_assignees(text: str) -> list[str]:
-    if not text:
-        return []
-    parts = re.split(r"[+,;]", str(text))
-    out: list[str] = []
-    for p in parts:
-        n = p.strip()
-        if n:
-            out.append(n)
-    return out
-
-
 def rpc_delete_task(task_id: str) -> None:
     sb.rpc("rpc_delete_task", {"p_task_id": task_id}).execute()
 
@@ -152,31 +118,30 @@ def load_people(_k: str):
 
 @st.cache_data(ttl=30)
 def load_tasks_for_project(_k: str, project_id: str):
-    # tenta puxar assignee_id (se a view tiver). se não tiver, faz fallback.
-    cols_with_lead = "task_id, project_id, title, tipo_atividade, start_date, end_date, date_confidence, status, assignee_names, assignee_id, notes"
-    cols_fallback = "task_id, project_id, title, tipo_atividade, start_date, end_date, date_confidence, status, assignee_names, notes"
-
-    try:
-        res = (
-            sb.table("v_portfolio_tasks")
-            .select(cols_with_lead)
-            .eq("project_id", project_id)
-            .order("start_date")
-            .execute()
-        )
-        return pd.DataFrame(res.data or [])
-    except Exception:
-        res = (
-            sb.table("v_portfolio_tasks")
-            .select(cols_fallback)
-            .eq("project_id", project_id)
-            .order("start_date")
-            .execute()
-        )
-        df = pd.DataFrame(res.data or [])
-        if not df.empty and "assignee_id" not in df.columns:
-            df["assignee_id"] = None
-        return df
+    # tenta puxar assignee_id + arrays de responsáveis (se a view tiver); senão, fallback.
+    base_cols = "task_id, project_id, title, tipo_atividade, start_date, end_date, date_confidence, status, assignee_names, notes"
+    attempts = [
+        f"{base_cols}, assignee_id, assignee_ids, assignee_list",
+        f"{base_cols}, assignee_id",
+        base_cols,
+    ]
+    for i, cols in enumerate(attempts):
+        try:
+            res = (
+                sb.table("v_portfolio_tasks")
+                .select(cols)
+                .eq("project_id", project_id)
+                .order("start_date")
+                .execute()
+            )
+            break
+        except Exception:
+            if i == len(attempts) - 1:
+                raise
+    df = pd.DataFrame(res.data or [])
+    if not df.empty and "assignee_id" not in df.columns:
+        df["assignee_id"] = None
+    return apply_schema(df, "v_portfolio_tasks")
 
 
 def refresh_tasks_cache():
@@ -194,7 +159,14 @@ if df_projects.empty:
     st.warning("Nenhum projeto encontrado. Crie um projeto antes.")
     st.stop()
 
-selected_label = st.selectbox("Projeto", df_projects["label"].tolist(), index=0)
+# deep link da Busca global: pré-seleciona projeto (e tarefa, mais abaixo)
+deep_link = take_deep_link("pages/3_Tarefas.py")
+if deep_link.get("project_code"):
+    hit = df_projects.loc[df_projects["project_code"] == deep_link["project_code"], "label"]
+    if not hit.empty:
+        st.session_state["tasks_project"] = hit.iloc[0]
+
+selected_label = st.selectbox("Projeto", df_projects["label"].tolist(), index=0, key="tasks_project")
 project_id = df_projects.loc[df_projects["label"] == selected_label, "id"].iloc[0]
 
 if df_people.empty:
@@ -313,35 +285,30 @@ for col, default in [
     if col not in df_tasks.columns:
         df_tasks[col] = default
 
-# função para achar lead-name com fallback
-def _lead_name_row(assignee_id, assignee_names_text: str) -> str:
+# lead: assignee_id; senão o primeiro da lista (lead vem primeiro na view)
+def _lead_name_row(assignee_id, names: list[str]) -> str:
     if assignee_id and assignee_id in id_to_name:
         return id_to_name[assignee_id]
-    parts = split_assignees(assignee_names_text or "")
-    if parts:
-        # se o primeiro nome existir em people, usa ele
-        if parts[0] in people_map:
-            return parts[0]
-        return parts[0]
-    return PLACEHOLDER_PERSON_NAME
+    return names[0] if names else PLACEHOLDER_PERSON_NAME
 
 
-ids = safe_text_list(df_tasks["task_id"])
+ids = text_list(df_tasks["task_id"])
+assignee_names = text_list(df_tasks["assignee_names"], PLACEHOLDER_PERSON_NAME)
 
 df_show = pd.DataFrame(
     {
         "Excluir?": [False] * len(df_tasks),
-        "Tarefa": safe_text_list(df_tasks["title"]),
-        "Tipo": safe_text_list(df_tasks["tipo_atividade"]),
+        "Tarefa": text_list(df_tasks["title"]),
+        "Tipo": text_list(df_tasks["tipo_atividade"]),
         "Lead": [
-            _lead_name_row(aid, an)
-            for aid, an in zip(df_tasks["assignee_id"].tolist(), safe_text_list(df_tasks["assignee_names"], PLACEHOLDER_PERSON_NAME))
+            _lead_name_row(aid, names)
+            for aid, names in zip(df_tasks["assignee_id"].tolist(), df_tasks["assignee_list"].tolist())
         ],
-        "Responsável(is)": [x or PLACEHOLDER_PERSON_NAME for x in safe_text_list(df_tasks["assignee_names"], PLACEHOLDER_PERSON_NAME)],
-        "Início": [to_date(x) for x in df_tasks["start_date"].tolist()],
-        "Fim": [to_date(x) for x in df_tasks["end_date"].tolist()],
-        "Status da data": [x or "PLANEJADO" for x in safe_text_list(df_tasks["date_confidence"])],
-        "Obs": safe_text_list(df_tasks["notes"]),
+        "Responsável(is)": assignee_names,
+        "Início": date_values(df_tasks["start_date"]),
+        "Fim": date_values(df_tasks["end_date"]),
+        "Status da data": text_list(df_tasks["date_confidence"], "PLANEJADO"),
+        "Obs": text_list(df_tasks["notes"]),
     },
     index=ids,
 )
@@ -406,22 +373,29 @@ with st.container(border=True):
     # lista de tarefas para escolher
     task_labels = []
     task_id_by_label = {}
-    for tid, title_txt in zip(ids, safe_text_list(df_tasks["title"])):
+    for tid, title_txt in zip(ids, text_list(df_tasks["title"])):
         lbl = f"{tid[:8]} — {title_txt or 'Sem título'}"
         task_labels.append(lbl)
         task_id_by_label[lbl] = tid
 
-    pick = st.selectbox("Selecione a tarefa", task_labels, index=0)
+    picked_labels = [lbl for lbl, tid in task_id_by_label.items() if tid == deep_link.get("task_id")]
+    if picked_labels:
+        st.session_state["tasks_pick"] = picked_labels[0]
+    elif st.session_state.get("tasks_pick") not in task_id_by_label:
+        # seleção de outro projeto: volta para a primeira tarefa
+        st.session_state.pop("tasks_pick", None)
+
+    pick = st.selectbox("Selecione a tarefa", task_labels, index=0, key="tasks_pick")
     picked_task_id = task_id_by_label[pick]
 
     # estado atual (a partir da view)
     row = df_tasks.loc[df_tasks["task_id"].astype(str) == str(picked_task_id)].iloc[0]
-    current_assignees_text = normalize_str(row.get("assignee_names") or PLACEHOLDER_PERSON_NAME)
-    current_names = split_assignees(current_assignees_text) or [PLACEHOLDER_PERSON_NAME]
+    # por id quando a view já expõe assignee_ids; nomes só como compat
+    current_names = [id_to_name[i] for i in row["assignee_ids"] if i in id_to_name] or list(row["assignee_list"])
     # garante que existam em people (se algum não existir, ignora no default)
     current_names = [n for n in current_names if n in people_map] or [PLACEHOLDER_PERSON_NAME]
 
-    default_lead = _lead_name_row(row.get("assignee_id"), current_assignees_text)
+    default_lead = _lead_name_row(row.get("assignee_id"), current_names)
     if default_lead not in people_map:
         default_lead = PLACEHOLDER_PERSON_NAME
 
@@ -494,7 +468,7 @@ if save_inline:
 
             changed = False
             for c in compare_cols:
-                if normalize_str(rb[c]) != normalize_str(ra[c]):
+                if norm(rb[c]) != norm(ra[c]):
                     changed = True
                     break
             if not changed:
@@ -503,20 +477,20 @@ if save_inline:
             start_v = ra["Início"]
             end_v = ra["Fim"]
             if start_v and end_v and end_v < start_v:
-                warnings.append(f"Tarefa {normalize_str(ra['Tarefa'])}: 'Fim' menor que 'Início' (ignorado).")
+                warnings.append(f"Tarefa {norm(ra['Tarefa'])}: 'Fim' menor que 'Início' (ignorado).")
                 continue
 
-            lead_name_new = normalize_str(ra["Lead"]) or PLACEHOLDER_PERSON_NAME
+            lead_name_new = norm(ra["Lead"]) or PLACEHOLDER_PERSON_NAME
             lead_id_new = people_map.get(lead_name_new) or placeholder_id
 
             update_payload = {
-                "title": normalize_str(ra["Tarefa"]) or "Sem título",
-                "tipo_atividade": normalize_str(ra["Tipo"]) or TIPO_OPTIONS[0],
+                "title": norm(ra["Tarefa"]) or "Sem título",
+                "tipo_atividade": norm(ra["Tipo"]) or TIPO_OPTIONS[0],
                 "assignee_id": lead_id_new,  # LEAD via dropdown
                 "start_date": start_v.isoformat() if start_v else None,
                 "end_date": end_v.isoformat() if end_v else None,
-                "date_confidence": normalize_str(ra["Status da data"]) or DATE_CONFIDENCE_OPTIONS[0],
-                "notes": normalize_str(ra["Obs"]) or None,
+                "date_confidence": norm(ra["Status da data"]) or DATE_CONFIDENCE_OPTIONS[0],
+                "notes": norm(ra["Obs"]) or None,
             }
 
             sb.table("tasks").update(update_payload).eq("id", str(task_id)).execute()
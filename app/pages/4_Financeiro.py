@@ -6,8 +6,14 @@ import pandas as pd
 import streamlit as st
 
 from services.auth import require_login
+from services.normalize import clean_str, clean_text, norm, to_date
+from services.schemas import apply_schema, date_values
 from services.supabase_client import get_authed_client
+from services.versioning import clear_editor_state, data_version, stamp_version
 from services.finance_guard import can_finance_write, require_finance_access
+from ui.fragments import fragment
+from ui.layout import filter_form, section_selector
+from ui.paginated_editor import EditorPager, paginated_editor
 
 # Branding (não pode quebrar o app se faltar algo)
 try:
@@ -47,6 +53,8 @@ if not can_write:
 
 TYPE_OPTIONS = ["RECEITA", "DESPESA", "TRANSFERENCIA"]
 STATUS_OPTIONS = ["PREVISTO", "REALIZADO", "CANCELADO"]
+EDITOR_PREFIX = "finance_editor"
+FINANCE_SECTIONS = ["Resumo", "Gráficos", "A receber / a pagar", "Novo lançamento", "Lançamentos"]
 today = date.today()
 
 
@@ -71,19 +79,8 @@ def _api_error_message(e: Exception) -> str:
         return "Erro desconhecido."
 
 
-def norm(x) -> str:
-    return ("" if x is None else str(x)).strip()
-
-
-def _clean_str(x) -> str:
-    if x is None:
-        return ""
-    s = str(x).strip()
-    return "" if s in ("None", "nan", "NaT") else s
-
-
 def _html(x) -> str:
-    return html.escape(_clean_str(x))
+    return html.escape(clean_str(x))
 
 
 def _brl(v: float) -> str:
@@ -147,9 +144,14 @@ def fetch_counterparties(_cache_key: str):
     return pd.DataFrame(res.data or [])
 
 
-@st.cache_data(ttl=30)
-def fetch_transactions_view(
-    _cache_key: str,
+TX_SELECT = (
+    "id,date,type,status,description,amount,"
+    "category_id,counterparty_id,project_id,"
+    "payment_method,competence_month,notes,created_by"
+)
+
+
+def _transactions_query(
     date_from: date,
     date_to: date,
     project_id: str | None,
@@ -157,28 +159,15 @@ def fetch_transactions_view(
     status: str | None,
     category_id: str | None,
     counterparty_id: str | None,
+    *,
+    count: str | None = None,
 ):
-    """
-    IMPORTANTE:
-    - A lista NÃO depende de v_finance_transactions.
-    - Busca na tabela finance_transactions e enriquece nomes via merge (cache local).
-    Isso evita:
-      • view desatualizada
-      • RLS/joins te enganando
-      • colunas *_name faltando
-    """
     q = (
         sb.table("finance_transactions")
-        .select(
-            "id,date,type,status,description,amount,"
-            "category_id,counterparty_id,project_id,"
-            "payment_method,competence_month,notes,created_by"
-        )
+        .select(TX_SELECT, count=count)
         .gte("date", date_from.isoformat())
         .lte("date", date_to.isoformat())
-        .order("date", desc=True)
     )
-
     if project_id:
         q = q.eq("project_id", project_id)
     if t_type:
@@ -189,13 +178,12 @@ def fetch_transactions_view(
         q = q.eq("category_id", category_id)
     if counterparty_id:
         q = q.eq("counterparty_id", counterparty_id)
+    return q
 
-    res = q.execute()
-    df = pd.DataFrame(res.data or [])
 
-    # Mesmo vazio: devolve no "formato esperado"
-    if df.empty:
-        return pd.DataFrame(
+def _empty_transactions() -> pd.DataFrame:
+    return apply_schema(
+        pd.DataFrame(
             columns=[
                 "id", "date", "type", "status", "description", "amount",
                 "category_id", "category_name",
@@ -203,9 +191,13 @@ def fetch_transactions_view(
                 "project_id", "project_code", "project_name",
                 "payment_method", "competence_month", "notes", "created_by",
             ]
-        )
+        ),
+        "finance_transactions",
+    )
+
 
-    # Enriquecimento (nomes)
+def _enrich_transactions(_cache_key: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Nomes de categoria/contraparte/projeto (merge com os cadastros em cache) + schema."""
     cats = fetch_categories(_cache_key)
     cps = fetch_counterparties(_cache_key)
     projs = fetch_projects(_cache_key)
@@ -229,14 +221,84 @@ def fetch_transactions_view(
         df["project_code"] = None
         df["project_name"] = None
 
-    # Higiene
+    # Higiene + tipos (uma vez, antes do cache)
+    apply_schema(df, "finance_transactions")
     for col in ["description", "payment_method", "notes"]:
         if col in df.columns:
-            df[col] = df[col].fillna("").apply(_clean_str)
+            df[col] = clean_text(df[col])
 
     return df
 
 
+@st.cache_data(ttl=30)
+def fetch_transactions_view(
+    _cache_key: str,
+    date_from: date,
+    date_to: date,
+    project_id: str | None,
+    t_type: str | None,
+    status: str | None,
+    category_id: str | None,
+    counterparty_id: str | None,
+):
+    """
+    IMPORTANTE:
+    - A lista NÃO depende de v_finance_transactions.
+    - Busca na tabela finance_transactions e enriquece nomes via merge (cache local).
+    Isso evita:
+      • view desatualizada
+      • RLS/joins te enganando
+      • colunas *_name faltando
+    """
+    q = _transactions_query(
+        date_from, date_to, project_id, t_type, status, category_id, counterparty_id
+    ).order("date", desc=True)
+
+    res = q.execute()
+    df = pd.DataFrame(res.data or [])
+
+    # Mesmo vazio: devolve no "formato esperado"
+    if df.empty:
+        return _empty_transactions()
+
+    return stamp_version(_enrich_transactions(_cache_key, df))
+
+
+@st.cache_data(ttl=30)
+def fetch_transactions_page(
+    _cache_key: str,
+    date_from: date,
+    date_to: date,
+    project_id: str | None,
+    t_type: str | None,
+    status: str | None,
+    category_id: str | None,
+    counterparty_id: str | None,
+    after: tuple[str, str] | None,
+    limit: int,
+) -> tuple[pd.DataFrame, int]:
+    """
+    Uma página da lista (edição inline), em keyset sobre (date desc, id desc):
+    `after` é (date, id) da última linha da página anterior. O count="exact"
+    vem junto e conta as linhas a partir do cursor — quem chama soma as
+    páginas já passadas para mostrar o total.
+    """
+    q = _transactions_query(
+        date_from, date_to, project_id, t_type, status, category_id, counterparty_id, count="exact"
+    )
+    if after:
+        after_date, after_id = after
+        q = q.or_(f"date.lt.{after_date},and(date.eq.{after_date},id.lt.{after_id})")
+
+    res = q.order("date", desc=True).order("id", desc=True).limit(limit).execute()
+    df = pd.DataFrame(res.data or [])
+    remaining = int(res.count if res.count is not None else len(df))
+
+    if df.empty:
+        return _empty_transactions(), remaining
+    return stamp_version(_enrich_transactions(_cache_key, df)), remaining
+
+
 def insert_tx(payload: dict):
     return sb.table("finance_transactions").insert(payload).execute()
 
@@ -249,7 +311,7 @@ def fetch_monthly_summary(_cache_key: str):
         .order("month", desc=False)
         .execute()
     )
-    return pd.DataFrame(res.data or [])
+    return apply_schema(pd.DataFrame(res.data or []), "v_finance_monthly_summary")
 
 
 @st.cache_data(ttl=30)
@@ -261,7 +323,7 @@ def fetch_tx_min(_cache_key: str, date_from: date, date_to: date):
         .lte("date", date_to.isoformat())
         .execute()
     )
-    return pd.DataFrame(res.data or [])
+    return apply_schema(pd.DataFrame(res.data or []), "finance_transactions")
 
 
 @st.cache_data(ttl=30)
@@ -273,7 +335,7 @@ def fetch_receivables(_cache_key: str, limit: int = 10):
         .limit(limit)
         .execute()
     )
-    return pd.DataFrame(res.data or [])
+    return apply_schema(pd.DataFrame(res.data or []), "finance_transactions")
 
 
 @st.cache_data(ttl=30)
@@ -285,7 +347,7 @@ def fetch_payables(_cache_key: str, limit: int = 10):
         .limit(limit)
         .execute()
     )
-    return pd.DataFrame(res.data or [])
+    return apply_schema(pd.DataFrame(res.data or []), "finance_transactions")
 
 
 def clear_caches():
@@ -293,6 +355,7 @@ def clear_caches():
     fetch_categories.clear()
     fetch_counterparties.clear()
     fetch_transactions_view.clear()
+    fetch_transactions_page.clear()
     fetch_monthly_summary.clear()
     fetch_tx_min.clear()
     fetch_receivables.clear()
@@ -386,7 +449,15 @@ st.subheader("Filtros")
 default_from = date(today.year, today.month, 1)
 default_to = today
 
-with st.container(border=True):
+if st.button("Recarregar"):
+    clear_caches()
+    # reset correto do editor: APAGA a chave do widget, não injeta df
+    clear_editor_state(EDITOR_PREFIX)
+    st.rerun()
+
+# seis seletores + datas: no modo "aplicar" a combinação inteira vira um
+# único rerun (e uma busca) em vez de um por widget
+with filter_form("finance_filters"):
     f1, f2, f3, f4, f5, f6 = st.columns([1.2, 1.2, 1.2, 1.2, 2.0, 2.0])
     with f1:
         date_from = st.date_input("De", value=default_from, format="DD/MM/YYYY")
@@ -401,16 +472,9 @@ with st.container(border=True):
     with f6:
         cat_label = st.selectbox("Categoria", cat_options, index=0)
 
-    g1, g2 = st.columns([2.0, 1.0])
+    g1, _ = st.columns([2.0, 1.0])
     with g1:
         cp_label = st.selectbox("Cliente/Fornecedor", cp_options, index=0)
-    with g2:
-        if st.button("Recarregar"):
-            clear_caches()
-            # reset correto do editor: APAGA a chave do widget, não injeta df
-            if "finance_editor" in st.session_state:
-                del st.session_state["finance_editor"]
-            st.rerun()
 
 f_project_id = proj_map.get(proj_label)
 f_type = None if t_type == "(Todos)" else t_type
@@ -420,314 +484,302 @@ f_cp_id = cp_map.get(cp_label)
 
 
 # ==========================================================
-# DASHBOARD
+# SEÇÕES
 # ==========================================================
+# Só a seção escolhida roda: cada uma faz as próprias buscas (cacheadas,
+# ttl=30) e contas. Lançar um movimento não recalcula dashboard e gráficos;
+# voltar a uma seção já vista reaproveita o cache dos fetchs.
 st.divider()
-st.subheader("Dashboard")
+section = section_selector("Seção", FINANCE_SECTIONS, key="finance_section")
 
-try:
-    ms = fetch_monthly_summary(cache_key)
-except Exception as e:
-    st.error("Erro ao carregar resumo mensal:")
-    st.code(_api_error_message(e))
-    ms = pd.DataFrame()
-
-if not ms.empty:
-    ms["month"] = pd.to_datetime(ms["month"]).dt.date
-    month_options = [m.isoformat() for m in sorted(ms["month"].unique(), reverse=True)]
-else:
-    month_options = [today.replace(day=1).isoformat()]
-
-sel_month_str = st.selectbox("Mês (competência)", month_options, index=0, key="dash_month")
-sel_month = pd.to_datetime(sel_month_str).date()
-
-m_from, m_to = month_range(sel_month)
-txm = fetch_tx_min(cache_key, m_from, m_to)
-
-def _calc_month(tx: pd.DataFrame):
-    r_real = d_real = r_prev = d_prev = 0.0
-    if not tx.empty:
-        t = tx.copy()
-        t["type"] = t["type"].astype(str).str.upper()
-        t["status"] = t["status"].astype(str).str.upper()
-        t["amount"] = pd.to_numeric(t["amount"], errors="coerce").fillna(0.0)
-        r_real = float(t[(t["type"] == "RECEITA") & (t["status"] == "REALIZADO")]["amount"].sum())
-        d_real = float(t[(t["type"] == "DESPESA") & (t["status"] == "REALIZADO")]["amount"].sum())
-        r_prev = float(t[(t["type"] == "RECEITA") & (t["status"] == "PREVISTO")]["amount"].sum())
-        d_prev = float(t[(t["type"] == "DESPESA") & (t["status"] == "PREVISTO")]["amount"].sum())
-    return {"saldo": r_real - d_real, "r_prev": r_prev, "d_prev": d_prev}
-
-curr = _calc_month(txm)
-
-pm = _prev_month(sel_month)
-pm_from, pm_to = month_range(pm)
-txm_prev = fetch_tx_min(cache_key, pm_from, pm_to)
-prev = _calc_month(txm_prev)
-
-saldo_delta = _pct(curr["saldo"], prev["saldo"])
-rprev_delta = _pct(curr["r_prev"], prev["r_prev"])
-dprev_delta = _pct(curr["d_prev"], prev["d_prev"])
-saldo_projetado = (curr["saldo"] + curr["r_prev"]) - curr["d_prev"]
-
-n_receber = 0
-n_pagar = 0
-if not txm.empty:
-    t2 = txm.copy()
-    t2["type"] = t2["type"].astype(str).str.upper()
-    t2["status"] = t2["status"].astype(str).str.upper()
-    n_receber = int(((t2["type"] == "RECEITA") & (t2["status"] == "PREVISTO")).sum())
-    n_pagar = int(((t2["type"] == "DESPESA") & (t2["status"] == "PREVISTO")).sum())
 
-st.markdown(
-    f"""
-<div class="op-cards">
-  <div class="op-card op-green">
-    <div class="op-title">Saldo Atual</div>
-    <div class="op-value">{_brl(curr["saldo"])}</div>
-    <div class="op-sub">{saldo_delta} vs mês anterior</div>
-  </div>
-
-  <div class="op-card op-blue">
-    <div class="op-title">Receitas Previstas</div>
-    <div class="op-value">{_brl(curr["r_prev"])}</div>
-    <div class="op-sub">{n_receber} a receber • {rprev_delta} vs mês anterior</div>
-  </div>
-
-  <div class="op-card op-orange">
-    <div class="op-title">Despesas Previstas</div>
-    <div class="op-value">{_brl(curr["d_prev"])}</div>
-    <div class="op-sub">{n_pagar} a pagar • {dprev_delta} vs mês anterior</div>
-  </div>
-
-  <div class="op-card op-red">
-    <div class="op-title">Saldo Projetado</div>
-    <div class="op-value">{_brl(saldo_projetado)}</div>
-    <div class="op-sub">Atual + previstas</div>
-  </div>
-</div>
-""",
-    unsafe_allow_html=True,
-)
+def _month_picker() -> date:
+    """Mês de competência (mesma key no Resumo e nos Gráficos)."""
+    try:
+        ms = fetch_monthly_summary(cache_key)
+    except Exception as e:
+        st.error("Erro ao carregar resumo mensal:")
+        st.code(_api_error_message(e))
+        ms = pd.DataFrame()
 
-st.divider()
+    if not ms.empty:
+        month_options = [m.isoformat() for m in sorted(set(date_values(ms["month"].dropna())), reverse=True)]
+    else:
+        month_options = [today.replace(day=1).isoformat()]
+
+    sel_month_str = st.selectbox("Mês (competência)", month_options, index=0, key="dash_month")
+    sel_month = pd.to_datetime(sel_month_str).date()
+    return sel_month
 
 
 # ==========================================================
-# ALERTAS DE VENCIMENTO
+# DASHBOARD + ALERTAS DE VENCIMENTO
 # ==========================================================
-st.subheader("Alertas")
+def render_summary() -> None:
+    st.subheader("Dashboard")
+    sel_month = _month_picker()
+
+    m_from, m_to = month_range(sel_month)
+    txm = fetch_tx_min(cache_key, m_from, m_to)
+
+    def _calc_month(tx: pd.DataFrame):
+        r_real = d_real = r_prev = d_prev = 0.0
+        if not tx.empty:
+            t = tx  # já tipado pelo schema (type/status em maiúsculas, amount numérico)
+            r_real = float(t[(t["type"] == "RECEITA") & (t["status"] == "REALIZADO")]["amount"].sum())
+            d_real = float(t[(t["type"] == "DESPESA") & (t["status"] == "REALIZADO")]["amount"].sum())
+            r_prev = float(t[(t["type"] == "RECEITA") & (t["status"] == "PREVISTO")]["amount"].sum())
+            d_prev = float(t[(t["type"] == "DESPESA") & (t["status"] == "PREVISTO")]["amount"].sum())
+        return {"saldo": r_real - d_real, "r_prev": r_prev, "d_prev": d_prev}
+
+    curr = _calc_month(txm)
+
+    pm = _prev_month(sel_month)
+    pm_from, pm_to = month_range(pm)
+    txm_prev = fetch_tx_min(cache_key, pm_from, pm_to)
+    prev = _calc_month(txm_prev)
+
+    saldo_delta = _pct(curr["saldo"], prev["saldo"])
+    rprev_delta = _pct(curr["r_prev"], prev["r_prev"])
+    dprev_delta = _pct(curr["d_prev"], prev["d_prev"])
+    saldo_projetado = (curr["saldo"] + curr["r_prev"]) - curr["d_prev"]
+
+    n_receber = 0
+    n_pagar = 0
+    if not txm.empty:
+        n_receber = int(((txm["type"] == "RECEITA") & (txm["status"] == "PREVISTO")).sum())
+        n_pagar = int(((txm["type"] == "DESPESA") & (txm["status"] == "PREVISTO")).sum())
+
+    st.markdown(
+        f"""
+    <div class="op-cards">
+      <div class="op-card op-green">
+        <div class="op-title">Saldo Atual</div>
+        <div class="op-value">{_brl(curr["saldo"])}</div>
+        <div class="op-sub">{saldo_delta} vs mês anterior</div>
+      </div>
+
+      <div class="op-card op-blue">
+        <div class="op-title">Receitas Previstas</div>
+        <div class="op-value">{_brl(curr["r_prev"])}</div>
+        <div class="op-sub">{n_receber} a receber • {rprev_delta} vs mês anterior</div>
+      </div>
+
+      <div class="op-card op-orange">
+        <div class="op-title">Despesas Previstas</div>
+        <div class="op-value">{_brl(curr["d_prev"])}</div>
+        <div class="op-sub">{n_pagar} a pagar • {dprev_delta} vs mês anterior</div>
+      </div>
+
+      <div class="op-card op-red">
+        <div class="op-title">Saldo Projetado</div>
+        <div class="op-value">{_brl(saldo_projetado)}</div>
+        <div class="op-sub">Atual + previstas</div>
+      </div>
+    </div>
+    """,
+        unsafe_allow_html=True,
+    )
 
-today_dt = today
-next_7 = (pd.to_datetime(today_dt) + pd.Timedelta(days=7)).date()
+    st.divider()
+
+    st.subheader("Alertas")
+
+    today_dt = today
+    next_7 = (pd.to_datetime(today_dt) + pd.Timedelta(days=7)).date()
+
+    try:
+        df_alert = fetch_transactions_view(
+            cache_key,
+            date_from=today_dt,
+            date_to=next_7,
+            project_id=None,
+            t_type=None,
+            status="PREVISTO",
+            category_id=None,
+            counterparty_id=None,
+        )
+    except Exception as e:
+        st.error("Erro ao carregar alertas de vencimento:")
+        st.code(_api_error_message(e))
+        df_alert = pd.DataFrame()
+
+    if df_alert.empty:
+        st.caption("Nenhum lançamento previsto para vencer nos próximos dias.")
+    else:
+        today_ts = pd.Timestamp(today_dt)
+        df_today = df_alert[df_alert["date"] == today_ts]
+        df_week = df_alert[(df_alert["date"] > today_ts) & (df_alert["date"] <= pd.Timestamp(next_7))]
+
+        def _alert_card(title: str, dfx: pd.DataFrame):
+            if dfx.empty:
+                st.markdown(
+                    f"""
+                    <div class="op-panel">
+                      <strong>{title}</strong>
+                      <div style="opacity:.75; margin-top:6px;">Nenhum lançamento</div>
+                    </div>
+                    """,
+                    unsafe_allow_html=True,
+                )
+                return
+
+            total = float(dfx["amount"].sum())
+            n = len(dfx)
+            rec = float(dfx[dfx["type"] == "RECEITA"]["amount"].sum())
+            desp = float(dfx[dfx["type"] == "DESPESA"]["amount"].sum())
 
-try:
-    df_alert = fetch_transactions_view(
-        cache_key,
-        date_from=today_dt,
-        date_to=next_7,
-        project_id=None,
-        t_type=None,
-        status="PREVISTO",
-        category_id=None,
-        counterparty_id=None,
-    )
-except Exception as e:
-    st.error("Erro ao carregar alertas de vencimento:")
-    st.code(_api_error_message(e))
-    df_alert = pd.DataFrame()
-
-if df_alert.empty:
-    st.caption("Nenhum lançamento previsto para vencer nos próximos dias.")
-else:
-    df_alert = df_alert.copy()
-    df_alert["date"] = pd.to_datetime(df_alert["date"], errors="coerce").dt.date
-    df_alert["amount"] = pd.to_numeric(df_alert["amount"], errors="coerce").fillna(0.0)
-    df_alert["type"] = df_alert["type"].astype(str).str.upper()
-
-    df_today = df_alert[df_alert["date"] == today_dt]
-    df_week = df_alert[(df_alert["date"] > today_dt) & (df_alert["date"] <= next_7)]
-
-    def _alert_card(title: str, dfx: pd.DataFrame):
-        if dfx.empty:
             st.markdown(
                 f"""
                 <div class="op-panel">
                   <strong>{title}</strong>
-                  <div style="opacity:.75; margin-top:6px;">Nenhum lançamento</div>
+                  <div style="margin-top:6px;">
+                    <b>{n}</b> lançamentos • <b>{_brl(total)}</b>
+                  </div>
+                  <div style="opacity:.85; margin-top:4px; font-size:13px;">
+                    Receitas: {_brl(rec)} • Despesas: {_brl(desp)}
+                  </div>
                 </div>
                 """,
                 unsafe_allow_html=True,
             )
-            return
-
-        total = float(dfx["amount"].sum())
-        n = len(dfx)
-        rec = float(dfx[dfx["type"] == "RECEITA"]["amount"].sum())
-        desp = float(dfx[dfx["type"] == "DESPESA"]["amount"].sum())
-
-        st.markdown(
-            f"""
-            <div class="op-panel">
-              <strong>{title}</strong>
-              <div style="margin-top:6px;">
-                <b>{n}</b> lançamentos • <b>{_brl(total)}</b>
-              </div>
-              <div style="opacity:.85; margin-top:4px; font-size:13px;">
-                Receitas: {_brl(rec)} • Despesas: {_brl(desp)}
-              </div>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
-
-    a1, a2 = st.columns([1, 1])
-    with a1:
-        _alert_card("⚠️ Vencem hoje", df_today)
-    with a2:
-        _alert_card("📅 Vencem nos próximos 7 dias", df_week)
 
-st.divider()
+        a1, a2 = st.columns([1, 1])
+        with a1:
+            _alert_card("⚠️ Vencem hoje", df_today)
+        with a2:
+            _alert_card("📅 Vencem nos próximos 7 dias", df_week)
 
 
 # ==========================================================
-# FLUXO DE CAIXA MENSAL (6 meses)
+# FLUXO DE CAIXA MENSAL (6 meses) + DESPESAS POR CATEGORIA (donut)
 # ==========================================================
-st.subheader("Fluxo de Caixa Mensal")
-
-def _month_start(d: date) -> date:
-    return date(d.year, d.month, 1)
-
-def _add_months(d: date, n: int) -> date:
-    y = d.year + (d.month - 1 + n) // 12
-    m = (d.month - 1 + n) % 12 + 1
-    return date(y, m, 1)
-
-end_m = _month_start(sel_month)
-start_m = _add_months(end_m, -5)
-range_from = start_m
-range_to = month_range(end_m)[1]
-
-df_range = fetch_tx_min(cache_key, range_from, range_to)
-
-if df_range.empty:
-    st.caption("Sem dados no intervalo para montar o gráfico.")
-else:
-    df_range = df_range.copy()
-    df_range["date"] = pd.to_datetime(df_range["date"], errors="coerce")
-    df_range["month"] = df_range["date"].dt.to_period("M").dt.to_timestamp().dt.date
-    df_range["type"] = df_range["type"].astype(str).str.upper()
-    df_range["amount"] = pd.to_numeric(df_range["amount"], errors="coerce").fillna(0.0)
-
-    receita_m = df_range[df_range["type"] == "RECEITA"].groupby("month")["amount"].sum().rename("receita")
-    despesa_m = df_range[df_range["type"] == "DESPESA"].groupby("month")["amount"].sum().rename("despesa")
-
-    months = pd.date_range(pd.to_datetime(start_m), pd.to_datetime(end_m), freq="MS").date
-    plot_df = pd.DataFrame({"month": months}).set_index("month")
-    plot_df["receita"] = receita_m.reindex(plot_df.index).fillna(0.0)
-    plot_df["despesa"] = despesa_m.reindex(plot_df.index).fillna(0.0)
-    plot_df["saldo_final"] = (plot_df["receita"] - plot_df["despesa"]).cumsum()
-    plot_df = plot_df.reset_index()
-
-    import plotly.graph_objects as go
-
-    fig = go.Figure()
-    fig.add_bar(x=plot_df["month"], y=plot_df["receita"], name="Receitas")
-    fig.add_bar(x=plot_df["month"], y=plot_df["despesa"], name="Despesas")
-    fig.add_trace(
-        go.Scatter(
-            x=plot_df["month"],
-            y=plot_df["saldo_final"],
-            mode="lines+markers",
-            name="Saldo Final (R$)",
-            yaxis="y2",
-        )
-    )
+def render_charts() -> None:
+    sel_month = _month_picker()
+    m_from, m_to = month_range(sel_month)
 
-    fig.update_layout(
-        barmode="group",
-        height=360,
-        margin=dict(l=10, r=10, t=20, b=10),
-        xaxis=dict(title="", tickformat="%b/%y"),
-        yaxis=dict(title="R$"),
-        yaxis2=dict(title="", overlaying="y", side="right"),
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="left", x=0),
-    )
+    st.subheader("Fluxo de Caixa Mensal")
 
-    st.plotly_chart(fig, use_container_width=True)
+    def _month_start(d: date) -> date:
+        return date(d.year, d.month, 1)
 
-st.divider()
+    def _add_months(d: date, n: int) -> date:
+        y = d.year + (d.month - 1 + n) // 12
+        m = (d.month - 1 + n) % 12 + 1
+        return date(y, m, 1)
 
+    end_m = _month_start(sel_month)
+    start_m = _add_months(end_m, -5)
+    range_from = start_m
+    range_to = month_range(end_m)[1]
 
-# ==========================================================
-# DESPESAS POR CATEGORIA (donut)
-# ==========================================================
-st.subheader("Despesas por Categoria")
+    df_range = fetch_tx_min(cache_key, range_from, range_to)
 
-try:
-    df_month_full = fetch_transactions_view(
-        cache_key,
-        date_from=m_from,
-        date_to=m_to,
-        project_id=None,
-        t_type="DESPESA",
-        status=None,
-        category_id=None,
-        counterparty_id=None,
-    )
-except Exception as e:
-    st.error("Erro ao montar despesas por categoria:")
-    st.code(_api_error_message(e))
-    df_month_full = pd.DataFrame()
-
-if df_month_full.empty:
-    st.caption("Sem despesas no mês selecionado.")
-else:
-    dfc = df_month_full.copy()
-    dfc["amount"] = pd.to_numeric(dfc["amount"], errors="coerce").fillna(0.0)
-    dfc["category_name"] = dfc.get("category_name", "").fillna("").apply(_clean_str)
-    dfc = dfc[dfc["amount"] > 0]
-
-    if dfc.empty:
-        st.caption("Sem despesas válidas para exibir.")
+    if df_range.empty:
+        st.caption("Sem dados no intervalo para montar o gráfico.")
     else:
-        by_cat = dfc.groupby("category_name")["amount"].sum().sort_values(ascending=False).reset_index()
-        by_cat["category_name"] = by_cat["category_name"].replace("", "(Sem categoria)")
+        df_range["month"] = df_range["date"].dt.to_period("M").dt.to_timestamp().dt.date
+
+        receita_m = df_range[df_range["type"] == "RECEITA"].groupby("month")["amount"].sum().rename("receita")
+        despesa_m = df_range[df_range["type"] == "DESPESA"].groupby("month")["amount"].sum().rename("despesa")
+
+        months = pd.date_range(pd.to_datetime(start_m), pd.to_datetime(end_m), freq="MS").date
+        plot_df = pd.DataFrame({"month": months}).set_index("month")
+        plot_df["receita"] = receita_m.reindex(plot_df.index).fillna(0.0)
+        plot_df["despesa"] = despesa_m.reindex(plot_df.index).fillna(0.0)
+        plot_df["saldo_final"] = (plot_df["receita"] - plot_df["despesa"]).cumsum()
+        plot_df = plot_df.reset_index()
+
+        import plotly.graph_objects as go
+
+        fig = go.Figure()
+        fig.add_bar(x=plot_df["month"], y=plot_df["receita"], name="Receitas")
+        fig.add_bar(x=plot_df["month"], y=plot_df["despesa"], name="Despesas")
+        fig.add_trace(
+            go.Scatter(
+                x=plot_df["month"],
+                y=plot_df["saldo_final"],
+                mode="lines+markers",
+                name="Saldo Final (R$)",
+                yaxis="y2",
+            )
+        )
 
-        import plotly.express as px
+        fig.update_layout(
+            barmode="group",
+            height=360,
+            margin=dict(l=10, r=10, t=20, b=10),
+            xaxis=dict(title="", tickformat="%b/%y"),
+            yaxis=dict(title="R$"),
+            yaxis2=dict(title="", overlaying="y", side="right"),
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="left", x=0),
+        )
 
-        fig = px.pie(by_cat, names="category_name", values="amount", hole=0.55)
-        fig.update_traces(textposition="outside", textinfo="percent+label")
-        fig.update_layout(height=360, margin=dict(l=10, r=10, t=10, b=10), showlegend=False)
         st.plotly_chart(fig, use_container_width=True)
 
-        st.caption("Top categorias (mês):")
-        topn = by_cat.head(6).copy()
-        topn["Valor (R$)"] = topn["amount"].apply(lambda v: _brl(float(v)))
-        st.dataframe(
-            topn[["category_name", "Valor (R$)"]].rename(columns={"category_name": "Categoria"}),
-            use_container_width=True,
-            hide_index=True,
+    st.divider()
+
+    st.subheader("Despesas por Categoria")
+
+    try:
+        df_month_full = fetch_transactions_view(
+            cache_key,
+            date_from=m_from,
+            date_to=m_to,
+            project_id=None,
+            t_type="DESPESA",
+            status=None,
+            category_id=None,
+            counterparty_id=None,
         )
+    except Exception as e:
+        st.error("Erro ao montar despesas por categoria:")
+        st.code(_api_error_message(e))
+        df_month_full = pd.DataFrame()
 
-st.divider()
+    if df_month_full.empty:
+        st.caption("Sem despesas no mês selecionado.")
+    else:
+        dfc = df_month_full.copy()
+        dfc["category_name"] = clean_text(dfc["category_name"]) if "category_name" in dfc.columns else ""
+        dfc = dfc[dfc["amount"] > 0]
+
+        if dfc.empty:
+            st.caption("Sem despesas válidas para exibir.")
+        else:
+            by_cat = dfc.groupby("category_name")["amount"].sum().sort_values(ascending=False).reset_index()
+            by_cat["category_name"] = by_cat["category_name"].replace("", "(Sem categoria)")
+
+            import plotly.express as px
+
+            fig = px.pie(by_cat, names="category_name", values="amount", hole=0.55)
+            fig.update_traces(textposition="outside", textinfo="percent+label")
+            fig.update_layout(height=360, margin=dict(l=10, r=10, t=10, b=10), showlegend=False)
+            st.plotly_chart(fig, use_container_width=True)
+
+            st.caption("Top categorias (mês):")
+            topn = by_cat.head(6).copy()
+            topn["Valor (R$)"] = topn["amount"].apply(lambda v: _brl(float(v)))
+            st.dataframe(
+                topn[["category_name", "Valor (R$)"]].rename(columns={"category_name": "Categoria"}),
+                use_container_width=True,
+                hide_index=True,
+            )
 
 
 # ==========================================================
 # Contas a receber / pagar (painel)
 # ==========================================================
-r1, r2 = st.columns([1, 1])
-
 def _render_list_panel(df_in: pd.DataFrame, empty_text: str):
     if df_in is None or df_in.empty:
         st.caption(empty_text)
         return
 
     dfp = df_in.copy()
-    dfp["date"] = pd.to_datetime(dfp["date"], errors="coerce").dt.date
-    dfp["amount"] = pd.to_numeric(dfp["amount"], errors="coerce").fillna(0.0)
+    dfp["date"] = date_values(dfp["date"])
     for col in ["description", "counterparty_name", "project_code", "status"]:
         if col in dfp.columns:
-            dfp[col] = dfp[col].fillna("").apply(_clean_str)
+            dfp[col] = clean_text(dfp[col])
 
     html = '<div class="op-panel">'
     for _, row in dfp.iterrows():
@@ -753,320 +805,347 @@ def _render_list_panel(df_in: pd.DataFrame, empty_text: str):
     html += "</div>"
     st.markdown(html, unsafe_allow_html=True)
 
-with r1:
-    st.subheader("Contas a Receber (previsto)")
-    try:
-        df_r = fetch_receivables(cache_key, limit=10)
-    except Exception as e:
-        st.error("Erro ao carregar contas a receber:")
-        st.code(_api_error_message(e))
-        df_r = pd.DataFrame()
-    _render_list_panel(df_r, "Nenhuma conta a receber prevista.")
 
-with r2:
-    st.subheader("Contas a Pagar (previsto)")
-    try:
-        df_p = fetch_payables(cache_key, limit=10)
-    except Exception as e:
-        st.error("Erro ao carregar contas a pagar:")
-        st.code(_api_error_message(e))
-        df_p = pd.DataFrame()
-    _render_list_panel(df_p, "Nenhuma conta a pagar prevista.")
+def render_accounts() -> None:
+    r1, r2 = st.columns([1, 1])
 
-st.divider()
+    with r1:
+        st.subheader("Contas a Receber (previsto)")
+        try:
+            df_r = fetch_receivables(cache_key, limit=10)
+        except Exception as e:
+            st.error("Erro ao carregar contas a receber:")
+            st.code(_api_error_message(e))
+            df_r = pd.DataFrame()
+        _render_list_panel(df_r, "Nenhuma conta a receber prevista.")
+
+    with r2:
+        st.subheader("Contas a Pagar (previsto)")
+        try:
+            df_p = fetch_payables(cache_key, limit=10)
+        except Exception as e:
+            st.error("Erro ao carregar contas a pagar:")
+            st.code(_api_error_message(e))
+            df_p = pd.DataFrame()
+        _render_list_panel(df_p, "Nenhuma conta a pagar prevista.")
 
 
 # ==========================================================
 # NOVO LANÇAMENTO (INSERT)
 # ==========================================================
-st.subheader("Novo lançamento")
-if can_write:
-    st.caption("✅ Criar lançamentos. (Você pode editar/excluir na tabela abaixo.)")
-else:
-    st.caption("🔒 Somente leitura para seu usuário.")
-
-with st.container(border=True):
-    c1, c2, c3, c4 = st.columns([1.2, 1.2, 1.2, 1.2])
-    with c1:
-        new_date = st.date_input("Data", value=today, format="DD/MM/YYYY", key="new_date")
-    with c2:
-        new_type = st.selectbox("Tipo", TYPE_OPTIONS, index=1, key="new_type")
-    with c3:
-        new_status = st.selectbox("Status", ["REALIZADO", "PREVISTO", "CANCELADO"], index=0, key="new_status")
-    with c4:
-        new_amount = st.number_input("Valor (R$)", min_value=0.01, value=0.01, step=10.0, key="new_amount")
-
-    d1, d2, d3 = st.columns([2.6, 1.6, 1.6])
-    with d1:
-        new_desc = st.text_input("Descrição", value="", key="new_desc")
-    with d2:
-        new_payment = st.text_input("Forma de pagamento (opcional)", value="", key="new_payment")
-    with d3:
-        new_comp = st.date_input("Competência (opcional)", value=None, format="DD/MM/YYYY", key="new_comp")
-
-    e1, e2, e3 = st.columns([2.0, 2.0, 2.0])
-    with e1:
-        new_cat_label = st.selectbox("Categoria", cat_options, index=0, key="new_cat")
-    with e2:
-        new_cp_label = st.selectbox("Cliente/Fornecedor", cp_options, index=0, key="new_cp")
-    with e3:
-        new_proj_label = st.selectbox("Projeto (opcional)", ["(Nenhum)"] + proj_options[1:], index=0, key="new_proj")
-
-    new_notes = st.text_area("Observações (opcional)", value="", height=80, key="new_notes")
-
-    if st.button("Salvar lançamento", type="primary", disabled=not can_write):
-        if norm(new_desc) == "":
-            st.error("Descrição é obrigatória.")
-        elif float(new_amount) <= 0:
-            st.error("Valor deve ser maior que zero.")
-        else:
-            payload = {
-                "date": new_date.isoformat() if new_date else None,
-                "type": new_type,
-                "status": new_status,
-                "description": norm(new_desc),
-                "amount": float(new_amount),
-                "category_id": cat_map.get(new_cat_label),
-                "counterparty_id": cp_map.get(new_cp_label),
-                "project_id": proj_map.get(new_proj_label) if new_proj_label != "(Nenhum)" else None,
-                "payment_method": norm(new_payment) or None,
-                "competence_month": new_comp.isoformat() if new_comp else None,
-                "notes": norm(new_notes) or None,
-                "created_by": user_email or None,
-            }
+def render_new_transaction() -> None:
+    st.subheader("Novo lançamento")
+    if can_write:
+        st.caption("✅ Criar lançamentos. (Você pode editar/excluir na tabela abaixo.)")
+    else:
+        st.caption("🔒 Somente leitura para seu usuário.")
+
+    with st.container(border=True):
+        c1, c2, c3, c4 = st.columns([1.2, 1.2, 1.2, 1.2])
+        with c1:
+            new_date = st.date_input("Data", value=today, format="DD/MM/YYYY", key="new_date")
+        with c2:
+            new_type = st.selectbox("Tipo", TYPE_OPTIONS, index=1, key="new_type")
+        with c3:
+            new_status = st.selectbox("Status", ["REALIZADO", "PREVISTO", "CANCELADO"], index=0, key="new_status")
+        with c4:
+            new_amount = st.number_input("Valor (R$)", min_value=0.01, value=0.01, step=10.0, key="new_amount")
+
+        d1, d2, d3 = st.columns([2.6, 1.6, 1.6])
+        with d1:
+            new_desc = st.text_input("Descrição", value="", key="new_desc")
+        with d2:
+            new_payment = st.text_input("Forma de pagamento (opcional)", value="", key="new_payment")
+        with d3:
+            new_comp = st.date_input("Competência (opcional)", value=None, format="DD/MM/YYYY", key="new_comp")
+
+        e1, e2, e3 = st.columns([2.0, 2.0, 2.0])
+        with e1:
+            new_cat_label = st.selectbox("Categoria", cat_options, index=0, key="new_cat")
+        with e2:
+            new_cp_label = st.selectbox("Cliente/Fornecedor", cp_options, index=0, key="new_cp")
+        with e3:
+            new_proj_label = st.selectbox("Projeto (opcional)", ["(Nenhum)"] + proj_options[1:], index=0, key="new_proj")
+
+        new_notes = st.text_area("Observações (opcional)", value="", height=80, key="new_notes")
+
+        if st.button("Salvar lançamento", type="primary", disabled=not can_write):
+            if norm(new_desc) == "":
+                st.error("Descrição é obrigatória.")
+            elif float(new_amount) <= 0:
+                st.error("Valor deve ser maior que zero.")
+            else:
+                payload = {
+                    "date": new_date.isoformat() if new_date else None,
+                    "type": new_type,
+                    "status": new_status,
+                    "description": norm(new_desc),
+                    "amount": float(new_amount),
+                    "category_id": cat_map.get(new_cat_label),
+                    "counterparty_id": cp_map.get(new_cp_label),
+                    "project_id": proj_map.get(new_proj_label) if new_proj_label != "(Nenhum)" else None,
+                    "payment_method": norm(new_payment) or None,
+                    "competence_month": new_comp.isoformat() if new_comp else None,
+                    "notes": norm(new_notes) or None,
+                    "created_by": user_email or None,
+                }
+
+                try:
+                    insert_tx(payload)
+                    st.success("Lançamento criado.")
+                    clear_caches()
+                    # reset correto do editor (se estiver aberto)
+                    clear_editor_state(EDITOR_PREFIX)
+                    st.rerun()
+                except Exception as e:
+                    st.error("Erro ao salvar lançamento:")
+                    st.code(_api_error_message(e))
 
-            try:
-                insert_tx(payload)
-                st.success("Lançamento criado.")
-                clear_caches()
-                # reset correto do editor (se estiver aberto)
-                if "finance_editor" in st.session_state:
-                    del st.session_state["finance_editor"]
-                st.rerun()
-            except Exception as e:
-                st.error("Erro ao salvar lançamento:")
-                st.code(_api_error_message(e))
-
-st.divider()
 
 # ==========================================================
 # LISTA (EDIÇÃO INLINE + EXCLUSÃO)
 # ==========================================================
-st.subheader("Lançamentos (edição inline)")
-st.caption("✏️ Edite na tabela e clique em **Salvar alterações**. Para excluir, marque e confirme.")
-
 # sempre resetar o editor quando recarregar dados
 def _reset_editor_state():
-    if "finance_editor" in st.session_state:
-        del st.session_state["finance_editor"]
-
-try:
-    df = fetch_transactions_view(
-        cache_key,
-        date_from=date_from,
-        date_to=date_to,
-        project_id=f_project_id,
-        t_type=f_type,
-        status=f_status,
-        category_id=f_category_id,
-        counterparty_id=f_cp_id,
+    clear_editor_state(EDITOR_PREFIX)
+
+# Fragmento: paginar, editar e marcar exclusão rerodam só a tabela.
+@fragment
+def transactions_ledger() -> None:
+    st.subheader("Lançamentos (edição inline)")
+    st.caption("✏️ Edite na tabela e clique em **Salvar alterações**. Para excluir, marque e confirme.")
+
+    # Só a página visível vem do banco (keyset em date desc, id desc); as
+    # edições de cada página ficam pendentes até o save.
+    pager = EditorPager(
+        EDITOR_PREFIX, date_from, date_to, f_project_id, f_type, f_status, f_category_id, f_cp_id
     )
-except Exception as e:
-    st.error("Erro ao carregar lançamentos:")
-    st.code(_api_error_message(e))
-    st.stop()
-
-if df.empty:
-    st.info("Nenhum lançamento encontrado para os filtros.")
-    st.stop()
-
-# -------------------------
-# Normalização FORTE
-# -------------------------
-df2 = df.copy()
-
-# garante colunas mínimas
-need_cols = [
-    "id", "date", "type", "status", "description", "amount",
-    "category_id", "counterparty_id", "project_id",
-    "payment_method", "notes"
-]
-for c in need_cols:
-    if c not in df2.columns:
-        df2[c] = None
-
-df2["id"] = df2["id"].astype(str)
-
-df2["date"] = pd.to_datetime(df2["date"], errors="coerce").dt.date
-df2["type"] = df2["type"].fillna("").astype(str).str.upper().apply(_clean_str)
-df2["status"] = df2["status"].fillna("").astype(str).str.upper().apply(_clean_str)
-df2["description"] = df2["description"].fillna("").astype(str).apply(_clean_str)
-
-df2["amount"] = pd.to_numeric(df2["amount"], errors="coerce").fillna(0.0)
-
-df2["payment_method"] = df2["payment_method"].fillna("").astype(str).apply(_clean_str)
-df2["notes"] = df2["notes"].fillna("").astype(str).apply(_clean_str)
-
-# -------------------------
-# Options / maps
-# -------------------------
-CAT_NONE = "(Sem)"
-CP_NONE = "(Sem)"
-PROJ_NONE = "(Sem)"
-
-cat_options_editor = [CAT_NONE] + [k for k in cat_map.keys() if k != "(Todas)"]
-cp_options_editor  = [CP_NONE]  + [k for k in cp_map.keys() if k != "(Todas)"]
-proj_options_editor= [PROJ_NONE]+ [k for k in proj_map.keys() if k != "(Todos)"]
-
-cat_label_by_id = {v: k for k, v in cat_map.items() if v}
-cp_label_by_id  = {v: k for k, v in cp_map.items() if v}
-proj_label_by_id= {v: k for k, v in proj_map.items() if v}
-
-# -------------------------
-# DataFrame editável
-# IMPORTANTÍSSIMO:
-# - NÃO usar id como index do editor
-# - manter id como coluna oculta (não listada no column_order)
-# -------------------------
-df_edit = pd.DataFrame({
-    "id": df2["id"],  # coluna oculta (não aparecerá no grid)
-    "Excluir?": False,
-    "Data": df2["date"],
-    "Tipo": df2["type"],
-    "Status": df2["status"],
-    "Descrição": df2["description"],
-    "Categoria": df2["category_id"].map(cat_label_by_id).fillna(CAT_NONE),
-    "Cliente/Fornecedor": df2["counterparty_id"].map(cp_label_by_id).fillna(CP_NONE),
-    "Projeto": df2["project_id"].map(proj_label_by_id).fillna(PROJ_NONE),
-    "Valor": df2["amount"],
-    "Pagamento": df2["payment_method"],
-    "Obs": df2["notes"],
-}).reset_index(drop=True)
-
-edited = st.data_editor(
-    df_edit,
-    key="finance_editor",
-    use_container_width=True,
-    disabled=not can_write,
-    hide_index=True,
-    num_rows="fixed",
-    column_order=[
-        "Excluir?",
-        "Data",
-        "Tipo",
-        "Status",
-        "Descrição",
-        "Categoria",
-        "Cliente/Fornecedor",
-        "Projeto",
-        "Valor",
-        "Pagamento",
-        "Obs",
-    ],
-    column_config={
-        "Excluir?": st.column_config.CheckboxColumn(width="small"),
-        "Data": st.column_config.DateColumn(format="DD/MM/YYYY", width="small"),
-        "Tipo": st.column_config.SelectboxColumn(options=TYPE_OPTIONS, width="small"),
-        "Status": st.column_config.SelectboxColumn(options=STATUS_OPTIONS, width="small"),
-        "Categoria": st.column_config.SelectboxColumn(options=cat_options_editor),
-        "Cliente/Fornecedor": st.column_config.SelectboxColumn(options=cp_options_editor),
-        "Projeto": st.column_config.SelectboxColumn(options=proj_options_editor),
-        "Valor": st.column_config.NumberColumn(min_value=0.01, step=10.0, width="small"),
-        "Descrição": st.column_config.TextColumn(width="large"),
-        "Obs": st.column_config.TextColumn(width="large"),
-    },
-)
 
-c1, c2 = st.columns([1, 1])
-save_btn = c1.button("Salvar alterações", type="primary", disabled=not can_write)
-reload_btn = c2.button("Recarregar lançamentos")
-
-if reload_btn:
-    clear_caches()
-    _reset_editor_state()
-    st.rerun()
+    try:
+        df, remaining = fetch_transactions_page(
+            cache_key,
+            date_from=date_from,
+            date_to=date_to,
+            project_id=f_project_id,
+            t_type=f_type,
+            status=f_status,
+            category_id=f_category_id,
+            counterparty_id=f_cp_id,
+            after=pager.after,
+            limit=pager.size,
+        )
+    except Exception as e:
+        st.error("Erro ao carregar lançamentos:")
+        st.code(_api_error_message(e))
+        st.stop()
 
-delete_rows = edited[edited["Excluir?"] == True]  # noqa: E712
-delete_ids = delete_rows["id"].tolist()
+    total_rows = pager.offset + remaining
+    if total_rows == 0:
+        st.info("Nenhum lançamento encontrado para os filtros.")
+        st.stop()
 
-confirm_delete = False
-if delete_ids:
-    confirm_delete = st.checkbox(f"Confirmar exclusão de {len(delete_ids)} lançamento(s)", value=False)
+    pager.controls(total_rows)
+
+    # -------------------------
+    # Normalização FORTE
+    # -------------------------
+    df2 = df.copy()
+
+    # garante colunas mínimas
+    need_cols = [
+        "id", "date", "type", "status", "description", "amount",
+        "category_id", "counterparty_id", "project_id",
+        "payment_method", "notes"
+    ]
+    for c in need_cols:
+        if c not in df2.columns:
+            df2[c] = None
+
+    df2["id"] = df2["id"].astype(str)
+
+    # date/type/status/amount/textos já chegam tipados e limpos pelo schema
+    df2["date"] = date_values(df2["date"])
+    df2["type"] = df2["type"].astype(str)
+    df2["status"] = df2["status"].astype(str)
+
+    if not df2.empty:
+        pager.remember((df2["date"].iloc[-1].isoformat(), df2["id"].iloc[-1]))
+
+    # -------------------------
+    # Options / maps
+    # -------------------------
+    CAT_NONE = "(Sem)"
+    CP_NONE = "(Sem)"
+    PROJ_NONE = "(Sem)"
+
+    cat_options_editor = [CAT_NONE] + [k for k in cat_map.keys() if k != "(Todas)"]
+    cp_options_editor  = [CP_NONE]  + [k for k in cp_map.keys() if k != "(Todas)"]
+    proj_options_editor= [PROJ_NONE]+ [k for k in proj_map.keys() if k != "(Todos)"]
+
+    cat_label_by_id = {v: k for k, v in cat_map.items() if v}
+    cp_label_by_id  = {v: k for k, v in cp_map.items() if v}
+    proj_label_by_id= {v: k for k, v in proj_map.items() if v}
+
+    # -------------------------
+    # DataFrame editável
+    # IMPORTANTÍSSIMO:
+    # - NÃO usar id como index do editor
+    # - manter id como coluna oculta (não listada no column_order)
+    # -------------------------
+    df_edit = pd.DataFrame({
+        "id": df2["id"],  # coluna oculta (não aparecerá no grid)
+        "Excluir?": False,
+        "Data": df2["date"],
+        "Tipo": df2["type"],
+        "Status": df2["status"],
+        "Descrição": df2["description"],
+        "Categoria": df2["category_id"].map(cat_label_by_id).fillna(CAT_NONE),
+        "Cliente/Fornecedor": df2["counterparty_id"].map(cp_label_by_id).fillna(CP_NONE),
+        "Projeto": df2["project_id"].map(proj_label_by_id).fillna(PROJ_NONE),
+        "Valor": df2["amount"],
+        "Pagamento": df2["payment_method"],
+        "Obs": df2["notes"],
+    }).reset_index(drop=True)
+
+    editor = paginated_editor(
+        df_edit,
+        pager,
+        # versão da página carregada: troca de filtro/página/recarga = editor limpo
+        version=data_version(df),
+        id_col="id",
+        use_container_width=True,
+        disabled=not can_write,
+        hide_index=True,
+        num_rows="fixed",
+        column_order=[
+            "Excluir?",
+            "Data",
+            "Tipo",
+            "Status",
+            "Descrição",
+            "Categoria",
+            "Cliente/Fornecedor",
+            "Projeto",
+            "Valor",
+            "Pagamento",
+            "Obs",
+        ],
+        column_config={
+            "Excluir?": st.column_config.CheckboxColumn(width="small"),
+            "Data": st.column_config.DateColumn(format="DD/MM/YYYY", width="small"),
+            "Tipo": st.column_config.SelectboxColumn(options=TYPE_OPTIONS, width="small"),
+            "Status": st.column_config.SelectboxColumn(options=STATUS_OPTIONS, width="small"),
+            "Categoria": st.column_config.SelectboxColumn(options=cat_options_editor),
+            "Cliente/Fornecedor": st.column_config.SelectboxColumn(options=cp_options_editor),
+            "Projeto": st.column_config.SelectboxColumn(options=proj_options_editor),
+            "Valor": st.column_config.NumberColumn(min_value=0.01, step=10.0, width="small"),
+            "Descrição": st.column_config.TextColumn(width="large"),
+            "Obs": st.column_config.TextColumn(width="large"),
+        },
+    )
 
-if save_btn:
-    if not can_write:
-        st.warning("Seu perfil não possui permissão de escrita no Financeiro.")
-        st.stop()
+    c1, c2 = st.columns([1, 1])
+    save_btn = c1.button("Salvar alterações", type="primary", disabled=not can_write)
+    reload_btn = c2.button("Recarregar lançamentos")
 
-    before = df_edit.copy()
-    after = edited.copy()
+    if reload_btn:
+        clear_caches()
+        _reset_editor_state()
+        st.rerun()
 
-    warnings: list[str] = []
-    n_updates = 0
-    n_deletes = 0
+    # pendentes de todas as páginas (só as linhas alteradas)
+    delete_rows = editor.after[editor.after["Excluir?"] == True]  # noqa: E712
+    delete_ids = delete_rows["id"].tolist()
 
-    # 1) deletes
+    confirm_delete = False
     if delete_ids:
-        if not confirm_delete:
-            st.warning("Você marcou exclusões. Marque a checkbox de confirmação para apagar de verdade.")
+        confirm_delete = st.checkbox(f"Confirmar exclusão de {len(delete_ids)} lançamento(s)", value=False)
+
+    if save_btn:
+        if not can_write:
+            st.warning("Seu perfil não possui permissão de escrita no Financeiro.")
             st.stop()
 
-        for tx_id in delete_ids:
+        before = editor.before
+        after = editor.after
+
+        warnings: list[str] = []
+        n_updates = 0
+        n_deletes = 0
+
+        # 1) deletes
+        if delete_ids:
+            if not confirm_delete:
+                st.warning("Você marcou exclusões. Marque a checkbox de confirmação para apagar de verdade.")
+                st.stop()
+
+            for tx_id in delete_ids:
+                try:
+                    sb.table("finance_transactions").delete().eq("id", tx_id).execute()
+                    n_deletes += 1
+                except Exception as e:
+                    warnings.append(f"Erro ao excluir {tx_id}: {_api_error_message(e)}")
+
+        # 2) updates
+        # compara linha a linha pelo índice do DF (estável) e pega o tx_id na coluna
+        for i in range(len(after)):
+            if after.loc[i, "id"] in delete_ids:
+                continue
+
+            changed = False
+            for col in ["Data", "Tipo", "Status", "Descrição", "Categoria", "Cliente/Fornecedor", "Projeto", "Valor", "Pagamento", "Obs"]:
+                if norm(before.loc[i, col]) != norm(after.loc[i, col]):
+                    changed = True
+                    break
+            if not changed:
+                continue
+
+            tx_id = after.loc[i, "id"]
+            tx_date = to_date(after.loc[i, "Data"])
+
+            if tx_date is None:
+                warnings.append(f"{tx_id}: Data vazia (update ignorado).")
+                continue
+            if float(after.loc[i, "Valor"]) <= 0:
+                warnings.append(f"{tx_id}: Valor deve ser > 0 (update ignorado).")
+                continue
+            if norm(after.loc[i, "Descrição"]) == "":
+                warnings.append(f"{tx_id}: Descrição obrigatória (update ignorado).")
+                continue
+
+            payload = {
+                "date": tx_date.isoformat(),
+                "type": after.loc[i, "Tipo"],
+                "status": after.loc[i, "Status"],
+                "description": norm(after.loc[i, "Descrição"]),
+                "amount": float(after.loc[i, "Valor"]),
+                "category_id": None if after.loc[i, "Categoria"] == CAT_NONE else cat_map.get(after.loc[i, "Categoria"]),
+                "counterparty_id": None if after.loc[i, "Cliente/Fornecedor"] == CP_NONE else cp_map.get(after.loc[i, "Cliente/Fornecedor"]),
+                "project_id": None if after.loc[i, "Projeto"] == PROJ_NONE else proj_map.get(after.loc[i, "Projeto"]),
+                "payment_method": norm(after.loc[i, "Pagamento"]) or None,
+                "notes": norm(after.loc[i, "Obs"]) or None,
+            }
+
             try:
-                sb.table("finance_transactions").delete().eq("id", tx_id).execute()
-                n_deletes += 1
+                sb.table("finance_transactions").update(payload).eq("id", tx_id).execute()
+                n_updates += 1
             except Exception as e:
-                warnings.append(f"Erro ao excluir {tx_id}: {_api_error_message(e)}")
-
-    # 2) updates
-    # compara linha a linha pelo índice do DF (estável) e pega o tx_id na coluna
-    for i in range(len(after)):
-        if after.loc[i, "id"] in delete_ids:
-            continue
-
-        changed = False
-        for col in ["Data", "Tipo", "Status", "Descrição", "Categoria", "Cliente/Fornecedor", "Projeto", "Valor", "Pagamento", "Obs"]:
-            if norm(before.loc[i, col]) != norm(after.loc[i, col]):
-                changed = True
-                break
-        if not changed:
-            continue
-
-        tx_id = after.loc[i, "id"]
-
-        if after.loc[i, "Data"] is None:
-            warnings.append(f"{tx_id}: Data vazia (update ignorado).")
-            continue
-        if float(after.loc[i, "Valor"]) <= 0:
-            warnings.append(f"{tx_id}: Valor deve ser > 0 (update ignorado).")
-            continue
-        if norm(after.loc[i, "Descrição"]) == "":
-            warnings.append(f"{tx_id}: Descrição obrigatória (update ignorado).")
-            continue
-
-        payload = {
-            "date": after.loc[i, "Data"].isoformat(),
-            "type": after.loc[i, "Tipo"],
-            "status": after.loc[i, "Status"],
-            "description": norm(after.loc[i, "Descrição"]),
-            "amount": float(after.loc[i, "Valor"]),
-            "category_id": None if after.loc[i, "Categoria"] == CAT_NONE else cat_map.get(after.loc[i, "Categoria"]),
-            "counterparty_id": None if after.loc[i, "Cliente/Fornecedor"] == CP_NONE else cp_map.get(after.loc[i, "Cliente/Fornecedor"]),
-            "project_id": None if after.loc[i, "Projeto"] == PROJ_NONE else proj_map.get(after.loc[i, "Projeto"]),
-            "payment_method": norm(after.loc[i, "Pagamento"]) or None,
-            "notes": norm(after.loc[i, "Obs"]) or None,
-        }
+                warnings.append(f"Erro ao atualizar {tx_id}: {_api_error_message(e)}")
 
-        try:
-            sb.table("finance_transactions").update(payload).eq("id", tx_id).execute()
-            n_updates += 1
-        except Exception as e:
-            warnings.append(f"Erro ao atualizar {tx_id}: {_api_error_message(e)}")
+        if warnings:
+            st.warning("\n".join(warnings))
 
-    if warnings:
-        st.warning("\n".join(warnings))
+        st.success(f"Atualizados: {n_updates} • Excluídos: {n_deletes}")
+        clear_caches()
+        _reset_editor_state()
+        st.rerun()
 
-    st.success(f"Atualizados: {n_updates} • Excluídos: {n_deletes}")
-    clear_caches()
-    _reset_editor_state()
-    st.rerun()
+
+SECTION_RENDERERS = {
+    "Resumo": render_summary,
+    "Gráficos": render_charts,
+    "A receber / a pagar": render_accounts,
+    "Novo lançamento": render_new_transaction,
+    "Lançamentos": transactions_ledger,
+}
+SECTION_RENDERERS[section]()
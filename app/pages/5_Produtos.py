@@ -10,13 +10,24 @@ task_delivery_events. Nenhum cadastro novo de produto é feito aqui.
 from __future__ import annotations
 
 from datetime import date, datetime, timedelta
-from io import BytesIO
 
 import pandas as pd
 import streamlit as st
 
 from services.auth import require_login
+from services.classifiers import delivery_date_status, labeled_list
+from services.interval_index import DateIntervalIndex
+from services.normalize import clean_text, label_list, norm_text, text_list, to_date
+from services.prefetch import fetch_grouped
+from services.schemas import apply_schema, date_values, parse_dates
+from services.search_index import ROW_COL, SearchIndex
 from services.supabase_client import get_authed_client
+from services.versioning import clear_editor_state, data_version, frame_digest, stamp_version
+from ui.deep_link import take_deep_link
+from ui.exports import export_bar
+from ui.fragments import fragment
+from ui.layout import filter_form
+from ui.paginated_editor import EditorPager, paginated_editor
 
 # Branding
 try:
@@ -57,6 +68,10 @@ page_header(
 # ==========================================================
 # Constantes
 # ==========================================================
+EDITOR_PREFIX = "deliverables_editor"
+SEARCH_COLUMNS = ["project_code", "product_name", "assignee_names", "tracking_notes"]
+ALL_PERIODS = "Todos os prazos"
+
 DELIVERY_STATUS_OPTIONS = [
     "NAO_INICIADO",
     "EM_ELABORACAO",
@@ -123,46 +138,12 @@ def _api_error_message(e: Exception) -> str:
         return "Erro desconhecido."
 
 
-def to_date(x):
-    if x is None or (isinstance(x, float) and pd.isna(x)):
-        return None
-    try:
-        # Streamlit data_editor pode devolver datas como string no formato pt-BR (DD/MM/YYYY).
-        # pd.to_datetime sem dayfirst pode falhar e "sumir" com o prazo/entrega, quebrando o Status da entrega.
-        if isinstance(x, str) and "/" in x:
-            return pd.to_datetime(x, dayfirst=True, errors="coerce").date() if not pd.isna(pd.to_datetime(x, dayfirst=True, errors="coerce")) else None
-        dt = pd.to_datetime(x, errors="coerce")
-        return dt.date() if not pd.isna(dt) else None
-    except Exception:
-        return None
-
-
-def norm_text(x) -> str | None:
-    if x is None:
-        return None
-    s = str(x).strip()
-    if s in ("", "None", "nan", "NaT"):
-        return None
-    return s
-
-
-def safe_text_list(series: pd.Series, default: str = "") -> list[str]:
-    out: list[str] = []
-    for v in series.tolist():
-        if v is None or (isinstance(v, float) and pd.isna(v)):
-            out.append(default)
-        else:
-            s = str(v).strip()
-            out.append(default if s in ("None", "nan", "NaT") else s)
-    return out
-
-
 def client_due_series(df_: pd.DataFrame) -> pd.Series:
     if "client_due_date" in df_.columns:
         return df_["client_due_date"]
     if "enterprise" in df_.columns:
-        return df_["enterprise"]
-    return pd.Series([None] * len(df_), index=df_.index)
+        return parse_dates(df_["enterprise"], dayfirst=True)
+    return pd.Series(pd.NaT, index=df_.index, dtype="datetime64[ns]")
 
 
 def to_ui_status(status: str | None) -> str:
@@ -173,59 +154,14 @@ def to_ui_status(status: str | None) -> str:
     return s
 
 
-def delivery_status_for(deadline, delivery_date, today_: date) -> str:
-    prazo = to_date(deadline)
-    entrega = to_date(delivery_date)
-    if entrega is None:
-        if prazo is None:
-            return DELIVERY_DATE_STATUS["SEM_PRAZO"]
-        if prazo < today_:
-            return DELIVERY_DATE_STATUS["ATRASADA"]
-        return DELIVERY_DATE_STATUS["PENDENTE"]
-    if prazo is None or entrega <= prazo:
-        return DELIVERY_DATE_STATUS["ENTREGUE_NO_PRAZO"]
-    return DELIVERY_DATE_STATUS["ENTREGUE_COM_ATRASO"]
+def delivery_status_labels(deadline, delivery_date, today_: date) -> list[str]:
+    return labeled_list(delivery_date_status(deadline, delivery_date, today_), DELIVERY_DATE_STATUS)
 
 
 def product_use_status(status_ui: str | None) -> str:
     return "LIBERADO" if status_ui == "CONCLUIDO" else "TRAVADO"
 
 
-def apply_data_editor_state(base: pd.DataFrame, returned: pd.DataFrame, key: str) -> pd.DataFrame:
-    out = returned.copy()
-    if len(out) == len(base):
-        out.index = base.index.copy()
-
-    state = st.session_state.get(key)
-    if not isinstance(state, dict):
-        return out
-
-    for row_key, changes in (state.get("edited_rows") or {}).items():
-        if not isinstance(changes, dict):
-            continue
-        idx = None
-        try:
-            pos = int(row_key)
-            if 0 <= pos < len(out):
-                idx = out.index[pos]
-        except Exception:
-            if str(row_key) in out.index.astype(str):
-                idx = out.index[out.index.astype(str).tolist().index(str(row_key))]
-        if idx is None:
-            continue
-        for col, val in changes.items():
-            if col in out.columns:
-                out.at[idx, col] = val
-
-    return out
-
-
-def clear_deliverables_editor_state() -> None:
-    for key in list(st.session_state.keys()):
-        if str(key).startswith("deliverables_editor::"):
-            del st.session_state[key]
-
-
 def month_range(d: date) -> tuple[date, date]:
     first = d.replace(day=1)
     if first.month == 12:
@@ -275,25 +211,37 @@ def rpc_delete_task(task_id: str) -> None:
 # Loads
 # ==========================================================
 @st.cache_data(ttl=30)
-def load_deliverables(_k: str) -> pd.DataFrame:
+def load_deliverables(_k: str) -> tuple[pd.DataFrame, DateIntervalIndex, SearchIndex]:
+    """Produtos + índices do prazo interno (end_date) e da busca, montados juntos no cache."""
     data = sb_paginate(
         "v_deliverables",
         order_cols=[("project_code", False), ("end_date", False)],
     )
-    return pd.DataFrame(data)
+    df_ = pd.DataFrame(data)
+    if df_.empty:
+        return df_, DateIntervalIndex([]), SearchIndex([])
+
+    apply_schema(df_, "v_deliverables")
+    df_["__client_due_date"] = client_due_series(df_)
+    df_["delivery_status_ui"] = [to_ui_status(s) for s in text_list(df_["delivery_status"], "NAO_INICIADO")]
+    df_["product_use_status"] = [product_use_status(s) for s in df_["delivery_status_ui"].tolist()]
+    df_[ROW_COL] = range(len(df_))
+    search_index = SearchIndex.from_frame(df_, SEARCH_COLUMNS)
+    return stamp_version(df_), DateIntervalIndex(df_["end_date"]), search_index
 
 
 @st.cache_data(ttl=30)
-def load_events(_k: str, task_id: str) -> pd.DataFrame:
-    res = (
-        sb.table("task_delivery_events")
-        .select("event_type,from_value,to_value,notes,changed_at")
-        .eq("task_id", task_id)
-        .order("changed_at", desc=True)
-        .limit(50)
-        .execute()
+def load_events(_k: str, task_ids: tuple[str, ...]) -> dict[str, pd.DataFrame]:
+    """Timeline (50 eventos mais recentes) de todos os produtos do filtro, num lote só."""
+    return fetch_grouped(
+        sb,
+        "task_delivery_events",
+        "task_id,event_type,from_value,to_value,notes,changed_at",
+        "task_id",
+        task_ids,
+        order_col="changed_at",
+        per_key=50,
     )
-    return pd.DataFrame(res.data or [])
 
 
 def refresh():
@@ -302,7 +250,7 @@ def refresh():
 
 
 with st.spinner("Carregando produtos..."):
-    df = load_deliverables(cache_key)
+    df, end_date_index, search_index = load_deliverables(cache_key)
 
 if df.empty:
     st.info(
@@ -313,15 +261,11 @@ if df.empty:
 
 today = date.today()
 
-status_all = safe_text_list(df["delivery_status"], "NAO_INICIADO")
-df["delivery_status_ui"] = [to_ui_status(s) for s in status_all]
-df["product_use_status"] = [product_use_status(s) for s in df["delivery_status_ui"].tolist()]
-
 
 # ==========================================================
 # Filtros
 # ==========================================================
-projects_all = sorted({p for p in safe_text_list(df["project_code"]) if p})
+projects_all = sorted(p for p in clean_text(df["project_code"]).unique() if p)
 
 cur_first = shift_month_first(today, 0)
 next_first = shift_month_first(today, 1)
@@ -340,6 +284,7 @@ period_presets: list[tuple[str, date | None, date | None]] = [
     (f"2 meses ({month_label(cur_first)} + {month_label(next_first)})", cur_start, next_end),
     (f"3 meses ({month_label(cur_first)} + {month_label(next2_first)})", cur_start, next2_end),
     (f"Mês anterior + atual ({month_label(prev_first)} + {month_label(cur_first)})", prev_start, cur_end),
+    (ALL_PERIODS, None, None),
 ]
 period_labels = [p[0] for p in period_presets]
 default_period_idx = next(
@@ -347,23 +292,32 @@ default_period_idx = next(
     1 if len(period_labels) > 1 else 0,
 )
 
-fc1, fc2, fc3, fc4 = st.columns([1.4, 1.4, 1.7, 1.1])
-with fc1:
-    f_projects = st.multiselect("Projeto", projects_all, default=[])
-with fc2:
-    f_status = st.multiselect(
-        "Status",
-        DELIVERY_STATUS_OPTIONS,
-        default=[],
-        format_func=lambda s: STATUS_LABEL.get(s, s),
-    )
-with fc3:
-    sel_period = st.selectbox("Atalho (período)", period_labels, index=default_period_idx)
-with fc4:
-    f_product_use_scope = st.selectbox("Uso", PRODUCT_USE_SCOPE_OPTIONS, index=0)
+# deep link da Busca global: todos os prazos + busca pelo produto
+deep_link = take_deep_link("pages/5_Produtos.py")
+if deep_link.get("q"):
+    st.session_state["deliverables_period"] = ALL_PERIODS
+    st.session_state["deliverables_search"] = deep_link["q"]
+
+with filter_form("deliverables_filters"):
+    fc1, fc2, fc3, fc4 = st.columns([1.4, 1.4, 1.7, 1.1])
+    with fc1:
+        f_projects = st.multiselect("Projeto", projects_all, default=[])
+    with fc2:
+        f_status = st.multiselect(
+            "Status",
+            DELIVERY_STATUS_OPTIONS,
+            default=[],
+            format_func=lambda s: STATUS_LABEL.get(s, s),
+        )
+    with fc3:
+        sel_period = st.selectbox("Atalho (período)", period_labels, index=default_period_idx, key="deliverables_period")
+    with fc4:
+        f_product_use_scope = st.selectbox("Uso", PRODUCT_USE_SCOPE_OPTIONS, index=0)
 
 chosen = next(p for p in period_presets if p[0] == sel_period)
-if chosen[0] != "(manual)":
+if chosen[0] == ALL_PERIODS:
+    p_start, p_end = None, None
+elif chosen[0] != "(manual)":
     p_start, p_end = chosen[1], chosen[2]
     st.caption(f"Período: **{p_start.strftime('%d/%m/%Y')} – {p_end.strftime('%d/%m/%Y')}**")
 else:
@@ -373,23 +327,25 @@ else:
     else:
         p_start, p_end = cur_start, cur_end
 
-mask = pd.Series(True, index=df.index)
+# Janela pelo índice (O(log n + k)); os demais filtros só olham o recorte.
+df_w = df if p_start is None else df.iloc[end_date_index.between(p_start, p_end)]
+
+mask = pd.Series(True, index=df_w.index)
 if f_projects:
-    mask &= df["project_code"].isin(f_projects)
+    mask &= df_w["project_code"].isin(f_projects)
 if f_status:
-    mask &= df["delivery_status_ui"].isin(f_status)
+    mask &= df_w["delivery_status_ui"].isin(f_status)
 if f_product_use_scope == "Liberados":
-    mask &= df["product_use_status"] == "LIBERADO"
+    mask &= df_w["product_use_status"] == "LIBERADO"
 elif f_product_use_scope == "Travados":
-    mask &= df["product_use_status"] == "TRAVADO"
+    mask &= df_w["product_use_status"] == "TRAVADO"
 
-end_dates = pd.to_datetime(df["end_date"], errors="coerce").dt.date
-mask &= end_dates.between(p_start, p_end)
+df_f = df_w.loc[mask].reset_index(drop=True)
 
-df_f = df.loc[mask].reset_index(drop=True)
-df_f["__client_due_date"] = [to_date(x) for x in client_due_series(df_f).tolist()]
-
-st.caption(f"Quantitativo do período: **{p_start.strftime('%d/%m/%Y')} – {p_end.strftime('%d/%m/%Y')}**")
+if p_start is None:
+    st.caption("Quantitativo: **todos os prazos**")
+else:
+    st.caption(f"Quantitativo do período: **{p_start.strftime('%d/%m/%Y')} – {p_end.strftime('%d/%m/%Y')}**")
 qm1, qm2, qm3, qm4, qm5, qm6 = st.columns(6)
 qm1.metric("Total", len(df_f))
 qm2.metric(STATUS_LABEL["NAO_INICIADO"], int((df_f["delivery_status_ui"] == "NAO_INICIADO").sum()))
@@ -425,20 +381,13 @@ with tc1:
         "Buscar (Projeto · Produto · Responsável · Obs)",
         value="",
         placeholder="Ex.: relatório semestral, fulano, ASSCAF...",
+        key="deliverables_search",
     )
 with tc2:
     sort_label = st.selectbox("Ordenar por", list(SORT_OPTIONS.keys()), index=0)
 
 if search.strip():
-    q = search.strip().lower()
-    haystack = (
-        df_f["project_code"].fillna("").astype(str).str.lower() + " | "
-        + df_f["product_name"].fillna("").astype(str).str.lower() + " | "
-        + (df_f["assignee_names"].fillna("").astype(str).str.lower() if "assignee_names" in df_f.columns else "")
-        + " | "
-        + df_f["tracking_notes"].fillna("").astype(str).str.lower()
-    )
-    df_f = df_f.loc[haystack.str.contains(q, na=False, regex=False)].reset_index(drop=True)
+    df_f = df_f.loc[search_index.mask(df_f[ROW_COL], search)].reset_index(drop=True)
 
 df_f["__status_priority"] = (
     df_f["delivery_status_ui"].map(STATUS_PRIORITY).fillna(99).astype(int)
@@ -461,336 +410,328 @@ if df_f.empty:
 # ==========================================================
 def _build_export_df(_df: pd.DataFrame) -> pd.DataFrame:
     out = pd.DataFrame({
-        "Projeto": safe_text_list(_df["project_code"]),
-        "Produto": safe_text_list(_df["product_name"]),
+        "Projeto": text_list(_df["project_code"]),
+        "Produto": text_list(_df["product_name"]),
         "Responsável": (
-            safe_text_list(_df["assignee_names"])
+            text_list(_df["assignee_names"])
             if "assignee_names" in _df.columns else [""] * len(_df)
         ),
-        "Status do produto": [STATUS_LABEL.get(s, s) for s in safe_text_list(_df["delivery_status_ui"])],
-        "Uso": [PRODUCT_USE_LABEL.get(s, s) for s in safe_text_list(_df["product_use_status"])],
-        "Prazo de entrega interna": [to_date(x) for x in _df["end_date"].tolist()],
-        "Prazo de entrega ao cliente": [to_date(x) for x in client_due_series(_df).tolist()],
-        "Data de entrega ao cliente": [to_date(x) for x in _df["delivery_date"].tolist()],
-        "Obs": safe_text_list(_df["tracking_notes"]),
+        "Status do produto": label_list(_df["delivery_status_ui"], STATUS_LABEL),
+        "Uso": label_list(_df["product_use_status"], PRODUCT_USE_LABEL),
+        "Prazo de entrega interna": date_values(_df["end_date"]),
+        "Prazo de entrega ao cliente": date_values(_df["__client_due_date"]),
+        "Data de entrega ao cliente": date_values(_df["delivery_date"]),
+        "Obs": text_list(_df["tracking_notes"]),
     })
-    out["Status da entrega"] = [
-        delivery_status_for(p, d, today) for p, d in zip(out["Prazo de entrega ao cliente"].tolist(), out["Data de entrega ao cliente"].tolist())
-    ]
+    out["Status da entrega"] = delivery_status_labels(
+        out["Prazo de entrega ao cliente"], out["Data de entrega ao cliente"], today
+    )
     return out
 
 
-export_df = _build_export_df(df_f)
-csv_bytes = export_df.to_csv(index=False, sep=";", encoding="utf-8-sig").encode("utf-8-sig")
-xc1, xc2, _ = st.columns([1.2, 1.2, 4])
-xc1.download_button(
-    "⬇️ Exportar CSV",
-    data=csv_bytes,
-    file_name=f"produtos_{today.isoformat()}.csv",
-    mime="text/csv",
+# só gera no clique; mesmo recorte (dados + linhas + dia) reaproveita o arquivo
+export_bar(
+    "deliverables_export",
+    f"{data_version(df)}:{frame_digest(df_f, ['task_id'])}:{today.isoformat()}",
+    lambda: _build_export_df(df_f),
+    file_stem=f"produtos_{today.isoformat()}",
+    sheet_name="Produtos",
+    summary_by=["Projeto", "Status do produto", "Status da entrega"],
 )
-try:
-    buf = BytesIO()
-    with pd.ExcelWriter(buf, engine="xlsxwriter") as writer:
-        export_df.to_excel(writer, index=False, sheet_name="Produtos")
-    xc2.download_button(
-        "⬇️ Exportar Excel",
-        data=buf.getvalue(),
-        file_name=f"produtos_{today.isoformat()}.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-except Exception:
-    pass
 
 
 # ==========================================================
 # Editor
 # ==========================================================
-ids = safe_text_list(df_f["task_id"])
-status_labels = [STATUS_LABEL.get(s, s) for s in safe_text_list(df_f["delivery_status_ui"], "NAO_INICIADO")]
-resp_col = df_f["assignee_names"] if "assignee_names" in df_f.columns else pd.Series([""] * len(df_f))
-
-df_show = pd.DataFrame(
-    {
-        "Projeto": safe_text_list(df_f["project_code"]),
-        "Produto": safe_text_list(df_f["product_name"]),
-        "Responsável": safe_text_list(resp_col),
-        "Status do produto": status_labels,
-        "Uso": [PRODUCT_USE_LABEL.get(s, s) for s in safe_text_list(df_f["product_use_status"])],
-        "Prazo de entrega interna": [to_date(x) for x in df_f["end_date"].tolist()],
-        "Prazo de entrega ao cliente": [to_date(x) for x in client_due_series(df_f).tolist()],
-        "Data de entrega ao cliente": [to_date(x) for x in df_f["delivery_date"].tolist()],
-        "Obs": safe_text_list(df_f["tracking_notes"]),
-        "Excluir?": [False] * len(df_f),
-    },
-    index=ids,
-)
-df_show["Status da entrega"] = [
-    delivery_status_for(p, d, today)
-    for p, d in zip(df_show["Prazo de entrega ao cliente"].tolist(), df_show["Data de entrega ao cliente"].tolist())
-]
+# Fragmento: editar célula, marcar exclusão ou paginar reroda só esta seção
+# (os filtros, métricas e gráficos acima ficam como estão).
+@fragment
+def deliverables_editor(df: pd.DataFrame, df_f: pd.DataFrame) -> None:
+    ids = text_list(df_f["task_id"])
+    status_labels = label_list(df_f["delivery_status_ui"], STATUS_LABEL, "NAO_INICIADO")
+    resp_col = df_f["assignee_names"] if "assignee_names" in df_f.columns else pd.Series([""] * len(df_f))
+
+    df_show = pd.DataFrame(
+        {
+            "Projeto": text_list(df_f["project_code"]),
+            "Produto": text_list(df_f["product_name"]),
+            "Responsável": text_list(resp_col),
+            "Status do produto": status_labels,
+            "Uso": label_list(df_f["product_use_status"], PRODUCT_USE_LABEL),
+            "Prazo de entrega interna": date_values(df_f["end_date"]),
+            "Prazo de entrega ao cliente": date_values(df_f["__client_due_date"]),
+            "Data de entrega ao cliente": date_values(df_f["delivery_date"]),
+            "Obs": text_list(df_f["tracking_notes"]),
+            "Excluir?": [False] * len(df_f),
+        },
+        index=ids,
+    )
+    df_show["Status da entrega"] = delivery_status_labels(
+        df_show["Prazo de entrega ao cliente"], df_show["Data de entrega ao cliente"], today
+    )
 
-# Garante que o editor e o loop de save enderecem linhas por task_id (string).
-df_show.index = df_show.index.astype(str)
-ids = df_show.index.tolist()
+    # Garante que o editor e o loop de save enderecem linhas por task_id (string).
+    df_show.index = df_show.index.astype(str)
 
-status_label_options = [STATUS_LABEL[s] for s in DELIVERY_STATUS_OPTIONS]
+    status_label_options = [STATUS_LABEL[s] for s in DELIVERY_STATUS_OPTIONS]
 
-# Assinatura dos filtros — força reset do data_editor quando filtros mudam.
-# Sem isso, o editor cacheia as edições por índice e mostra dados defasados.
-_editor_signature = hash(
-    (
+    # Escopo do editor = versão dos dados + filtros — força reset do data_editor
+    # (e volta à página 1) quando filtros mudam ou os dados são recarregados.
+    # Sem isso, o editor cacheia as edições por índice e mostra dados defasados.
+    pager = EditorPager(
+        EDITOR_PREFIX,
+        data_version(df),
         tuple(f_projects), tuple(f_status),
         sel_period, p_start, p_end, f_product_use_scope, sort_label, search.strip(),
-        tuple(ids),
-        tuple(str(x) for x in df_show["Status do produto"].tolist()),
-        tuple(str(x) for x in df_show["Uso"].tolist()),
-        tuple(str(x) for x in df_show["Prazo de entrega ao cliente"].tolist()),
-        tuple(str(x) for x in df_show["Data de entrega ao cliente"].tolist()),
-        tuple(str(x) for x in df_show["Obs"].tolist()),
     )
-)
-editor_key = f"deliverables_editor::{_editor_signature}"
-
-edited = st.data_editor(
-    df_show,
-    use_container_width=True,
-    hide_index=True,
-    num_rows="fixed",
-    column_config={
-        "Projeto": st.column_config.TextColumn(disabled=True, width="small"),
-        "Produto": st.column_config.TextColumn(disabled=True, width="large"),
-        "Responsável": st.column_config.TextColumn(disabled=True, width="medium"),
-        "Status do produto": st.column_config.SelectboxColumn(options=status_label_options, width="medium"),
-        "Uso": st.column_config.TextColumn(disabled=True, width="small"),
-        "Prazo de entrega interna": st.column_config.DateColumn(
-            format="DD/MM/YYYY",
-            disabled=True,
-            width="small",
-        ),
-        "Prazo de entrega ao cliente": st.column_config.DateColumn(
-            format="DD/MM/YYYY",
-            width="small",
-            help="Prazo combinado com o cliente (editável aqui).",
-        ),
-        "Data de entrega ao cliente": st.column_config.DateColumn(
-            format="DD/MM/YYYY",
-            width="small",
-            help="Data de entrega efetiva ao cliente.",
-        ),
-        "Status da entrega": st.column_config.TextColumn(disabled=True, width="medium"),
-        "Obs": st.column_config.TextColumn(width="large"),
-        "Excluir?": st.column_config.CheckboxColumn("Excluir?", width="small", help="Marque para excluir."),
-    },
-    key=editor_key,
-)
+    pager.controls(len(df_show))
+
+    editor = paginated_editor(
+        df_show.iloc[pager.window()],
+        pager,
+        version=data_version(df),
+        use_container_width=True,
+        hide_index=True,
+        num_rows="fixed",
+        column_config={
+            "Projeto": st.column_config.TextColumn(disabled=True, width="small"),
+            "Produto": st.column_config.TextColumn(disabled=True, width="large"),
+            "Responsável": st.column_config.TextColumn(disabled=True, width="medium"),
+            "Status do produto": st.column_config.SelectboxColumn(options=status_label_options, width="medium"),
+            "Uso": st.column_config.TextColumn(disabled=True, width="small"),
+            "Prazo de entrega interna": st.column_config.DateColumn(
+                format="DD/MM/YYYY",
+                disabled=True,
+                width="small",
+            ),
+            "Prazo de entrega ao cliente": st.column_config.DateColumn(
+                format="DD/MM/YYYY",
+                width="small",
+                help="Prazo combinado com o cliente (editável aqui).",
+            ),
+            "Data de entrega ao cliente": st.column_config.DateColumn(
+                format="DD/MM/YYYY",
+                width="small",
+                help="Data de entrega efetiva ao cliente.",
+            ),
+            "Status da entrega": st.column_config.TextColumn(disabled=True, width="medium"),
+            "Obs": st.column_config.TextColumn(width="large"),
+            "Excluir?": st.column_config.CheckboxColumn("Excluir?", width="small", help="Marque para excluir."),
+        },
+    )
 
-edited = apply_data_editor_state(df_show, edited, editor_key)
+    # Só as linhas alteradas (de todas as páginas) seguem para exclusão/save.
+    edited = editor.after
 
-# Recalcula colunas derivadas a partir do que está na tela (evita status "travado").
-try:
-    _deadline_series = edited.get("Prazo de entrega ao cliente")
-    _delivery_series = edited.get("Data de entrega ao cliente")
-    if _deadline_series is not None and _delivery_series is not None:
-        edited["Status da entrega"] = [
-            delivery_status_for(p, d, today) for p, d in zip(_deadline_series.tolist(), _delivery_series.tolist())
-        ]
-except Exception:
-    pass
+    # Recalcula colunas derivadas a partir do que foi editado (evita status "travado").
+    try:
+        _deadline_series = edited.get("Prazo de entrega ao cliente")
+        _delivery_series = edited.get("Data de entrega ao cliente")
+        if _deadline_series is not None and _delivery_series is not None:
+            edited["Status da entrega"] = delivery_status_labels(_deadline_series, _delivery_series, today)
+    except Exception:
+        pass
 
-try:
-    edited.index = edited.index.astype(str)
-except Exception:
-    pass
-
-to_delete_ids = edited.index[edited["Excluir?"] == True].astype(str).tolist()  # noqa: E712
-
-if to_delete_ids:
-    with st.container(border=True):
-        st.error(f"Exclusão: você marcou **{len(to_delete_ids)}** produto(s).")
-        titles = edited.loc[to_delete_ids, "Produto"].astype(str).tolist()
-        st.write("**Produtos marcados:**")
-        st.write("\n".join([f"- {t}" for t in titles if t and t != "None"]))
-
-        confirm_delete = st.checkbox("Confirmo a exclusão definitiva dos produtos marcados", value=False)
-
-        colx1, colx2 = st.columns([1, 2])
-        delete_now = colx1.button("Excluir marcados agora", type="primary", disabled=not confirm_delete)
-        colx2.caption("Dica: desmarque o checkbox na tabela para cancelar a exclusão.")
-
-        if delete_now:
-            try:
-                for tid in to_delete_ids:
-                    rpc_delete_task(tid)
-                st.success(f"Excluídos: {len(to_delete_ids)}")
+    to_delete_ids = edited.index[edited["Excluir?"] == True].astype(str).tolist()  # noqa: E712
+
+    if to_delete_ids:
+        with st.container(border=True):
+            st.error(f"Exclusão: você marcou **{len(to_delete_ids)}** produto(s).")
+            titles = edited.loc[to_delete_ids, "Produto"].astype(str).tolist()
+            st.write("**Produtos marcados:**")
+            st.write("\n".join([f"- {t}" for t in titles if t and t != "None"]))
+
+            confirm_delete = st.checkbox("Confirmo a exclusão definitiva dos produtos marcados", value=False)
+
+            colx1, colx2 = st.columns([1, 2])
+            delete_now = colx1.button("Excluir marcados agora", type="primary", disabled=not confirm_delete)
+            colx2.caption("Dica: desmarque o checkbox na tabela para cancelar a exclusão.")
+
+            if delete_now:
+                try:
+                    for tid in to_delete_ids:
+                        rpc_delete_task(tid)
+                    st.success(f"Excluídos: {len(to_delete_ids)}")
+                    refresh()
+                    st.rerun()
+                except Exception as e:
+                    st.error("Erro ao excluir:")
+                    st.code(_api_error_message(e))
+
+    bc1, bc2, _ = st.columns([1, 1, 4])
+    save_clicked = bc1.button("Salvar alterações", type="primary")
+    reload_clicked = bc2.button("Recarregar")
+
+    if reload_clicked:
+        clear_editor_state(EDITOR_PREFIX)
+        refresh()
+        st.rerun()
+
+    if save_clicked:
+        changes: list[dict] = []
+        warnings: list[str] = []
+        rows_by_task_id = {str(r["task_id"]): r for _, r in df_f.iterrows()}
+
+        for task_id in edited.index:
+            before = editor.before.loc[task_id]
+            after = edited.loc[task_id]
+
+            if bool(after["Excluir?"]):
+                continue
+
+            before_status_ui = LABEL_TO_STATUS.get(before["Status do produto"], "NAO_INICIADO")
+            after_status_ui = LABEL_TO_STATUS.get(after["Status do produto"], "NAO_INICIADO")
+
+            after_entrega = to_date(after["Data de entrega ao cliente"])
+            before_entrega = to_date(before["Data de entrega ao cliente"])
+            after_prazo_cliente = to_date(after["Prazo de entrega ao cliente"])
+            before_prazo_cliente = to_date(before["Prazo de entrega ao cliente"])
+            before_obs = norm_text(before["Obs"])
+            after_obs = norm_text(after["Obs"])
+
+            # Se tem entrega real, considera o produto concluido automaticamente.
+            if after_entrega is not None:
+                after_status_ui = "CONCLUIDO"
+
+            diff = (
+                before_status_ui != after_status_ui
+                or before_entrega != after_entrega
+                or before_prazo_cliente != after_prazo_cliente
+                or before_obs != after_obs
+            )
+            if not diff:
+                continue
+
+            row = rows_by_task_id.get(str(task_id))
+            if row is None:
+                continue
+
+            current_db_status = str(row.get("delivery_status") or "NAO_INICIADO").strip().upper()
+            current_ui_status = to_ui_status(current_db_status)
+            if after_status_ui == current_ui_status:
+                # Se o status visual não mudou, preserva exatamente o valor atual no banco.
+                after_status_db = current_db_status
+            else:
+                after_status_db = UI_STATUS_TO_DB.get(after_status_ui, "NAO_INICIADO")
+
+            keep_revision = bool(row.get("needs_revision", False))
+            keep_sent = bool(row.get("sent_to_client", False))
+            keep_invoice = to_date(row.get("invoice_date"))
+            keep_discipline = norm_text(row.get("discipline"))
+            keep_enterprise = norm_text(row.get("enterprise"))
+
+            if after_status_ui == "CONCLUIDO" and after_entrega is None:
+                label = f"{after.get('Projeto','?')} — {after.get('Produto','?')}"
+                warnings.append(f"{label}: status **Concluído** sem data de entrega ao cliente.")
+
+            payload = {
+                "task_id": task_id,
+                "delivery_status": after_status_db,
+                "needs_revision": keep_revision,
+                "sent_to_client": keep_sent,
+                "delivery_date": after_entrega.isoformat() if after_entrega else None,
+                "invoice_date": keep_invoice.isoformat() if keep_invoice else None,
+                "discipline": keep_discipline,
+                "enterprise": keep_enterprise,
+                "notes": after_obs,
+            }
+            if "client_due_date" in df.columns:
+                payload["client_due_date"] = after_prazo_cliente.isoformat() if after_prazo_cliente else None
+            else:
+                payload["enterprise"] = after_prazo_cliente.isoformat() if after_prazo_cliente else None
+
+            changes.append(payload)
+
+        if not changes:
+            st.info("Nenhuma alteração a salvar.")
+        else:
+            ok, fail = 0, 0
+            errors: list[str] = []
+            for row in changes:
+                try:
+                    resp = (
+                        sb.table("task_delivery_tracking")
+                        .upsert(row, on_conflict="task_id", returning="representation")
+                        .execute()
+                    )
+                    if not getattr(resp, "data", None):
+                        fail += 1
+                        errors.append(
+                            f"{row['task_id']}: upsert não retornou linha "
+                            "(provável bloqueio por RLS/trigger no banco)."
+                        )
+                    else:
+                        ok += 1
+                except Exception as e:
+                    fail += 1
+                    errors.append(f"{row['task_id']}: {_api_error_message(e)}")
+            if ok:
+                st.success(f"{ok} produto(s) atualizado(s).")
+            if warnings:
+                for w in warnings:
+                    st.warning(w)
+            if fail:
+                st.error(f"{fail} falha(s):")
+                for err in errors:
+                    st.code(err)
+            if ok and not fail:
+                clear_editor_state(EDITOR_PREFIX)
                 refresh()
                 st.rerun()
-            except Exception as e:
-                st.error("Erro ao excluir:")
-                st.code(_api_error_message(e))
-
-bc1, bc2, _ = st.columns([1, 1, 4])
-save_clicked = bc1.button("Salvar alterações", type="primary")
-reload_clicked = bc2.button("Recarregar")
-
-if reload_clicked:
-    clear_deliverables_editor_state()
-    refresh()
-    st.rerun()
-
-if save_clicked:
-    changes: list[dict] = []
-    warnings: list[str] = []
-    rows_by_task_id = {str(r["task_id"]): r for _, r in df_f.iterrows()}
-
-    for task_id in ids:
-        before = df_show.loc[task_id]
-        after = edited.loc[task_id]
-
-        if bool(after["Excluir?"]):
-            continue
-
-        before_status_ui = LABEL_TO_STATUS.get(before["Status do produto"], "NAO_INICIADO")
-        after_status_ui = LABEL_TO_STATUS.get(after["Status do produto"], "NAO_INICIADO")
-
-        after_entrega = to_date(after["Data de entrega ao cliente"])
-        before_entrega = to_date(before["Data de entrega ao cliente"])
-        after_prazo_cliente = to_date(after["Prazo de entrega ao cliente"])
-        before_prazo_cliente = to_date(before["Prazo de entrega ao cliente"])
-        before_obs = norm_text(before["Obs"])
-        after_obs = norm_text(after["Obs"])
-
-        # Se tem entrega real, considera o produto concluido automaticamente.
-        if after_entrega is not None:
-            after_status_ui = "CONCLUIDO"
-
-        diff = (
-            before_status_ui != after_status_ui
-            or before_entrega != after_entrega
-            or before_prazo_cliente != after_prazo_cliente
-            or before_obs != after_obs
-        )
-        if not diff:
-            continue
-
-        row = rows_by_task_id.get(str(task_id))
-        if row is None:
-            continue
-
-        current_db_status = str(row.get("delivery_status") or "NAO_INICIADO").strip().upper()
-        current_ui_status = to_ui_status(current_db_status)
-        if after_status_ui == current_ui_status:
-            # Se o status visual não mudou, preserva exatamente o valor atual no banco.
-            after_status_db = current_db_status
-        else:
-            after_status_db = UI_STATUS_TO_DB.get(after_status_ui, "NAO_INICIADO")
-
-        keep_revision = bool(row.get("needs_revision", False))
-        keep_sent = bool(row.get("sent_to_client", False))
-        keep_invoice = to_date(row.get("invoice_date"))
-        keep_discipline = norm_text(row.get("discipline"))
-        keep_enterprise = norm_text(row.get("enterprise"))
-
-        if after_status_ui == "CONCLUIDO" and after_entrega is None:
-            label = f"{after.get('Projeto','?')} — {after.get('Produto','?')}"
-            warnings.append(f"{label}: status **Concluído** sem data de entrega ao cliente.")
-
-        payload = {
-            "task_id": task_id,
-            "delivery_status": after_status_db,
-            "needs_revision": keep_revision,
-            "sent_to_client": keep_sent,
-            "delivery_date": after_entrega.isoformat() if after_entrega else None,
-            "invoice_date": keep_invoice.isoformat() if keep_invoice else None,
-            "discipline": keep_discipline,
-            "enterprise": keep_enterprise,
-            "notes": after_obs,
-        }
-        if "client_due_date" in df.columns:
-            payload["client_due_date"] = after_prazo_cliente.isoformat() if after_prazo_cliente else None
-        else:
-            payload["enterprise"] = after_prazo_cliente.isoformat() if after_prazo_cliente else None
 
-        changes.append(payload)
 
-    if not changes:
-        st.info("Nenhuma alteração a salvar.")
-    else:
-        ok, fail = 0, 0
-        errors: list[str] = []
-        for row in changes:
-            try:
-                resp = (
-                    sb.table("task_delivery_tracking")
-                    .upsert(row, on_conflict="task_id", returning="representation")
-                    .execute()
-                )
-                if not getattr(resp, "data", None):
-                    fail += 1
-                    errors.append(
-                        f"{row['task_id']}: upsert não retornou linha "
-                        "(provável bloqueio por RLS/trigger no banco)."
-                    )
-                else:
-                    ok += 1
-            except Exception as e:
-                fail += 1
-                errors.append(f"{row['task_id']}: {_api_error_message(e)}")
-        if ok:
-            st.success(f"{ok} produto(s) atualizado(s).")
-        if warnings:
-            for w in warnings:
-                st.warning(w)
-        if fail:
-            st.error(f"{fail} falha(s):")
-            for err in errors:
-                st.code(err)
-        if ok and not fail:
-            clear_deliverables_editor_state()
-            refresh()
-            st.rerun()
+deliverables_editor(df, df_f)
 
 
 # ==========================================================
 # Timeline
 # ==========================================================
-st.divider()
-st.subheader("Histórico / Timeline")
+@fragment
+def product_timeline(df_f: pd.DataFrame) -> None:
+    st.divider()
+    st.subheader("Histórico / Timeline")
 
-if df_f.empty:
-    st.caption("Sem produtos no filtro.")
-else:
-    options = {
-        f"{r['project_code']} — {r['product_name']}": r["task_id"]
-        for _, r in df_f.iterrows()
-    }
-    pick = st.selectbox("Selecione um produto", list(options.keys()))
-    if pick:
-        task_id = options[pick]
-        events = load_events(cache_key, task_id)
-        if events.empty:
-            st.info("Sem eventos registrados ainda.")
-        else:
-            def _fmt_event(row) -> str:
-                ts = row["changed_at"]
-                try:
-                    ts = datetime.fromisoformat(str(ts).replace("Z", "+00:00")).strftime("%d/%m/%Y %H:%M")
-                except Exception:
-                    ts = str(ts)
-                ev = row["event_type"]
-                if ev == "STATUS_CHANGE":
-                    from_status = STATUS_LABEL.get(to_ui_status(row.get("from_value")), row.get("from_value"))
-                    to_status = STATUS_LABEL.get(to_ui_status(row.get("to_value")), row.get("to_value"))
-                    return f"**{ts}** — Status: `{from_status}` → `{to_status}`"
-                if ev == "DELIVERED":
-                    return f"**{ts}** — Entrega ao cliente em `{row['to_value']}`"
-                if ev == "CREATED":
-                    created_status = STATUS_LABEL.get(to_ui_status(row.get("to_value")), row.get("to_value"))
-                    return f"**{ts}** — Acompanhamento iniciado (`{created_status}`)"
-                return f"**{ts}** — {ev}"
-
-            hidden_events = {"REVISION_FLAG", "SENT_TO_CLIENT", "INVOICED"}
-            for _, ev in events.iterrows():
-                if str(ev.get("event_type") or "").upper() in hidden_events:
-                    continue
-                st.markdown("• " + _fmt_event(ev))
+    if df_f.empty:
+        st.caption("Sem produtos no filtro.")
+    else:
+        options = {
+            f"{r['project_code']} — {r['product_name']}": r["task_id"]
+            for _, r in df_f.iterrows()
+        }
+        # eventos de todos os produtos do filtro de uma vez; trocar o produto
+        # selecionado não vai ao banco
+        with st.spinner("Carregando histórico..."):
+            events_by_task = load_events(cache_key, tuple(sorted(options.values())))
+        pick = st.selectbox("Selecione um produto", list(options.keys()))
+        if pick:
+            task_id = options[pick]
+            events = events_by_task.get(str(task_id), pd.DataFrame())
+            if events.empty:
+                st.info("Sem eventos registrados ainda.")
+            else:
+                def _fmt_event(row) -> str:
+                    ts = row["changed_at"]
+                    try:
+                        ts = datetime.fromisoformat(str(ts).replace("Z", "+00:00")).strftime("%d/%m/%Y %H:%M")
+                    except Exception:
+                        ts = str(ts)
+                    ev = row["event_type"]
+                    if ev == "STATUS_CHANGE":
+                        from_status = STATUS_LABEL.get(to_ui_status(row.get("from_value")), row.get("from_value"))
+                        to_status = STATUS_LABEL.get(to_ui_status(row.get("to_value")), row.get("to_value"))
+                        return f"**{ts}** — Status: `{from_status}` → `{to_status}`"
+                    if ev == "DELIVERED":
+                        return f"**{ts}** — Entrega ao cliente em `{row['to_value']}`"
+                    if ev == "CREATED":
+                        created_status = STATUS_LABEL.get(to_ui_status(row.get("to_value")), row.get("to_value"))
+                        return f"**{ts}** — Acompanhamento iniciado (`{created_status}`)"
+                    return f"**{ts}** — {ev}"
+
+                hidden_events = {"REVISION_FLAG", "SENT_TO_CLIENT", "INVOICED"}
+                for _, ev in events.iterrows():
+                    if str(ev.get("event_type") or "").upper() in hidden_events:
+                        continue
+                    st.markdown("• " + _fmt_event(ev))
+
+
+product_timeline(df_f)
@@ -9,13 +9,25 @@ conter MÚLTIPLOS tipos de amostras enviados em conjunto ao mesmo laboratório.
 from __future__ import annotations
 
 from datetime import date, timedelta
-from io import BytesIO
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+from services.array_columns import MultiHot, join_lists
 from services.auth import require_login
+from services.classifiers import days_until, lab_situation, labeled
+from services.interval_index import DateIntervalIndex
+from services.normalize import clean_text, norm_text, text_list, to_date
+from services.schemas import apply_schema, date_values
+from services.search_index import ROW_COL, SearchIndex
 from services.supabase_client import get_authed_client
+from services.versioning import data_version, frame_digest, stamp_version
+from ui.deep_link import take_deep_link
+from ui.exports import export_bar
+from ui.fragments import fragment
+from ui.layout import filter_form
+from ui.paginated_editor import EditorPager, paginated_editor
 
 try:
     from ui.brand import apply_brand, apply_app_chrome, page_header
@@ -70,6 +82,13 @@ LEGACY_TO_UI = {
 }
 LABEL_TO_STATUS_UI = {v: k for k, v in STATUS_LABEL_UI.items()}
 
+SITUACAO_LABEL = {
+    "ATRASO":     "🔴 Atraso",
+    "PENDENTE":   "🟡 Pendente",
+    "EM_ANALISE": "🔵 Em análise",
+    "CONCLUIDO":  "🟢 Concluído",
+}
+
 SITUACAO_PRIORITY = {
     "🔴 Atraso":     0,
     "🟡 Pendente":   1,
@@ -78,6 +97,7 @@ SITUACAO_PRIORITY = {
 }
 
 DEFAULT_SLA_DAYS = 45
+SEARCH_COLUMNS = ["project_code", "sample_types", "lab_name", "assignee_name", "notes"]
 
 
 # ==========================================================
@@ -101,48 +121,15 @@ def _api_error_message(e: Exception) -> str:
         return "Erro desconhecido."
 
 
-def to_date(x):
-    if x is None or (isinstance(x, float) and pd.isna(x)):
-        return None
-    try:
-        return pd.to_datetime(x).date()
-    except Exception:
-        return None
+# Coluna inexistente (Postgres / cache de schema do PostgREST).
+MISSING_COLUMN_CODES = {"42703", "PGRST204"}
 
 
-def norm_text(x) -> str | None:
-    if x is None:
-        return None
-    s = str(x).strip()
-    if s in ("", "None", "nan", "NaT"):
-        return None
-    return s
-
-
-def safe_text_list(series: pd.Series, default: str = "") -> list[str]:
-    out: list[str] = []
-    for v in series.tolist():
-        if v is None or (isinstance(v, float) and pd.isna(v)):
-            out.append(default)
-        else:
-            s = str(v).strip()
-            out.append(default if s in ("None", "nan", "NaT") else s)
-    return out
-
-
-def to_list(x) -> list[str]:
-    if x is None:
-        return []
-    if isinstance(x, list):
-        return [str(i) for i in x if i is not None and str(i).strip() != ""]
-    if isinstance(x, float) and pd.isna(x):
-        return []
-    s = str(x).strip()
-    if not s or s in ("None", "nan", "NaT"):
-        return []
-    if s.startswith("{") and s.endswith("}"):
-        s = s[1:-1]
-    return [p.strip().strip('"') for p in s.split(",") if p.strip()]
+def _is_missing_column(e: Exception) -> bool:
+    code = getattr(e, "code", None)
+    if code is None and getattr(e, "args", None) and isinstance(e.args[0], dict):
+        code = e.args[0].get("code")
+    return str(code) in MISSING_COLUMN_CODES
 
 
 def month_range(d: date) -> tuple[date, date]:
@@ -178,12 +165,20 @@ def calc_expected(shipment: date | None, sla_days: int | None) -> date | None:
 
 
 def sb_paginate(table: str, *, select: str = "*", order_col: str | None = None,
-                desc: bool = False, page_size: int = 1000) -> list[dict]:
-    """Paginação obrigatória — anon key trunca em 1000 linhas por request."""
+                desc: bool = False, page_size: int = 1000,
+                filters: tuple[tuple[str, str, tuple], ...] = ()) -> list[dict]:
+    """Paginação obrigatória — anon key trunca em 1000 linhas por request.
+
+    `filters`: (operador, coluna, valores) aplicados no PostgREST, ex.:
+    ("ov", "sample_types", (...)) usa o índice GIN do array.
+    """
     out: list[dict] = []
     offset = 0
     while True:
-        q = sb.table(table).select(select).range(offset, offset + page_size - 1)
+        q = sb.table(table).select(select)
+        for op, col, values in filters:
+            q = getattr(q, op)(col, list(values))
+        q = q.range(offset, offset + page_size - 1)
         if order_col:
             q = q.order(order_col, desc=desc)
         resp = q.execute()
@@ -195,30 +190,53 @@ def sb_paginate(table: str, *, select: str = "*", order_col: str | None = None,
     return out
 
 
-def situacao_for(status: str | None, exp: date | None, today_: date) -> str:
-    status_ui = LEGACY_TO_UI.get(status or "", "PENDENTE")
-    if status_ui == "CONCLUIDO":
-        return "🟢 Concluído"
-    if exp is not None and exp < today_:
-        return "🔴 Atraso"
-    if status_ui == "PENDENTE":
-        return "🟡 Pendente"
-    return "🔵 Em análise"
-
-
-def days_delta(exp: date | None, today_: date) -> int | None:
-    if exp is None:
-        return None
-    return (exp - today_).days
-
-
 # ==========================================================
 # Loads
 # ==========================================================
 @st.cache_data(ttl=30)
-def load_samples(_k: str) -> pd.DataFrame:
-    data = sb_paginate("v_lab_samples", order_col="expected_release_date")
-    return pd.DataFrame(data)
+def load_samples(
+    _k: str,
+    project_ids: tuple[str, ...] = (),
+    statuses: tuple[str, ...] = (),
+    lab_ids: tuple[str, ...] = (),
+    types: tuple[str, ...] = (),
+) -> tuple[pd.DataFrame, DateIntervalIndex, SearchIndex, MultiHot]:
+    """Entregas + índices da Previsão, da busca e dos tipos, montados juntos no cache.
+
+    Projeto/status/laboratório/tipo vão para a query (índices de project_id,
+    status, lab_id e GIN de sample_types); se a view ainda não tiver essas
+    colunas (migrações antigas), carrega tudo e a página filtra localmente.
+    Qualquer outro erro (timeout, 5xx, filtro inválido) sobe.
+    """
+    filters = tuple(
+        f for f in (
+            ("in_", "project_id", project_ids),
+            ("in_", "status", statuses),
+            ("in_", "lab_id", lab_ids),
+            ("ov", "sample_types", types),
+        ) if f[2]
+    )
+    try:
+        data = sb_paginate("v_lab_samples", order_col="expected_release_date", filters=filters)
+    except Exception as e:
+        if not filters or not _is_missing_column(e):
+            raise
+        data = sb_paginate("v_lab_samples", order_col="expected_release_date")
+    df_ = pd.DataFrame(data)
+    if df_.empty:
+        return df_, DateIntervalIndex([]), SearchIndex([]), MultiHot([])
+    apply_schema(df_, "v_lab_samples")  # sample_types -> lista por linha
+    df_[ROW_COL] = range(len(df_))
+    type_lists = df_["sample_types"].tolist()
+    fields = df_.reindex(columns=SEARCH_COLUMNS)
+    fields["sample_types"] = join_lists(type_lists)
+    search_index = SearchIndex.from_frame(fields, SEARCH_COLUMNS)
+    return (
+        stamp_version(df_),
+        DateIntervalIndex(df_["expected_release_date"]),
+        search_index,
+        MultiHot(type_lists),
+    )
 
 
 @st.cache_data(ttl=300)
@@ -383,30 +401,52 @@ with st.expander("➕ Nova entrega de amostras", expanded=False):
 # ==========================================================
 # Carrega tabela principal
 # ==========================================================
+# Filtros de projeto/status/laboratório/tipo vão para a query: os widgets
+# (com key) ficam mais abaixo, mas o valor já está no session_state.
+FILTER_KEYS = ["lab_follow_projects_v2", "lab_follow_status_v2", "lab_labs_filter_v2", "lab_types_filter_v2"]
+project_code_to_id = (
+    dict(zip(clean_text(df_projects["project_code"]), clean_text(df_projects["id"]))) if not df_projects.empty else {}
+)
+pushed_status_ui = set(st.session_state.get("lab_follow_status_v2") or [])
+
 with st.spinner("Carregando amostras..."):
-    df = load_samples(cache_key)
+    df, expected_index, search_index, types_hot = load_samples(
+        cache_key,
+        project_ids=tuple(sorted(
+            project_code_to_id[c] for c in st.session_state.get("lab_follow_projects_v2") or [] if c in project_code_to_id
+        )),
+        statuses=tuple(s for s in LAB_STATUS_DB if LEGACY_TO_UI[s] in pushed_status_ui),
+        lab_ids=tuple(sorted(
+            str(lab_name_to_id[n]) for n in st.session_state.get("lab_labs_filter_v2") or [] if n in lab_name_to_id
+        )),
+        types=tuple(sorted(st.session_state.get("lab_types_filter_v2") or [])),
+    )
 
 if df.empty:
-    st.info("Nenhuma entrega cadastrada ainda. Use **Nova entrega de amostras** acima.")
+    if any(st.session_state.get(k) for k in FILTER_KEYS):
+        st.info("Nenhuma entrega para os filtros de projeto/status/laboratório/tipo selecionados.")
+        if st.button("Limpar filtros", key="lab_clear_filters"):
+            for k in FILTER_KEYS:
+                st.session_state.pop(k, None)
+            st.rerun()
+    else:
+        st.info("Nenhuma entrega cadastrada ainda. Use **Nova entrega de amostras** acima.")
     st.stop()
 
 # Fallbacks defensivos caso migrações v3/v4 ainda não tenham sido aplicadas
 for col, default in [
-    ("sample_types", None), ("lab_name", None), ("lab_id", None),
+    ("lab_name", None), ("lab_id", None),
     ("sample_count", None), ("sample_types_label", None),
 ]:
     if col not in df.columns:
         df[col] = default
 
-df["sample_types_list"] = df["sample_types"].apply(to_list)
-
 today = date.today()
 
 # Pré-computa Situação e dias restantes para todas as linhas
-exp_dates = [to_date(x) for x in df["expected_release_date"].tolist()]
-status_raw = safe_text_list(df["status"], "PENDENTE")
-df["__situacao"] = [situacao_for(s, e, today) for s, e in zip(status_raw, exp_dates)]
-df["__days"] = [days_delta(e, today) for e in exp_dates]
+status_ui = clean_text(df["status"], "PENDENTE").map(LEGACY_TO_UI).fillna("PENDENTE")
+df["__situacao"] = labeled(lab_situation(status_ui, df["expected_release_date"], today), SITUACAO_LABEL).array
+df["__days"] = days_until(df["expected_release_date"], today).array
 
 
 # ==========================================================
@@ -434,9 +474,10 @@ _vencimento_panel()
 # ==========================================================
 # Filtros (mesmo padrão da Produtos)
 # ==========================================================
-projects_all = sorted({p for p in safe_text_list(df["project_code"]) if p})
-labs_all = sorted({p for p in safe_text_list(df["lab_name"]) if p})
-people_all = sorted({p for p in safe_text_list(df["assignee_name"]) if p})
+# opções de projeto/laboratório vêm dos cadastros (o df já pode estar filtrado)
+projects_all = sorted(project_code_to_id)
+labs_all = lab_names_sorted
+people_all = sorted(p for p in clean_text(df["assignee_name"]).unique() if p)
 
 cur_first = shift_month_first(today, 0)
 next_first = shift_month_first(today, 1)
@@ -462,42 +503,43 @@ period_labels = [p[0] for p in period_presets]
 st.caption("Exibindo todos os registros por padrão. Use os filtros opcionais apenas para recortes pontuais.")
 
 with st.expander("Filtros opcionais de acompanhamento", expanded=False):
-    fc1, fc2, fc3 = st.columns([1.6, 1.6, 1.2])
-    with fc1:
-        f_projects = st.multiselect("Projeto", projects_all, default=[], key="lab_follow_projects_v2")
-    with fc2:
-        f_status_ui = st.multiselect(
-            "Status",
-            LAB_STATUS_UI,
-            default=[],
-            format_func=lambda s: STATUS_LABEL_UI.get(s, s),
-            key="lab_follow_status_v2",
-        )
-    with fc3:
-        only_pending = st.toggle(
-            "Apenas pendentes", value=False,
-            help="Oculta entregas concluídas.",
-            key="lab_follow_only_pending_v2",
-        )
+    with filter_form("lab_follow_filters", border=False):
+        fc1, fc2, fc3 = st.columns([1.6, 1.6, 1.2])
+        with fc1:
+            f_projects = st.multiselect("Projeto", projects_all, default=[], key="lab_follow_projects_v2")
+        with fc2:
+            f_status_ui = st.multiselect(
+                "Status",
+                LAB_STATUS_UI,
+                default=[],
+                format_func=lambda s: STATUS_LABEL_UI.get(s, s),
+                key="lab_follow_status_v2",
+            )
+        with fc3:
+            only_pending = st.toggle(
+                "Apenas pendentes", value=False,
+                help="Oculta entregas concluídas.",
+                key="lab_follow_only_pending_v2",
+            )
 
-    fc4, fc5, fc6 = st.columns([2.0, 1.2, 1.2])
-    with fc4:
-        sel_period = st.selectbox(
-            "Atalho (período pela Previsão)",
-            period_labels,
-            index=0,
-            key="lab_period_preset_v2",
-            help="Padrão = Tudo, sem restringir pela data de previsão.",
-        )
-    with fc5:
-        include_overdue = st.toggle(
-            "Incluir atrasadas",
-            value=True,
-            help="Mostra atrasadas mesmo fora do período.",
-            key="lab_include_overdue_v2",
-        )
-    with fc6:
-        include_undated = st.toggle("Incluir sem previsão", value=True, key="lab_include_undated_v2")
+        fc4, fc5, fc6 = st.columns([2.0, 1.2, 1.2])
+        with fc4:
+            sel_period = st.selectbox(
+                "Atalho (período pela Previsão)",
+                period_labels,
+                index=0,
+                key="lab_period_preset_v2",
+                help="Padrão = Tudo, sem restringir pela data de previsão.",
+            )
+        with fc5:
+            include_overdue = st.toggle(
+                "Incluir atrasadas",
+                value=True,
+                help="Mostra atrasadas mesmo fora do período.",
+                key="lab_include_overdue_v2",
+            )
+        with fc6:
+            include_undated = st.toggle("Incluir sem previsão", value=True, key="lab_include_undated_v2")
 
     chosen = next(p for p in period_presets if p[0] == sel_period)
     if chosen[0] == "(manual)":
@@ -512,30 +554,33 @@ with st.expander("Filtros opcionais de acompanhamento", expanded=False):
         p_start, p_end = chosen[1], chosen[2]
         st.caption(f"Período (Previsão): **{p_start.strftime('%d/%m/%Y')} – {p_end.strftime('%d/%m/%Y')}**")
 
-# Máscaras
-mask = pd.Series(True, index=df.index)
-if f_projects:
-    mask &= df["project_code"].isin(f_projects)
-if f_status_ui:
-    status_norm = df["status"].fillna("PENDENTE").map(lambda s: LEGACY_TO_UI.get(s, "PENDENTE"))
-    mask &= status_norm.isin(f_status_ui)
-if only_pending:
-    mask &= df["__situacao"] != "🟢 Concluído"
-
-expected = pd.to_datetime(df["expected_release_date"], errors="coerce").dt.date
+# Janela pela Previsão via índice (O(log n + k)); atrasadas = início < hoje
+# e não concluídas; sem previsão = posições fora do índice.
 if p_start is not None and p_end is not None:
-    in_window = expected.between(p_start, p_end)
-    extra = pd.Series(False, index=df.index)
+    rows = expected_index.between(p_start, p_end)
     if include_overdue:
-        extra = extra | (df["__situacao"] == "🔴 Atraso")
+        before_today = expected_index.before(today)
+        sit = df["__situacao"].to_numpy()
+        rows = np.union1d(rows, before_today[sit[before_today] == "🔴 Atraso"])
     if include_undated:
-        extra = extra | expected.isna()
-    mask &= in_window | extra
+        rows = np.union1d(rows, expected_index.missing)
+    df_w = df.iloc[rows]
 else:
+    df_w = df
     if chosen[0] != "Tudo" and not include_undated:
-        mask &= expected.notna()
+        df_w = df_w.drop(index=df.index[expected_index.missing])
 
-df_f = df.loc[mask].reset_index(drop=True)
+# Máscaras (só sobre o recorte da janela)
+mask = pd.Series(True, index=df_w.index)
+if f_projects:
+    mask &= df_w["project_code"].isin(f_projects)
+if f_status_ui:
+    status_norm = clean_text(df_w["status"], "PENDENTE").map(LEGACY_TO_UI).fillna("PENDENTE")
+    mask &= status_norm.isin(f_status_ui)
+if only_pending:
+    mask &= df_w["__situacao"] != "🟢 Concluído"
+
+df_f = df_w.loc[mask].reset_index(drop=True)
 
 
 # ==========================================================
@@ -571,30 +616,37 @@ SORT_OPTIONS = {
     "Atualizado recentemente":           ("updated_at", False),
 }
 
-with st.expander("Busca, filtros e ordenação", expanded=False):
-    tc1, tc2 = st.columns([2.5, 1.5])
-    with tc1:
-        search = st.text_input(
-            "Buscar (Projeto · Tipo · Lab · Responsável · Obs)",
-            value="", placeholder="Ex.: bentos, biofile, ASSCAF, fulano...",
-            key="lab_search_v2",
-        )
-    with tc2:
-        sort_label = st.selectbox("Ordenar por", list(SORT_OPTIONS.keys()), index=0, key="lab_sort_v2")
-
-    rc1, rc2, rc3, rc4 = st.columns([1.2, 1.2, 1.2, 1.4])
-    with rc1:
-        f_types = st.multiselect("Tipo de amostra", type_names_sorted, default=[], key="lab_types_filter_v2")
-    with rc2:
-        f_labs = st.multiselect("Laboratório", labs_all, default=[], key="lab_labs_filter_v2")
-    with rc3:
-        f_people = st.multiselect("Responsável", people_all, default=[], key="lab_people_filter_v2")
-    with rc4:
-        sit_options = ["🔴 Atraso", "🟡 Pendente", "🔵 Em análise", "🟢 Concluído"]
-        f_sit = st.multiselect("Situação", sit_options, default=[], key="lab_situation_filter_v2")
+# deep link da Busca global: abre já buscando a entrega
+deep_link = take_deep_link("pages/6_Laboratorio.py")
+if deep_link.get("q"):
+    st.session_state["lab_search_v2"] = deep_link["q"]
+
+with st.expander("Busca, filtros e ordenação", expanded=bool(st.session_state.get("lab_search_v2"))):
+    with filter_form("lab_table_filters", border=False):
+        tc1, tc2 = st.columns([2.5, 1.5])
+        with tc1:
+            search = st.text_input(
+                "Buscar (Projeto · Tipo · Lab · Responsável · Obs)",
+                value="", placeholder="Ex.: bentos, biofile, ASSCAF, fulano...",
+                key="lab_search_v2",
+            )
+        with tc2:
+            sort_label = st.selectbox("Ordenar por", list(SORT_OPTIONS.keys()), index=0, key="lab_sort_v2")
+
+        rc1, rc2, rc3, rc4 = st.columns([1.2, 1.2, 1.2, 1.4])
+        with rc1:
+            f_types = st.multiselect("Tipo de amostra", type_names_sorted, default=[], key="lab_types_filter_v2")
+        with rc2:
+            f_labs = st.multiselect("Laboratório", labs_all, default=[], key="lab_labs_filter_v2")
+        with rc3:
+            f_people = st.multiselect("Responsável", people_all, default=[], key="lab_people_filter_v2")
+        with rc4:
+            sit_options = ["🔴 Atraso", "🟡 Pendente", "🔵 Em análise", "🟢 Concluído"]
+            f_sit = st.multiselect("Situação", sit_options, default=[], key="lab_situation_filter_v2")
 
 if f_types:
-    df_f = df_f[df_f["sample_types_list"].apply(lambda lst: any(t in lst for t in f_types))].reset_index(drop=True)
+    # no-op quando o filtro foi para a query; cobre o fallback sem colunas novas
+    df_f = df_f[types_hot.any_of(f_types)[df_f[ROW_COL].to_numpy()]].reset_index(drop=True)
 if f_labs:
     df_f = df_f[df_f["lab_name"].isin(f_labs)].reset_index(drop=True)
 if f_people:
@@ -603,17 +655,9 @@ if f_sit:
     df_f = df_f[df_f["__situacao"].isin(f_sit)].reset_index(drop=True)
 
 if search.strip():
-    q = search.strip().lower()
-    haystack = (
-        df_f["project_code"].fillna("").astype(str).str.lower() + " | "
-        + df_f["sample_types_list"].apply(lambda lst: ", ".join(lst).lower()) + " | "
-        + df_f["lab_name"].fillna("").astype(str).str.lower() + " | "
-        + df_f["assignee_name"].fillna("").astype(str).str.lower() + " | "
-        + df_f["notes"].fillna("").astype(str).str.lower()
-    )
-    df_f = df_f.loc[haystack.str.contains(q, na=False, regex=False)].reset_index(drop=True)
+    df_f = df_f.loc[search_index.mask(df_f[ROW_COL], search)].reset_index(drop=True)
 
-df_f["__sit_priority"] = df_f["__situacao"].map(SITUACAO_PRIORITY).fillna(99).astype(int)
+df_f["__sit_priority"] = df_f["__situacao"].astype(object).map(SITUACAO_PRIORITY).fillna(99).astype(int)
 sort_col, sort_asc = SORT_OPTIONS[sort_label]
 if sort_col in df_f.columns and not df_f.empty:
     df_f = df_f.sort_values(by=sort_col, ascending=sort_asc, na_position="last").reset_index(drop=True)
@@ -621,277 +665,279 @@ if sort_col in df_f.columns and not df_f.empty:
 if df_f.empty:
     st.info(
         f"Nenhuma amostra corresponde aos filtros/busca atuais. "
-        f"Existem **{len(df)}** entrega(s) cadastrada(s) no total — "
+        f"Existem **{len(df)}** entrega(s) no recorte carregado — "
         "limpe os filtros opcionais ou revise a busca digitada."
     )
     st.stop()
 
 
 # ==========================================================
-# Export CSV
+# Export CSV / Excel
 # ==========================================================
 def _build_export_df(_df: pd.DataFrame) -> pd.DataFrame:
     out = pd.DataFrame({
-        "Projeto": safe_text_list(_df["project_code"]),
+        "Projeto": text_list(_df["project_code"]),
         "Situação": _df["__situacao"].tolist(),
-        "Tipos": [", ".join(lst) for lst in _df["sample_types_list"].tolist()],
+        "Tipos": join_lists(_df["sample_types"]),
         "Qtd": _df["sample_count"].fillna(0).astype(int).tolist(),
-        "Laboratório": safe_text_list(_df["lab_name"]),
-        "Responsável": safe_text_list(_df["assignee_name"]),
-        "Status (DB)": safe_text_list(_df["status"]),
-        "Entrega": [to_date(x) for x in _df["shipment_date"].tolist()],
+        "Laboratório": text_list(_df["lab_name"]),
+        "Responsável": text_list(_df["assignee_name"]),
+        "Status (DB)": text_list(_df["status"]),
+        "Entrega": date_values(_df["shipment_date"]),
         "Prazo (dias)": _df["sla_days"].fillna(DEFAULT_SLA_DAYS).astype(int).tolist(),
-        "Previsão": [to_date(x) for x in _df["expected_release_date"].tolist()],
+        "Previsão": date_values(_df["expected_release_date"]),
         "Dias": _df["__days"].tolist(),
-        "Obs": safe_text_list(_df["notes"]),
+        "Obs": text_list(_df["notes"]),
     })
     return out
 
 
-export_df = _build_export_df(df_f)
-csv_bytes = export_df.to_csv(index=False, sep=";", encoding="utf-8-sig").encode("utf-8-sig")
-xc1, xc2, _ = st.columns([1.2, 1.2, 4])
-xc1.download_button(
-    "⬇️ Exportar CSV",
-    data=csv_bytes,
-    file_name=f"laboratorio_{today.isoformat()}.csv",
-    mime="text/csv",
+# só gera no clique; mesmo recorte (dados + linhas + dia) reaproveita o arquivo
+export_bar(
+    "lab_export",
+    f"{data_version(df)}:{frame_digest(df_f, ['sample_id'])}:{today.isoformat()}",
+    lambda: _build_export_df(df_f),
+    file_stem=f"laboratorio_{today.isoformat()}",
+    sheet_name="Amostras",
+    summary_by=["Projeto", "Laboratório", "Situação"],
+    summary_value="Qtd",
 )
-try:
-    buf = BytesIO()
-    with pd.ExcelWriter(buf, engine="xlsxwriter") as writer:
-        export_df.to_excel(writer, index=False, sheet_name="Amostras")
-    xc2.download_button(
-        "⬇️ Exportar Excel",
-        data=buf.getvalue(),
-        file_name=f"laboratorio_{today.isoformat()}.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-except Exception:
-    pass  # xlsxwriter pode não estar instalado; o CSV cobre o caso
 
 
 # ==========================================================
 # Editor principal
 # ==========================================================
-people_names_sorted = sorted({n for n in safe_text_list(df_people["name"]) if n}) if not df_people.empty else []
-name_to_id = {row["name"]: row["id"] for _, row in df_people.iterrows()} if not df_people.empty else {}
-
-ids = safe_text_list(df_f["sample_id"])
-status_norm = [LEGACY_TO_UI.get(s, "PENDENTE") for s in safe_text_list(df_f["status"], "PENDENTE")]
-status_labels = [STATUS_LABEL_UI[s] for s in status_norm]
-
-def _format_days(d):
-    if d is None or (isinstance(d, float) and pd.isna(d)):
-        return ""
-    d = int(d)
-    if d < 0:
-        return f"⚠ −{-d}d (atraso)"
-    if d == 0:
-        return "Hoje"
-    return f"+{d}d"
-
-dias_strings = [_format_days(d) for d in df_f["__days"].tolist()]
-
-df_show = pd.DataFrame(
-    {
-        "Projeto":      safe_text_list(df_f["project_code"]),
-        "Situação":     df_f["__situacao"].tolist(),
-        "Tipos":        [", ".join(lst) for lst in df_f["sample_types_list"].tolist()],
-        "Qtd":          df_f["sample_count"].fillna(0).astype(int).tolist(),
-        "Laboratório":  safe_text_list(df_f["lab_name"]),
-        "Responsável":  safe_text_list(df_f["assignee_name"]),
-        "Status":       status_labels,
-        "Entrega":      [to_date(x) for x in df_f["shipment_date"].tolist()],
-        "Prazo (dias)": df_f["sla_days"].fillna(DEFAULT_SLA_DAYS).astype(int).tolist(),
-        "Previsão":     [to_date(x) for x in df_f["expected_release_date"].tolist()],
-        "Dias":         dias_strings,
-        "Obs":          safe_text_list(df_f["notes"]),
-        "Excluir?":     [False] * len(df_f),
-    },
-    index=ids,
-)
+# Fragmento: editar, paginar e salvar rerodam só esta seção.
+@fragment
+def samples_editor(df: pd.DataFrame, df_f: pd.DataFrame) -> None:
+    people_names_sorted = sorted(n for n in clean_text(df_people["name"]).unique() if n) if not df_people.empty else []
+    name_to_id = {row["name"]: row["id"] for _, row in df_people.iterrows()} if not df_people.empty else {}
+
+    ids = text_list(df_f["sample_id"])
+    status_norm = clean_text(df_f["status"], "PENDENTE").map(LEGACY_TO_UI).fillna("PENDENTE")
+    status_labels = status_norm.map(STATUS_LABEL_UI).tolist()
+
+    def _format_days(d):
+        if pd.isna(d):
+            return ""
+        d = int(d)
+        if d < 0:
+            return f"⚠ −{-d}d (atraso)"
+        if d == 0:
+            return "Hoje"
+        return f"+{d}d"
+
+    dias_strings = [_format_days(d) for d in df_f["__days"].tolist()]
+
+    df_show = pd.DataFrame(
+        {
+            "Projeto":      text_list(df_f["project_code"]),
+            "Situação":     df_f["__situacao"].tolist(),
+            "Tipos":        join_lists(df_f["sample_types"]),
+            "Qtd":          df_f["sample_count"].fillna(0).astype(int).tolist(),
+            "Laboratório":  text_list(df_f["lab_name"]),
+            "Responsável":  text_list(df_f["assignee_name"]),
+            "Status":       status_labels,
+            "Entrega":      date_values(df_f["shipment_date"]),
+            "Prazo (dias)": df_f["sla_days"].fillna(DEFAULT_SLA_DAYS).astype(int).tolist(),
+            "Previsão":     date_values(df_f["expected_release_date"]),
+            "Dias":         dias_strings,
+            "Obs":          text_list(df_f["notes"]),
+            "Excluir?":     [False] * len(df_f),
+        },
+        index=ids,
+    )
 
-status_label_options_ui = [STATUS_LABEL_UI[s] for s in LAB_STATUS_UI]
-
-edited = st.data_editor(
-    df_show,
-    use_container_width=True,
-    hide_index=True,
-    num_rows="fixed",
-    column_config={
-        "Projeto":      st.column_config.TextColumn(disabled=True, width="small"),
-        "Situação":     st.column_config.TextColumn(
-            disabled=True, width="small",
-            help="Calculada automaticamente: 🔴 Atraso (previsão vencida), "
-                 "🟡 Pendente (não entregue), 🔵 Em análise (no prazo), 🟢 Concluído.",
-        ),
-        "Tipos":        st.column_config.TextColumn(
-            disabled=True, width="medium",
-            help="Para alterar, use **Editar tipos** abaixo da tabela.",
-        ),
-        "Qtd":          st.column_config.NumberColumn(
-            min_value=0, max_value=10000, step=1, width="small",
-            help="Quantidade total de amostras nesta entrega.",
-        ),
-        "Laboratório":  st.column_config.SelectboxColumn(
-            options=[""] + lab_names_sorted, width="medium",
-        ),
-        "Responsável":  st.column_config.SelectboxColumn(
-            options=[""] + people_names_sorted, width="medium",
-        ),
-        "Status":       st.column_config.SelectboxColumn(
-            options=status_label_options_ui, width="small",
-            help="3 estados: Pendente · Em análise · Concluído.",
-        ),
-        "Entrega":      st.column_config.DateColumn(format="DD/MM/YYYY", width="small"),
-        "Prazo (dias)": st.column_config.NumberColumn(
-            min_value=0, max_value=365, step=1, width="small",
-            help="Prazo do laboratório para liberar os laudos.",
-        ),
-        "Previsão":     st.column_config.DateColumn(
-            format="DD/MM/YYYY", width="small",
-            help="Recalculada (Entrega + Prazo) ao salvar se você não a editar manualmente.",
-        ),
-        "Dias":         st.column_config.TextColumn(
-            disabled=True, width="small",
-            help="Dias restantes (+) ou de atraso (−) em relação à Previsão.",
-        ),
-        "Obs":          st.column_config.TextColumn(width="large"),
-        "Excluir?":     st.column_config.CheckboxColumn(width="small"),
-    },
-    key="lab_editor",
-)
+    status_label_options_ui = [STATUS_LABEL_UI[s] for s in LAB_STATUS_UI]
+
+    # versão dos dados + digest das linhas visíveis: filtros/ordenação/recarga
+    # trocam o escopo, voltam à página 1 e descartam edições pendentes
+    pager = EditorPager("lab_editor", data_version(df), frame_digest(df_f, ["sample_id"]))
+    pager.controls(len(df_show))
+
+    editor = paginated_editor(
+        df_show.iloc[pager.window()],
+        pager,
+        version=data_version(df),
+        use_container_width=True,
+        hide_index=True,
+        num_rows="fixed",
+        column_config={
+            "Projeto":      st.column_config.TextColumn(disabled=True, width="small"),
+            "Situação":     st.column_config.TextColumn(
+                disabled=True, width="small",
+                help="Calculada automaticamente: 🔴 Atraso (previsão vencida), "
+                     "🟡 Pendente (não entregue), 🔵 Em análise (no prazo), 🟢 Concluído.",
+            ),
+            "Tipos":        st.column_config.TextColumn(
+                disabled=True, width="medium",
+                help="Para alterar, use **Editar tipos** abaixo da tabela.",
+            ),
+            "Qtd":          st.column_config.NumberColumn(
+                min_value=0, max_value=10000, step=1, width="small",
+                help="Quantidade total de amostras nesta entrega.",
+            ),
+            "Laboratório":  st.column_config.SelectboxColumn(
+                options=[""] + lab_names_sorted, width="medium",
+            ),
+            "Responsável":  st.column_config.SelectboxColumn(
+                options=[""] + people_names_sorted, width="medium",
+            ),
+            "Status":       st.column_config.SelectboxColumn(
+                options=status_label_options_ui, width="small",
+                help="3 estados: Pendente · Em análise · Concluído.",
+            ),
+            "Entrega":      st.column_config.DateColumn(format="DD/MM/YYYY", width="small"),
+            "Prazo (dias)": st.column_config.NumberColumn(
+                min_value=0, max_value=365, step=1, width="small",
+                help="Prazo do laboratório para liberar os laudos.",
+            ),
+            "Previsão":     st.column_config.DateColumn(
+                format="DD/MM/YYYY", width="small",
+                help="Recalculada (Entrega + Prazo) ao salvar se você não a editar manualmente.",
+            ),
+            "Dias":         st.column_config.TextColumn(
+                disabled=True, width="small",
+                help="Dias restantes (+) ou de atraso (−) em relação à Previsão.",
+            ),
+            "Obs":          st.column_config.TextColumn(width="large"),
+            "Excluir?":     st.column_config.CheckboxColumn(width="small"),
+        },
+    )
 
-st.caption(
-    "💡 **Previsão** é recalculada ao salvar quando você muda **Entrega** ou "
-    "**Prazo (dias)** *e* não editou Previsão manualmente. "
-    "**Situação** e **Dias** são recalculadas após salvar."
-)
+    st.caption(
+        "💡 **Previsão** é recalculada ao salvar quando você muda **Entrega** ou "
+        "**Prazo (dias)** *e* não editou Previsão manualmente. "
+        "**Situação** e **Dias** são recalculadas após salvar."
+    )
+
+    bc1, bc2, _ = st.columns([1, 1, 4])
+    save_clicked = bc1.button("Salvar alterações", type="primary")
+    reload_clicked = bc2.button("Recarregar")
+
+    if reload_clicked:
+        refresh(); st.rerun()
+
+    if save_clicked:
+        ok, fail, deleted = 0, 0, 0
+        errors: list[str] = []
+        warnings: list[str] = []
 
-bc1, bc2, _ = st.columns([1, 1, 4])
-save_clicked = bc1.button("Salvar alterações", type="primary")
-reload_clicked = bc2.button("Recarregar")
+        # só as linhas alteradas, de todas as páginas
+        for sample_id in editor.after.index:
+            before = editor.before.loc[sample_id]
+            after = editor.after.loc[sample_id]
 
-if reload_clicked:
-    refresh(); st.rerun()
+            if bool(after["Excluir?"]):
+                try:
+                    sb.table("lab_samples").delete().eq("id", sample_id).execute()
+                    deleted += 1
+                except Exception as e:
+                    fail += 1
+                    errors.append(f"{sample_id} (delete): {_api_error_message(e)}")
+                continue
 
-if save_clicked:
-    ok, fail, deleted = 0, 0, 0
-    errors: list[str] = []
-    warnings: list[str] = []
+            before_status = LABEL_TO_STATUS_UI.get(before["Status"], "PENDENTE")
+            after_status = LABEL_TO_STATUS_UI.get(after["Status"], "PENDENTE")
 
-    for sample_id in ids:
-        before = df_show.loc[sample_id]
-        after = edited.loc[sample_id]
+            before_entrega = to_date(before["Entrega"])
+            after_entrega = to_date(after["Entrega"])
+            before_prev = to_date(before["Previsão"])
+            after_prev = to_date(after["Previsão"])
 
-        if bool(after["Excluir?"]):
+            before_sla = int(before["Prazo (dias)"]) if before["Prazo (dias)"] is not None else DEFAULT_SLA_DAYS
             try:
-                sb.table("lab_samples").delete().eq("id", sample_id).execute()
-                deleted += 1
-            except Exception as e:
-                fail += 1
-                errors.append(f"{sample_id} (delete): {_api_error_message(e)}")
-            continue
-
-        before_status = LABEL_TO_STATUS_UI.get(before["Status"], "PENDENTE")
-        after_status = LABEL_TO_STATUS_UI.get(after["Status"], "PENDENTE")
-
-        before_entrega = to_date(before["Entrega"])
-        after_entrega = to_date(after["Entrega"])
-        before_prev = to_date(before["Previsão"])
-        after_prev = to_date(after["Previsão"])
-
-        before_sla = int(before["Prazo (dias)"]) if before["Prazo (dias)"] is not None else DEFAULT_SLA_DAYS
-        try:
-            after_sla = int(after["Prazo (dias)"])
-        except Exception:
-            after_sla = before_sla
-
-        try:
-            before_qtd = int(before["Qtd"]) if before["Qtd"] is not None else 0
-        except Exception:
-            before_qtd = 0
-        try:
-            after_qtd = int(after["Qtd"])
-        except Exception:
-            after_qtd = before_qtd
-
-        before_resp = norm_text(before["Responsável"])
-        after_resp = norm_text(after["Responsável"])
-        before_lab = norm_text(before["Laboratório"])
-        after_lab = norm_text(after["Laboratório"])
-        before_obs = norm_text(before["Obs"])
-        after_obs = norm_text(after["Obs"])
-
-        # Auto-cálculo da Previsão
-        prev_user_changed = before_prev != after_prev
-        if not prev_user_changed and (before_entrega != after_entrega or before_sla != after_sla):
-            recalc = calc_expected(after_entrega, after_sla)
-            if recalc is not None:
-                after_prev = recalc
-
-        diff = (
-            before_status != after_status
-            or before_entrega != after_entrega
-            or before_sla != after_sla
-            or before_prev != after_prev
-            or before_qtd != after_qtd
-            or before_resp != after_resp
-            or before_lab != after_lab
-            or before_obs != after_obs
-        )
-        if not diff:
-            continue
-
-        # Validação: CONCLUIDO com previsão futura
-        if after_status == "CONCLUIDO" and after_prev is not None and after_prev > today:
-            warnings.append(
-                f"{after.get('Projeto','?')}: marcado como **Concluído** "
-                f"mas Previsão é futura ({after_prev.strftime('%d/%m/%Y')}) — confira."
-            )
+                after_sla = int(after["Prazo (dias)"])
+            except Exception:
+                after_sla = before_sla
 
-        payload = {
-            "status": after_status,
-            "shipment_date": after_entrega.isoformat() if after_entrega else None,
-            "sla_days": int(after_sla),
-            "sample_count": int(after_qtd) if after_qtd else None,
-            "expected_release_date": after_prev.isoformat() if after_prev else None,
-            "notes": after_obs,
-            "assignee_id": name_to_id.get(after_resp) if after_resp else None,
-            "lab_id": lab_name_to_id.get(after_lab) if after_lab else None,
-        }
-        try:
-            resp = (
-                sb.table("lab_samples")
-                .update(payload, returning="representation")
-                .eq("id", sample_id)
-                .execute()
+            try:
+                before_qtd = int(before["Qtd"]) if before["Qtd"] is not None else 0
+            except Exception:
+                before_qtd = 0
+            try:
+                after_qtd = int(after["Qtd"])
+            except Exception:
+                after_qtd = before_qtd
+
+            before_resp = norm_text(before["Responsável"])
+            after_resp = norm_text(after["Responsável"])
+            before_lab = norm_text(before["Laboratório"])
+            after_lab = norm_text(after["Laboratório"])
+            before_obs = norm_text(before["Obs"])
+            after_obs = norm_text(after["Obs"])
+
+            # Auto-cálculo da Previsão
+            prev_user_changed = before_prev != after_prev
+            if not prev_user_changed and (before_entrega != after_entrega or before_sla != after_sla):
+                recalc = calc_expected(after_entrega, after_sla)
+                if recalc is not None:
+                    after_prev = recalc
+
+            diff = (
+                before_status != after_status
+                or before_entrega != after_entrega
+                or before_sla != after_sla
+                or before_prev != after_prev
+                or before_qtd != after_qtd
+                or before_resp != after_resp
+                or before_lab != after_lab
+                or before_obs != after_obs
             )
-            if not getattr(resp, "data", None):
+            if not diff:
+                continue
+
+            # Validação: CONCLUIDO com previsão futura
+            if after_status == "CONCLUIDO" and after_prev is not None and after_prev > today:
+                warnings.append(
+                    f"{after.get('Projeto','?')}: marcado como **Concluído** "
+                    f"mas Previsão é futura ({after_prev.strftime('%d/%m/%Y')}) — confira."
+                )
+
+            payload = {
+                "status": after_status,
+                "shipment_date": after_entrega.isoformat() if after_entrega else None,
+                "sla_days": int(after_sla),
+                "sample_count": int(after_qtd) if after_qtd else None,
+                "expected_release_date": after_prev.isoformat() if after_prev else None,
+                "notes": after_obs,
+                "assignee_id": name_to_id.get(after_resp) if after_resp else None,
+                "lab_id": lab_name_to_id.get(after_lab) if after_lab else None,
+            }
+            try:
+                resp = (
+                    sb.table("lab_samples")
+                    .update(payload, returning="representation")
+                    .eq("id", sample_id)
+                    .execute()
+                )
+                if not getattr(resp, "data", None):
+                    fail += 1
+                    errors.append(f"{sample_id}: update não retornou linha (provável RLS).")
+                else:
+                    ok += 1
+            except Exception as e:
                 fail += 1
-                errors.append(f"{sample_id}: update não retornou linha (provável RLS).")
-            else:
-                ok += 1
-        except Exception as e:
-            fail += 1
-            errors.append(f"{sample_id}: {_api_error_message(e)}")
-
-    if ok:
-        st.success(f"{ok} amostra(s) atualizada(s).")
-    if deleted:
-        st.success(f"{deleted} amostra(s) excluída(s).")
-    if warnings:
-        for w in warnings:
-            st.warning(w)
-    if fail:
-        st.error(f"{fail} falha(s):")
-        for err in errors:
-            st.code(err)
-    if ok or deleted or fail:
-        refresh(); st.rerun()
-    elif not warnings:
-        st.info("Nenhuma alteração a salvar.")
+                errors.append(f"{sample_id}: {_api_error_message(e)}")
+
+        if ok:
+            st.success(f"{ok} amostra(s) atualizada(s).")
+        if deleted:
+            st.success(f"{deleted} amostra(s) excluída(s).")
+        if warnings:
+            for w in warnings:
+                st.warning(w)
+        if fail:
+            st.error(f"{fail} falha(s):")
+            for err in errors:
+                st.code(err)
+        if ok or deleted or fail:
+            refresh(); st.rerun()
+        elif not warnings:
+            st.info("Nenhuma alteração a salvar.")
+
+
+samples_editor(df, df_f)
 
 
 # ==========================================================
@@ -910,7 +956,7 @@ with st.expander("🎨 Visão colorida (somente leitura)", expanded=False):
             return ["background-color: #dcfce7"] * len(row)
         return [""] * len(row)
 
-    view_df = export_df.copy()
+    view_df = _build_export_df(df_f)
     try:
         styled = view_df.style.apply(_row_style, axis=1)
         st.dataframe(styled, use_container_width=True, hide_index=True)
@@ -935,14 +981,14 @@ with edit_types_container("✏️ Editar tipos de amostras de uma entrega"):
             r = df_f.iloc[i]
             label = (
                 f"{r['project_code']} · "
-                f"{', '.join(to_list(r['sample_types'])) or '—'} · "
+                f"{', '.join(r['sample_types']) or '—'} · "
                 f"entrega {to_date(r['shipment_date']) or '—'}"
             )
             labels.append(label)
             label_to_pos[label] = i
         sel = st.selectbox("Entrega", labels, key="edit_types_sel")
         row = df_f.iloc[label_to_pos[sel]]
-        current_types = to_list(row["sample_types"])
+        current_types = list(row["sample_types"])
         new_types = st.multiselect(
             "Tipos de amostra",
             type_names_sorted,
@@ -9,7 +9,6 @@ passivo atual, pagamentos, comprovantes e historico de alteracoes.
 from __future__ import annotations
 
 from datetime import date, datetime
-from io import BytesIO
 import html
 import re
 import uuid
@@ -18,8 +17,20 @@ import pandas as pd
 import streamlit as st
 
 from services.auth import require_login
+from services.classifiers import labeled, reimbursement_situation
+from services.interval_index import DateIntervalIndex
+from services.normalize import clean_str, clean_text, label_list, norm, norm_text, text_list, to_date
+from services.prefetch import fetch_grouped
+from services.schemas import apply_schema, date_values
+from services.search_index import ROW_COL, SearchIndex
 from services.supabase_client import get_authed_client
+from services.versioning import clear_editor_state, data_version, frame_digest, stamp_version
 from services.finance_guard import can_finance_write
+from ui.deep_link import take_deep_link
+from ui.exports import export_bar
+from ui.fragments import fragment
+from ui.layout import filter_form
+from ui.paginated_editor import EditorPager, paginated_editor
 
 try:
     from ui.brand import apply_brand, apply_app_chrome, page_header
@@ -67,6 +78,7 @@ if not can_write:
 BUCKET = "reimbursement-receipts"
 ALLOWED_MIMES = {"application/pdf", "image/jpeg", "image/png"}
 ALLOWED_EXTS = {".pdf", ".jpg", ".jpeg", ".png"}
+SEARCH_COLUMNS = ["description", "observations", "collaborator_name", "project_code", "project_name", "category_name"]
 
 STATUS_OPTIONS = ["PENDENTE", "APROVADO", "PAGO", "GLOSADO"]
 STATUS_LABEL = {
@@ -163,66 +175,17 @@ def _show_missing_schema_notice(e: Exception) -> None:
         st.code(_api_error_message(e))
 
 
-def norm(x) -> str:
-    return ("" if x is None else str(x)).strip()
-
-
-def norm_text(x) -> str | None:
-    s = norm(x)
-    if s in ("", "None", "nan", "NaT"):
-        return None
-    return s
-
-
-def _clean_str(x) -> str:
-    s = norm(x)
-    return "" if s in ("None", "nan", "NaT") else s
-
-
 def _html(x) -> str:
-    return html.escape(_clean_str(x))
-
-
-def to_date(x):
-    if x is None or (isinstance(x, float) and pd.isna(x)):
-        return None
-    try:
-        if isinstance(x, date) and not isinstance(x, datetime):
-            return x
-        if isinstance(x, str) and "/" in x:
-            dt = pd.to_datetime(x, dayfirst=True, errors="coerce")
-        else:
-            dt = pd.to_datetime(x, errors="coerce")
-        return dt.date() if not pd.isna(dt) else None
-    except Exception:
-        return None
+    return html.escape(clean_str(x))
 
 
 def _brl(v: float) -> str:
     return f"R$ {float(v):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
 
-def situation_for(status: str | None, due_date, today_: date) -> str:
-    status_norm = (status or "PENDENTE").strip().upper()
-    if status_norm == "PAGO":
-        return SITUATION_LABEL["PAGO"]
-    if status_norm == "GLOSADO":
-        return SITUATION_LABEL["GLOSADO"]
-
-    due = to_date(due_date)
-    if due is not None and due < today_:
-        return SITUATION_LABEL["ATRASADO"]
-    if status_norm == "APROVADO":
-        return SITUATION_LABEL["APROVADO"]
-    return SITUATION_LABEL["PENDENTE"]
-
-
-def _safe_text_list(series: pd.Series, default: str = "") -> list[str]:
-    out: list[str] = []
-    for v in series.tolist():
-        s = _clean_str(v)
-        out.append(s if s else default)
-    return out
+def _labels_by_id(ids: pd.Series, names: pd.Series, label_by_id: dict[str, str]) -> list[str]:
+    labels = clean_text(ids).map(label_by_id)
+    return labels.where(labels.notna(), clean_text(names)).tolist()
 
 
 def _month_start(d: date) -> date:
@@ -277,31 +240,6 @@ def _signed_url(bucket: str, path: str) -> str | None:
         return None
 
 
-def apply_data_editor_state(base: pd.DataFrame, returned: pd.DataFrame, key: str) -> pd.DataFrame:
-    out = returned.copy()
-    if len(out) == len(base):
-        out.index = base.index.copy()
-
-    state = st.session_state.get(key)
-    if not isinstance(state, dict):
-        return out
-
-    for row_key, changes in (state.get("edited_rows") or {}).items():
-        if not isinstance(changes, dict):
-            continue
-        try:
-            pos = int(row_key)
-            if not (0 <= pos < len(out)):
-                continue
-            idx = out.index[pos]
-        except Exception:
-            continue
-        for col, val in changes.items():
-            if col in out.columns:
-                out.at[idx, col] = val
-    return out
-
-
 def sb_paginate(table: str, *, select: str = "*", order_col: str | None = None,
                 desc: bool = False, page_size: int = 1000) -> list[dict]:
     out: list[dict] = []
@@ -323,9 +261,23 @@ def sb_paginate(table: str, *, select: str = "*", order_col: str | None = None,
 # Fetchs
 # ==========================================================
 @st.cache_data(ttl=30)
-def load_reimbursements(_k: str) -> pd.DataFrame:
+def load_reimbursements(_k: str) -> tuple[pd.DataFrame, DateIntervalIndex, SearchIndex]:
+    """
+    Lançamentos tipados pelo schema (services.schemas) + índices da data da
+    despesa e da busca. Parse e índices rodam uma vez por carga, não a cada interação.
+    """
     data = sb_paginate("v_reimbursements", order_col="expense_date", desc=True)
-    return pd.DataFrame(data)
+    df_ = pd.DataFrame(data)
+    if df_.empty:
+        return df_, DateIntervalIndex([]), SearchIndex([])
+
+    apply_schema(df_, "v_reimbursements")
+    # Prazo vazio assume a data da despesa (regra de situação).
+    df_["due_date"] = df_["due_date"].fillna(df_["expense_date"])
+    df_["expense_date_dt"] = date_values(df_["expense_date"])
+    df_[ROW_COL] = range(len(df_))
+    search_index = SearchIndex.from_frame(df_, SEARCH_COLUMNS)
+    return stamp_version(df_), DateIntervalIndex(df_["expense_date"]), search_index
 
 
 @st.cache_data(ttl=300)
@@ -354,28 +306,30 @@ def load_categories(_k: str) -> pd.DataFrame:
 
 
 @st.cache_data(ttl=30)
-def load_attachments(_k: str, reimbursement_id: str) -> pd.DataFrame:
-    res = (
-        sb.table("reimbursement_attachments")
-        .select("id,reimbursement_id,file_name,storage_bucket,storage_path,mime_type,file_size,uploaded_at,uploaded_by_email")
-        .eq("reimbursement_id", reimbursement_id)
-        .order("uploaded_at", desc=True)
-        .execute()
+def load_attachments(_k: str, reimbursement_ids: tuple[str, ...]) -> dict[str, pd.DataFrame]:
+    """Comprovantes (metadados) de todos os lancamentos do filtro, num lote so."""
+    return fetch_grouped(
+        sb,
+        "reimbursement_attachments",
+        "id,reimbursement_id,file_name,storage_bucket,storage_path,mime_type,file_size,uploaded_at,uploaded_by_email",
+        "reimbursement_id",
+        reimbursement_ids,
+        order_col="uploaded_at",
     )
-    return pd.DataFrame(res.data or [])
 
 
 @st.cache_data(ttl=30)
-def load_events(_k: str, reimbursement_id: str) -> pd.DataFrame:
-    res = (
-        sb.table("reimbursement_events")
-        .select("event_type,from_value,to_value,notes,changed_by_email,changed_at")
-        .eq("reimbursement_id", reimbursement_id)
-        .order("changed_at", desc=True)
-        .limit(100)
-        .execute()
+def load_events(_k: str, reimbursement_ids: tuple[str, ...]) -> dict[str, pd.DataFrame]:
+    """Historico (100 eventos mais recentes) de todos os lancamentos do filtro."""
+    return fetch_grouped(
+        sb,
+        "reimbursement_events",
+        "reimbursement_id,event_type,from_value,to_value,notes,changed_by_email,changed_at",
+        "reimbursement_id",
+        reimbursement_ids,
+        order_col="changed_at",
+        per_key=100,
     )
-    return pd.DataFrame(res.data or [])
 
 
 def clear_caches() -> None:
@@ -388,9 +342,7 @@ def clear_caches() -> None:
 
 
 def _reset_editor_state() -> None:
-    for key in list(st.session_state.keys()):
-        if str(key).startswith("reimbursements_editor::"):
-            del st.session_state[key]
+    clear_editor_state("reimbursements_editor")
 
 
 def _upload_receipts(reimbursement_id: str, files: list, actor_email: str) -> tuple[int, list[str]]:
@@ -455,18 +407,18 @@ except Exception as e:
 people_options: dict[str, str] = {}
 if not people_df.empty:
     for _, row in people_df.iterrows():
-        people_options[_clean_str(row.get("name"))] = _clean_str(row.get("id"))
+        people_options[clean_str(row.get("name"))] = clean_str(row.get("id"))
 
 project_options: dict[str, str] = {}
 if not projects_df.empty:
     for _, row in projects_df.iterrows():
-        label = f"{_clean_str(row.get('project_code'))} - {_clean_str(row.get('name'))}".strip(" -")
-        project_options[label] = _clean_str(row.get("id"))
+        label = f"{clean_str(row.get('project_code'))} - {clean_str(row.get('name'))}".strip(" -")
+        project_options[label] = clean_str(row.get("id"))
 
 category_options: dict[str, str] = {}
 if not categories_df.empty:
     for _, row in categories_df.iterrows():
-        category_options[_clean_str(row.get("name"))] = _clean_str(row.get("id"))
+        category_options[clean_str(row.get("name"))] = clean_str(row.get("id"))
 
 
 # ==========================================================
@@ -605,7 +557,7 @@ with st.expander("Novo reembolso / despesa interna", expanded=False):
 # ==========================================================
 try:
     with st.spinner("Carregando reembolsos..."):
-        df = load_reimbursements(cache_key)
+        df, expense_index, search_index = load_reimbursements(cache_key)
 except Exception as e:
     if _is_missing_reimbursement_schema(e):
         _show_missing_schema_notice(e)
@@ -620,27 +572,9 @@ if df.empty:
 
 today = date.today()
 
-for col, default in [
-    ("receipt_count", 0),
-    ("observations", ""),
-    ("due_date", None),
-    ("payment_date", None),
-    ("updated_at", None),
-    ("created_at", None),
-]:
-    if col not in df.columns:
-        df[col] = default
-
-df["amount"] = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0)
-df["expense_date_dt"] = pd.to_datetime(df["expense_date"], errors="coerce").dt.date
-df["due_date_dt"] = pd.to_datetime(df["due_date"], errors="coerce").dt.date
-df["due_date_dt"] = df["due_date_dt"].where(df["due_date_dt"].notna(), df["expense_date_dt"])
-df["due_date"] = df["due_date_dt"]
-df["payment_date_dt"] = pd.to_datetime(df["payment_date"], errors="coerce").dt.date
-df["status"] = df["status"].fillna("PENDENTE").astype(str).str.upper()
-df["__situacao"] = [situation_for(s, d, today) for s, d in zip(df["status"].tolist(), df["due_date_dt"].tolist())]
-df["__status_priority"] = df["status"].map(STATUS_PRIORITY).fillna(99).astype(int)
-df["__situation_priority"] = df["__situacao"].map(SITUATION_PRIORITY).fillna(99).astype(int)
+df["__situacao"] = labeled(reimbursement_situation(df["status"], df["due_date"], today), SITUATION_LABEL).array
+df["__status_priority"] = df["status"].astype(str).map(STATUS_PRIORITY).fillna(99).astype(int)
+df["__situation_priority"] = df["__situacao"].astype(str).map(SITUATION_PRIORITY).fillna(99).astype(int)
 
 
 # ==========================================================
@@ -648,11 +582,39 @@ df["__situation_priority"] = df["__situacao"].map(SITUATION_PRIORITY).fillna(99)
 # ==========================================================
 st.subheader("Filtros")
 
-expense_dates = [d for d in df["expense_date_dt"].tolist() if isinstance(d, date)]
-default_from = min(expense_dates) if expense_dates else _month_start(today)
-default_to = max(expense_dates) if expense_dates else today
+has_expense_dates = len(expense_index) > 0
+first_expense, last_expense = expense_index.bounds()
+default_from = first_expense or _month_start(today)
+default_to = last_expense or today
+
+# deep link da Busca global: período completo + busca pelo lançamento
+deep_link = take_deep_link("pages/7_Reembolsos.py")
+if deep_link.get("q"):
+    st.session_state.pop("reimb_filter_from_v2", None)
+    st.session_state.pop("reimb_filter_to_v2", None)
+    st.session_state["reimb_search"] = deep_link["q"]
+
+h1, h2, h3 = st.columns([1.0, 1.2, 3.8])
+with h1:
+    if st.button("Recarregar"):
+        clear_caches()
+        _reset_editor_state()
+        st.rerun()
+with h2:
+    if st.button("Mostrar todos"):
+        st.session_state["reimb_filter_from_v2"] = default_from
+        st.session_state["reimb_filter_to_v2"] = default_to
+        clear_caches()
+        _reset_editor_state()
+        st.rerun()
+with h3:
+    st.caption(
+        "Atraso e calculado automaticamente pelo Prazo de pagamento. Pago e Glosado encerram a pendencia operacional."
+    )
 
-with st.container(border=True):
+# botoes ficam fora do form: "Mostrar todos" reescreve as datas antes de os
+# widgets existirem neste rerun
+with filter_form("reimb_filters"):
     f1, f2, f3, f4, f5 = st.columns([1.1, 1.1, 1.7, 1.8, 1.5])
     with f1:
         date_from = st.date_input("De", value=default_from, format="DD/MM/YYYY", key="reimb_filter_from_v2")
@@ -661,13 +623,13 @@ with st.container(border=True):
     with f3:
         f_collaborators = st.multiselect(
             "Colaborador",
-            sorted({x for x in _safe_text_list(df["collaborator_name"]) if x}),
+            sorted(x for x in clean_text(df["collaborator_name"]).unique() if x),
             default=[],
         )
     with f4:
         f_projects = st.multiselect(
             "Projeto",
-            sorted({x for x in _safe_text_list(df["project_code"]) if x}),
+            sorted(x for x in clean_text(df["project_code"]).unique() if x),
             default=[],
         )
     with f5:
@@ -687,7 +649,7 @@ with st.container(border=True):
     with g2:
         f_categories = st.multiselect(
             "Categoria",
-            sorted({x for x in _safe_text_list(df["category_name"]) if x}),
+            sorted(x for x in clean_text(df["category_name"]).unique() if x),
             default=[],
         )
     with g3:
@@ -695,60 +657,36 @@ with st.container(border=True):
             "Buscar",
             value="",
             placeholder="Descricao, observacao, colaborador, projeto...",
+            key="reimb_search",
         )
     with g4:
         sort_label = st.selectbox("Ordenar por", list(SORT_OPTIONS.keys()), index=0)
 
-    h1, h2, h3 = st.columns([1.0, 1.2, 3.8])
-    with h1:
-        if st.button("Recarregar"):
-            clear_caches()
-            _reset_editor_state()
-            st.rerun()
-    with h2:
-        if st.button("Mostrar todos"):
-            st.session_state["reimb_filter_from_v2"] = default_from
-            st.session_state["reimb_filter_to_v2"] = default_to
-            clear_caches()
-            _reset_editor_state()
-            st.rerun()
-    with h3:
-        st.caption(
-            "Atraso e calculado automaticamente pelo Prazo de pagamento. Pago e Glosado encerram a pendencia operacional."
-        )
-
 if date_from > date_to:
     st.error("A data inicial nao pode ser maior que a data final.")
     st.stop()
 
-mask = pd.Series(True, index=df.index)
-mask &= df["expense_date_dt"].between(date_from, date_to)
+# Janela de datas pelo índice (O(log n + k)); os demais filtros só olham o recorte.
+df_w = df.iloc[expense_index.between(date_from, date_to)]
+
+mask = pd.Series(True, index=df_w.index)
 if f_collaborators:
-    mask &= df["collaborator_name"].isin(f_collaborators)
+    mask &= df_w["collaborator_name"].isin(f_collaborators)
 if f_projects:
-    mask &= df["project_code"].isin(f_projects)
+    mask &= df_w["project_code"].isin(f_projects)
 if f_categories:
-    mask &= df["category_name"].isin(f_categories)
+    mask &= df_w["category_name"].isin(f_categories)
 if f_status_labels:
     selected_status = [LABEL_TO_STATUS.get(s, s) for s in f_status_labels]
-    mask &= df["status"].isin(selected_status)
+    mask &= df_w["status"].isin(selected_status)
 if f_situation_labels:
-    mask &= df["__situacao"].isin(f_situation_labels)
+    mask &= df_w["__situacao"].isin(f_situation_labels)
 
-df_f = df.loc[mask].copy().reset_index(drop=True)
+df_f = df_w.loc[mask].copy().reset_index(drop=True)
 
 if search.strip():
-    q = search.strip().lower()
-    haystack = (
-        df_f["description"].fillna("").astype(str).str.lower() + " | "
-        + df_f["observations"].fillna("").astype(str).str.lower() + " | "
-        + df_f["collaborator_name"].fillna("").astype(str).str.lower() + " | "
-        + df_f["project_code"].fillna("").astype(str).str.lower() + " | "
-        + df_f["project_name"].fillna("").astype(str).str.lower() + " | "
-        + df_f["category_name"].fillna("").astype(str).str.lower() + " | "
-        + df_f["__situacao"].fillna("").astype(str).str.lower()
-    )
-    df_f = df_f.loc[haystack.str.contains(q, na=False, regex=False)].reset_index(drop=True)
+    # situação depende de hoje: entra na busca como coluna extra, fora do índice
+    df_f = df_f.loc[search_index.mask(df_f[ROW_COL], search, extra=df["__situacao"])].reset_index(drop=True)
 
 sort_col, sort_asc = SORT_OPTIONS[sort_label]
 if sort_col in df_f.columns and not df_f.empty:
@@ -762,7 +700,7 @@ st.divider()
 st.subheader("Indicadores")
 
 if df_f.empty:
-    if expense_dates:
+    if has_expense_dates:
         st.info(
             "Nenhum lancamento corresponde aos filtros atuais. "
             f"Existem {len(df)} lancamento(s) cadastrados entre "
@@ -828,91 +766,74 @@ st.divider()
 def _build_export_df(_df: pd.DataFrame) -> pd.DataFrame:
     out = pd.DataFrame(
         {
-            "Data da despesa": [to_date(x) for x in _df["expense_date"].tolist()],
-            "Colaborador": _safe_text_list(_df["collaborator_name"]),
-            "Projeto": _safe_text_list(_df["project_code"]),
-            "Nome do projeto": _safe_text_list(_df["project_name"]),
-            "Categoria": _safe_text_list(_df["category_name"]),
-            "Descricao": _safe_text_list(_df["description"]),
-            "Valor (R$)": pd.to_numeric(_df["amount"], errors="coerce").fillna(0.0).tolist(),
-            "Status": [STATUS_LABEL.get(s, s) for s in _safe_text_list(_df["status"])],
-            "Situacao": _safe_text_list(_df["__situacao"]),
-            "Prazo de pagamento": [to_date(x) for x in _df["due_date"].tolist()],
-            "Data do pagamento": [to_date(x) for x in _df["payment_date"].tolist()],
-            "Observacoes": _safe_text_list(_df["observations"]),
-            "Comprovantes": pd.to_numeric(_df["receipt_count"], errors="coerce").fillna(0).astype(int).tolist(),
-            "Criado por": _safe_text_list(_df["created_by_email"]),
-            "Atualizado por": _safe_text_list(_df["updated_by_email"]),
+            "Data da despesa": date_values(_df["expense_date"]),
+            "Colaborador": text_list(_df["collaborator_name"]),
+            "Projeto": text_list(_df["project_code"]),
+            "Nome do projeto": text_list(_df["project_name"]),
+            "Categoria": text_list(_df["category_name"]),
+            "Descricao": text_list(_df["description"]),
+            "Valor (R$)": _df["amount"].tolist(),
+            "Status": label_list(_df["status"], STATUS_LABEL),
+            "Situacao": text_list(_df["__situacao"]),
+            "Prazo de pagamento": date_values(_df["due_date"]),
+            "Data do pagamento": date_values(_df["payment_date"]),
+            "Observacoes": text_list(_df["observations"]),
+            "Comprovantes": _df["receipt_count"].tolist(),
+            "Criado por": text_list(_df["created_by_email"]),
+            "Atualizado por": text_list(_df["updated_by_email"]),
         }
     )
     return out
 
 
-export_df = _build_export_df(df_f)
-csv_bytes = export_df.to_csv(index=False, sep=";", encoding="utf-8-sig").encode("utf-8-sig")
-ec1, ec2, _ = st.columns([1.2, 1.2, 4])
-ec1.download_button(
-    "Exportar CSV",
-    data=csv_bytes,
-    file_name=f"reembolsos_{today.isoformat()}.csv",
-    mime="text/csv",
+# so gera no clique; mesmo recorte (dados + linhas + dia) reaproveita o arquivo
+export_bar(
+    "reimbursements_export",
+    f"{data_version(df)}:{frame_digest(df_f, ['id'])}:{today.isoformat()}",
+    lambda: _build_export_df(df_f),
+    file_stem=f"reembolsos_{today.isoformat()}",
+    sheet_name="Reembolsos",
+    summary_by=["Projeto", "Colaborador", "Categoria", "Status"],
+    summary_value="Valor (R$)",
 )
-try:
-    buf = BytesIO()
-    with pd.ExcelWriter(buf, engine="xlsxwriter") as writer:
-        export_df.to_excel(writer, index=False, sheet_name="Reembolsos")
-    ec2.download_button(
-        "Exportar Excel",
-        data=buf.getvalue(),
-        file_name=f"reembolsos_{today.isoformat()}.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-except Exception as e:
-    ec2.caption(f"Excel indisponivel: {_api_error_message(e)}")
 
 
 # ==========================================================
 # Editor principal
 # ==========================================================
-st.subheader("Lancamentos")
-st.caption("Edite os campos e clique em Salvar alteracoes. Marque Excluir? para remover lancamentos.")
-
-id_list = _safe_text_list(df_f["id"])
-collab_label_by_id = {v: k for k, v in people_options.items()}
-project_label_by_id = {v: k for k, v in project_options.items()}
-category_label_by_id = {v: k for k, v in category_options.items()}
-
-df_edit = pd.DataFrame(
-    {
-        "id": id_list,
-        "Excluir?": [False] * len(df_f),
-        "Data da despesa": [to_date(x) for x in df_f["expense_date"].tolist()],
-        "Colaborador": [
-            collab_label_by_id.get(_clean_str(x), _clean_str(n))
-            for x, n in zip(df_f["collaborator_id"].tolist(), df_f["collaborator_name"].tolist())
-        ],
-        "Projeto": [
-            project_label_by_id.get(_clean_str(x), _clean_str(c))
-            for x, c in zip(df_f["project_id"].tolist(), df_f["project_code"].tolist())
-        ],
-        "Categoria": [
-            category_label_by_id.get(_clean_str(x), _clean_str(n))
-            for x, n in zip(df_f["category_id"].tolist(), df_f["category_name"].tolist())
-        ],
-        "Descricao": _safe_text_list(df_f["description"]),
-        "Valor (R$)": pd.to_numeric(df_f["amount"], errors="coerce").fillna(0.0).tolist(),
-        "Status": [STATUS_LABEL.get(s, s) for s in _safe_text_list(df_f["status"], "PENDENTE")],
-        "Situacao": _safe_text_list(df_f["__situacao"]),
-        "Prazo de pagamento": [to_date(x) for x in df_f["due_date"].tolist()],
-        "Data do pagamento": [to_date(x) for x in df_f["payment_date"].tolist()],
-        "Observacoes": _safe_text_list(df_f["observations"]),
-        "Comprovantes": pd.to_numeric(df_f["receipt_count"], errors="coerce").fillna(0).astype(int).tolist(),
-    }
-).reset_index(drop=True)
+# Fragmento: editar, paginar e marcar exclusao rerodam so esta secao.
+@fragment
+def reimbursements_editor(df: pd.DataFrame, df_f: pd.DataFrame) -> None:
+    st.subheader("Lancamentos")
+    st.caption("Edite os campos e clique em Salvar alteracoes. Marque Excluir? para remover lancamentos.")
+
+    id_list = text_list(df_f["id"])
+    collab_label_by_id = {v: k for k, v in people_options.items()}
+    project_label_by_id = {v: k for k, v in project_options.items()}
+    category_label_by_id = {v: k for k, v in category_options.items()}
+
+    df_edit = pd.DataFrame(
+        {
+            "id": id_list,
+            "Excluir?": [False] * len(df_f),
+            "Data da despesa": date_values(df_f["expense_date"]),
+            "Colaborador": _labels_by_id(df_f["collaborator_id"], df_f["collaborator_name"], collab_label_by_id),
+            "Projeto": _labels_by_id(df_f["project_id"], df_f["project_code"], project_label_by_id),
+            "Categoria": _labels_by_id(df_f["category_id"], df_f["category_name"], category_label_by_id),
+            "Descricao": text_list(df_f["description"]),
+            "Valor (R$)": df_f["amount"].tolist(),
+            "Status": label_list(df_f["status"], STATUS_LABEL, "PENDENTE"),
+            "Situacao": text_list(df_f["__situacao"]),
+            "Prazo de pagamento": date_values(df_f["due_date"]),
+            "Data do pagamento": date_values(df_f["payment_date"]),
+            "Observacoes": text_list(df_f["observations"]),
+            "Comprovantes": df_f["receipt_count"].tolist(),
+        }
+    ).reset_index(drop=True)
 
-editor_signature = hash(
-    (
-        tuple(id_list),
+    pager = EditorPager(
+        "reimbursements_editor",
+        data_version(df),
         date_from,
         date_to,
         tuple(f_collaborators),
@@ -923,102 +844,19 @@ editor_signature = hash(
         search.strip(),
         sort_label,
     )
-)
-editor_key = f"reimbursements_editor::{editor_signature}"
-
-edited = st.data_editor(
-    df_edit,
-    key=editor_key,
-    use_container_width=True,
-    hide_index=True,
-    disabled=not can_write,
-    num_rows="fixed",
-    column_order=[
-        "Excluir?",
-        "Data da despesa",
-        "Colaborador",
-        "Projeto",
-        "Categoria",
-        "Descricao",
-        "Valor (R$)",
-        "Status",
-        "Situacao",
-        "Prazo de pagamento",
-        "Data do pagamento",
-        "Observacoes",
-        "Comprovantes",
-    ],
-    column_config={
-        "Excluir?": st.column_config.CheckboxColumn(width="small"),
-        "Data da despesa": st.column_config.DateColumn(format="DD/MM/YYYY", width="small"),
-        "Colaborador": st.column_config.SelectboxColumn(options=list(people_options.keys()), width="medium"),
-        "Projeto": st.column_config.SelectboxColumn(options=list(project_options.keys()), width="medium"),
-        "Categoria": st.column_config.SelectboxColumn(options=list(category_options.keys()), width="medium"),
-        "Descricao": st.column_config.TextColumn(width="large"),
-        "Valor (R$)": st.column_config.NumberColumn(min_value=0.01, step=10.0, format="R$ %.2f", width="small"),
-        "Status": st.column_config.SelectboxColumn(options=[STATUS_LABEL[s] for s in STATUS_OPTIONS], width="small"),
-        "Situacao": st.column_config.TextColumn(disabled=True, width="small"),
-        "Prazo de pagamento": st.column_config.DateColumn(format="DD/MM/YYYY", width="small"),
-        "Data do pagamento": st.column_config.DateColumn(format="DD/MM/YYYY", width="small"),
-        "Observacoes": st.column_config.TextColumn(width="large"),
-        "Comprovantes": st.column_config.NumberColumn(disabled=True, width="small"),
-    },
-)
-edited = apply_data_editor_state(df_edit, edited, editor_key)
-
-save_col, reload_col, _ = st.columns([1.0, 1.0, 4.0])
-save_btn = save_col.button("Salvar alteracoes", type="primary", disabled=not can_write)
-reload_btn = reload_col.button("Recarregar tabela")
-
-if reload_btn:
-    clear_caches()
-    _reset_editor_state()
-    st.rerun()
-
-delete_rows = edited[edited["Excluir?"] == True]  # noqa: E712
-delete_ids = delete_rows["id"].astype(str).tolist() if not delete_rows.empty else []
-confirm_delete = False
-if delete_ids:
-    with st.container(border=True):
-        st.error(f"Exclusao: {len(delete_ids)} lancamento(s) marcado(s).")
-        confirm_delete = st.checkbox("Confirmo a exclusao definitiva dos lancamentos marcados", value=False)
-
-if save_btn:
-    if not can_write:
-        st.warning("Seu perfil nao possui permissao de escrita.")
-        st.stop()
-
-    before = df_edit.copy()
-    after = edited.copy()
-    warnings: list[str] = []
-    n_updates = 0
-    n_deletes = 0
-
-    if delete_ids:
-        if not confirm_delete:
-            st.warning("Marque a confirmacao para excluir os lancamentos selecionados.")
-            st.stop()
-
-        for rid in delete_ids:
-            try:
-                att = load_attachments(cache_key, rid)
-                if not att.empty:
-                    paths = _safe_text_list(att["storage_path"])
-                    try:
-                        sb.storage.from_(BUCKET).remove(paths)
-                    except Exception:
-                        pass
-                sb.table("reimbursements").delete().eq("id", rid).execute()
-                n_deletes += 1
-            except Exception as e:
-                warnings.append(f"Erro ao excluir {rid}: {_api_error_message(e)}")
-
-    for i in range(len(after)):
-        rid = str(after.loc[i, "id"])
-        if rid in delete_ids:
-            continue
-
-        compare_cols = [
+    pager.controls(len(df_edit))
+
+    editor = paginated_editor(
+        df_edit.iloc[pager.window()],
+        pager,
+        version=data_version(df),
+        id_col="id",
+        use_container_width=True,
+        hide_index=True,
+        disabled=not can_write,
+        num_rows="fixed",
+        column_order=[
+            "Excluir?",
             "Data da despesa",
             "Colaborador",
             "Projeto",
@@ -1026,170 +864,270 @@ if save_btn:
             "Descricao",
             "Valor (R$)",
             "Status",
+            "Situacao",
             "Prazo de pagamento",
             "Data do pagamento",
             "Observacoes",
-        ]
-        if all(norm(before.loc[i, c]) == norm(after.loc[i, c]) for c in compare_cols):
-            continue
+            "Comprovantes",
+        ],
+        column_config={
+            "Excluir?": st.column_config.CheckboxColumn(width="small"),
+            "Data da despesa": st.column_config.DateColumn(format="DD/MM/YYYY", width="small"),
+            "Colaborador": st.column_config.SelectboxColumn(options=list(people_options.keys()), width="medium"),
+            "Projeto": st.column_config.SelectboxColumn(options=list(project_options.keys()), width="medium"),
+            "Categoria": st.column_config.SelectboxColumn(options=list(category_options.keys()), width="medium"),
+            "Descricao": st.column_config.TextColumn(width="large"),
+            "Valor (R$)": st.column_config.NumberColumn(min_value=0.01, step=10.0, format="R$ %.2f", width="small"),
+            "Status": st.column_config.SelectboxColumn(options=[STATUS_LABEL[s] for s in STATUS_OPTIONS], width="small"),
+            "Situacao": st.column_config.TextColumn(disabled=True, width="small"),
+            "Prazo de pagamento": st.column_config.DateColumn(format="DD/MM/YYYY", width="small"),
+            "Data do pagamento": st.column_config.DateColumn(format="DD/MM/YYYY", width="small"),
+            "Observacoes": st.column_config.TextColumn(width="large"),
+            "Comprovantes": st.column_config.NumberColumn(disabled=True, width="small"),
+        },
+    )
 
-        expense_date = to_date(after.loc[i, "Data da despesa"])
-        status = LABEL_TO_STATUS.get(norm(after.loc[i, "Status"]), "PENDENTE")
-        due_date = to_date(after.loc[i, "Prazo de pagamento"])
-        payment_date = to_date(after.loc[i, "Data do pagamento"])
-        amount = float(after.loc[i, "Valor (R$)"] or 0)
+    save_col, reload_col, _ = st.columns([1.0, 1.0, 4.0])
+    save_btn = save_col.button("Salvar alteracoes", type="primary", disabled=not can_write)
+    reload_btn = reload_col.button("Recarregar tabela")
 
-        if expense_date is None:
-            warnings.append(f"{rid}: Data da despesa vazia. Atualizacao ignorada.")
-            continue
-        if due_date is None:
-            warnings.append(f"{rid}: Prazo de pagamento vazio. Atualizacao ignorada.")
-            continue
-        if amount <= 0:
-            warnings.append(f"{rid}: Valor deve ser maior que zero. Atualizacao ignorada.")
-            continue
-        if norm(after.loc[i, "Descricao"]) == "":
-            warnings.append(f"{rid}: Descricao obrigatoria. Atualizacao ignorada.")
-            continue
-        if status == "PAGO" and payment_date is None:
-            warnings.append(f"{rid}: status Pago exige Data do pagamento. Atualizacao ignorada.")
-            continue
+    if reload_btn:
+        clear_caches()
+        _reset_editor_state()
+        st.rerun()
 
-        payload = {
-            "expense_date": expense_date.isoformat(),
-            "collaborator_id": people_options.get(norm(after.loc[i, "Colaborador"])),
-            "project_id": project_options.get(norm(after.loc[i, "Projeto"])),
-            "category_id": category_options.get(norm(after.loc[i, "Categoria"])),
-            "description": norm(after.loc[i, "Descricao"]),
-            "amount": amount,
-            "status": status,
-            "due_date": due_date.isoformat(),
-            "payment_date": payment_date.isoformat() if status == "PAGO" and payment_date else None,
-            "observations": norm_text(after.loc[i, "Observacoes"]),
-            "updated_by_email": user_email or None,
-        }
+    # pendentes de todas as páginas (só as linhas alteradas)
+    delete_rows = editor.after[editor.after["Excluir?"] == True]  # noqa: E712
+    delete_ids = delete_rows["id"].astype(str).tolist() if not delete_rows.empty else []
+    confirm_delete = False
+    if delete_ids:
+        with st.container(border=True):
+            st.error(f"Exclusao: {len(delete_ids)} lancamento(s) marcado(s).")
+            confirm_delete = st.checkbox("Confirmo a exclusao definitiva dos lancamentos marcados", value=False)
 
-        if not payload["collaborator_id"] or not payload["project_id"] or not payload["category_id"]:
-            warnings.append(f"{rid}: colaborador, projeto ou categoria invalido. Atualizacao ignorada.")
-            continue
+    if save_btn:
+        if not can_write:
+            st.warning("Seu perfil nao possui permissao de escrita.")
+            st.stop()
 
-        try:
-            sb.table("reimbursements").update(payload, returning="representation").eq("id", rid).execute()
-            n_updates += 1
-        except Exception as e:
-            warnings.append(f"Erro ao atualizar {rid}: {_api_error_message(e)}")
+        before = editor.before
+        after = editor.after
+        warnings: list[str] = []
+        n_updates = 0
+        n_deletes = 0
+
+        if delete_ids:
+            if not confirm_delete:
+                st.warning("Marque a confirmacao para excluir os lancamentos selecionados.")
+                st.stop()
+
+            att_by_id = load_attachments(cache_key, tuple(sorted(delete_ids)))
+            for rid in delete_ids:
+                try:
+                    att = att_by_id.get(rid, pd.DataFrame())
+                    if not att.empty:
+                        paths = text_list(att["storage_path"])
+                        try:
+                            sb.storage.from_(BUCKET).remove(paths)
+                        except Exception:
+                            pass
+                    sb.table("reimbursements").delete().eq("id", rid).execute()
+                    n_deletes += 1
+                except Exception as e:
+                    warnings.append(f"Erro ao excluir {rid}: {_api_error_message(e)}")
+
+        for i in range(len(after)):
+            rid = str(after.loc[i, "id"])
+            if rid in delete_ids:
+                continue
 
-    if warnings:
-        st.warning("\n".join(warnings))
+            compare_cols = [
+                "Data da despesa",
+                "Colaborador",
+                "Projeto",
+                "Categoria",
+                "Descricao",
+                "Valor (R$)",
+                "Status",
+                "Prazo de pagamento",
+                "Data do pagamento",
+                "Observacoes",
+            ]
+            if all(norm(before.loc[i, c]) == norm(after.loc[i, c]) for c in compare_cols):
+                continue
 
-    st.success(f"Atualizados: {n_updates} - Excluidos: {n_deletes}")
-    clear_caches()
-    _reset_editor_state()
-    st.rerun()
+            expense_date = to_date(after.loc[i, "Data da despesa"])
+            status = LABEL_TO_STATUS.get(norm(after.loc[i, "Status"]), "PENDENTE")
+            due_date = to_date(after.loc[i, "Prazo de pagamento"])
+            payment_date = to_date(after.loc[i, "Data do pagamento"])
+            amount = float(after.loc[i, "Valor (R$)"] or 0)
+
+            if expense_date is None:
+                warnings.append(f"{rid}: Data da despesa vazia. Atualizacao ignorada.")
+                continue
+            if due_date is None:
+                warnings.append(f"{rid}: Prazo de pagamento vazio. Atualizacao ignorada.")
+                continue
+            if amount <= 0:
+                warnings.append(f"{rid}: Valor deve ser maior que zero. Atualizacao ignorada.")
+                continue
+            if norm(after.loc[i, "Descricao"]) == "":
+                warnings.append(f"{rid}: Descricao obrigatoria. Atualizacao ignorada.")
+                continue
+            if status == "PAGO" and payment_date is None:
+                warnings.append(f"{rid}: status Pago exige Data do pagamento. Atualizacao ignorada.")
+                continue
+
+            payload = {
+                "expense_date": expense_date.isoformat(),
+                "collaborator_id": people_options.get(norm(after.loc[i, "Colaborador"])),
+                "project_id": project_options.get(norm(after.loc[i, "Projeto"])),
+                "category_id": category_options.get(norm(after.loc[i, "Categoria"])),
+                "description": norm(after.loc[i, "Descricao"]),
+                "amount": amount,
+                "status": status,
+                "due_date": due_date.isoformat(),
+                "payment_date": payment_date.isoformat() if status == "PAGO" and payment_date else None,
+                "observations": norm_text(after.loc[i, "Observacoes"]),
+                "updated_by_email": user_email or None,
+            }
+
+            if not payload["collaborator_id"] or not payload["project_id"] or not payload["category_id"]:
+                warnings.append(f"{rid}: colaborador, projeto ou categoria invalido. Atualizacao ignorada.")
+                continue
+
+            try:
+                sb.table("reimbursements").update(payload, returning="representation").eq("id", rid).execute()
+                n_updates += 1
+            except Exception as e:
+                warnings.append(f"Erro ao atualizar {rid}: {_api_error_message(e)}")
+
+        if warnings:
+            st.warning("\n".join(warnings))
+
+        st.success(f"Atualizados: {n_updates} - Excluidos: {n_deletes}")
+        clear_caches()
+        _reset_editor_state()
+        st.rerun()
+
+
+reimbursements_editor(df, df_f)
 
 
 # ==========================================================
 # Comprovantes e historico
 # ==========================================================
-st.divider()
-st.subheader("Comprovantes e historico")
-
-label_to_id: dict[str, str] = {}
-for _, row in df_f.iterrows():
-    d = to_date(row.get("expense_date"))
-    d_txt = d.strftime("%d/%m/%Y") if d else ""
-    label = (
-        f"{_clean_str(row.get('__situacao'))} - {d_txt} - {_clean_str(row.get('collaborator_name'))} - "
-        f"{_clean_str(row.get('project_code'))} - {_brl(float(row.get('amount') or 0))}"
-    )
-    label_to_id[label] = _clean_str(row.get("id"))
+@fragment
+def receipts_and_history(df_f: pd.DataFrame) -> None:
+    st.divider()
+    st.subheader("Comprovantes e historico")
+
+    label_to_id: dict[str, str] = {}
+    for _, row in df_f.iterrows():
+        d = row.get("expense_date_dt")
+        d_txt = d.strftime("%d/%m/%Y") if d else ""
+        label = (
+            f"{clean_str(row.get('__situacao'))} - {d_txt} - {clean_str(row.get('collaborator_name'))} - "
+            f"{clean_str(row.get('project_code'))} - {_brl(float(row.get('amount') or 0))}"
+        )
+        label_to_id[label] = clean_str(row.get("id"))
 
-selected_label = st.selectbox("Lancamento", list(label_to_id.keys()))
-selected_id = label_to_id[selected_label]
+    # comprovantes e historico de todos os lancamentos do filtro de uma vez;
+    # trocar o lancamento selecionado nao vai ao banco
+    visible_ids = tuple(sorted(set(label_to_id.values())))
+    with st.spinner("Carregando comprovantes e historico..."):
+        attachments_by_id = load_attachments(cache_key, visible_ids)
+        events_by_id = load_events(cache_key, visible_ids)
 
-att_col, hist_col = st.columns([1.1, 1.0])
-with att_col:
-    st.caption("Comprovantes vinculados")
+    selected_label = st.selectbox("Lancamento", list(label_to_id.keys()))
+    selected_id = label_to_id[selected_label]
 
-    if can_write:
-        new_receipts = st.file_uploader(
-            "Adicionar comprovantes",
-            type=["pdf", "jpg", "jpeg", "png"],
-            accept_multiple_files=True,
-            key=f"receipt_uploader_{selected_id}",
-        )
-        if st.button("Anexar comprovantes", type="primary", disabled=not new_receipts, key=f"upload_btn_{selected_id}"):
-            ok, errs = _upload_receipts(selected_id, new_receipts, user_email)
-            if ok:
-                st.success(f"Comprovantes anexados: {ok}.")
-            for err in errs:
-                st.warning(err)
-            clear_caches()
-            st.rerun()
-
-    attachments = load_attachments(cache_key, selected_id)
-    if attachments.empty:
-        st.info("Nenhum comprovante anexado.")
-    else:
-        for _, a in attachments.iterrows():
-            file_name = _clean_str(a.get("file_name"))
-            mime = _clean_str(a.get("mime_type"))
-            bucket = _clean_str(a.get("storage_bucket")) or BUCKET
-            path = _clean_str(a.get("storage_path"))
-            uploaded_at = _clean_str(a.get("uploaded_at"))
-            url = _signed_url(bucket, path)
-
-            with st.container(border=True):
-                st.write(f"**{_html(file_name)}**")
-                st.caption(f"{mime} - {uploaded_at}")
-                if url:
-                    if mime.startswith("image/"):
-                        st.image(url, use_container_width=True)
-                    st.link_button("Abrir comprovante", url)
-                else:
-                    st.warning("Nao foi possivel gerar link temporario para visualizacao.")
+    att_col, hist_col = st.columns([1.1, 1.0])
+    with att_col:
+        st.caption("Comprovantes vinculados")
 
-                if can_write:
-                    remove_key = f"remove_attachment_{_clean_str(a.get('id'))}"
-                    if st.button("Excluir comprovante", key=remove_key):
-                        try:
+        if can_write:
+            new_receipts = st.file_uploader(
+                "Adicionar comprovantes",
+                type=["pdf", "jpg", "jpeg", "png"],
+                accept_multiple_files=True,
+                key=f"receipt_uploader_{selected_id}",
+            )
+            if st.button("Anexar comprovantes", type="primary", disabled=not new_receipts, key=f"upload_btn_{selected_id}"):
+                ok, errs = _upload_receipts(selected_id, new_receipts, user_email)
+                if ok:
+                    st.success(f"Comprovantes anexados: {ok}.")
+                for err in errs:
+                    st.warning(err)
+                clear_caches()
+                st.rerun()
+
+        attachments = attachments_by_id.get(selected_id, pd.DataFrame())
+        if attachments.empty:
+            st.info("Nenhum comprovante anexado.")
+        else:
+            for _, a in attachments.iterrows():
+                file_name = clean_str(a.get("file_name"))
+                mime = clean_str(a.get("mime_type"))
+                bucket = clean_str(a.get("storage_bucket")) or BUCKET
+                path = clean_str(a.get("storage_path"))
+                uploaded_at = clean_str(a.get("uploaded_at"))
+                url = _signed_url(bucket, path)
+
+                with st.container(border=True):
+                    st.write(f"**{_html(file_name)}**")
+                    st.caption(f"{mime} - {uploaded_at}")
+                    if url:
+                        if mime.startswith("image/"):
+                            st.image(url, use_container_width=True)
+                        st.link_button("Abrir comprovante", url)
+                    else:
+                        st.warning("Nao foi possivel gerar link temporario para visualizacao.")
+
+                    if can_write:
+                        remove_key = f"remove_attachment_{clean_str(a.get('id'))}"
+                        if st.button("Excluir comprovante", key=remove_key):
                             try:
-                                sb.storage.from_(bucket).remove([path])
-                            except Exception:
-                                pass
-                            sb.table("reimbursement_attachments").delete().eq("id", _clean_str(a.get("id"))).execute()
-                            st.success("Comprovante excluido.")
-                            clear_caches()
-                            st.rerun()
-                        except Exception as e:
-                            st.error("Falha ao excluir comprovante:")
-                            st.code(_api_error_message(e))
-
-with hist_col:
-    st.caption("Historico de alteracoes")
-    events = load_events(cache_key, selected_id)
-    if events.empty:
-        st.info("Sem eventos registrados.")
-    else:
-        for _, ev in events.iterrows():
-            raw_ts = ev.get("changed_at")
-            try:
-                ts = datetime.fromisoformat(str(raw_ts).replace("Z", "+00:00")).strftime("%d/%m/%Y %H:%M")
-            except Exception:
-                ts = _clean_str(raw_ts)
-
-            event_type = _clean_str(ev.get("event_type"))
-            title = EVENT_LABEL.get(event_type, event_type)
-            actor = _clean_str(ev.get("changed_by_email"))
-            from_value = _clean_str(ev.get("from_value"))
-            to_value = _clean_str(ev.get("to_value"))
-            notes = _clean_str(ev.get("notes"))
-
-            detail = ""
-            if from_value or to_value:
-                detail = f"`{from_value or '-'} -> {to_value or '-'}`"
-            elif notes:
-                detail = notes
-
-            actor_txt = f" por `{actor}`" if actor else ""
-            st.markdown(f"- **{ts}** - {title}{actor_txt}. {detail}")
+                                try:
+                                    sb.storage.from_(bucket).remove([path])
+                                except Exception:
+                                    pass
+                                sb.table("reimbursement_attachments").delete().eq("id", clean_str(a.get("id"))).execute()
+                                st.success("Comprovante excluido.")
+                                clear_caches()
+                                st.rerun()
+                            except Exception as e:
+                                st.error("Falha ao excluir comprovante:")
+                                st.code(_api_error_message(e))
+
+    with hist_col:
+        st.caption("Historico de alteracoes")
+        events = events_by_id.get(selected_id, pd.DataFrame())
+        if events.empty:
+            st.info("Sem eventos registrados.")
+        else:
+            for _, ev in events.iterrows():
+                raw_ts = ev.get("changed_at")
+                try:
+                    ts = datetime.fromisoformat(str(raw_ts).replace("Z", "+00:00")).strftime("%d/%m/%Y %H:%M")
+                except Exception:
+                    ts = clean_str(raw_ts)
+
+                event_type = clean_str(ev.get("event_type"))
+                title = EVENT_LABEL.get(event_type, event_type)
+                actor = clean_str(ev.get("changed_by_email"))
+                from_value = clean_str(ev.get("from_value"))
+                to_value = clean_str(ev.get("to_value"))
+                notes = clean_str(ev.get("notes"))
+
+                detail = ""
+                if from_value or to_value:
+                    detail = f"`{from_value or '-'} -> {to_value or '-'}`"
+                elif notes:
+                    detail = notes
+
+                actor_txt = f" por `{actor}`" if actor else ""
+                st.markdown(f"- **{ts}** - {title}{actor_txt}. {detail}")
+
+
+receipts_and_history(df_f)
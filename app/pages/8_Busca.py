@@ -0,0 +1,173 @@
+# app/pages/8_Busca.py
+"""
+Busca global.
+
+Procura um código de projeto, uma pessoa, um laboratório ou um texto livre
+em Projetos, Tarefas, Produtos, Laboratório e Reembolsos de uma vez, com
+hits ranqueados e link direto para a página certa.
+
+Usa a RPC rpc_global_search (índice GIN em search_documents). Se a migração
+ainda não foi aplicada, cai para um índice local montado a partir de
+seleções leves (só colunas de texto), cacheado como as demais páginas.
+"""
+
+from __future__ import annotations
+
+import pandas as pd
+import streamlit as st
+
+from services.array_columns import join_lists, to_lists
+from services.auth import require_login
+from services.global_search import KINDS, build_documents, build_index, hits_frame, local_search
+from services.normalize import clean_text
+from services.search_index import SearchIndex
+from services.supabase_client import get_authed_client
+from ui.deep_link import open_page
+
+try:
+    from ui.brand import apply_brand, apply_app_chrome, page_header
+except Exception:  # pragma: no cover
+    def apply_brand():  # type: ignore
+        return
+
+    def apply_app_chrome():  # type: ignore
+        return
+
+    def page_header(title, subtitle, user_email=""):  # type: ignore
+        st.title(title)
+        if subtitle:
+            st.caption(subtitle)
+        if user_email:
+            st.caption(f"Logado como: {user_email}")
+
+
+# ==========================================================
+# Boot
+# ==========================================================
+st.set_page_config(page_title="Busca", layout="wide")
+apply_brand()
+apply_app_chrome()
+
+require_login()
+sb = get_authed_client()
+cache_key = str(st.session_state.get("access_token") or "no-token")
+
+page_header(
+    "Busca global",
+    "Projetos · Tarefas · Produtos · Laboratório · Reembolsos",
+    st.session_state.get("user_email", ""),
+)
+
+MAX_RESULTS = 50
+
+
+# ==========================================================
+# Loads
+# ==========================================================
+def _select_all(table: str, select: str, page_size: int = 1000) -> pd.DataFrame:
+    """Seleção paginada; módulo ausente/sem permissão vira frame vazio."""
+    out: list[dict] = []
+    offset = 0
+    try:
+        while True:
+            chunk = sb.table(table).select(select).range(offset, offset + page_size - 1).execute().data or []
+            out.extend(chunk)
+            if len(chunk) < page_size:
+                break
+            offset += page_size
+    except Exception:
+        return pd.DataFrame()
+    return pd.DataFrame(out)
+
+
+@st.cache_data(ttl=30)
+def rpc_search(_k: str, query: str, limit: int) -> pd.DataFrame | None:
+    """Hits da busca no banco; None se a RPC não existir/falhar."""
+    try:
+        res = sb.rpc("rpc_global_search", {"q": query, "max_results": limit}).execute()
+    except Exception:
+        return None
+    return hits_frame(res.data)
+
+
+@st.cache_data(ttl=30)
+def load_documents(_k: str) -> tuple[pd.DataFrame, SearchIndex]:
+    """Fallback: documentos leves dos 5 módulos + um índice único sobre eles."""
+    projects = _select_all("projects", "id, project_code, name, client, notes")
+    tasks = _select_all("v_portfolio_tasks", "task_id, project_id, title, tipo_atividade, assignee_names, notes")
+    deliverables = _select_all(
+        "v_deliverables",
+        "task_id, project_code, product_name, delivery_status, assignee_names, discipline, enterprise, tracking_notes",
+    )
+    samples = _select_all(
+        "v_lab_samples", "id:sample_id, project_code, sample_types, lab_name, assignee_name, status, notes"
+    )
+    reimbursements = _select_all(
+        "v_reimbursements",
+        "id, project_code, description, status, collaborator_name, category_name, observations",
+    )
+
+    if not tasks.empty and not projects.empty:
+        code_by_id = dict(zip(clean_text(projects["id"]), clean_text(projects["project_code"])))
+        tasks["project_code"] = clean_text(tasks["project_id"]).map(code_by_id).fillna("")
+    if not samples.empty:
+        samples["sample_types"] = join_lists(to_lists(samples["sample_types"]))
+
+    docs = build_documents(projects, tasks, deliverables, samples, reimbursements)
+    return docs, build_index(docs)
+
+
+# ==========================================================
+# Deep links
+# ==========================================================
+def _open(hit: dict) -> None:
+    kind = hit["kind"]
+    page = KINDS[kind][1]
+    code = hit["project_code"]
+    if kind == "PROJETO":
+        open_page(page, project_code=code)
+    elif kind == "TAREFA":
+        open_page(page, project_code=code, task_id=hit["id"])
+    else:
+        open_page(page, q=f"{code} {hit['title']}".replace(",", " ").strip())
+
+
+# ==========================================================
+# UI
+# ==========================================================
+query = st.text_input(
+    "Buscar",
+    value="",
+    placeholder="Ex.: BRACE001, relatório semestral, fulano, biofile...",
+    key="global_search_q",
+).strip()
+
+if not query:
+    st.caption("Digite um código de projeto, nome de pessoa, laboratório ou trecho de texto.")
+    st.stop()
+
+hits = rpc_search(cache_key, query, MAX_RESULTS)
+if hits is None:
+    st.caption("Índice do servidor indisponível — usando busca local (aplique a migração global_search).")
+    with st.spinner("Montando índice local..."):
+        docs, index = load_documents(cache_key)
+    hits = local_search(docs, index, query, MAX_RESULTS)
+
+if hits.empty:
+    st.info("Nenhum resultado.")
+    st.stop()
+
+counts = hits["kind"].value_counts()
+st.caption(
+    f"**{len(hits)}** resultado(s) — "
+    + " · ".join(f"{KINDS[k][0]}: {int(counts[k])}" for k in KINDS if k in counts.index)
+)
+
+for i, hit in enumerate(hits.to_dict("records")):
+    label = KINDS.get(hit["kind"], (hit["kind"], ""))[0]
+    with st.container(border=True):
+        c1, c2, c3 = st.columns([1.2, 5.0, 1.0])
+        c1.markdown(f"{label}  \n`{hit['project_code'] or '—'}`")
+        c2.markdown(f"**{hit['title'] or 'Sem título'}**  \n{hit['subtitle']}")
+        if hit["kind"] in KINDS and c3.button("Abrir", key=f"global_search_open_{i}"):
+            _open(hit)
@@ -0,0 +1,99 @@
+# app/services/array_columns.py
+"""
+Colunas de array do Postgres (ex.: lab_samples.sample_types text[]).
+
+O PostgREST devolve listas JSON, mas views antigas/caches podem trazer o
+literal do Postgres ("{Bentos,\"Água superficial\"}"). `to_lists` converte
+a coluna inteira de uma vez; `MultiHot` guarda uma matriz booleana
+linhas × categorias, montada uma vez no load, para filtrar "tem algum
+desses tipos" com uma operação numpy em vez de um apply por linha.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from services.normalize import NULL_SENTINELS
+
+__all__ = ["MultiHot", "join_lists", "to_list", "to_lists"]
+
+
+def _clean(items: Iterable) -> list[str]:
+    return [s for s in (str(i).strip().strip('"').strip() for i in items if i is not None) if s]
+
+
+def to_list(x, sep: str = ",") -> list[str]:
+    """Um valor (lista, literal "{a,b}", texto "a, b"/"A + B" ou nulo) -> lista de textos."""
+    if isinstance(x, (list, tuple, np.ndarray)):
+        return _clean(x)
+    if x is None or (isinstance(x, float) and pd.isna(x)):
+        return []
+    s = str(x).strip()
+    if not s or s in NULL_SENTINELS:
+        return []
+    if s.startswith("{") and s.endswith("}"):
+        return _clean(s[1:-1].split(","))
+    return _clean(s.split(sep))
+
+
+def to_lists(values, sep: str = ",") -> list[list[str]]:
+    """Coluna inteira -> lista de listas.
+
+    Listas (caso normal do PostgREST) passam direto; os textos são
+    quebrados em lote com os métodos vetorizados de `.str` — por vírgula
+    (literal "{a,b}") ou por `sep` no texto legado ("A + B").
+    """
+    s = pd.Series(values, dtype=object).reset_index(drop=True)
+    is_list = s.map(lambda v: isinstance(v, (list, tuple, np.ndarray))).to_numpy(dtype=bool)
+    out: list[list[str]] = [[] for _ in range(len(s))]
+    for i in np.flatnonzero(is_list):
+        out[i] = _clean(s.iat[i])
+    txt = s[~is_list].astype("string").str.strip()
+    txt = txt[txt.notna() & (txt != "") & ~txt.isin(NULL_SENTINELS)]
+    if not txt.empty:
+        literal = (txt.str.startswith("{") & txt.str.endswith("}")).to_numpy(dtype=bool)
+        inner = txt.str.slice(1, -1).str.split(",").tolist()
+        parts = txt.str.split(sep).tolist()
+        for i, is_literal, a, b in zip(txt.index, literal, inner, parts):
+            out[i] = _clean(a if is_literal else b)
+    return out
+
+
+def join_lists(lists: Iterable[list[str]], sep: str = ", ") -> list[str]:
+    return [sep.join(lst) for lst in lists]
+
+
+class MultiHot:
+    """Matriz booleana linhas × categorias para uma coluna de listas."""
+
+    __slots__ = ("matrix", "categories")
+
+    def __init__(self, lists: Iterable[list[str]]):
+        lists = list(lists)
+        lengths = np.fromiter((len(lst) for lst in lists), dtype=np.int64, count=len(lists))
+        flat = pd.Categorical([item for lst in lists for item in lst])
+        self.categories = pd.Index(flat.categories)
+        self.matrix = np.zeros((len(lists), len(self.categories)), dtype=bool)
+        rows = np.repeat(np.arange(len(lists)), lengths)
+        self.matrix[rows, flat.codes] = True
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def any_of(self, labels: Iterable[str]) -> np.ndarray:
+        """Máscara das linhas que têm ao menos uma das categorias."""
+        cols = self.categories.get_indexer(list(labels))
+        cols = cols[cols >= 0]
+        if not cols.size:
+            return np.zeros(len(self), dtype=bool)
+        return self.matrix[:, cols].any(axis=1)
+
+    def counts(self) -> pd.Series:
+        """Linhas por categoria."""
+        return pd.Series(self.matrix.sum(axis=0), index=self.categories)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.matrix, columns=pd.CategoricalIndex(self.categories))
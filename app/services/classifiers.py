@@ -0,0 +1,135 @@
+# app/services/classifiers.py
+"""
+Classificadores vetorizados de prazo/situação.
+
+Substituem as funções por linha (`delivery_status_for`, `situacao_for`,
+`days_delta`, `situation_for`) por `numpy.select` sobre arrays datetime64[D].
+Servem tanto no load (colunas tipadas) quanto na re-derivação depois do
+data_editor (listas de `date`/strings DD/MM/YYYY).
+
+Cada classificador devolve uma Series categórica com os CÓDIGOS da regra
+(ex.: "ATRASADA"); a página troca para os rótulos de UI com `labeled()`.
+A ordem das condições reproduz a ordem dos `if` das versões escalares.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Mapping
+
+import numpy as np
+import pandas as pd
+
+from services.schemas import parse_dates
+
+DELIVERY_DATE_CODES = ["SEM_PRAZO", "PENDENTE", "ATRASADA", "ENTREGUE_NO_PRAZO", "ENTREGUE_COM_ATRASO"]
+LAB_SITUATION_CODES = ["ATRASO", "PENDENTE", "EM_ANALISE", "CONCLUIDO"]
+REIMBURSEMENT_SITUATION_CODES = ["ATRASADO", "PENDENTE", "APROVADO", "PAGO", "GLOSADO"]
+
+
+# ==========================================================
+# Entradas
+# ==========================================================
+def _series(values: Any) -> pd.Series:
+    if isinstance(values, pd.Series):
+        return values.reset_index(drop=True)
+    return pd.Series(list(values), dtype=object)
+
+
+def day_array(values: Any) -> np.ndarray:
+    """Datas (datetime64, `date`, ISO ou DD/MM/YYYY) -> ndarray datetime64[D] com NaT."""
+    s = _series(values)
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype(object)
+    out = parse_dates(s)
+    if not pd.api.types.is_datetime64_any_dtype(s):
+        # data_editor pode devolver strings pt-BR (DD/MM/YYYY)
+        txt = s.astype("string")
+        br = out.isna() & txt.str.contains("/", regex=False).fillna(False)
+        if br.any():
+            out[br] = pd.to_datetime(txt[br], format="%d/%m/%Y", errors="coerce")
+    return out.to_numpy(dtype="datetime64[D]")
+
+
+def _today(today_: date) -> np.datetime64:
+    return np.datetime64(today_, "D")
+
+
+def _codes(values: Any, default: str) -> np.ndarray:
+    s = _series(values)
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype(object)
+    txt = s.astype("string").str.strip().str.upper()
+    return txt.mask(txt == "").fillna(default).to_numpy(dtype=object)
+
+
+def _select(conditions: list[np.ndarray], choices: list[str], default: str, categories: list[str]) -> pd.Series:
+    out = np.select(conditions, choices, default=default)
+    return pd.Series(pd.Categorical(out, categories=categories))
+
+
+def labeled(codes: pd.Series, labels: Mapping[str, str]) -> pd.Series:
+    """Categórica de códigos -> categórica de rótulos (ordem das categorias preservada)."""
+    return codes.cat.rename_categories(lambda c: labels.get(c, c))
+
+
+def labeled_list(codes: pd.Series, labels: Mapping[str, str]) -> list[str]:
+    return labeled(codes, labels).astype(object).tolist()
+
+
+# ==========================================================
+# Classificadores
+# ==========================================================
+def delivery_date_status(deadline: Any, delivery: Any, today_: date) -> pd.Series:
+    """Produtos: status da entrega a partir do prazo do cliente e da data de entrega."""
+    prazo = day_array(deadline)
+    entrega = day_array(delivery)
+    t = _today(today_)
+    no_delivery = np.isnat(entrega)
+    no_deadline = np.isnat(prazo)
+    return _select(
+        [
+            no_delivery & no_deadline,
+            no_delivery & (prazo < t),
+            no_delivery,
+            no_deadline | (entrega <= prazo),
+        ],
+        ["SEM_PRAZO", "ATRASADA", "PENDENTE", "ENTREGUE_NO_PRAZO"],
+        "ENTREGUE_COM_ATRASO",
+        DELIVERY_DATE_CODES,
+    )
+
+
+def lab_situation(status_ui: Any, expected: Any, today_: date) -> pd.Series:
+    """Laboratório: situação da amostra (status já no vocabulário da UI)."""
+    status = _codes(status_ui, "PENDENTE")
+    exp = day_array(expected)
+    overdue = ~np.isnat(exp) & (exp < _today(today_))
+    return _select(
+        [status == "CONCLUIDO", overdue, status == "PENDENTE"],
+        ["CONCLUIDO", "ATRASO", "PENDENTE"],
+        "EM_ANALISE",
+        LAB_SITUATION_CODES,
+    )
+
+
+def reimbursement_situation(status: Any, due: Any, today_: date) -> pd.Series:
+    """Reembolsos: situação do lançamento a partir do status e do prazo de pagamento."""
+    st_codes = _codes(status, "PENDENTE")
+    due_days = day_array(due)
+    overdue = ~np.isnat(due_days) & (due_days < _today(today_))
+    return _select(
+        [st_codes == "PAGO", st_codes == "GLOSADO", overdue, st_codes == "APROVADO"],
+        ["PAGO", "GLOSADO", "ATRASADO", "APROVADO"],
+        "PENDENTE",
+        REIMBURSEMENT_SITUATION_CODES,
+    )
+
+
+def days_until(dates: Any, today_: date) -> pd.Series:
+    """Dias de hoje até cada data (negativo = atraso); nulo quando não há data (Int64)."""
+    d = day_array(dates)
+    delta = (d - _today(today_)).astype("timedelta64[D]")
+    days = pd.Series(delta.astype("int64"), dtype="Int64")
+    days[np.isnat(delta)] = pd.NA
+    return days
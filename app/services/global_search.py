@@ -0,0 +1,128 @@
+# app/services/global_search.py
+"""
+Busca global (Projetos · Tarefas · Produtos · Laboratório · Reembolsos).
+
+Caminho principal: a RPC `rpc_global_search` (migração
+2026_10_19_global_search.sql) consulta a tabela `search_documents`
+(GIN sobre o tsvector, mantida por triggers) com os mesmos campos deste
+fallback e devolve só os hits ranqueados — o app não baixa nenhum dataset.
+
+Fallback (RPC ainda não aplicada): a página monta, uma vez por TTL do
+cache, um frame de "documentos" leve (só colunas de texto de cada módulo)
+e um único `SearchIndex` sobre ele; `local_search` ranqueia os hits com a
+mesma ideia da RPC (projetos pesam mais; título/código contam mais que
+observações).
+
+Cada hit tem `kind`, que define a página de destino do deep link.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from services.normalize import clean_text
+from services.search_index import SearchIndex, fold, fold_text
+
+HIT_COLUMNS = ["kind", "id", "project_code", "title", "subtitle", "rank"]
+DOC_COLUMNS = ["kind", "id", "project_code", "title", "subtitle", "body"]
+
+# kind -> (rótulo, página de destino)
+KINDS: dict[str, tuple[str, str]] = {
+    "PROJETO": ("📁 Projeto", "pages/3_Tarefas.py"),
+    "TAREFA": ("🧩 Tarefa", "pages/3_Tarefas.py"),
+    "PRODUTO": ("📄 Produto", "pages/5_Produtos.py"),
+    "AMOSTRA": ("🧪 Amostra", "pages/6_Laboratorio.py"),
+    "REEMBOLSO": ("💸 Reembolso", "pages/7_Reembolsos.py"),
+}
+
+KIND_WEIGHT = {"PROJETO": 1.5}
+
+
+def hits_frame(rows: list[dict] | None) -> pd.DataFrame:
+    """Hits da RPC como frame com as colunas fixas (`HIT_COLUMNS`)."""
+    df = pd.DataFrame(rows or [])
+    df = df.reindex(columns=HIT_COLUMNS)
+    df["rank"] = pd.to_numeric(df["rank"], errors="coerce").fillna(0.0)
+    for c in HIT_COLUMNS[:-1]:
+        df[c] = clean_text(df[c])
+    return df
+
+
+def _docs(kind: str, df: pd.DataFrame, id_col: str, title: str, subtitle: str, body: list[str]) -> pd.DataFrame:
+    if df is None or df.empty:
+        return pd.DataFrame(columns=DOC_COLUMNS)
+    src = df.reindex(columns=[id_col, "project_code", title, subtitle, *body])
+    text = clean_text(src[body[0]]) if body else pd.Series("", index=src.index, dtype=object)
+    for c in body[1:]:
+        text = text + " " + clean_text(src[c])
+    return pd.DataFrame(
+        {
+            "kind": kind,
+            "id": clean_text(src[id_col]).array,
+            "project_code": clean_text(src["project_code"]).array,
+            "title": clean_text(src[title]).array,
+            "subtitle": clean_text(src[subtitle]).array,
+            "body": text.array,
+        }
+    )
+
+
+def build_documents(
+    projects: pd.DataFrame,
+    tasks: pd.DataFrame,
+    deliverables: pd.DataFrame,
+    samples: pd.DataFrame,
+    reimbursements: pd.DataFrame,
+) -> pd.DataFrame:
+    """Um frame de documentos (uma linha por item) a partir das seleções leves de cada módulo.
+
+    `tasks` e `samples` precisam de `project_code` (a página junta pelo
+    project_id); `samples.sample_types` já deve vir como texto.
+    """
+    parts = [
+        _docs("PROJETO", projects, "id", "name", "client", ["notes"]),
+        _docs("TAREFA", tasks, "task_id", "title", "tipo_atividade", ["assignee_names", "notes"]),
+        _docs(
+            "PRODUTO", deliverables, "task_id", "product_name", "delivery_status",
+            ["assignee_names", "discipline", "enterprise", "tracking_notes"],
+        ),
+        _docs("AMOSTRA", samples, "id", "sample_types", "status", ["lab_name", "assignee_name", "notes"]),
+        _docs(
+            "REEMBOLSO", reimbursements, "id", "description", "status",
+            ["collaborator_name", "category_name", "observations"],
+        ),
+    ]
+    parts = [p for p in parts if not p.empty]
+    if not parts:
+        return pd.DataFrame(columns=DOC_COLUMNS)
+    return pd.concat(parts, ignore_index=True)
+
+
+def build_index(docs: pd.DataFrame) -> SearchIndex:
+    return SearchIndex.from_frame(docs, ["project_code", "title", "subtitle", "body"])
+
+
+def local_search(docs: pd.DataFrame, index: SearchIndex, query: str, limit: int = 50) -> pd.DataFrame:
+    """Hits ranqueados do índice local, no mesmo formato da RPC."""
+    terms = fold_text(query or "").split()
+    if not terms or docs.empty:
+        return hits_frame([])
+    rows = index.search(query)
+    if not rows.size:
+        return hits_frame([])
+
+    hits = docs.iloc[rows].reset_index(drop=True)
+    title = fold(hits["title"]).to_numpy(dtype=object)
+    code = fold(hits["project_code"]).to_numpy(dtype=object)
+
+    # 1 ponto por termo no título, 2 se algum termo for o código exato
+    in_title = np.zeros(len(hits))
+    for t in terms:
+        in_title += np.fromiter((t in x for x in title), dtype=bool, count=len(title))
+    code_hit = np.isin(code, terms)
+    weight = hits["kind"].map(KIND_WEIGHT).fillna(1.0).to_numpy(dtype=float)
+    hits["rank"] = (1.0 + in_title / len(terms) + 2.0 * code_hit) * weight
+
+    hits = hits.sort_values(["rank", "project_code", "title"], ascending=[False, True, True], kind="stable")
+    return hits.head(max(int(limit), 1)).reindex(columns=HIT_COLUMNS).reset_index(drop=True)
@@ -0,0 +1,132 @@
+# app/services/interval_index.py
+"""
+Índice de intervalos de datas ("o que toca esta janela?").
+
+Montado uma vez por frame carregado (dentro do loader cacheado) e reaproveitado
+em todas as trocas de período da página. Os inícios ficam ordenados; uma
+consulta de janela faz duas buscas binárias sobre os inícios e só testa o fim
+das linhas candidatas -> O(log n + k) em vez de varrer o frame inteiro.
+
+Para colunas de data única (ex.: end_date de produtos, expense_date de
+reembolsos) basta passar só `starts`: o índice vira um "ponto = intervalo de
+um dia".
+
+As consultas devolvem POSIÇÕES (para usar com `df.iloc[...]`), sempre em
+ordem crescente, preservando a ordem original do frame.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+_DAY = "datetime64[D]"
+_EMPTY = np.array([], dtype=np.intp)
+
+
+def _as_days(values) -> np.ndarray:
+    """Converte datas/strings/Timestamps em array datetime64[D] (inválidos -> NaT)."""
+    if values is None:
+        return np.array([], dtype=_DAY)
+    s = values if isinstance(values, pd.Series) else pd.Series(values, dtype="object")
+    if not pd.api.types.is_datetime64_any_dtype(s):
+        s = pd.to_datetime(s, errors="coerce")
+    if getattr(s.dt, "tz", None) is not None:
+        s = s.dt.tz_localize(None)
+    return s.to_numpy(dtype=_DAY)
+
+
+def _day(x) -> np.datetime64:
+    if isinstance(x, np.datetime64):
+        return x.astype(_DAY)
+    if isinstance(x, pd.Timestamp):
+        x = x.date()
+    if isinstance(x, date):
+        return np.datetime64(x.isoformat(), "D")
+    return np.datetime64(pd.to_datetime(x).date().isoformat(), "D")
+
+
+class DateIntervalIndex:
+    """
+    Intervalos [start, end] (dias inclusivos) indexados por início.
+
+    - `end` vazio assume `start` (mesma regra do Gantt).
+    - Linhas sem `start` ficam fora do índice e aparecem em `missing`.
+    - `max_span` é o maior intervalo do frame: qualquer linha que toque
+      [a, b] tem início em [a - max_span, b], então só esse trecho é lido.
+    """
+
+    __slots__ = ("_order", "_starts", "_ends", "_max_span", "_missing", "n_rows")
+
+    def __init__(self, starts, ends=None):
+        s = _as_days(starts)
+        e = s if ends is None else _as_days(ends)
+        if len(e) != len(s):
+            raise ValueError("starts e ends precisam ter o mesmo tamanho.")
+
+        e = np.where(np.isnat(e), s, e)
+        valid = ~np.isnat(s)
+
+        self.n_rows = len(s)
+        self._missing = np.flatnonzero(~valid)
+
+        pos = np.flatnonzero(valid)
+        order = np.argsort(s[pos], kind="stable")
+        self._order = pos[order]
+        self._starts = s[self._order]
+        self._ends = e[self._order]
+
+        if len(self._order):
+            spans = (self._ends - self._starts).astype("timedelta64[D]")
+            self._max_span = max(spans.max(), np.timedelta64(0, "D"))
+        else:
+            self._max_span = np.timedelta64(0, "D")
+
+    # ------------------------------
+    # Metadados
+    # ------------------------------
+    def __len__(self) -> int:
+        return len(self._order)
+
+    @property
+    def missing(self) -> np.ndarray:
+        """Posições sem data de início."""
+        return self._missing.copy()
+
+    def bounds(self) -> tuple[date | None, date | None]:
+        """(menor início, maior fim) do frame, sem varrer nada."""
+        if not len(self._order):
+            return None, None
+        return self._starts[0].item(), self._ends.max().item()
+
+    # ------------------------------
+    # Consultas
+    # ------------------------------
+    def overlapping(self, start, end) -> np.ndarray:
+        """Posições cujo intervalo toca [start, end] (inclusivo)."""
+        if start is None or end is None or not len(self._order):
+            return _EMPTY
+        a, b = _day(start), _day(end)
+        if b < a:
+            return _EMPTY
+
+        lo = int(np.searchsorted(self._starts, a - self._max_span, side="left"))
+        hi = int(np.searchsorted(self._starts, b, side="right"))
+        if hi <= lo:
+            return _EMPTY
+
+        hit = self._ends[lo:hi] >= a
+        return np.sort(self._order[lo:hi][hit])
+
+    def between(self, start, end) -> np.ndarray:
+        """Alias semântico para colunas de data única (início em [start, end])."""
+        return self.overlapping(start, end)
+
+    def before(self, day) -> np.ndarray:
+        """Posições com início estritamente anterior a `day`."""
+        if day is None or not len(self._order):
+            return _EMPTY
+        hi = int(np.searchsorted(self._starts, _day(day), side="left"))
+        return np.sort(self._order[:hi])
@@ -0,0 +1,88 @@
+# app/services/normalize.py
+"""
+Normalização de texto/datas compartilhada pelas páginas.
+
+As versões de coluna (`clean_text`, `text_list`) são vetorizadas com os
+métodos `.str` do pandas: nulos, vazios e os sentinelas "None"/"nan"/"NaT"
+(restos de `str()` em valores ausentes) viram `default`. As versões escalares
+(`norm`, `norm_text`, `clean_str`, `to_date`) ficam para valores soltos, como
+as linhas devolvidas pelo data_editor.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+
+import pandas as pd
+
+from services.schemas import date_values
+
+NULL_SENTINELS = ("None", "nan", "NaT")
+
+__all__ = [
+    "NULL_SENTINELS",
+    "clean_str",
+    "clean_text",
+    "date_values",
+    "label_list",
+    "norm",
+    "norm_text",
+    "text_list",
+    "to_date",
+]
+
+
+# ==========================================================
+# Colunas (vetorizado)
+# ==========================================================
+def clean_text(series: pd.Series, default: str = "") -> pd.Series:
+    """Série -> str aparado; nulos, vazios e sentinelas viram `default` (dtype object)."""
+    s = series
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype(object)
+    txt = s.astype("string").str.strip()
+    txt = txt.mask(txt.isin(NULL_SENTINELS) | (txt == ""))
+    return txt.fillna(default).astype(object)
+
+
+def text_list(series: pd.Series, default: str = "") -> list[str]:
+    """`clean_text` já como lista, formato usado para montar os frames do data_editor."""
+    return clean_text(series, default).tolist()
+
+
+def label_list(series: pd.Series, labels: dict[str, str], default: str = "") -> list[str]:
+    """`clean_text` trocando códigos pelos rótulos de `labels` (sem rótulo: mantém o código)."""
+    return clean_text(series, default).replace(labels).tolist()
+
+
+# ==========================================================
+# Escalares
+# ==========================================================
+def norm(x) -> str:
+    return ("" if x is None else str(x)).strip()
+
+
+def clean_str(x) -> str:
+    s = norm(x)
+    return "" if s in NULL_SENTINELS else s
+
+
+def norm_text(x) -> str | None:
+    s = clean_str(x)
+    return s or None
+
+
+def to_date(x):
+    if x is None or (isinstance(x, float) and pd.isna(x)):
+        return None
+    if isinstance(x, date) and not isinstance(x, datetime):
+        return x
+    try:
+        # data_editor pode devolver datas como string pt-BR (DD/MM/YYYY).
+        if isinstance(x, str) and "/" in x:
+            dt = pd.to_datetime(x, dayfirst=True, errors="coerce")
+        else:
+            dt = pd.to_datetime(x, errors="coerce")
+        return dt.date() if not pd.isna(dt) else None
+    except Exception:
+        return None
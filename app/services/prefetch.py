@@ -0,0 +1,86 @@
+# app/services/prefetch.py
+"""
+Busca em lote de tabelas-filhas (eventos, anexos) das linhas do filtro atual.
+
+Em vez de uma query por item escolhido no selectbox, `fetch_grouped` traz os
+filhos de todos os ids de uma vez com `.in_()` — em blocos, para não estourar
+o tamanho da URL do PostgREST, e paginado, para não truncar em 1000 linhas —
+e devolve {id: frame}. A página cacheia o dict inteiro (chave = ids do
+filtro); trocar o item selecionado vira um lookup em memória.
+
+A ordem (id do pai, data desc, id) bate com os índices
+(reimbursement_id, changed_at desc) etc. já criados nas migrações.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Iterable, Iterator
+
+import pandas as pd
+
+__all__ = ["IN_CHUNK", "chunked", "fetch_grouped", "group_rows"]
+
+# ~150 uuids por `in.(...)` mantém a URL bem abaixo dos limites usuais (8 KB)
+IN_CHUNK = 150
+
+
+def chunked(values: Iterable[Any], size: int = IN_CHUNK) -> Iterator[list]:
+    block: list = []
+    for v in values:
+        block.append(v)
+        if len(block) == size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def group_rows(rows: list[dict], key_col: str, per_key: int | None = None) -> dict[str, pd.DataFrame]:
+    """Linhas (já ordenadas) -> {id do pai: frame}, com no máximo `per_key` por pai."""
+    if not rows:
+        return {}
+    df = pd.DataFrame(rows)
+    keys = df[key_col].astype(str)
+    out: dict[str, pd.DataFrame] = {}
+    for key, part in df.groupby(keys, sort=False):
+        part = part.reset_index(drop=True)
+        out[str(key)] = part.head(per_key) if per_key else part
+    return out
+
+
+def fetch_grouped(
+    client,
+    table: str,
+    select: str,
+    key_col: str,
+    ids: Iterable[str],
+    *,
+    order_col: str,
+    per_key: int | None = None,
+    chunk: int = IN_CHUNK,
+    page_size: int = 1000,
+) -> dict[str, pd.DataFrame]:
+    """Filhos de `ids` em `table`, mais recentes primeiro por `order_col`.
+
+    `select` precisa incluir `key_col`. Ids sem filhos ficam fora do dict.
+    """
+    rows: list[dict] = []
+    for block in chunked(sorted({str(i) for i in ids if i}), chunk):
+        offset = 0
+        while True:
+            resp = (
+                client.table(table)
+                .select(select)
+                .in_(key_col, block)
+                .order(key_col)
+                .order(order_col, desc=True)
+                .order("id")
+                .range(offset, offset + page_size - 1)
+                .execute()
+            )
+            data = resp.data or []
+            rows.extend(data)
+            if len(data) < page_size:
+                break
+            offset += page_size
+    return group_rows(rows, key_col, per_key)
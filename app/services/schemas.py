@@ -0,0 +1,215 @@
+# app/services/schemas.py
+"""
+Registro de schemas das views consumidas pelas páginas.
+
+Cada view declara o tipo de cada coluna (data, timestamp, número, texto,
+categoria). Os loaders aplicam o schema UMA vez, vetorizado, antes do cache;
+as páginas recebem frames tipados e não re-parseiam nada a cada interação.
+
+Convenções:
+- "date": Supabase devolve "YYYY-MM-DD" (ou timestamp ISO); usamos só os 10
+  primeiros caracteres com formato explícito -> datetime64 à meia-noite.
+- "datetime": timestamp ISO-8601 -> datetime64 UTC.
+- "number"/"int": pd.to_numeric(errors="coerce"); `default` preenche nulos.
+- "text": mantém object (str), preenchendo nulos com `default` quando dado.
+- "category": preenche `default` ANTES do cast (evita setitem de categoria
+  nova depois) e, se `upper=True`, normaliza para maiúsculas.
+- `ensure=True` cria a coluna com `default` quando a view ainda não a tem
+  (migração pendente), substituindo os fallbacks espalhados pelas páginas.
+- "list": array do Postgres (uuid[]/text[]) -> lista Python por linha. Com
+  `fallback`, linhas vazias (ou a coluna inteira, se a view ainda não a
+  expõe) vêm da coluna de texto legada, quebrada por `sep` ("A + B").
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Any
+
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class Column:
+    kind: str
+    default: Any = None
+    upper: bool = False
+    ensure: bool = False
+    fallback: str | None = None
+    sep: str = ","
+
+
+def _date(ensure: bool = False) -> Column:
+    return Column("date", ensure=ensure)
+
+
+def _ts() -> Column:
+    return Column("datetime")
+
+
+def _num(default: Any = None) -> Column:
+    return Column("number", default)
+
+
+def _text(default: Any = None, ensure: bool = False) -> Column:
+    return Column("text", default, ensure=ensure)
+
+
+def _cat(default: str, upper: bool = True, ensure: bool = False) -> Column:
+    return Column("category", default, upper=upper, ensure=ensure)
+
+
+def _list(fallback: str | None = None, sep: str = ",") -> Column:
+    return Column("list", ensure=True, fallback=fallback, sep=sep)
+
+
+SCHEMAS: dict[str, dict[str, Column]] = {
+    "v_portfolio_tasks": {
+        "start_date": _date(),
+        "end_date": _date(),
+        "project_code": _text("", ensure=True),
+        "title": _text("", ensure=True),
+        "assignee_names": _text("Profissional", ensure=True),
+        "assignee_ids": _list(),
+        "assignee_list": _list(fallback="assignee_names", sep="+"),
+        "tipo_atividade": _cat("CAMPO", ensure=True),
+        "status": _cat("", upper=False, ensure=True),
+        "date_confidence": _cat("", upper=False, ensure=True),
+    },
+    "v_deliverables": {
+        "end_date": _date(),
+        "client_due_date": _date(),
+        "delivery_date": _date(),
+        "invoice_date": _date(),
+        "tracking_updated_at": _ts(),
+        "delivery_status": _cat("NAO_INICIADO"),
+        "assignee_ids": _list(),
+        "assignee_list": _list(fallback="assignee_names", sep="+"),
+    },
+    "v_lab_samples": {
+        "shipment_date": _date(),
+        "expected_release_date": _date(),
+        "created_at": _ts(),
+        "updated_at": _ts(),
+        "sample_count": _num(),
+        "sla_days": _num(),
+        "status": _cat("PENDENTE"),
+        "sample_types": _list(fallback="sample_type"),
+    },
+    "v_reimbursements": {
+        "expense_date": _date(),
+        "due_date": _date(ensure=True),
+        "payment_date": _date(ensure=True),
+        "created_at": _ts(),
+        "updated_at": _ts(),
+        "amount": _num(0.0),
+        "receipt_count": Column("int", 0, ensure=True),
+        "observations": _text("", ensure=True),
+        "status": _cat("PENDENTE"),
+    },
+    "finance_transactions": {
+        "date": _date(ensure=True),
+        "competence_month": _date(),
+        "amount": _num(0.0),
+        "type": _cat(""),
+        "status": _cat(""),
+        "description": _text(""),
+        "payment_method": _text(""),
+        "notes": _text(""),
+    },
+    "v_finance_monthly_summary": {
+        "month": _date(),
+        "receita": _num(0.0),
+        "despesa": _num(0.0),
+        "saldo": _num(0.0),
+    },
+}
+
+
+# ==========================================================
+# Conversores (vetorizados)
+# ==========================================================
+def parse_dates(s: pd.Series, *, dayfirst: bool = False) -> pd.Series:
+    """Datas "YYYY-MM-DD" (ou ISO com hora) -> datetime64 à meia-noite; inválidas -> NaT.
+
+    `dayfirst=True` aceita também "DD/MM/YYYY" (texto digitado à mão, como
+    `enterprise` nos produtos) — a mesma regra do `to_date` escalar.
+    """
+    if pd.api.types.is_datetime64_any_dtype(s):
+        if getattr(s.dt, "tz", None) is not None:
+            s = s.dt.tz_localize(None)
+        return s.dt.normalize()
+    txt = s.astype("string").str.strip().str.slice(0, 10)
+    out = pd.to_datetime(txt, format="%Y-%m-%d", errors="coerce")
+    if dayfirst:
+        out = out.fillna(pd.to_datetime(txt, format="%d/%m/%Y", errors="coerce"))
+    return out
+
+
+def parse_timestamps(s: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s
+    return pd.to_datetime(s, format="ISO8601", utc=True, errors="coerce")
+
+
+def _text_values(s: pd.Series, default: Any) -> pd.Series:
+    out = s.astype(object).where(s.notna(), None)
+    out = out.map(lambda v: v if v is None or isinstance(v, str) else str(v))
+    if default is not None:
+        out = out.where(out.notna(), default)
+    return out
+
+
+def _convert(s: pd.Series, col: Column) -> pd.Series:
+    if col.kind == "date":
+        return parse_dates(s)
+    if col.kind == "datetime":
+        return parse_timestamps(s)
+    if col.kind in ("number", "int"):
+        out = pd.to_numeric(s, errors="coerce")
+        if col.default is not None:
+            out = out.fillna(col.default)
+            if col.kind == "int":
+                out = out.astype(int)
+        return out
+    if col.kind == "text":
+        return _text_values(s, col.default)
+    if col.kind == "category":
+        out = _text_values(s, col.default)
+        if col.upper:
+            out = out.str.strip().str.upper()
+        return out.astype("category")
+    raise ValueError(f"Tipo de coluna desconhecido: {col.kind}")
+
+
+def _list_values(df: pd.DataFrame, name: str, col: Column) -> list[list[str]]:
+    from services.array_columns import to_lists  # array_columns -> normalize -> schemas
+
+    lists = to_lists(df[name]) if name in df.columns else [[] for _ in range(len(df))]
+    if col.fallback and col.fallback in df.columns:
+        legacy = to_lists(df[col.fallback], sep=col.sep)
+        lists = [cur or old for cur, old in zip(lists, legacy)]
+    return lists
+
+
+def apply_schema(df: pd.DataFrame, view: str) -> pd.DataFrame:
+    """Aplica o schema de `view` (in place) e devolve o próprio frame."""
+    schema = SCHEMAS[view]
+    for name, col in schema.items():
+        if col.kind == "list":
+            df[name] = pd.Series(_list_values(df, name, col), index=df.index, dtype=object)
+            continue
+        if name not in df.columns:
+            if not col.ensure:
+                continue
+            df[name] = pd.Series([col.default] * len(df), index=df.index, dtype=object)
+        df[name] = _convert(df[name], col)
+    return df
+
+
+def date_values(s: pd.Series) -> list[date | None]:
+    """Coluna de data tipada -> lista de `date` (None p/ NaT), formato do data_editor."""
+    if not pd.api.types.is_datetime64_any_dtype(s):
+        s = parse_dates(s)
+    return s.dt.date.astype(object).where(s.notna(), None).tolist()
@@ -0,0 +1,131 @@
+# app/services/search_index.py
+"""
+Índice de busca textual por linha, montado uma vez por frame carregado.
+
+Substitui o "haystack" (concatenação de colunas + lower + str.contains) que
+as páginas refaziam a cada rerun/tecla. No build, cada linha vira um texto
+único em minúsculas e sem acentos ("relatório" -> "relatorio"), e um índice
+de trigramas aponta, para cada trigrama, as posições que o contêm.
+
+Consulta: o texto é dobrado do mesmo jeito e quebrado em termos; a linha
+precisa conter TODOS os termos (substring). Termos com 3+ caracteres usam a
+interseção das listas de trigramas e só conferem os candidatos; termos
+curtos varrem os textos. O resultado são posições (0..n-1) do frame usado
+no build — as páginas guardam essa posição em `ROW_COL` para cruzar com o
+frame já filtrado.
+
+Picklável: pode ser devolvido por loaders com @st.cache_data.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+ROW_COL = "__row"
+SEPARATOR = " | "
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def fold(s: pd.Series) -> pd.Series:
+    """Minúsculas sem acentos (NFKD + remoção das marcas combinantes)."""
+    txt = s.astype("string").fillna("")
+    txt = txt.str.normalize("NFKD").str.replace(r"[\u0300-\u036f]", "", regex=True)
+    return txt.str.lower()
+
+
+def fold_text(text: str) -> str:
+    return str(fold(pd.Series([text])).iloc[0])
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """Trigramas -> posições, sobre o texto dobrado de cada linha."""
+
+    __slots__ = ("_texts", "_postings", "n_rows")
+
+    def __init__(self, fields: Iterable[pd.Series]):
+        parts = [fold(f.reset_index(drop=True)) for f in fields]
+        if parts:
+            joined = parts[0]
+            for p in parts[1:]:
+                joined = joined + SEPARATOR + p
+        else:
+            joined = pd.Series([], dtype="string")
+        self._texts = joined.astype(object).to_numpy()
+        self.n_rows = len(self._texts)
+
+        postings: dict[str, list[int]] = {}
+        for row, text in enumerate(self._texts):
+            for g in _trigrams(text):
+                postings.setdefault(g, []).append(row)
+        self._postings = {g: np.asarray(rows, dtype=np.int64) for g, rows in postings.items()}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns: Iterable[str]) -> "SearchIndex":
+        """Índice sobre as colunas de `df` (colunas ausentes são ignoradas)."""
+        if df.empty:
+            return cls([])
+        return cls([df[c] for c in columns if c in df.columns])
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def _term(self, term: str) -> np.ndarray:
+        if len(term) < 3:
+            return np.flatnonzero([term in t for t in self._texts])
+        lists = []
+        for g in _trigrams(term):
+            rows = self._postings.get(g)
+            if rows is None:
+                return _EMPTY
+            lists.append(rows)
+        lists.sort(key=len)
+        cand = lists[0]
+        for rows in lists[1:]:
+            cand = np.intersect1d(cand, rows, assume_unique=True)
+            if not cand.size:
+                return _EMPTY
+        if len(term) == 3:
+            return cand
+        texts = self._texts
+        return cand[[term in texts[r] for r in cand]] if cand.size else cand
+
+    def search(self, query: str, extra: pd.Series | None = None) -> np.ndarray:
+        """Posições (ordenadas) das linhas que contêm todos os termos de `query`.
+
+        `extra`: coluna derivada na página (alinhada às posições do build) que
+        também vale para a busca, sem entrar no índice — ex.: a situação, que
+        depende da data de hoje.
+        """
+        terms = fold_text(query or "").split()
+        if not terms:
+            return np.arange(self.n_rows)
+        out: np.ndarray | None = None
+        for term in sorted(set(terms), key=len, reverse=True):
+            rows = self._term(term)
+            if extra is not None:
+                rows = np.union1d(rows, _extra_term(extra, term))
+            out = rows if out is None else np.intersect1d(out, rows, assume_unique=True)
+            if not out.size:
+                return _EMPTY
+        return out
+
+    def mask(self, rows: pd.Series, query: str, extra: pd.Series | None = None) -> np.ndarray:
+        """Máscara booleana para um frame filtrado, via sua coluna de posições (`ROW_COL`)."""
+        return np.isin(rows.to_numpy(), self.search(query, extra))
+
+
+def _extra_term(extra: pd.Series, term: str) -> np.ndarray:
+    if isinstance(extra.dtype, pd.CategoricalDtype):
+        # dobra só as categorias e mapeia pelos códigos
+        cats = fold(pd.Series(extra.cat.categories))
+        hit_codes = np.flatnonzero(cats.str.contains(term, regex=False).to_numpy(dtype=bool))
+        return np.flatnonzero(np.isin(extra.cat.codes.to_numpy(), hit_codes))
+    return np.flatnonzero(fold(extra).str.contains(term, regex=False).to_numpy(dtype=bool))
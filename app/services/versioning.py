@@ -0,0 +1,66 @@
+# app/services/versioning.py
+"""
+Versão de conteúdo dos frames carregados, para chavear o estado do data_editor.
+
+- Cada load (miss do st.cache_data) carimba o frame em `df.attrs` com um
+  digest do conteúdo, calculado UMA vez com hash vetorizado
+  (pd.util.hash_pandas_object). O carimbo vai junto no pickle do cache e
+  sobrevive a filtros/cópias.
+- Escritas chamam `refresh()` (limpa o cache): o próximo load traz conteúdo
+  novo e, portanto, versão nova. Um refill do TTL com os mesmos dados mantém
+  a versão — edições em andamento no editor não se perdem.
+- A chave do editor vira `prefixo::versão::hash(filtros)`: O(1) por rerun,
+  sem montar tuplas com todos os valores da tabela.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Any, Iterable
+
+import pandas as pd
+import streamlit as st
+
+VERSION_ATTR = "data_version"
+
+
+def _hashes(obj: pd.Series | pd.Index) -> bytes:
+    try:
+        values = pd.util.hash_pandas_object(obj, index=False)
+    except TypeError:
+        # valores não-hasheáveis (listas, dicts): cai para o texto
+        values = pd.util.hash_pandas_object(obj.astype(str), index=False)
+    return values.to_numpy().tobytes()
+
+
+def frame_digest(df: pd.DataFrame, columns: Iterable[str] | None = None) -> str:
+    """Digest do conteúdo (índice + colunas) com hash vetorizado do pandas."""
+    cols = list(df.columns if columns is None else columns)
+    h = hashlib.blake2b(digest_size=8)
+    h.update(_hashes(df.index))
+    for col in cols:
+        h.update(str(col).encode())
+        h.update(_hashes(df[col]))
+    return h.hexdigest()
+
+
+def stamp_version(df: pd.DataFrame) -> pd.DataFrame:
+    """Carimba `df` (in place) com a versão do conteúdo e devolve o próprio frame."""
+    df.attrs[VERSION_ATTR] = frame_digest(df)
+    return df
+
+
+def data_version(df: pd.DataFrame) -> str:
+    return str(df.attrs.get(VERSION_ATTR, ""))
+
+
+def editor_state_key(prefix: str, version: str, *parts: Any) -> str:
+    """Chave do data_editor: muda quando os dados (versão) ou os filtros mudam."""
+    return f"{prefix}::{version}::{hash(tuple(parts))}"
+
+
+def clear_editor_state(prefix: str) -> None:
+    """Remove do session_state todas as chaves de editor com esse prefixo."""
+    for key in list(st.session_state.keys()):
+        if str(key).startswith(f"{prefix}::"):
+            del st.session_state[key]
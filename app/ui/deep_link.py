@@ -0,0 +1,30 @@
+# app/ui/deep_link.py
+"""
+Deep links entre páginas (usado pela Busca global).
+
+`open_page` guarda o destino no session_state e troca de página; a página
+de destino chama `take_deep_link` uma vez no topo e, se houver link para
+ela, pré-preenche filtros/busca (via chaves dos widgets).
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import streamlit as st
+
+DEEP_LINK_KEY = "__deep_link"
+
+
+def open_page(page: str, **params: Any) -> None:
+    st.session_state[DEEP_LINK_KEY] = {"page": page, **params}
+    st.switch_page(page)
+
+
+def take_deep_link(page: str) -> dict[str, Any]:
+    """Consome o link pendente se ele for para `page` (senão devolve {})."""
+    link = st.session_state.get(DEEP_LINK_KEY)
+    if not isinstance(link, dict) or link.get("page") != page:
+        return {}
+    del st.session_state[DEEP_LINK_KEY]
+    return link
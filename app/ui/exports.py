@@ -0,0 +1,151 @@
+# app/ui/exports.py
+"""
+Exportação CSV / Excel sob demanda (Produtos, Laboratório, Reembolsos).
+
+Antes cada rerun montava o CSV e um workbook inteiro mesmo sem ninguém
+baixar. Agora a barra só desenha "Formato + Gerar arquivo": os bytes são
+gerados no clique e cacheados pela assinatura do filtro (versão dos dados +
+linhas visíveis), então baixar de novo o mesmo recorte não refaz nada.
+
+O Excel é escrito linha a linha com xlsxwriter em `constant_memory` (cada
+linha vai para disco assim que a próxima começa) — o `to_excel` do pandas
+escreve por coluna e não serve para esse modo. "Excel consolidado" junta a
+planilha principal e resumos por coluna num único arquivo.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from io import BytesIO
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+__all__ = [
+    "CSV_MIME",
+    "EXPORT_FORMATS",
+    "XLSX_MIME",
+    "csv_bytes",
+    "export_bar",
+    "summary_sheets",
+    "xlsx_bytes",
+]
+
+CSV_MIME = "text/csv"
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+EXPORT_FORMATS = ("CSV", "Excel", "Excel consolidado")
+
+
+# ==========================================================
+# Geração
+# ==========================================================
+def csv_bytes(df: pd.DataFrame) -> bytes:
+    """CSV com ';' e BOM (abre direto no Excel pt-BR)."""
+    return df.to_csv(index=False, sep=";").encode("utf-8-sig")
+
+
+def _write_cell(ws, row: int, col: int, value: Any, date_fmt) -> None:
+    if value is None or (not isinstance(value, (list, tuple, np.ndarray)) and pd.isna(value)):
+        return
+    if isinstance(value, (bool, np.bool_)):
+        ws.write_boolean(row, col, bool(value))
+    elif isinstance(value, (int, float, np.integer, np.floating)):
+        ws.write_number(row, col, float(value))
+    elif isinstance(value, (datetime, date)):
+        ws.write_datetime(row, col, value, date_fmt)
+    else:
+        ws.write_string(row, col, str(value))
+
+
+def xlsx_bytes(sheets: dict[str, pd.DataFrame]) -> bytes:
+    """Workbook com uma aba por item de `sheets`, escrito em modo streaming."""
+    import xlsxwriter  # opcional: sem ele a barra mostra só o aviso
+
+    buf = BytesIO()
+    wb = xlsxwriter.Workbook(buf, {"constant_memory": True})
+    header_fmt = wb.add_format({"bold": True})
+    date_fmt = wb.add_format({"num_format": "dd/mm/yyyy"})
+    for name, df in sheets.items():
+        ws = wb.add_worksheet(str(name)[:31])
+        ws.write_row(0, 0, [str(c) for c in df.columns], header_fmt)
+        for r, values in enumerate(df.itertuples(index=False, name=None), start=1):
+            for c, value in enumerate(values):
+                _write_cell(ws, r, c, value, date_fmt)
+    wb.close()
+    return buf.getvalue()
+
+
+def summary_sheets(df: pd.DataFrame, by: list[str], value: str | None = None) -> dict[str, pd.DataFrame]:
+    """Uma aba "Por <coluna>" para cada coluna de `by`: contagem (+ soma de `value`)."""
+    out: dict[str, pd.DataFrame] = {}
+    for col in by:
+        keys = df[col].fillna("").astype(str).replace("", "(vazio)")
+        grouped = df.groupby(keys, sort=True)
+        summary = grouped.size().rename("Linhas").to_frame()
+        if value:
+            summary[f"Total {value}"] = grouped[value].apply(lambda s: pd.to_numeric(s, errors="coerce").sum())
+        out[f"Por {col}"] = summary.rename_axis(col).reset_index()
+    return out
+
+
+@st.cache_data(ttl=600)
+def _export_bytes(key: str, kind: str, signature: str, _sheets: Callable[[], dict[str, pd.DataFrame]]) -> bytes:
+    """Bytes do arquivo; a chave do cache é (barra, formato, assinatura), não o frame."""
+    sheets = _sheets()
+    if kind == "CSV":
+        return csv_bytes(next(iter(sheets.values())))
+    return xlsx_bytes(sheets)
+
+
+# ==========================================================
+# UI
+# ==========================================================
+def export_bar(
+    key: str,
+    signature: str,
+    build: Callable[[], pd.DataFrame],
+    *,
+    file_stem: str,
+    sheet_name: str,
+    summary_by: list[str] | None = None,
+    summary_value: str | None = None,
+) -> None:
+    """Formato + "Gerar arquivo" + download. `build` só roda quando alguém pede o arquivo.
+
+    `signature` deve mudar sempre que o conteúdo exportado mudar (versão dos
+    dados, linhas filtradas/ordem, data de referência).
+    """
+    ready_key = f"{key}__ready"
+    c1, c2, c3, _ = st.columns([1.4, 1.0, 1.4, 3.2])
+    fmt = c1.selectbox("Exportar", list(EXPORT_FORMATS), key=f"{key}__format", label_visibility="collapsed")
+    if c2.button("Gerar arquivo", key=f"{key}__prepare"):
+        st.session_state[ready_key] = (fmt, signature)
+
+    if st.session_state.get(ready_key) != (fmt, signature):
+        return
+
+    def _sheets() -> dict[str, pd.DataFrame]:
+        df = build()
+        sheets = {sheet_name: df}
+        if fmt == "Excel consolidado" and summary_by:
+            sheets.update(summary_sheets(df, summary_by, summary_value))
+        return sheets
+
+    try:
+        with st.spinner("Gerando arquivo..."):
+            data = _export_bytes(key, fmt, signature, _sheets)
+    except ImportError:
+        c3.caption("Excel indisponível (xlsxwriter não instalado) — use CSV.")
+        return
+
+    is_csv = fmt == "CSV"
+    suffix = "" if fmt != "Excel consolidado" else "_consolidado"
+    c3.download_button(
+        "⬇️ Baixar",
+        data=data,
+        file_name=f"{file_stem}{suffix}.{'csv' if is_csv else 'xlsx'}",
+        mime=CSV_MIME if is_csv else XLSX_MIME,
+        key=f"{key}__download",
+    )
@@ -0,0 +1,35 @@
+# app/ui/fragments.py
+"""
+Seções que rerodam sozinhas (st.fragment).
+
+Um widget dentro de um fragmento (editar uma célula, marcar um checkbox,
+trocar o item da timeline) reroda só a função do fragmento, não a página:
+nada de recarregar frames, renormalizar e redesenhar gráficos/editores das
+outras seções. Os dados chegam como argumentos — o Streamlit guarda os
+argumentos da última execução completa e os reusa nos reruns do fragmento.
+
+Regras de uso nas páginas:
+- filtros ficam fora (mudar filtro precisa rerodar a página toda);
+- depois de gravar, `st.rerun()` (escopo app) para as outras seções verem
+  os dados novos.
+
+Versões antigas do Streamlit sem fragmento: o decorador vira identidade e a
+página se comporta como antes.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, TypeVar
+
+import streamlit as st
+
+__all__ = ["fragment"]
+
+F = TypeVar("F", bound=Callable)
+
+
+def fragment(func: F) -> F:
+    impl = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    if impl is None:
+        return func
+    return impl(func)
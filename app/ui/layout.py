@@ -1,4 +1,6 @@
 # app/ui/layout.py
+from contextlib import contextmanager
+
 import streamlit as st
 
 def apply_app_chrome():
@@ -45,3 +47,47 @@ def page_header(title: str, subtitle: str | None = None, user_email: str | None
 def filter_bar_start():
     """Começo de uma faixa de filtros bonita/padrão."""
     return st.container(border=True)
+
+
+@contextmanager
+def filter_form(key: str, *, border: bool = True, submit_label: str = "Aplicar filtros"):
+    """Faixa de filtros com modo "aplicar ao clicar" (padrão).
+
+    Nesse modo os widgets ficam num `st.form`: montar uma combinação de
+    filtros não reroda a página a cada widget — só o botão Aplicar dispara
+    um rerun (e uma query). Desligando o toggle abaixo da faixa, cada widget
+    volta a aplicar na hora.
+
+    Dentro do `with` só widgets de valor: `st.button` e widgets que dependem
+    de outro filtro (ex.: data manual do atalho de período) ficam fora.
+    """
+    mode_key = f"{key}__apply_mode"
+    st.session_state.setdefault(mode_key, True)
+    if st.session_state[mode_key]:
+        with st.form(key, border=border):
+            yield
+            st.form_submit_button(submit_label, type="primary")
+    else:
+        with st.container(border=border):
+            yield
+    st.toggle(
+        "Aplicar filtros só ao clicar",
+        key=mode_key,
+        help="Desligado: cada alteração de filtro recarrega a página na hora.",
+    )
+
+
+def section_selector(label: str, options: list[str], *, key: str, default: str | None = None) -> str:
+    """Escolha de seção da página; só a seção escolhida é executada.
+
+    Diferente de `st.tabs` (que roda o conteúdo de todas as abas a cada
+    rerun), a página renderiza apenas o que este seletor devolver.
+    """
+    default = default or options[0]
+    control = getattr(st, "segmented_control", None)
+    if control is not None:
+        choice = control(label, options, default=default, key=key)
+    else:
+        choice = st.radio(label, options, index=options.index(default), horizontal=True, key=key)
+    # segmented_control permite desmarcar tudo: volta para o padrão
+    return choice or default
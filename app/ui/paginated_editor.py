@@ -0,0 +1,270 @@
+# app/ui/paginated_editor.py
+"""
+data_editor paginado para as tabelas grandes (Financeiro, Produtos,
+Laboratório, Reembolsos).
+
+- `EditorPager` guarda no session_state a página atual, o tamanho da página
+  e os cursores de keyset (última chave de cada página já visitada), e
+  desenha a barra "linhas por página · total · ◀ x/y ▶". Quem busca no
+  banco (Financeiro) pede só a página seguinte ao cursor `pager.after`;
+  quem já tem o frame filtrado em memória (métricas/busca usam tudo) fatia
+  com `pager.window()`.
+- `paginated_editor` manda ao navegador só as linhas da página e guarda as
+  edições por id num "pendente" que sobrevive à troca de página. O save
+  recebe apenas as linhas alteradas (antes/depois) de todas as páginas.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, NamedTuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from services.normalize import clean_str, to_date
+from services.versioning import editor_state_key
+
+__all__ = [
+    "DEFAULT_PAGE_SIZE",
+    "EditorPager",
+    "EditorResult",
+    "PAGE_SIZES",
+    "apply_data_editor_state",
+    "changed_mask",
+    "paginated_editor",
+]
+
+PAGE_SIZES = (50, 100, 250, 500)
+DEFAULT_PAGE_SIZE = 100
+
+
+# ==========================================================
+# Paginação
+# ==========================================================
+class EditorPager:
+    """Página atual + cursores de keyset de um editor, por conjunto de filtros.
+
+    `scope` são os filtros/ordenação da tabela: mudou, volta para a página 1
+    (os cursores antigos não valem mais). O tamanho da página fica no widget
+    `<prefix>__page_size`, lido aqui antes de a barra ser desenhada.
+    """
+
+    def __init__(self, prefix: str, *scope: Any, sizes: tuple[int, ...] = PAGE_SIZES,
+                 default_size: int = DEFAULT_PAGE_SIZE):
+        self.prefix = prefix
+        self.scope = hash(tuple(scope))
+        self.sizes = sizes
+        self._size_key = f"{prefix}__page_size"
+        self._state_key = f"{prefix}__page"
+
+        if st.session_state.get(self._size_key) not in sizes:
+            st.session_state[self._size_key] = default_size if default_size in sizes else sizes[0]
+        self.size = int(st.session_state[self._size_key])
+
+        state = st.session_state.get(self._state_key)
+        if not isinstance(state, dict) or state.get("scope") != (self.scope, self.size):
+            state = {"scope": (self.scope, self.size), "number": 1, "cursors": {}}
+            st.session_state[self._state_key] = state
+        self._state = state
+
+    @property
+    def number(self) -> int:
+        return int(self._state["number"])
+
+    @property
+    def after(self) -> Any:
+        """Cursor de keyset da página atual (última chave da anterior); None na 1ª."""
+        return self._state["cursors"].get(self.number)
+
+    @property
+    def offset(self) -> int:
+        return (self.number - 1) * self.size
+
+    def window(self) -> slice:
+        """Fatia posicional da página, para frames já filtrados em memória."""
+        return slice(self.offset, self.offset + self.size)
+
+    def remember(self, last_key: Any) -> None:
+        """Registra a última chave da página atual como cursor da próxima."""
+        self._state["cursors"][self.number + 1] = last_key
+
+    def controls(self, total: int) -> None:
+        """Barra de paginação. Página fora do total (linhas excluídas) volta para a última."""
+        pages = max(1, -(-int(total) // self.size))
+        if self.number > pages:
+            self._state["number"] = pages
+            st.rerun()
+
+        c1, c2, c3, c4, _ = st.columns([1.3, 0.5, 1.6, 0.5, 3.0])
+        c1.selectbox("Linhas por página", list(self.sizes), key=self._size_key)
+        prev_clicked = c2.button("◀", key=f"{self.prefix}__prev", disabled=self.number <= 1)
+        c3.caption(f"**{int(total)}** linha(s) · página {self.number}/{pages}")
+        next_clicked = c4.button("▶", key=f"{self.prefix}__next", disabled=self.number >= pages)
+
+        if prev_clicked or next_clicked:
+            self._state["number"] = self.number + (1 if next_clicked else -1)
+            st.rerun()
+
+
+# ==========================================================
+# Diff
+# ==========================================================
+def _cell(v: Any) -> Any:
+    """Valor comparável: nulos/vazios viram None, datas viram date, números float."""
+    if v is None or (not isinstance(v, (list, tuple, np.ndarray)) and pd.isna(v)):
+        return None
+    if isinstance(v, (bool, np.bool_)):
+        return bool(v)
+    if isinstance(v, (int, float, np.integer, np.floating)):
+        return float(v)
+    if isinstance(v, (date, pd.Timestamp)):
+        return to_date(v)
+    return clean_str(v) or None
+
+
+def changed_mask(before: pd.DataFrame, after: pd.DataFrame, columns: list[str]) -> np.ndarray:
+    """Máscara posicional das linhas de `after` que diferem de `before` em `columns`."""
+    mask = np.zeros(len(before), dtype=bool)
+    for col in columns:
+        a = [_cell(v) for v in before[col].tolist()]
+        b = [_cell(v) for v in after[col].tolist()]
+        mask |= np.fromiter((x != y for x, y in zip(a, b)), dtype=bool, count=len(a))
+    return mask
+
+
+def _is_date_column(series: pd.Series) -> bool:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return True
+    sample = series.dropna()
+    return not sample.empty and isinstance(sample.iloc[0], date)
+
+
+def _editor_value(series: pd.Series, val: Any) -> Any:
+    """Valor de `edited_rows` no tipo da coluna: DateColumn chega como texto ISO."""
+    if val is None or not _is_date_column(series):
+        return val
+    d = to_date(val)
+    if d is None:
+        return None
+    return pd.Timestamp(d) if pd.api.types.is_datetime64_any_dtype(series) else d
+
+
+def apply_data_editor_state(base: pd.DataFrame, returned: pd.DataFrame, key: str) -> pd.DataFrame:
+    """Reaplica `edited_rows` do session_state sobre o retorno do editor.
+
+    Com índice de texto o data_editor às vezes devolve o frame sem a última
+    edição; o estado do widget (posição -> {coluna: valor}) é a fonte certa.
+    Os valores voltam no tipo da coluna de `base` (datas como date).
+    """
+    out = returned.copy()
+    if len(out) == len(base):
+        out.index = base.index.copy()
+
+    state = st.session_state.get(key)
+    if not isinstance(state, dict):
+        return out
+
+    for row_key, changes in (state.get("edited_rows") or {}).items():
+        if not isinstance(changes, dict):
+            continue
+        try:
+            pos = int(row_key)
+        except (TypeError, ValueError):
+            continue
+        if not (0 <= pos < len(out)):
+            continue
+        for col, val in changes.items():
+            if col in out.columns:
+                ref = base[col] if col in base.columns else out[col]
+                out.at[out.index[pos], col] = _editor_value(ref, val)
+    return out
+
+
+# ==========================================================
+# Editor
+# ==========================================================
+class EditorResult(NamedTuple):
+    edited: pd.DataFrame  # página atual, como está na tela
+    before: pd.DataFrame  # linhas alteradas (todas as páginas), valores originais
+    after: pd.DataFrame  # as mesmas linhas, valores editados
+
+
+def _value_cols(df: pd.DataFrame, id_col: str | None) -> list[str]:
+    return [c for c in df.columns if c != id_col]
+
+
+def _row_ids(df: pd.DataFrame, id_col: str | None) -> list[str]:
+    values = df.index if id_col is None else df[id_col]
+    return [str(v) for v in values]
+
+
+def _pending_frames(rows: dict[str, tuple[dict, dict]], columns: pd.Index,
+                    id_col: str | None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    ids = list(rows)
+    before = pd.DataFrame([rows[i][0] for i in ids], columns=columns)
+    after = pd.DataFrame([rows[i][1] for i in ids], columns=columns)
+    if id_col is None:
+        before.index = after.index = pd.Index(ids, dtype=object)
+    return before, after
+
+
+def paginated_editor(
+    df_page: pd.DataFrame,
+    pager: EditorPager,
+    *,
+    version: str,
+    id_col: str | None = None,
+    compare_cols: list[str] | None = None,
+    **editor_kwargs: Any,
+) -> EditorResult:
+    """`st.data_editor` de uma página, com edições pendentes entre páginas.
+
+    As linhas são identificadas por `id_col` (ou pelo índice, se None). Ao
+    voltar a uma página, as edições pendentes dela reaparecem na grade: a
+    base do editor é fixada na entrada da página (trocar o `data` de um
+    editor com key reinicia o widget e perderia a edição em curso).
+    """
+    key = editor_state_key(pager.prefix, version, pager.scope, pager.number, pager.size)
+    store_key = f"{pager.prefix}::pending"
+    store = st.session_state.get(store_key)
+    if not isinstance(store, dict) or store.get("scope") != pager.scope:
+        store = {"scope": pager.scope, "rows": {}, "base_key": None, "overlay": {}}
+        st.session_state[store_key] = store
+    rows: dict[str, tuple[dict, dict]] = store["rows"]
+
+    ids = _row_ids(df_page, id_col)
+    if store["base_key"] != key:
+        store["base_key"] = key
+        store["overlay"] = {i: rows[i][1] for i in ids if i in rows}
+
+    base = df_page.copy()
+    overlay = store["overlay"]
+    if overlay:
+        # coluna inteira por vez: um None numa coluna int não esbarra no dtype
+        for col in _value_cols(base, id_col):
+            values = base[col].tolist()
+            touched = False
+            for pos, row_id in enumerate(ids):
+                if row_id in overlay and _cell(overlay[row_id].get(col)) != _cell(values[pos]):
+                    values[pos] = overlay[row_id].get(col)
+                    touched = True
+            if touched:
+                base[col] = values
+
+    returned = st.data_editor(base, key=key, **editor_kwargs)
+    edited = apply_data_editor_state(base, returned, key)
+
+    cols = compare_cols or _value_cols(df_page, id_col)
+    changed = changed_mask(df_page, edited, cols)
+    for row_id in ids:
+        rows.pop(row_id, None)
+    for pos in np.flatnonzero(changed):
+        rows[ids[pos]] = (df_page.iloc[pos].to_dict(), edited.iloc[pos].to_dict())
+
+    if rows:
+        st.caption(f"✏️ {len(rows)} linha(s) alterada(s) aguardando **Salvar alterações**.")
+
+    before, after = _pending_frames(rows, df_page.columns, id_col)
+    return EditorResult(edited, before, after)
@@ -0,0 +1,92 @@
+-- =====================================================================
+-- Responsáveis como arrays tipados
+-- Expõe assignee_ids (uuid[]) e assignee_list (text[]) — lead primeiro,
+-- depois co-responsáveis por nome — em v_portfolio_tasks e v_deliverables.
+-- O app e o script de alertas deixam de quebrar "A + B + C" e de casar
+-- pessoa por nome. assignee_names (texto) continua lá por compatibilidade.
+-- Idempotente.
+-- =====================================================================
+
+-- Lead = tasks.assignee_id, mesmo sem linha em task_people (tarefas do
+-- importador do MS Project e legadas só têm o lead na própria tarefa).
+create or replace view public.v_task_assignees as
+with a as (
+  select t.id as task_id, t.assignee_id as person_id
+  from public.tasks t
+  where t.assignee_id is not null
+  union
+  select tp.task_id, tp.person_id
+  from public.task_people tp
+)
+select
+  a.task_id,
+  array_agg(a.person_id order by coalesce(a.person_id = t.assignee_id, false) desc, ppl.name) as assignee_ids,
+  array_agg(ppl.name    order by coalesce(a.person_id = t.assignee_id, false) desc, ppl.name) as assignee_list
+from a
+join public.tasks t    on t.id = a.task_id
+join public.people ppl on ppl.id = a.person_id
+group by a.task_id;
+
+grant select on public.v_task_assignees to authenticated;
+
+-- v_portfolio_tasks: acrescenta as colunas no fim (create or replace só
+-- permite isso). A definição atual é reaproveitada como subquery para não
+-- duplicar aqui a agregação existente.
+do $$
+declare
+  base_sql text;
+begin
+  if not exists (
+    select 1 from information_schema.columns
+    where table_schema = 'public' and table_name = 'v_portfolio_tasks' and column_name = 'assignee_ids'
+  ) then
+    base_sql := rtrim(pg_get_viewdef('public.v_portfolio_tasks'::regclass, true), E'; \n');
+    execute format(
+      'create or replace view public.v_portfolio_tasks as
+       select base.*,
+              coalesce(a.assignee_ids,  array[]::uuid[]) as assignee_ids,
+              coalesce(a.assignee_list, array[]::text[]) as assignee_list
+       from (%s) base
+       left join public.v_task_assignees a on a.task_id = base.task_id',
+      base_sql
+    );
+  end if;
+end $$;
+
+grant select on public.v_portfolio_tasks to authenticated;
+
+-- v_deliverables (v6 + arrays)
+drop view if exists public.v_deliverables;
+
+create view public.v_deliverables as
+select
+  vpt.task_id                                   as task_id,
+  vpt.project_id,
+  p.project_code,
+  p.name                                        as project_name,
+  vpt.title                                     as product_name,
+  vpt.tipo_atividade,
+  vpt.start_date,
+  vpt.end_date,
+  vpt.status                                    as task_status,
+  vpt.assignee_names,
+  coalesce(d.delivery_status,'NAO_INICIADO')    as delivery_status,
+  coalesce(d.needs_revision, false)             as needs_revision,
+  coalesce(d.sent_to_client, false)             as sent_to_client,
+  d.client_due_date,
+  d.delivery_date,
+  d.invoice_date,
+  d.discipline,
+  d.enterprise,
+  d.notes                                       as tracking_notes,
+  d.updated_at                                  as tracking_updated_at,
+  vpt.assignee_ids,
+  vpt.assignee_list
+from public.v_portfolio_tasks vpt
+join public.projects p on p.id = vpt.project_id
+left join public.task_delivery_tracking d on d.task_id = vpt.task_id
+where vpt.tipo_atividade = 'RELATORIO';
+
+grant select on public.v_deliverables to authenticated;
+
+notify pgrst, 'reload schema';
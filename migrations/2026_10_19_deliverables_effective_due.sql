@@ -0,0 +1,180 @@
+-- =====================================================================
+-- Prazo efetivo dos produtos no banco
+-- task_due_dates guarda, por tarefa RELATORIO, o effective_due_date
+-- (client_due_date -> data digitada em enterprise -> end_date da tarefa)
+-- e o is_terminal (status final ou já entregue). Triggers em
+-- task_delivery_tracking e tasks mantêm a tabela em dia, e o índice
+-- parcial em effective_due_date (só produtos em aberto) atende o filtro
+-- de janela do script de alertas. v_deliverables expõe as duas colunas.
+-- Idempotente.
+-- =====================================================================
+
+-- enterprise é texto livre; só vira data se estiver em YYYY-MM-DD ou
+-- DD/MM/YYYY (mesma regra do to_date do script). Data inválida -> null.
+create or replace function public.try_parse_date(p_text text)
+returns date
+language plpgsql
+stable
+as $$
+declare
+  v text := btrim(coalesce(p_text, ''));
+begin
+  if v ~ '^\d{4}-\d{2}-\d{2}' then
+    return substr(v, 1, 10)::date;
+  elsif v ~ '^\d{2}/\d{2}/\d{4}' then
+    return to_date(substr(v, 1, 10), 'DD/MM/YYYY');
+  end if;
+  return null;
+exception when others then
+  return null;
+end;
+$$;
+
+-- Tabela à parte (e não colunas em task_delivery_tracking): produto sem
+-- linha de acompanhamento também tem prazo (end_date da tarefa).
+create table if not exists public.task_due_dates (
+  task_id            uuid primary key references public.tasks(id) on delete cascade,
+  effective_due_date date,
+  is_terminal        boolean not null default false
+);
+
+create index if not exists ix_task_due_dates_open_due
+  on public.task_due_dates (effective_due_date)
+  where not is_terminal;
+
+alter table public.task_due_dates enable row level security;
+
+drop policy if exists p_task_due_dates_read on public.task_due_dates;
+create policy p_task_due_dates_read on public.task_due_dates
+  for select to authenticated using (true);
+
+grant select on public.task_due_dates to authenticated;
+
+-- Recalcula o prazo de uma tarefa; tarefa que não é (mais) RELATORIO sai.
+create or replace function public.fn_task_due_dates_refresh(p_task_id uuid)
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if p_task_id is null then
+    return;
+  end if;
+
+  delete from public.task_due_dates dd
+  where dd.task_id = p_task_id
+    and not exists (
+      select 1 from public.tasks t
+      where t.id = p_task_id and t.tipo_atividade = 'RELATORIO'
+    );
+
+  insert into public.task_due_dates (task_id, effective_due_date, is_terminal)
+  select
+    t.id,
+    coalesce(d.client_due_date, public.try_parse_date(d.enterprise), t.end_date),
+    (
+      d.delivery_date is not null
+      or upper(coalesce(d.delivery_status, '')) in ('ENTREGUE','FATURADO','CONCLUIDO')
+    )
+  from public.tasks t
+  left join public.task_delivery_tracking d on d.task_id = t.id
+  where t.id = p_task_id
+    and t.tipo_atividade = 'RELATORIO'
+  on conflict (task_id) do update
+    set effective_due_date = excluded.effective_due_date,
+        is_terminal        = excluded.is_terminal;
+end;
+$$;
+
+create or replace function public.fn_task_due_dates_tasks() returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  perform public.fn_task_due_dates_refresh(new.id);
+  return null;
+end;
+$$;
+
+create or replace function public.fn_task_due_dates_tracking() returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if tg_op <> 'INSERT' then
+    perform public.fn_task_due_dates_refresh(old.task_id);
+  end if;
+  if tg_op <> 'DELETE' and (tg_op = 'INSERT' or new.task_id is distinct from old.task_id) then
+    perform public.fn_task_due_dates_refresh(new.task_id);
+  end if;
+  return null;
+end;
+$$;
+
+-- Remoção da tarefa: on delete cascade.
+drop trigger if exists trg_task_due_dates_tasks on public.tasks;
+create trigger trg_task_due_dates_tasks
+after insert or update of end_date, tipo_atividade on public.tasks
+for each row execute function public.fn_task_due_dates_tasks();
+
+drop trigger if exists trg_task_due_dates_tracking on public.task_delivery_tracking;
+create trigger trg_task_due_dates_tracking
+after insert or update or delete on public.task_delivery_tracking
+for each row execute function public.fn_task_due_dates_tracking();
+
+-- Carga inicial (e recarga ao reaplicar a migração).
+delete from public.task_due_dates;
+insert into public.task_due_dates (task_id, effective_due_date, is_terminal)
+select
+  t.id,
+  coalesce(d.client_due_date, public.try_parse_date(d.enterprise), t.end_date),
+  (
+    d.delivery_date is not null
+    or upper(coalesce(d.delivery_status, '')) in ('ENTREGUE','FATURADO','CONCLUIDO')
+  )
+from public.tasks t
+left join public.task_delivery_tracking d on d.task_id = t.id
+where t.tipo_atividade = 'RELATORIO';
+
+-- v_deliverables: mesma definição de 2026_10_19_assignee_arrays.sql com as
+-- duas colunas novas no fim (create or replace só permite acrescentar).
+-- As colunas vêm direto de task_due_dates (sem coalesce) para o filtro
+-- do PostgREST chegar ao índice parcial.
+create or replace view public.v_deliverables as
+select
+  vpt.task_id                                   as task_id,
+  vpt.project_id,
+  p.project_code,
+  p.name                                        as project_name,
+  vpt.title                                     as product_name,
+  vpt.tipo_atividade,
+  vpt.start_date,
+  vpt.end_date,
+  vpt.status                                    as task_status,
+  vpt.assignee_names,
+  coalesce(d.delivery_status,'NAO_INICIADO')    as delivery_status,
+  coalesce(d.needs_revision, false)             as needs_revision,
+  coalesce(d.sent_to_client, false)             as sent_to_client,
+  d.client_due_date,
+  d.delivery_date,
+  d.invoice_date,
+  d.discipline,
+  d.enterprise,
+  d.notes                                       as tracking_notes,
+  d.updated_at                                  as tracking_updated_at,
+  vpt.assignee_ids,
+  vpt.assignee_list,
+  dd.effective_due_date,
+  dd.is_terminal
+from public.v_portfolio_tasks vpt
+join public.projects p on p.id = vpt.project_id
+left join public.task_delivery_tracking d on d.task_id = vpt.task_id
+left join public.task_due_dates dd on dd.task_id = vpt.task_id
+where vpt.tipo_atividade = 'RELATORIO';
+
+grant select on public.v_deliverables to authenticated;
+
+notify pgrst, 'reload schema';
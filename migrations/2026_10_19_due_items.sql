@@ -0,0 +1,87 @@
+-- =====================================================================
+-- Itens com prazo (alertas de vencimento) numa view só
+-- v_due_items junta Gantt, Laboratório, Produtos e Reembolsos no mesmo
+-- formato: source, source_id, item_key, title, project_code/name,
+-- due_date, responsible_ids (lead primeiro), responsible_names, detail,
+-- amount e is_terminal. O script de alertas lê tudo numa query paginada
+-- por (due_date, item_key) em vez de uma query por view.
+-- Requer 2026_10_19_assignee_arrays.sql e
+-- 2026_10_19_deliverables_effective_due.sql.
+-- Idempotente.
+-- =====================================================================
+
+create or replace view public.v_due_items as
+select
+  'gantt'::text                                  as source,
+  vpt.task_id::text                              as source_id,
+  'gantt/' || vpt.task_id::text                  as item_key,
+  coalesce(nullif(btrim(vpt.title), ''), '(Sem titulo)') as title,
+  vpt.project_code,
+  vpt.project_name,
+  vpt.end_date                                   as due_date,
+  vpt.assignee_ids                               as responsible_ids,
+  vpt.assignee_names                             as responsible_names,
+  'Prazo da tarefa no Gantt'::text               as detail,
+  null::numeric                                  as amount,
+  (
+    upper(coalesce(vpt.status::text, '')) in
+      ('CANCELADA','CANCELADO','CANCELLED','CONCLUIDA','CONCLUIDO','FINALIZADA','FINALIZADO')
+    or upper(coalesce(vpt.date_confidence::text, '')) in
+      ('CANCELADA','CANCELADO','CANCELLED','CONCLUIDA','CONCLUIDO','FINALIZADA','FINALIZADO')
+  )                                              as is_terminal
+from public.v_portfolio_tasks vpt
+
+union all
+
+select
+  'laboratorio',
+  s.sample_id::text,
+  'laboratorio/' || s.sample_id::text,
+  'Amostra de laboratorio',
+  s.project_code,
+  s.project_name,
+  s.expected_release_date,
+  case when s.assignee_id is null then null else array[s.assignee_id] end,
+  s.assignee_name,
+  concat_ws(' | ', nullif(s.sample_types_label, ''), nullif(s.lab_name, '')),
+  null::numeric,
+  upper(coalesce(s.status::text, '')) in ('CONCLUIDO','LAUDO_RECEBIDO')
+from public.v_lab_samples s
+
+union all
+
+select
+  'produtos',
+  d.task_id::text,
+  'produtos/' || d.task_id::text,
+  coalesce(nullif(btrim(d.product_name), ''), '(Produto sem nome)'),
+  d.project_code,
+  d.project_name,
+  d.effective_due_date,
+  d.assignee_ids,
+  d.assignee_names,
+  'Prazo de entrega ao cliente',
+  null::numeric,
+  d.is_terminal
+from public.v_deliverables d
+
+union all
+
+select
+  'reembolsos',
+  r.id::text,
+  'reembolsos/' || r.id::text,
+  'Reembolso / despesa interna',
+  r.project_code,
+  r.project_name,
+  r.due_date,
+  case when r.collaborator_id is null then null else array[r.collaborator_id] end,
+  r.collaborator_name,
+  concat_ws(' | ', nullif(r.category_name, ''), nullif(r.description, '')),
+  r.amount,
+  upper(coalesce(r.status::text, '')) in ('PAGO','GLOSADO')
+from public.v_reimbursements r;
+
+grant select on public.v_due_items to authenticated;
+
+notify pgrst, 'reload schema';
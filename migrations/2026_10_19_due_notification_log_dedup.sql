@@ -0,0 +1,36 @@
+-- =====================================================================
+-- Alertas de vencimento: dedup indexado do log
+-- - índice único (notification_key, status): alvo do upsert com
+--   ignore-duplicates do script (on_conflict precisa de índice não parcial)
+--   e busca por chave sem varrer o log inteiro;
+-- - rpc_due_notification_sent_keys: recebe todas as chaves da rodada e
+--   devolve as já enviadas numa chamada só.
+-- Idempotente.
+-- =====================================================================
+
+-- Linhas repetidas impediriam o índice único: fica a mais recente.
+delete from public.due_notification_log l
+using public.due_notification_log newer
+where newer.notification_key = l.notification_key
+  and newer.status = l.status
+  and (newer.sent_at, newer.id) > (l.sent_at, l.id);
+
+create unique index if not exists ux_due_notification_log_key_status
+  on public.due_notification_log (notification_key, status);
+
+create or replace function public.rpc_due_notification_sent_keys(p_keys text[])
+returns table (notification_key text)
+language sql
+stable
+security invoker
+set search_path = public
+as $$
+  select l.notification_key
+  from public.due_notification_log l
+  where l.status = 'SENT'
+    and l.notification_key = any(p_keys)
+$$;
+
+grant execute on function public.rpc_due_notification_sent_keys(text[]) to authenticated, service_role;
+
+notify pgrst, 'reload schema';
@@ -0,0 +1,326 @@
+-- =====================================================================
+-- Busca global (página "Busca")
+-- Um índice invertido só: search_documents guarda um "documento" por item
+-- (projeto, tarefa, produto, amostra, reembolso) com o tsvector já
+-- calculado ('simple' + unaccent) e GIN em cima. Os campos são os mesmos
+-- do fallback local do app (app/services/global_search.py): código do
+-- projeto, título, subtítulo, responsáveis, laboratório, colaborador etc.
+-- Triggers nas tabelas-fonte mantêm os documentos em dia; a RPC só
+-- consulta o índice e devolve os hits já ranqueados.
+-- Responsáveis vêm de v_task_assignees (lead + task_people,
+-- 2026_10_19_assignee_arrays.sql).
+-- Idempotente (recria os documentos a cada execução).
+-- =====================================================================
+
+create extension if not exists unaccent with schema public;
+
+-- unaccent() é STABLE; o wrapper IMMUTABLE permite usar em índices de
+-- expressão (o dicionário é fixo, então é seguro).
+create or replace function public.f_search_text(p text) returns text
+language sql
+immutable
+parallel safe
+as $$
+  select lower(public.unaccent('public.unaccent'::regdictionary, coalesce(p, '')))
+$$;
+
+-- ---------------------------------------------------------------------
+-- Documentos: definição (view) e cópia indexada (tabela)
+-- kind: PROJETO | TAREFA | PRODUTO | AMOSTRA | REEMBOLSO
+-- ---------------------------------------------------------------------
+create or replace view public.v_search_documents as
+select
+  d.kind, d.id, d.project_id, d.project_code, d.title, d.subtitle, d.weight,
+  to_tsvector('simple', public.f_search_text(
+    concat_ws(' ', d.project_code, d.title, d.subtitle, d.body)
+  )) as doc
+from (
+  select 'PROJETO'::text as kind, p.id, p.id as project_id, p.project_code::text as project_code,
+         p.name::text as title, p.client::text as subtitle,
+         concat_ws(' ', p.notes) as body,
+         1.5::real as weight
+  from public.projects p
+
+  union all
+  select 'TAREFA', t.id, t.project_id, p.project_code, t.title, t.tipo_atividade::text,
+         concat_ws(' ', array_to_string(a.assignee_list, ' '), t.notes),
+         1.0
+  from public.tasks t
+  join public.projects p on p.id = t.project_id
+  left join public.v_task_assignees a on a.task_id = t.id
+
+  union all
+  select 'PRODUTO', t.id, t.project_id, p.project_code, t.title,
+         coalesce(d.delivery_status::text, 'NAO_INICIADO'),
+         concat_ws(' ', array_to_string(a.assignee_list, ' '), d.discipline, d.enterprise, d.notes),
+         1.0
+  from public.tasks t
+  join public.projects p on p.id = t.project_id
+  left join public.task_delivery_tracking d on d.task_id = t.id
+  left join public.v_task_assignees a on a.task_id = t.id
+  where t.tipo_atividade = 'RELATORIO'
+
+  union all
+  select 'AMOSTRA', s.id, s.project_id, p.project_code,
+         coalesce(nullif(array_to_string(s.sample_types, ', '), ''), lt.name, s.sample_type),
+         s.status::text,
+         concat_ws(' ', l.name, ppl.name, s.notes),
+         1.0
+  from public.lab_samples s
+  join public.projects p on p.id = s.project_id
+  left join public.labs l on l.id = s.lab_id
+  left join public.people ppl on ppl.id = s.assignee_id
+  left join public.lab_sample_types lt on lt.id = s.sample_type_id
+
+  union all
+  select 'REEMBOLSO', r.id, r.project_id, p.project_code, r.description, r.status::text,
+         concat_ws(' ', ppl.name, c.name, r.observations),
+         1.0
+  from public.reimbursements r
+  join public.projects p on p.id = r.project_id
+  left join public.people ppl on ppl.id = r.collaborator_id
+  left join public.reimbursement_categories c on c.id = r.category_id
+) d;
+
+create table if not exists public.search_documents (
+  kind         text     not null,
+  id           uuid     not null,
+  project_id   uuid,
+  project_code text,
+  title        text,
+  subtitle     text,
+  weight       real     not null default 1.0,
+  doc          tsvector not null,
+  primary key (kind, id)
+);
+
+create index if not exists ix_search_documents_doc
+  on public.search_documents using gin (doc);
+
+create index if not exists ix_search_documents_project
+  on public.search_documents (project_id);
+
+-- Mesma visibilidade das tabelas-fonte (leitura liberada a autenticados);
+-- escrita só pelos triggers (security definer).
+alter table public.search_documents enable row level security;
+
+drop policy if exists p_search_documents_read on public.search_documents;
+create policy p_search_documents_read on public.search_documents
+  for select to authenticated using (true);
+
+grant select on public.search_documents to authenticated;
+
+-- ---------------------------------------------------------------------
+-- Atualização: reescreve os documentos de (kind, ids) a partir da view.
+-- Item apagado (ou que deixou de ser RELATORIO) some do índice.
+-- ---------------------------------------------------------------------
+create or replace function public.fn_search_documents_refresh(p_kind text, p_ids uuid[])
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if p_ids is null or cardinality(p_ids) = 0 then
+    return;
+  end if;
+  delete from public.search_documents where kind = p_kind and id = any(p_ids);
+  insert into public.search_documents (kind, id, project_id, project_code, title, subtitle, weight, doc)
+  select kind, id, project_id, project_code, title, subtitle, weight, doc
+  from public.v_search_documents
+  where kind = p_kind and id = any(p_ids);
+end;
+$$;
+
+create or replace function public.fn_search_documents_refresh_project(p_project_id uuid)
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  delete from public.search_documents where project_id = p_project_id;
+  insert into public.search_documents (kind, id, project_id, project_code, title, subtitle, weight, doc)
+  select kind, id, project_id, project_code, title, subtitle, weight, doc
+  from public.v_search_documents
+  where project_id = p_project_id;
+end;
+$$;
+
+-- Trigger genérico das tabelas de itens:
+-- TG_ARGV[0] = coluna com o id do item; TG_ARGV[1..] = kinds afetados.
+create or replace function public.fn_search_documents_row() returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+  ids uuid[];
+  i   int;
+begin
+  ids := array_remove(array[
+    case when tg_op <> 'INSERT' then (to_jsonb(old) ->> tg_argv[0])::uuid end,
+    case when tg_op <> 'DELETE' then (to_jsonb(new) ->> tg_argv[0])::uuid end
+  ], null);
+  for i in 1 .. tg_nargs - 1 loop
+    perform public.fn_search_documents_refresh(tg_argv[i], array(select distinct unnest(ids)));
+  end loop;
+  return null;
+end;
+$$;
+
+-- Projeto: código novo muda o documento de todos os itens do projeto.
+create or replace function public.fn_search_documents_project() returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if tg_op = 'DELETE' then
+    delete from public.search_documents where project_id = old.id;
+  elsif tg_op = 'UPDATE' and new.project_code is distinct from old.project_code then
+    perform public.fn_search_documents_refresh_project(new.id);
+  else
+    perform public.fn_search_documents_refresh('PROJETO', array[new.id]);
+  end if;
+  return null;
+end;
+$$;
+
+-- Nomes usados nos documentos de outras tabelas (pessoa, laboratório,
+-- tipo de amostra, categoria de reembolso).
+create or replace function public.fn_search_documents_lookup() returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if new.name is not distinct from old.name then
+    return null;
+  end if;
+
+  if tg_table_name = 'people' then
+    perform public.fn_search_documents_refresh(k, array(
+      select t.id from public.tasks t where t.assignee_id = new.id
+      union
+      select tp.task_id from public.task_people tp where tp.person_id = new.id
+    ))
+    from unnest(array['TAREFA', 'PRODUTO']) as k;
+    perform public.fn_search_documents_refresh('AMOSTRA', array(
+      select s.id from public.lab_samples s where s.assignee_id = new.id
+    ));
+    perform public.fn_search_documents_refresh('REEMBOLSO', array(
+      select r.id from public.reimbursements r where r.collaborator_id = new.id
+    ));
+  elsif tg_table_name = 'labs' then
+    perform public.fn_search_documents_refresh('AMOSTRA', array(
+      select s.id from public.lab_samples s where s.lab_id = new.id
+    ));
+  elsif tg_table_name = 'lab_sample_types' then
+    perform public.fn_search_documents_refresh('AMOSTRA', array(
+      select s.id from public.lab_samples s where s.sample_type_id = new.id
+    ));
+  elsif tg_table_name = 'reimbursement_categories' then
+    perform public.fn_search_documents_refresh('REEMBOLSO', array(
+      select r.id from public.reimbursements r where r.category_id = new.id
+    ));
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists trg_search_projects on public.projects;
+create trigger trg_search_projects
+after insert or update or delete on public.projects
+for each row execute function public.fn_search_documents_project();
+
+drop trigger if exists trg_search_tasks on public.tasks;
+create trigger trg_search_tasks
+after insert or update or delete on public.tasks
+for each row execute function public.fn_search_documents_row('id', 'TAREFA', 'PRODUTO');
+
+drop trigger if exists trg_search_task_people on public.task_people;
+create trigger trg_search_task_people
+after insert or update or delete on public.task_people
+for each row execute function public.fn_search_documents_row('task_id', 'TAREFA', 'PRODUTO');
+
+drop trigger if exists trg_search_delivery_tracking on public.task_delivery_tracking;
+create trigger trg_search_delivery_tracking
+after insert or update or delete on public.task_delivery_tracking
+for each row execute function public.fn_search_documents_row('task_id', 'PRODUTO');
+
+drop trigger if exists trg_search_lab_samples on public.lab_samples;
+create trigger trg_search_lab_samples
+after insert or update or delete on public.lab_samples
+for each row execute function public.fn_search_documents_row('id', 'AMOSTRA');
+
+drop trigger if exists trg_search_reimbursements on public.reimbursements;
+create trigger trg_search_reimbursements
+after insert or update or delete on public.reimbursements
+for each row execute function public.fn_search_documents_row('id', 'REEMBOLSO');
+
+drop trigger if exists trg_search_people on public.people;
+create trigger trg_search_people
+after update of name on public.people
+for each row execute function public.fn_search_documents_lookup();
+
+drop trigger if exists trg_search_labs on public.labs;
+create trigger trg_search_labs
+after update of name on public.labs
+for each row execute function public.fn_search_documents_lookup();
+
+drop trigger if exists trg_search_lab_sample_types on public.lab_sample_types;
+create trigger trg_search_lab_sample_types
+after update of name on public.lab_sample_types
+for each row execute function public.fn_search_documents_lookup();
+
+drop trigger if exists trg_search_reimbursement_categories on public.reimbursement_categories;
+create trigger trg_search_reimbursement_categories
+after update of name on public.reimbursement_categories
+for each row execute function public.fn_search_documents_lookup();
+
+-- Carga inicial (e recarga ao reaplicar a migração).
+delete from public.search_documents;
+insert into public.search_documents (kind, id, project_id, project_code, title, subtitle, weight, doc)
+select kind, id, project_id, project_code, title, subtitle, weight, doc
+from public.v_search_documents;
+
+-- ---------------------------------------------------------------------
+-- RPC: termos viram prefixos em AND ("relat semes" -> relat:* & semes:*),
+-- resolvidos pelo GIN de search_documents.doc.
+-- ---------------------------------------------------------------------
+create or replace function public.rpc_global_search(q text, max_results int default 50)
+returns table (
+  kind         text,
+  id           uuid,
+  project_code text,
+  title        text,
+  subtitle     text,
+  rank         real
+)
+language sql
+stable
+security invoker
+set search_path = public
+as $$
+  with terms as (
+    select t
+    from regexp_split_to_table(public.f_search_text(q), '[^[:alnum:]]+') as t
+    where t <> ''
+  ),
+  query as (
+    select to_tsquery('simple', string_agg(quote_literal(t) || ':*', ' & ')) as tsq
+    from terms
+    having count(*) > 0
+  )
+  select sd.kind, sd.id, sd.project_code, sd.title, sd.subtitle,
+         (ts_rank(sd.doc, query.tsq) * sd.weight)::real as rank
+  from public.search_documents sd, query
+  where sd.doc @@ query.tsq
+  order by rank desc, sd.project_code, sd.title
+  limit greatest(coalesce(max_results, 50), 1)
+$$;
+
+grant execute on function public.rpc_global_search(text, int) to authenticated;
+
+notify pgrst, 'reload schema';
@@ -0,0 +1,50 @@
+-- =====================================================================
+-- Sincronização de tarefas com o MS Project
+-- tasks.msproject_uid  = UID da tarefa no XML (chave estável do MS Project)
+-- tasks.msproject_hash = hash do conteúdo importado na última sincronização
+-- Usado por scripts/import_msproject_xml_folder.py --sync: casa tarefas
+-- pelo UID (título como fallback) e só atualiza o que mudou.
+-- Idempotente.
+-- =====================================================================
+
+alter table public.tasks add column if not exists msproject_uid text;
+alter table public.tasks add column if not exists msproject_hash text;
+
+create unique index if not exists ux_tasks_project_msproject_uid
+  on public.tasks (project_id, msproject_uid)
+  where msproject_uid is not null;
+
+-- ---------------------------------------------------------------------
+-- Atualização em lote: p_rows = [{"id": ..., <campos alterados>,
+-- "msproject_uid": ..., "msproject_hash": ...}, ...]
+-- Campos ausentes no JSON mantêm o valor atual; os tipos vêm da própria
+-- tabela (jsonb_populate_recordset), então enums/datas não precisam de cast.
+-- ---------------------------------------------------------------------
+create or replace function public.rpc_msproject_update_tasks(p_rows jsonb)
+returns int
+language sql
+security invoker
+set search_path = public
+as $$
+  with u as (
+    select * from jsonb_populate_recordset(null::public.tasks, p_rows)
+  ),
+  upd as (
+    update public.tasks t set
+      title          = coalesce(u.title, t.title),
+      tipo_atividade = coalesce(u.tipo_atividade, t.tipo_atividade),
+      start_date     = coalesce(u.start_date, t.start_date),
+      end_date       = coalesce(u.end_date, t.end_date),
+      assignee_id    = coalesce(u.assignee_id, t.assignee_id),
+      msproject_uid  = coalesce(u.msproject_uid, t.msproject_uid),
+      msproject_hash = coalesce(u.msproject_hash, t.msproject_hash)
+    from u
+    where t.id = u.id
+    returning 1
+  )
+  select count(*)::int from upd
+$$;
+
+grant execute on function public.rpc_msproject_update_tasks(jsonb) to service_role;
+
+notify pgrst, 'reload schema';
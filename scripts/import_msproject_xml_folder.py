@@ -1,8 +1,13 @@
+import argparse
+import hashlib
+import json
 import os
 import sys
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
 import xml.etree.ElementTree as ET
 
 from dotenv import load_dotenv
@@ -12,8 +17,6 @@ from supabase import create_client
 # ===============================
 # CONFIG
 # ===============================
-NS = {"p": "http://schemas.microsoft.com/project"}
-
 STATUS_DEFAULT = "PLANEJADA"
 
 # >>> IMPORTANTE:
@@ -119,48 +122,85 @@ def supabase_connect():
 # ===============================
 # XML PARSER
 # ===============================
-def load_msproject_xml(xml_path):
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
+# Só estes campos são lidos; o resto (calendários, atributos estendidos,
+# baselines, TimephasedData...) é descartado assim que o elemento fecha.
+PROJECT_FIELDS = {"Title", "StartDate", "FinishDate"}
+RECORD_FIELDS = {
+    "Task": {"UID", "Name", "OutlineLevel", "Summary", "Start", "Finish"},
+    "Resource": {"UID", "Name"},
+    "Assignment": {"TaskUID", "ResourceUID"},
+}
+RECORD_CONTAINERS = {"Tasks": "Task", "Resources": "Resource", "Assignments": "Assignment"}
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def iter_msproject(xml_path):
+    """
+    Lê o XML em streaming (iterparse) e gera ("Task" | "Resource" |
+    "Assignment", {campo: texto}) na ordem do arquivo; por último
+    ("Project", {Title, StartDate, FinishDate}).
+
+    Cada elemento sai da árvore assim que fecha (só os campos de
+    RECORD_FIELDS esperam o registro fechar), então a memória fica
+    constante qualquer que seja o tamanho do arquivo.
+    """
+    project = {}
+    stack = []
+    for event, elem in ET.iterparse(xml_path, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            continue
+
+        stack.pop()
+        tag = _local(elem.tag)
+        depth = len(stack)  # 0 = <Project>
+        parent = stack[-1] if stack else None
+
+        if depth == 1 and tag in PROJECT_FIELDS:
+            project[tag] = elem.text
+        elif depth == 2 and RECORD_CONTAINERS.get(_local(parent.tag)) == tag:
+            yield tag, {_local(c.tag): (c.text or "") for c in elem}
+        elif depth == 3 and tag in RECORD_FIELDS.get(_local(parent.tag), ()):
+            continue  # campo útil: fica até o registro fechar
+
+        if parent is not None:
+            parent.remove(elem)
 
-    title = root.findtext("p:Title", "", NS)
-    start = parse_iso_dt(root.findtext("p:StartDate", None, NS))
-    end = parse_iso_dt(root.findtext("p:FinishDate", None, NS))
+    yield "Project", project
 
-    tasks_el = root.find("p:Tasks", NS)
-    resources_el = root.find("p:Resources", NS)
-    assignments_el = root.find("p:Assignments", NS)
 
-    # resources
+def load_msproject_xml(xml_path):
+    project = {}
     resources = {}
-    if resources_el is not None:
-        for r in resources_el.findall("p:Resource", NS):
-            uid = r.findtext("p:UID", None, NS)
-            name = clean(r.findtext("p:Name", None, NS))
+    task_to_res = {}
+    tasks = []
+    task_uids = []
+    current_group = None
+
+    for kind, rec in iter_msproject(xml_path):
+        if kind == "Resource":
+            uid = rec.get("UID")
+            name = clean(rec.get("Name"))
             if uid and name:
                 resources[uid] = name
 
-    # assignments
-    task_to_res = {}
-    if assignments_el is not None:
-        for a in assignments_el.findall("p:Assignment", NS):
-            task_uid = a.findtext("p:TaskUID", None, NS)
-            res_uid = a.findtext("p:ResourceUID", None, NS)
+        elif kind == "Assignment":
+            task_uid = rec.get("TaskUID")
+            res_uid = rec.get("ResourceUID")
             if task_uid and res_uid and task_uid not in task_to_res:
                 task_to_res[task_uid] = res_uid
 
-    tasks = []
-    current_group = None
-
-    if tasks_el is not None:
-        for t in tasks_el.findall("p:Task", NS):
-            uid = t.findtext("p:UID", None, NS)
-            name = clean(t.findtext("p:Name", "", NS))
-            outline = t.findtext("p:OutlineLevel", None, NS)
-            summary = t.findtext("p:Summary", "0", NS)
+        elif kind == "Task":
+            uid = rec.get("UID")
+            name = clean(rec.get("Name", ""))
+            outline = rec.get("OutlineLevel")
+            summary = rec.get("Summary", "0")
 
-            start_t = parse_iso_dt(t.findtext("p:Start", None, NS))
-            end_t = parse_iso_dt(t.findtext("p:Finish", None, NS))
+            start_t = parse_iso_dt(rec.get("Start"))
+            end_t = parse_iso_dt(rec.get("Finish"))
 
             # grupos (summary nível 1)
             if summary == "1" and outline == "1":
@@ -174,9 +214,6 @@ def load_msproject_xml(xml_path):
             if not start_t:
                 continue
 
-            res_uid = task_to_res.get(uid)
-            assignee = resources.get(res_uid) if res_uid else None
-
             tipo = normalize_tipo(current_group, name)
             if tipo not in ALLOWED_TIPOS:
                 tipo = "RELATORIO"
@@ -187,17 +224,27 @@ def load_msproject_xml(xml_path):
                     "tipo_atividade": tipo,
                     "start_date": dt_to_date_str(start_t),
                     "end_date": dt_to_date_str(end_t or start_t),
-                    "assignee_name": assignee,
+                    "assignee_name": None,
+                    "msproject_uid": uid,
                 }
             )
+            task_uids.append(uid)
 
-    code, pname = parse_project_code_and_name(title)
+        else:
+            project = rec
+
+    # Resources/Assignments vêm depois de Tasks no XML: responsável no fim
+    for t, uid in zip(tasks, task_uids):
+        res_uid = task_to_res.get(uid)
+        t["assignee_name"] = resources.get(res_uid) if res_uid else None
+
+    code, pname = parse_project_code_and_name(project.get("Title") or "")
 
     return {
         "project_code": code,
         "project_name": pname,
-        "start": dt_to_date_str(start),
-        "end": dt_to_date_str(end),
+        "start": dt_to_date_str(parse_iso_dt(project.get("StartDate"))),
+        "end": dt_to_date_str(parse_iso_dt(project.get("FinishDate"))),
         "tasks": tasks,
         "people": set([t["assignee_name"] for t in tasks if t.get("assignee_name")]),
     }
@@ -206,18 +253,35 @@ def load_msproject_xml(xml_path):
 # ===============================
 # DB OPS
 # ===============================
-def upsert_people(sb, names):
+IN_CHUNK = 150          # ids por filtro in.(...) (URL do PostgREST)
+PAGE_SIZE = 1000        # limite padrão de linhas por resposta
+TASK_BATCH = 500        # linhas por insert em tasks
+
+
+def chunked(values, size):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def load_people_map(sb):
+    res = sb.table("people").select("id,name").execute()
+    return {r["name"]: r["id"] for r in (res.data or []) if r.get("name")}
+
+
+def ensure_people(sb, people_map, names):
+    """
+    Insere (num único lote) quem ainda não existe em `people_map` e completa
+    o mapa com os ids devolvidos pelo insert — sem reler a tabela.
+    """
     # inclui placeholder SEM duplicar
     names = sorted(set(clean(n) for n in names if clean(n)))
     if PLACEHOLDER_NAME not in names:
         names.append(PLACEHOLDER_NAME)
 
-    res = sb.table("people").select("id,name").execute()
-    existing = {r["name"]: r["id"] for r in (res.data or []) if r.get("name")}
-
     inserts = []
     for n in names:
-        if n not in existing:
+        if n not in people_map:
             is_ph = (n == PLACEHOLDER_NAME)
             role = "PLACEHOLDER" if is_ph else "BIOLOGO"
             inserts.append(
@@ -231,94 +295,489 @@ def upsert_people(sb, names):
             )
 
     if inserts:
-        sb.table("people").insert(inserts).execute()
+        res = sb.table("people").insert(inserts, returning="representation").execute()
+        for r in res.data or []:
+            if r.get("name"):
+                people_map[r["name"]] = r["id"]
+
+    return people_map
+
+
+def upsert_projects(sb, parsed):
+    """Upsert de todos os projetos numa chamada; devolve {project_code: id}."""
+    rows = {}
+    for data in parsed:
+        # mesmo código em dois arquivos: vale o último (como no import sequencial)
+        rows[data["project_code"]] = {
+            "project_code": data["project_code"],
+            "name": data["project_name"],
+            "status": "ATIVO",
+            "start_date": data["start"],
+            "end_date_planned": data["end"],
+        }
+    if not rows:
+        return {}
+
+    res = (
+        sb.table("projects")
+        .upsert(list(rows.values()), on_conflict="project_code", returning="representation")
+        .execute()
+    )
+    return {r["project_code"]: r["id"] for r in (res.data or [])}
+
+
+def fetch_tasks(sb, project_ids, select):
+    """{project_id: [linhas]} para os projetos do lote, em blocos paginados."""
+    out = {pid: [] for pid in project_ids}
+    for block in chunked(sorted(out), IN_CHUNK):
+        offset = 0
+        while True:
+            res = (
+                sb.table("tasks")
+                .select(select)
+                .in_("project_id", block)
+                .order("id")
+                .range(offset, offset + PAGE_SIZE - 1)
+                .execute()
+            )
+            data = res.data or []
+            for r in data:
+                out[r["project_id"]].append(r)
+            if len(data) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+    return out
 
-    res2 = sb.table("people").select("id,name").execute()
-    return {r["name"]: r["id"] for r in (res2.data or []) if r.get("name")}
 
+def existing_task_titles(sb, project_ids):
+    """{project_id: {títulos}} para os projetos do lote."""
+    rows = fetch_tasks(sb, project_ids, "id,project_id,title")
+    return {pid: {r["title"] for r in rs if r.get("title")} for pid, rs in rows.items()}
 
-def upsert_project(sb, code, name, start, end):
-    sb.table("projects").upsert(
-        {
-            "project_code": code,
-            "name": name,
-            "status": "ATIVO",
-            "start_date": start,
-            "end_date_planned": end,
-        },
-        on_conflict="project_code",
-    ).execute()
 
-    res = sb.table("projects").select("id").eq("project_code", code).limit(1).execute()
-    return res.data[0]["id"]
+def insert_task_batches(sb, rows, workers=4):
+    """Insere `rows` em lotes de TASK_BATCH, vários lotes em paralelo."""
+    batches = list(chunked(rows, TASK_BATCH))
+    if not batches:
+        return 0
+
+    def _insert(batch):
+        sb.table("tasks").insert(batch, returning="minimal").execute()
+        return len(batch)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(batches)))) as pool:
+        return sum(pool.map(_insert, batches))
 
 
 # ===============================
 # IMPORT
 # ===============================
+def parse_files(files, workers=None):
+    """
+    Lê os XML num pool de processos (parse é CPU). Devolve
+    [(arquivo, dados | None, erro | None)] na ordem de `files`.
+    """
+    files = [str(f) for f in files]
+    if workers == 1 or len(files) <= 1:
+        out = []
+        for f in files:
+            try:
+                out.append((f, load_msproject_xml(f), None))
+            except Exception as e:
+                out.append((f, None, e))
+        return out
+
+    out = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(load_msproject_xml, f) for f in files]
+        for f, fut in zip(files, futures):
+            try:
+                out.append((f, fut.result(), None))
+            except Exception as e:
+                out.append((f, None, e))
+    return out
+
+
+def build_task_rows(data, project_id, people_map, existing_titles):
+    """Payloads das tarefas novas (título ainda não existe no projeto)."""
+    placeholder_id = people_map[PLACEHOLDER_NAME]
+
+    date_conf = normalize_date_confidence(DATE_CONFIDENCE_DEFAULT)
+    if date_conf not in ALLOWED_DATE_CONF:
+        date_conf = "PLANEJADO"
+
+    rows = []
+    for t in data["tasks"]:
+        if t["title"] in existing_titles:
+            continue
+
+        assignee_id = people_map.get(t.get("assignee_name"), placeholder_id)
+
+        rows.append(
+            {
+                "project_id": project_id,
+                "title": t["title"],
+                "tipo_atividade": t["tipo_atividade"],
+                "assignee_id": assignee_id,
+                "status": STATUS_DEFAULT,
+                "start_date": t["start_date"],
+                "end_date": t["end_date"],
+                "date_confidence": date_conf,
+            }
+        )
+    return rows
+
+
+def import_parsed(sb, parsed, workers=4):
+    """
+    Grava uma leva de projetos já lidos: people uma vez (um select + um
+    insert), projetos num upsert, títulos existentes em lote e tarefas em
+    lotes paralelos. Devolve {project_code: tarefas inseridas}.
+    """
+    if not parsed:
+        return {}
+
+    people_map = load_people_map(sb)
+    ensure_people(sb, people_map, set().union(*(d["people"] for d in parsed)))
+
+    project_ids = upsert_projects(sb, parsed)
+    titles = existing_task_titles(sb, set(project_ids.values()))
+
+    rows = []
+    inserted = {}
+    for data in parsed:
+        code = data["project_code"]
+        project_id = project_ids[code]
+        new_rows = build_task_rows(data, project_id, people_map, titles[project_id])
+        # outro arquivo do mesmo projeto não repete estas tarefas
+        titles[project_id].update(r["title"] for r in new_rows)
+        inserted[code] = inserted.get(code, 0) + len(new_rows)
+        rows.extend(new_rows)
+
+    insert_task_batches(sb, rows, workers=workers)
+    return inserted
+
+
 def import_file(sb, xml_path):
     data = load_msproject_xml(xml_path)
     print(f"\nIMPORTANDO {data['project_code']} ({len(data['tasks'])} tarefas)")
+    inserted = import_parsed(sb, [data])
+    print(f"OK: {data['project_code']} | inseridas {inserted[data['project_code']]} tarefas")
 
-    people_map = upsert_people(sb, data["people"])
-    project_id = upsert_project(sb, data["project_code"], data["project_name"], data["start"], data["end"])
-    placeholder_id = people_map[PLACEHOLDER_NAME]
 
-    res = sb.table("tasks").select("title").eq("project_id", project_id).execute()
-    existing_titles = set(r["title"] for r in (res.data or []) if r.get("title"))
+# ===============================
+# SYNC (por UID do MS Project)
+# ===============================
+# Campos que o MS Project "manda" na tarefa; status, confiança da data,
+# notas etc. continuam sendo do app. Responsável só é sobrescrito quando o
+# XML tem um recurso atribuído.
+SYNC_FIELDS = ("title", "tipo_atividade", "start_date", "end_date")
+SYNC_SELECT = "id,project_id,title,tipo_atividade,assignee_id,start_date,end_date,msproject_uid,msproject_hash"
+
+
+def task_content_hash(t):
+    payload = [t.get(f) for f in SYNC_FIELDS] + [t.get("assignee_name")]
+    return hashlib.sha1(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def find_projects(sb, codes):
+    """{project_code: id} só dos projetos que já existem (sem gravar nada)."""
+    out = {}
+    for block in chunked(sorted(set(codes)), IN_CHUNK):
+        res = sb.table("projects").select("id,project_code").in_("project_code", block).execute()
+        out.update({r["project_code"]: r["id"] for r in (res.data or [])})
+    return out
+
+
+def plan_sync(data, project_id, existing, people_map):
+    """
+    Diff de um projeto: casa cada tarefa do XML com uma linha de `existing`
+    pelo UID e, sem UID, pelo título. Devolve
+    {"insert": [payloads], "update": [{"id", campos alterados..., uid, hash}],
+     "delete": [linhas com UID que saíram do XML], "unchanged": n,
+     "changes": [(título, {campo: (antes, depois)})]}.
+    """
+    by_uid = {r["msproject_uid"]: r for r in existing if r.get("msproject_uid")}
+    by_title = {}
+    for r in existing:
+        if not r.get("msproject_uid") and r.get("title"):
+            by_title.setdefault(r["title"], []).append(r)
+
+    # dry-run antes do primeiro import: o placeholder pode ainda não existir
+    people_map = {PLACEHOLDER_NAME: None, **people_map}
+    plan = {"insert": [], "update": [], "delete": [], "unchanged": 0, "changes": []}
 
-    inserts = []
     for t in data["tasks"]:
-        if t["title"] in existing_titles:
+        uid = t.get("msproject_uid")
+        digest = task_content_hash(t)
+        row = by_uid.pop(uid, None) if uid else None
+        if row is None and by_title.get(t["title"]):
+            row = by_title[t["title"]].pop(0)
+
+        if row is None:
+            new_row = build_task_rows({"tasks": [t]}, project_id, people_map, set())[0]
+            new_row.update({"msproject_uid": uid, "msproject_hash": digest})
+            plan["insert"].append(new_row)
             continue
 
-        assignee_id = people_map.get(t.get("assignee_name"), placeholder_id)
+        if row.get("msproject_uid") == uid and row.get("msproject_hash") == digest:
+            plan["unchanged"] += 1
+            continue
 
-        date_conf = normalize_date_confidence(DATE_CONFIDENCE_DEFAULT)
-        if date_conf not in ALLOWED_DATE_CONF:
-            date_conf = "PLANEJADO"
-
-        payload = {
-            "project_id": project_id,
-            "title": t["title"],
-            "tipo_atividade": t["tipo_atividade"],
-            "assignee_id": assignee_id,
-            "status": STATUS_DEFAULT,
-            "start_date": t["start_date"],
-            "end_date": t["end_date"],
-            "date_confidence": date_conf,
-        }
+        diff = {}
+        for f in SYNC_FIELDS:
+            if (row.get(f) or None) != (t.get(f) or None):
+                diff[f] = (row.get(f), t.get(f))
+        assignee_id = people_map.get(t.get("assignee_name")) if t.get("assignee_name") else None
+        if assignee_id and assignee_id != row.get("assignee_id"):
+            diff["assignee_id"] = (row.get("assignee_id"), assignee_id)
+
+        update = {"id": row["id"], **{f: new for f, (_, new) in diff.items()}}
+        update.update({"msproject_uid": uid, "msproject_hash": digest})
+        plan["update"].append(update)
+        if diff:
+            plan["changes"].append((t["title"], diff))
+
+    # só sai do banco o que veio do MS Project; tarefas criadas no app ficam
+    plan["delete"] = list(by_uid.values())
+    return plan
+
+
+def print_sync_report(code, plan, delete):
+    n_upd = len(plan["changes"])
+    n_meta = len(plan["update"]) - n_upd
+    print(
+        f"{code}: +{len(plan['insert'])} novas | ~{n_upd} alteradas"
+        f" (+{n_meta} só vínculo UID) | ={plan['unchanged']} iguais"
+        f" | -{len(plan['delete'])} fora do XML{'' if delete else ' (mantidas; use --delete)'}"
+    )
+    for r in plan["insert"]:
+        print(f"   + {r['title']} ({r['start_date']} → {r['end_date']})")
+    for title, diff in plan["changes"]:
+        fields = ", ".join(f"{f}: {old} → {new}" for f, (old, new) in diff.items())
+        print(f"   ~ {title}: {fields}")
+    for r in plan["delete"]:
+        print(f"   - {r.get('title')}")
+
+
+def apply_sync(sb, plans, delete=False, workers=4):
+    """Grava os planos: inserts e updates em lotes paralelos, deletes opcionais."""
+    inserts = [r for p in plans.values() for r in p["insert"]]
+    updates = [r for p in plans.values() for r in p["update"]]
+    deletes = [r["id"] for p in plans.values() for r in p["delete"]] if delete else []
+
+    insert_task_batches(sb, inserts, workers=workers)
+
+    def _update(batch):
+        sb.rpc("rpc_msproject_update_tasks", {"p_rows": batch}).execute()
+
+    def _delete(task_id):
+        sb.rpc("rpc_delete_task", {"p_task_id": task_id}).execute()
+
+    jobs = [(_update, b) for b in chunked(updates, TASK_BATCH)] + [(_delete, i) for i in deletes]
+    if jobs:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(jobs)))) as pool:
+            list(pool.map(lambda job: job[0](job[1]), jobs))
+
+    return {"insert": len(inserts), "update": len(updates), "delete": len(deletes)}
+
+
+def sync_parsed(sb, parsed, *, dry_run=False, delete=False, workers=4):
+    """
+    Modo --sync: em vez de só inserir títulos novos, alinha as tarefas de
+    cada projeto com o XML. Em dry-run só lê o banco e imprime o diff.
+    Devolve {project_code: plano}.
+    """
+    if not parsed:
+        return {}
+    # mesmo código em dois arquivos: vale o último
+    parsed = list({d["project_code"]: d for d in parsed}.values())
 
-        inserts.append(payload)
+    people_map = load_people_map(sb)
+    if dry_run:
+        project_ids = find_projects(sb, [d["project_code"] for d in parsed])
+    else:
+        ensure_people(sb, people_map, set().union(*(d["people"] for d in parsed)))
+        project_ids = upsert_projects(sb, parsed)
 
-    if inserts:
-        sb.table("tasks").insert(inserts).execute()
+    existing = fetch_tasks(sb, set(project_ids.values()), SYNC_SELECT)
 
-    print(f"OK: {data['project_code']} | inseridas {len(inserts)} tarefas")
+    plans = {}
+    for data in parsed:
+        code = data["project_code"]
+        project_id = project_ids.get(code)
+        plans[code] = plan_sync(data, project_id, existing.get(project_id, []), people_map)
+        print_sync_report(code, plans[code], delete)
+
+    if not dry_run:
+        totals = apply_sync(sb, plans, delete=delete, workers=workers)
+        print(f"GRAVADO: {totals['insert']} inserts | {totals['update']} updates | {totals['delete']} deletes")
+    return plans
+
+
+# ===============================
+# MANIFEST
+# ===============================
+# {"files": {sha256: {"file", "project_code", "tasks", "inserted", "mode", "imported_at"}}}
+# Um arquivo cujo conteúdo (hash) já está no manifest não é lido nem
+# consultado de novo. Só fica a entrada do último import de cada arquivo
+# presente na pasta, então voltar um arquivo a uma versão antiga reimporta.
+# No --sync só contam entradas gravadas por um sync: um arquivo que só foi
+# importado (inserção por título) ainda precisa ser sincronizado uma vez.
+MANIFEST_NAME = ".msproject_manifest.json"
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_manifest(path):
+    try:
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+    except FileNotFoundError:
+        return {"files": {}}
+    except (OSError, ValueError) as e:
+        print(f"AVISO: manifest ilegível ({e!r}); todos os arquivos serão importados.")
+        return {"files": {}}
+    data.setdefault("files", {})
+    return data
+
+
+def save_manifest(path, manifest, current_hashes):
+    """Grava só as entradas dos arquivos atuais (escrita atômica)."""
+    by_file = {Path(f).name: h for f, h in current_hashes.items()}
+    manifest["files"] = {
+        h: entry for h, entry in manifest["files"].items()
+        if by_file.get(entry.get("file")) == h
+    }
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def record_import(manifest, xml_path, digest, data, inserted, mode="import"):
+    manifest["files"][digest] = {
+        "file": Path(xml_path).name,
+        "project_code": data["project_code"],
+        "tasks": len(data["tasks"]),
+        "inserted": inserted,
+        "mode": mode,
+        "imported_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
 
 
 # ===============================
 # MAIN
 # ===============================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Importa uma pasta de XML do MS Project.")
+    parser.add_argument("folder", help="Pasta com os arquivos .xml")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ignora o manifest e reimporta todos os arquivos.",
+    )
+    parser.add_argument(
+        "--manifest",
+        default=None,
+        help=f"Caminho do manifest (padrão: <pasta>/{MANIFEST_NAME}).",
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="Sincroniza pelo UID do MS Project: insere, atualiza datas/títulos e (com --delete) remove.",
+    )
+    parser.add_argument(
+        "--delete",
+        action="store_true",
+        help="No --sync, apaga tarefas importadas que saíram do XML.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="No --sync, só mostra o diff; não grava nada (nem o manifest).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processos para o parse (padrão: núcleos da máquina; 1 = sequencial).",
+    )
+    args = parser.parse_args(argv)
+    if (args.delete or args.dry_run) and not args.sync:
+        parser.error("--delete e --dry-run só valem com --sync")
+    return args
+
+
 def main():
-    if len(sys.argv) < 2:
-        print("Uso: python scripts/import_msproject_xml_folder.py <pasta_xml>")
-        sys.exit(1)
+    args = parse_args()
 
-    folder = Path(sys.argv[1])
+    folder = Path(args.folder)
     if not folder.exists():
         raise RuntimeError("Pasta não encontrada")
 
-    sb = supabase_connect()
-
     files = sorted(folder.glob("*.xml"))
-    ok = 0
-
-    for f in files:
-        import_file(sb, f)
-        ok += 1
-
-    print(f"\nFINALIZADO. Projetos importados: {ok}")
+    started = time.perf_counter()
+
+    manifest_path = Path(args.manifest) if args.manifest else folder / MANIFEST_NAME
+    manifest = load_manifest(manifest_path)
+    hashes = {str(f): file_sha256(f) for f in files}
+    mode = "sync" if args.sync else "import"
+    done = {
+        h for h, e in manifest["files"].items()
+        if not args.sync or e.get("mode") == "sync"
+    }
+    if args.force:
+        todo = files
+    else:
+        todo = [f for f in files if hashes[str(f)] not in done]
+    print(f"ARQUIVOS: {len(files)} | inalterados (pulados): {len(files) - len(todo)} | a importar: {len(todo)}")
+
+    results = parse_files(todo, workers=args.workers)
+
+    parsed = []
+    fail = 0
+    for f, data, err in results:
+        if err is not None:
+            fail += 1
+            print(f"FALHOU: {Path(f).name} | {err!r}")
+            continue
+        print(f"LIDO: {Path(f).name} -> {data['project_code']} ({len(data['tasks'])} tarefas)")
+        parsed.append((f, data))
+
+    inserted = {}
+    if parsed and args.sync:
+        sb = supabase_connect()
+        plans = sync_parsed(
+            sb,
+            [d for _, d in parsed],
+            dry_run=args.dry_run,
+            delete=args.delete,
+            workers=args.workers or 4,
+        )
+        inserted = {code: len(plan["insert"]) for code, plan in plans.items()}
+    elif parsed:
+        sb = supabase_connect()
+        inserted = import_parsed(sb, [d for _, d in parsed], workers=args.workers or 4)
+        for code, n in inserted.items():
+            print(f"OK: {code} | inseridas {n} tarefas")
+
+    if not args.dry_run:
+        for f, data in parsed:
+            record_import(manifest, f, hashes[f], data, inserted.get(data["project_code"], 0), mode)
+        save_manifest(manifest_path, manifest, hashes)
+
+    elapsed = time.perf_counter() - started
+    print(f"\nFINALIZADO. Projetos importados: {len(inserted)}  FAIL={fail}  Tempo={elapsed:.1f}s")
+    if fail:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -5,12 +5,18 @@ import base64
 import html
 import json
 import os
+import random
+import re
 import sys
+import threading
+import time
+import unicodedata
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta, timezone
 from email.message import EmailMessage
-from typing import Any, Iterable
+from typing import Any, Callable, Iterable
 
 from dotenv import load_dotenv
 from supabase import create_client
@@ -168,22 +174,111 @@ def safe_data(response: Any) -> list[dict[str, Any]]:
     return list(getattr(response, "data", None) or [])
 
 
-def load_people(sb) -> tuple[dict[str, Person], dict[str, Person]]:
+# Undefined column / column not in the schema cache / undefined table.
+MISSING_SCHEMA_CODES = {"42703", "PGRST204", "42P01"}
+
+
+def is_missing_schema(exc: Exception) -> bool:
+    """True when PostgREST rejected a query because a column or view does not exist yet."""
+    code = getattr(exc, "code", None)
+    if code is None and getattr(exc, "args", None) and isinstance(exc.args[0], dict):
+        code = exc.args[0].get("code")
+    return str(code) in MISSING_SCHEMA_CODES
+
+
+def fold_name(value: Any) -> str:
+    """Case- and accent-insensitive key for a person name ("  Joao  Simoes" == "joão simões")."""
+    text = unicodedata.normalize("NFKD", clean_text(value))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.casefold().split())
+
+
+ASSIGNEE_SEPARATOR = re.compile(r"\s*[+,;]\s*")
+
+
+class PeopleResolver:
+    """People indexed once per run: by id and by folded name.
+
+    Multi-assignee strings ("Ana + Bruno") are split into individual names
+    and memoized, since the same few strings repeat across many rows.
+    """
+
+    def __init__(self, people: Iterable[Person]):
+        self.by_id: dict[str, Person] = {}
+        self.by_name: dict[str, Person] = {}
+        for person in people:
+            if person.id:
+                self.by_id[person.id] = person
+            key = fold_name(person.name)
+            # homonyms: an active person wins over an inactive one
+            if key and (key not in self.by_name or (person.active and not self.by_name[key].active)):
+                self.by_name[key] = person
+        self._names_cache: dict[str, tuple[Person, ...]] = {}
+
+    def get(self, person_id: Any) -> Person | None:
+        return self.by_id.get(clean_text(person_id))
+
+    def named(self, name: Any) -> Person | None:
+        return self.by_name.get(fold_name(name))
+
+    def from_names(self, names: Any) -> list[Person]:
+        text = clean_text(names)
+        cached = self._names_cache.get(text)
+        if cached is None:
+            found: dict[str, Person] = {}
+            for part in ASSIGNEE_SEPARATOR.split(text):
+                person = self.named(part)
+                if person is not None:
+                    found.setdefault(person.id or person.name, person)
+            cached = self._names_cache[text] = tuple(found.values())
+        return list(cached)
+
+    def from_ids(self, ids: Iterable[Any]) -> list[Person]:
+        found: dict[str, Person] = {}
+        for person_id in ids:
+            person = self.get(person_id)
+            if person is not None:
+                found.setdefault(person.id, person)
+        return list(found.values())
+
+    def for_row(
+        self,
+        row: dict[str, Any],
+        *,
+        id_key: str = "",
+        names_key: str = "assignee_names",
+    ) -> list[Person]:
+        """All assignees of the row, lead first.
+
+        Prefers assignee_ids (uuid[], lead first), then a single id column
+        (`id_key`), and only then the names text. An empty or unknown id
+        list falls through: views without the arrays yet (migration
+        2026_10_19_assignee_arrays.sql) and tasks without task_people rows
+        still resolve by name.
+        """
+        ids = row.get("assignee_ids")
+        if isinstance(ids, list) and ids:
+            found = self.from_ids(ids)
+            if found:
+                return found
+        if id_key and clean_text(row.get(id_key)):
+            found = self.from_ids([row.get(id_key)])
+            if found:
+                return found
+        return self.from_names(row.get(names_key))
+
+
+def load_people(sb) -> PeopleResolver:
     rows = safe_data(sb.table("people").select("id,name,email,active").execute())
-    by_id: dict[str, Person] = {}
-    by_name: dict[str, Person] = {}
-    for row in rows:
-        person = Person(
+    return PeopleResolver(
+        Person(
             id=clean_text(row.get("id")),
             name=clean_text(row.get("name")),
             email=clean_text(row.get("email")).lower(),
             active=bool(row.get("active", True)),
         )
-        if person.id:
-            by_id[person.id] = person
-        if person.name:
-            by_name[person.name.strip().lower()] = person
-    return by_id, by_name
+        for row in rows
+    )
 
 
 def load_projects(sb) -> dict[str, dict[str, str]]:
@@ -198,13 +293,6 @@ def load_projects(sb) -> dict[str, dict[str, str]]:
     }
 
 
-def person_for_name(people_by_name: dict[str, Person], names: str) -> Person | None:
-    first = clean_text(names).split("+")[0].strip()
-    if not first:
-        return None
-    return people_by_name.get(first.lower())
-
-
 def add_candidate(
     candidates: list[NotificationCandidate],
     missing_recipients: list[dict[str, str]],
@@ -214,7 +302,7 @@ def add_candidate(
     title: str,
     project_code: str,
     project_name: str,
-    responsible: Person | None,
+    responsible: Person | list[Person] | None,
     fallback_recipient: str,
     forced_recipients: list[str],
     due_date: date | None,
@@ -229,9 +317,15 @@ def add_candidate(
         return
     alert_type, days_until_due = alert
 
-    responsible_name = responsible.name if responsible else ""
-    recipients = forced_recipients or [((responsible.email if responsible else "") or fallback_recipient)]
-    recipients = [email.strip().lower() for email in recipients if email and email.strip()]
+    if responsible is None:
+        responsibles: list[Person] = []
+    elif isinstance(responsible, Person):
+        responsibles = [responsible]
+    else:
+        responsibles = list(responsible)
+    responsible_name = " + ".join(person.name for person in responsibles if person.name)
+    recipients = forced_recipients or [person.email for person in responsibles if person.email] or [fallback_recipient]
+    recipients = list(dict.fromkeys(email.strip().lower() for email in recipients if email and email.strip()))
     if not recipients:
         missing_recipients.append(
             {
@@ -263,14 +357,24 @@ def add_candidate(
         )
 
 
-def collect_gantt(sb, people_by_id, projects, today, windows, overdue_min, max_due, fallback_recipient, forced_recipients):
-    rows = safe_data(
-        sb.table("v_portfolio_tasks")
-        .select("task_id,project_id,project_code,project_name,title,status,date_confidence,end_date,assignee_name")
-        .gte("end_date", overdue_min.isoformat())
-        .lte("end_date", max_due.isoformat())
-        .execute()
-    )
+def collect_gantt(sb, people, projects, today, windows, overdue_min, max_due, fallback_recipient, forced_recipients):
+    base_select = "task_id,project_id,project_code,project_name,title,status,date_confidence,end_date,assignee_name"
+    try:
+        rows = safe_data(
+            sb.table("v_portfolio_tasks")
+            .select(f"{base_select},assignee_ids")
+            .gte("end_date", overdue_min.isoformat())
+            .lte("end_date", max_due.isoformat())
+            .execute()
+        )
+    except Exception:
+        rows = safe_data(
+            sb.table("v_portfolio_tasks")
+            .select(base_select)
+            .gte("end_date", overdue_min.isoformat())
+            .lte("end_date", max_due.isoformat())
+            .execute()
+        )
     candidates: list[NotificationCandidate] = []
     missing: list[dict[str, str]] = []
     for row in rows:
@@ -279,7 +383,7 @@ def collect_gantt(sb, people_by_id, projects, today, windows, overdue_min, max_d
         if status in TERMINAL_TASK_STATUSES or confidence in TERMINAL_TASK_STATUSES:
             continue
         project = projects.get(clean_text(row.get("project_id")), {})
-        responsible = person_for_name({p.name.lower(): p for p in people_by_id.values()}, clean_text(row.get("assignee_name")))
+        responsible = people.for_row(row, names_key="assignee_name")
         add_candidate(
             candidates,
             missing,
@@ -299,7 +403,7 @@ def collect_gantt(sb, people_by_id, projects, today, windows, overdue_min, max_d
     return candidates, missing
 
 
-def collect_laboratorio(sb, people_by_id, projects, today, windows, overdue_min, max_due, fallback_recipient, forced_recipients):
+def collect_laboratorio(sb, people, projects, today, windows, overdue_min, max_due, fallback_recipient, forced_recipients):
     rows = safe_data(
         sb.table("v_lab_samples")
         .select("sample_id,project_id,project_code,project_name,assignee_id,assignee_name,status,expected_release_date,sample_types_label,lab_name")
@@ -313,7 +417,7 @@ def collect_laboratorio(sb, people_by_id, projects, today, windows, overdue_min,
         if norm(row.get("status")) in TERMINAL_LAB_STATUSES:
             continue
         project = projects.get(clean_text(row.get("project_id")), {})
-        responsible = people_by_id.get(clean_text(row.get("assignee_id")))
+        responsible = people.for_row(row, id_key="assignee_id", names_key="assignee_name")
         sample_types = clean_text(row.get("sample_types_label")) or clean_text(row.get("sample_types"))
         lab_name = clean_text(row.get("lab_name"))
         detail = " | ".join(part for part in [sample_types, lab_name] if part)
@@ -336,7 +440,15 @@ def collect_laboratorio(sb, people_by_id, projects, today, windows, overdue_min,
     return candidates, missing
 
 
-def collect_produtos(sb, people_by_name, today, windows, overdue_min, max_due, fallback_recipient, forced_recipients):
+def collect_produtos(sb, people, today, windows, overdue_min, max_due, fallback_recipient, forced_recipients):
+    select_effective_due = (
+        "task_id,project_code,project_name,product_name,assignee_names,assignee_ids,"
+        "delivery_status,delivery_date,effective_due_date"
+    )
+    select_with_arrays = (
+        "task_id,project_code,project_name,product_name,assignee_names,assignee_ids,"
+        "delivery_status,delivery_date,client_due_date,enterprise,end_date"
+    )
     select_with_client_due = (
         "task_id,project_code,project_name,product_name,assignee_names,"
         "delivery_status,delivery_date,client_due_date,enterprise,end_date"
@@ -345,10 +457,29 @@ def collect_produtos(sb, people_by_name, today, windows, overdue_min, max_due, f
         "task_id,project_code,project_name,product_name,assignee_names,"
         "delivery_status,delivery_date,enterprise,end_date"
     )
+    rows: list[dict[str, Any]] = []
     try:
-        rows = safe_data(sb.table("v_deliverables").select(select_with_client_due).execute())
-    except Exception:
-        rows = safe_data(sb.table("v_deliverables").select(select_without_client_due).execute())
+        # Window and status filtered in the database
+        # (migration 2026_10_19_deliverables_effective_due.sql).
+        rows = safe_data(
+            sb.table("v_deliverables")
+            .select(select_effective_due)
+            .eq("is_terminal", False)
+            .gte("effective_due_date", overdue_min.isoformat())
+            .lte("effective_due_date", max_due.isoformat())
+            .execute()
+        )
+    except Exception as exc:
+        if not is_missing_schema(exc):
+            raise
+        # Older view: download everything and filter below.
+        for index, select in enumerate((select_with_arrays, select_with_client_due, select_without_client_due)):
+            try:
+                rows = safe_data(sb.table("v_deliverables").select(select).execute())
+                break
+            except Exception:
+                if index == 2:
+                    raise
 
     candidates: list[NotificationCandidate] = []
     missing: list[dict[str, str]] = []
@@ -357,10 +488,15 @@ def collect_produtos(sb, people_by_name, today, windows, overdue_min, max_due, f
             continue
         if to_date(row.get("delivery_date")) is not None:
             continue
-        due = to_date(row.get("client_due_date")) or to_date(row.get("enterprise")) or to_date(row.get("end_date"))
+        due = (
+            to_date(row.get("effective_due_date"))
+            or to_date(row.get("client_due_date"))
+            or to_date(row.get("enterprise"))
+            or to_date(row.get("end_date"))
+        )
         if due is None or due < overdue_min or due > max_due:
             continue
-        responsible = person_for_name(people_by_name, clean_text(row.get("assignee_names")))
+        responsible = people.for_row(row)
         add_candidate(
             candidates,
             missing,
@@ -380,7 +516,7 @@ def collect_produtos(sb, people_by_name, today, windows, overdue_min, max_due, f
     return candidates, missing
 
 
-def collect_reembolsos(sb, people_by_id, today, windows, overdue_min, max_due, fallback_recipient, forced_recipients):
+def collect_reembolsos(sb, people, today, windows, overdue_min, max_due, fallback_recipient, forced_recipients):
     rows = safe_data(
         sb.table("v_reimbursements")
         .select("id,due_date,collaborator_id,collaborator_name,project_code,project_name,category_name,description,amount,status")
@@ -393,7 +529,7 @@ def collect_reembolsos(sb, people_by_id, today, windows, overdue_min, max_due, f
     for row in rows:
         if norm(row.get("status")) in TERMINAL_REIMBURSEMENT_STATUSES:
             continue
-        responsible = people_by_id.get(clean_text(row.get("collaborator_id")))
+        responsible = people.for_row(row, id_key="collaborator_id", names_key="collaborator_name")
         detail = " | ".join(
             part
             for part in [
@@ -422,12 +558,142 @@ def collect_reembolsos(sb, people_by_id, today, windows, overdue_min, max_due, f
     return candidates, missing
 
 
+DUE_ITEMS_SELECT = (
+    "source,source_id,item_key,title,project_code,project_name,due_date,"
+    "responsible_ids,responsible_names,detail,amount"
+)
+DUE_ITEMS_PAGE_SIZE = 1000
+
+
+def iter_due_items(sb, sources: Iterable[str], overdue_min: date, max_due: date, page_size: int = DUE_ITEMS_PAGE_SIZE):
+    """Stream open v_due_items rows of `sources` in (due_date, item_key) order.
+
+    Keyset pagination: each page starts after the last (due_date, item_key)
+    seen, so no page is silently cut by the PostgREST row limit and there is
+    no OFFSET rescan.
+    """
+    last: dict[str, Any] | None = None
+    while True:
+        query = (
+            sb.table("v_due_items")
+            .select(DUE_ITEMS_SELECT)
+            .in_("source", sorted(sources))
+            .eq("is_terminal", False)
+            .gte("due_date", overdue_min.isoformat())
+            .lte("due_date", max_due.isoformat())
+        )
+        if last is not None:
+            due, key = last["due_date"], last["item_key"]
+            query = query.or_(f'due_date.gt.{due},and(due_date.eq.{due},item_key.gt."{key}")')
+        rows = safe_data(query.order("due_date").order("item_key").limit(page_size).execute())
+        yield from rows
+        if len(rows) < page_size:
+            return
+        last = rows[-1]
+
+
+def collect_due_items(sb, people, sources, today, windows, overdue_min, max_due, fallback_recipient, forced_recipients):
+    """All sources from v_due_items (migration 2026_10_19_due_items.sql).
+
+    Returns the same (candidates, missing, source_stats) as `run_collectors`.
+    """
+    started = time.perf_counter()
+    candidates: list[NotificationCandidate] = []
+    missing: list[dict[str, str]] = []
+    counts = {source: [0, 0, 0] for source in sources}  # rows, candidates, missing
+    for row in iter_due_items(sb, sources, overdue_min, max_due):
+        source = clean_text(row.get("source"))
+        before = len(candidates), len(missing)
+        amount = row.get("amount")
+        detail = " | ".join(part for part in [clean_text(row.get("detail")), brl(amount) if amount is not None else ""] if part)
+        add_candidate(
+            candidates,
+            missing,
+            source=source,
+            source_id=clean_text(row.get("source_id")),
+            title=clean_text(row.get("title")),
+            project_code=clean_text(row.get("project_code")),
+            project_name=clean_text(row.get("project_name")),
+            responsible=people.for_row(
+                {"assignee_ids": row.get("responsible_ids"), "assignee_names": row.get("responsible_names")}
+            ),
+            fallback_recipient=fallback_recipient,
+            forced_recipients=forced_recipients,
+            due_date=to_date(row.get("due_date")),
+            today=today,
+            windows=windows,
+            detail=detail,
+        )
+        entry = counts.setdefault(source, [0, 0, 0])
+        entry[0] += 1
+        entry[1] += len(candidates) - before[0]
+        entry[2] += len(missing) - before[1]
+
+    seconds = round(time.perf_counter() - started, 3)
+    source_stats = {
+        source: {"status": "ok", "seconds": seconds, "rows": rows, "candidates": n_candidates, "missing_recipient": n_missing}
+        for source, (rows, n_candidates, n_missing) in counts.items()
+    }
+    return candidates, missing, source_stats
+
+
+def timed(func: Callable[[], Any]) -> tuple[Any, Exception | None, float]:
+    started = time.perf_counter()
+    try:
+        return func(), None, time.perf_counter() - started
+    except Exception as exc:
+        return None, exc, time.perf_counter() - started
+
+
+def run_collectors(
+    collectors: dict[str, Callable[[], tuple[list[NotificationCandidate], list[dict[str, str]]]]],
+    workers: int = 4,
+) -> tuple[list[NotificationCandidate], list[dict[str, str]], dict[str, dict[str, Any]]]:
+    """Run the collectors on a thread pool; a failing source is only reported.
+
+    The work is mostly waiting on PostgREST, so the requests overlap. Results
+    are merged in the order of `collectors`, keeping the output stable.
+    """
+    if not collectors:
+        return [], [], {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(collectors)))) as pool:
+        futures = {source: pool.submit(timed, collector) for source, collector in collectors.items()}
+        results = {source: future.result() for source, future in futures.items()}
+
+    all_candidates: list[NotificationCandidate] = []
+    all_missing: list[dict[str, str]] = []
+    source_stats: dict[str, dict[str, Any]] = {}
+    for source, (result, error, seconds) in results.items():
+        entry: dict[str, Any] = {"seconds": round(seconds, 3)}
+        if error is not None:
+            print(f"WARN: fonte {source} ignorada por erro: {error}", file=sys.stderr)
+            entry.update(status="error", error=f"{type(error).__name__}: {error}")
+        else:
+            candidates, missing = result
+            all_candidates.extend(candidates)
+            all_missing.extend(missing)
+            entry.update(status="ok", candidates=len(candidates), missing_recipient=len(missing))
+        source_stats[source] = entry
+    return all_candidates, all_missing, source_stats
+
+
+LOG_BATCH_SIZE = 500
+
+
 def fetch_existing_keys(sb, keys: list[str], dry_run: bool) -> set[str]:
     if not keys:
         return set()
+    unique_keys = sorted(set(keys))
+    try:
+        # One call for the whole run (migration 2026_10_19_due_notification_log_dedup.sql).
+        rows = safe_data(sb.rpc("rpc_due_notification_sent_keys", {"p_keys": unique_keys}).execute())
+        return {clean_text(row.get("notification_key")) for row in rows}
+    except Exception as exc:
+        print(f"WARN: rpc_due_notification_sent_keys indisponivel, consultando em blocos: {exc}", file=sys.stderr)
+
     found: set[str] = set()
     try:
-        for group in chunked(keys, 100):
+        for group in chunked(unique_keys, 100):
             rows = safe_data(
                 sb.table("due_notification_log")
                 .select("notification_key")
@@ -447,9 +713,16 @@ def fetch_existing_keys(sb, keys: list[str], dry_run: bool) -> set[str]:
     return found
 
 
-def insert_logs(sb, candidates: list[NotificationCandidate], subject: str, provider_message_id: str) -> None:
+def log_rows(
+    candidates: list[NotificationCandidate],
+    subject: str,
+    *,
+    status: str = "SENT",
+    provider_message_id: str = "",
+    error_message: str = "",
+) -> list[dict[str, Any]]:
     now = datetime.now(timezone.utc).isoformat()
-    rows = [
+    return [
         {
             "notification_key": candidate.notification_key,
             "source": candidate.source.upper(),
@@ -459,14 +732,36 @@ def insert_logs(sb, candidates: list[NotificationCandidate], subject: str, provi
             "alert_type": candidate.alert_type,
             "days_until_due": candidate.days_until_due,
             "subject": subject,
-            "status": "SENT",
-            "provider_message_id": provider_message_id,
+            "status": status,
+            "provider_message_id": provider_message_id or None,
+            "error_message": error_message or None,
             "sent_at": now,
         }
         for candidate in candidates
     ]
-    for group in chunked(rows, 100):
-        sb.table("due_notification_log").insert(group).execute()
+
+
+def write_logs(sb, rows: list[dict[str, Any]]) -> None:
+    # A key already logged (e.g. a rerun after a partial failure) is skipped
+    # instead of failing the whole batch on the unique index. Without that
+    # index (migration 2026_10_19_due_notification_log_dedup.sql pending)
+    # on_conflict is rejected; the e-mails are already out, so fall back to
+    # plain inserts rather than lose the log and resend on the next run.
+    upsert = True
+    for group in chunked(rows, LOG_BATCH_SIZE):
+        if upsert:
+            try:
+                sb.table("due_notification_log").upsert(
+                    group,
+                    on_conflict="notification_key,status",
+                    ignore_duplicates=True,
+                    returning="minimal",
+                ).execute()
+                continue
+            except Exception as exc:
+                print(f"WARN: upsert em due_notification_log falhou, usando insert: {exc}", file=sys.stderr)
+                upsert = False
+        sb.table("due_notification_log").insert(group, returning="minimal").execute()
 
 
 def item_status_text(candidate: NotificationCandidate) -> str:
@@ -550,6 +845,112 @@ def send_gmail(service, from_email: str, to_email: str, subject: str, text_body:
     return clean_text(result.get("id"))
 
 
+class TokenBucket:
+    """Thread-safe token bucket: `rate` sends per second, bursts up to `capacity`."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.rate = max(rate, 0.001)
+        self.capacity = max(capacity if capacity is not None else rate, 1.0)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+RETRYABLE_HTTP_STATUSES = {429, 500, 502, 503, 504}
+
+
+def http_status(exc: Exception) -> int | None:
+    """Status of a googleapiclient HttpError (exc.resp.status), if any."""
+    status = getattr(getattr(exc, "resp", None), "status", None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def call_with_retry(
+    func: Callable[[], Any],
+    *,
+    attempts: int = 4,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Any:
+    """Retry 429/5xx with exponential backoff and full jitter; other errors raise at once."""
+    for attempt in range(1, attempts + 1):
+        try:
+            return func()
+        except Exception as exc:
+            if attempt == attempts or http_status(exc) not in RETRYABLE_HTTP_STATUSES:
+                raise
+            sleep(random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1))))
+
+
+@dataclass
+class Delivery:
+    recipient: str
+    items: list[NotificationCandidate]
+    subject: str
+    message_id: str = ""
+    error: str = ""
+
+
+def deliver_all(
+    messages: list[tuple[str, list[NotificationCandidate], str, str, str]],
+    send: Callable[[str, str, str, str], str],
+    *,
+    workers: int = 4,
+    bucket: TokenBucket | None = None,
+    attempts: int = 4,
+    sleep: Callable[[float], None] = time.sleep,
+) -> list[Delivery]:
+    """Send (recipient, items, subject, text, html) messages on a bounded pool.
+
+    A failing recipient does not block the others: its Delivery carries the
+    error instead of a message id. Results keep the input order.
+    """
+
+    def _one(message: tuple[str, list[NotificationCandidate], str, str, str]) -> Delivery:
+        recipient, items, subject, text_body, html_body = message
+        delivery = Delivery(recipient, items, subject)
+
+        def _send() -> str:
+            if bucket is not None:
+                bucket.acquire()
+            return send(recipient, subject, text_body, html_body)
+
+        try:
+            delivery.message_id = call_with_retry(_send, attempts=attempts, sleep=sleep)
+        except Exception as exc:
+            delivery.error = f"{type(exc).__name__}: {exc}"[:500]
+        return delivery
+
+    if not messages:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(messages)))) as pool:
+        return list(pool.map(_one, messages))
+
+
 def group_by_recipient(candidates: list[NotificationCandidate]) -> dict[str, list[NotificationCandidate]]:
     grouped: dict[str, list[NotificationCandidate]] = defaultdict(list)
     for candidate in candidates:
@@ -584,29 +985,38 @@ def main() -> int:
     if not supabase_url or not supabase_key:
         raise RuntimeError("SUPABASE_URL e SUPABASE_SERVICE_ROLE_KEY/SUPABASE_ANON_KEY sao obrigatorios.")
 
-    sb = create_client(supabase_url, supabase_key)
-    people_by_id, people_by_name = load_people(sb)
-    projects = load_projects(sb)
+    workers = env_int("NOTIFICATION_COLLECT_WORKERS", 4)
+    started = time.perf_counter()
 
-    all_candidates: list[NotificationCandidate] = []
-    all_missing: list[dict[str, str]] = []
+    sb = create_client(supabase_url, supabase_key)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        people_future = pool.submit(load_people, sb)
+        projects_future = pool.submit(load_projects, sb)
+        people = people_future.result()
+        projects = projects_future.result()
+    load_seconds = time.perf_counter() - started
 
     collectors = {
-        "gantt": lambda: collect_gantt(sb, people_by_id, projects, today, windows, overdue_min, max_due, fallback_recipient, forced_recipients),
-        "laboratorio": lambda: collect_laboratorio(sb, people_by_id, projects, today, windows, overdue_min, max_due, fallback_recipient, forced_recipients),
-        "produtos": lambda: collect_produtos(sb, people_by_name, today, windows, overdue_min, max_due, fallback_recipient, forced_recipients),
-        "reembolsos": lambda: collect_reembolsos(sb, people_by_id, today, windows, overdue_min, max_due, fallback_recipient, forced_recipients),
+        "gantt": lambda: collect_gantt(sb, people, projects, today, windows, overdue_min, max_due, fallback_recipient, forced_recipients),
+        "laboratorio": lambda: collect_laboratorio(sb, people, projects, today, windows, overdue_min, max_due, fallback_recipient, forced_recipients),
+        "produtos": lambda: collect_produtos(sb, people, today, windows, overdue_min, max_due, fallback_recipient, forced_recipients),
+        "reembolsos": lambda: collect_reembolsos(sb, people, today, windows, overdue_min, max_due, fallback_recipient, forced_recipients),
     }
 
-    for source, collector in collectors.items():
-        if source not in sources:
-            continue
-        try:
-            candidates, missing = collector()
-            all_candidates.extend(candidates)
-            all_missing.extend(missing)
-        except Exception as exc:
-            print(f"WARN: fonte {source} ignorada por erro: {exc}", file=sys.stderr)
+    enabled = [source for source in SOURCE_LABELS if source in sources]
+    collect_mode = "v_due_items"
+    try:
+        all_candidates, all_missing, source_stats = collect_due_items(
+            sb, people, enabled, today, windows, overdue_min, max_due, fallback_recipient, forced_recipients
+        )
+    except Exception as exc:
+        print(f"WARN: v_due_items indisponivel, consultando cada fonte: {exc}", file=sys.stderr)
+        collect_mode = "per_source"
+        all_candidates, all_missing, source_stats = run_collectors(
+            {source: collectors[source] for source in enabled},
+            workers=workers,
+        )
+    collect_seconds = time.perf_counter() - started - load_seconds
 
     existing = fetch_existing_keys(sb, [c.notification_key for c in all_candidates], dry_run=dry_run)
     candidates = [candidate for candidate in all_candidates if candidate.notification_key not in existing]
@@ -635,6 +1045,10 @@ def main() -> int:
         "recipient_count": len(grouped),
         "missing_recipient_count": len(all_missing),
         "missing_recipients_sample": all_missing[:10],
+        "load_seconds": round(load_seconds, 3),
+        "collect_mode": collect_mode,
+        "collect_seconds": round(collect_seconds, 3),
+        "sources": source_stats,
     }
 
     print(json.dumps(stats, ensure_ascii=False, indent=2))
@@ -644,28 +1058,55 @@ def main() -> int:
 
     from_email = clean_text(os.getenv("NOTIFICATION_FROM_EMAIL") or os.getenv("FALLBACK_OWNER_EMAIL")).lower()
     reply_to = clean_text(os.getenv("NOTIFICATION_REPLY_TO")).lower()
-    service = None
-    if not dry_run:
-        service_account_json = clean_text(os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON"))
-        delegated_user_email = clean_text(os.getenv("FALLBACK_OWNER_EMAIL") or from_email)
-        scopes = parse_csv(os.getenv("GOOGLE_SCOPES"), ["https://www.googleapis.com/auth/gmail.send"])
-        if not from_email:
-            raise RuntimeError("NOTIFICATION_FROM_EMAIL ou FALLBACK_OWNER_EMAIL e obrigatorio para envio real.")
-        if not service_account_json:
-            raise RuntimeError("GOOGLE_SERVICE_ACCOUNT_JSON e obrigatorio para envio real.")
-        service = build_gmail_service(service_account_json, delegated_user_email, scopes)
-
-    for recipient, items in grouped.items():
-        subject, text_body, html_body = build_email(recipient, items, today)
-        if dry_run:
+    messages = [(recipient, items, *build_email(recipient, items, today)) for recipient, items in grouped.items()]
+    if dry_run:
+        for recipient, _items, subject, text_body, _html_body in messages:
             print(f"DRY-RUN: enviaria para {recipient}: {subject}")
             print(text_body)
-            continue
-        message_id = send_gmail(service, from_email, recipient, subject, text_body, html_body, reply_to)
-        insert_logs(sb, items, subject, message_id)
-        print(f"SENT: {recipient} items={len(items)} message_id={message_id}")
+        return 0
+
+    service_account_json = clean_text(os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON"))
+    delegated_user_email = clean_text(os.getenv("FALLBACK_OWNER_EMAIL") or from_email)
+    scopes = parse_csv(os.getenv("GOOGLE_SCOPES"), ["https://www.googleapis.com/auth/gmail.send"])
+    if not from_email:
+        raise RuntimeError("NOTIFICATION_FROM_EMAIL ou FALLBACK_OWNER_EMAIL e obrigatorio para envio real.")
+    if not service_account_json:
+        raise RuntimeError("GOOGLE_SERVICE_ACCOUNT_JSON e obrigatorio para envio real.")
+
+    # The Gmail client (httplib2) is not thread-safe: one service per worker.
+    local = threading.local()
+
+    def send(recipient: str, subject: str, text_body: str, html_body: str) -> str:
+        if getattr(local, "service", None) is None:
+            local.service = build_gmail_service(service_account_json, delegated_user_email, scopes)
+        return send_gmail(local.service, from_email, recipient, subject, text_body, html_body, reply_to)
+
+    # Gmail API: messages.send costs 100 of the 250 quota units/user/second.
+    send_rate = float(os.getenv("NOTIFICATION_SEND_RATE") or 2)
+    deliveries = deliver_all(
+        messages,
+        send,
+        workers=env_int("NOTIFICATION_SEND_WORKERS", 4),
+        bucket=TokenBucket(send_rate),
+        attempts=env_int("NOTIFICATION_SEND_ATTEMPTS", 4),
+    )
 
-    return 0
+    rows: list[dict[str, Any]] = []
+    for delivery in deliveries:
+        if delivery.error:
+            rows.extend(log_rows(delivery.items, delivery.subject, status="ERROR", error_message=delivery.error))
+        else:
+            rows.extend(log_rows(delivery.items, delivery.subject, provider_message_id=delivery.message_id))
+    write_logs(sb, rows)
+
+    failed = [delivery for delivery in deliveries if delivery.error]
+    for delivery in deliveries:
+        if delivery.error:
+            print(f"ERROR: {delivery.recipient} items={len(delivery.items)} {delivery.error}", file=sys.stderr)
+        else:
+            print(f"SENT: {delivery.recipient} items={len(delivery.items)} message_id={delivery.message_id}")
+    print(f"ENVIO: {len(deliveries) - len(failed)} enviados | {len(failed)} com erro")
+    return 1 if failed else 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,55 @@
+import os
+import pickle
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath("app"))
+
+from services.array_columns import MultiHot, join_lists, to_list, to_lists
+
+
+class ArrayColumnTests(unittest.TestCase):
+    def test_to_lists_matches_scalar_parser(self):
+        values = [
+            ["Peixes", None, " Bentos "],
+            '{Peixes,"Água superficial"}',
+            "Bentos, Sedimento",
+            None,
+            float("nan"),
+            "",
+            "None",
+            "{}",
+            np.array(["Zoo"]),
+        ]
+        expected = [to_list(v) for v in values]
+        self.assertEqual(to_lists(values), expected)
+        self.assertEqual(
+            expected[:4],
+            [["Peixes", "Bentos"], ["Peixes", "Água superficial"], ["Bentos", "Sedimento"], []],
+        )
+        self.assertEqual(to_lists(pd.Series(values, index=range(10, 19))), expected)
+
+    def test_join_lists(self):
+        self.assertEqual(join_lists([["a", "b"], []]), ["a, b", ""])
+
+    def test_multi_hot_any_of(self):
+        hot = MultiHot([["Peixes"], ["Bentos", "Sedimento"], [], ["Peixes", "Bentos"]])
+        self.assertEqual(list(hot.categories), ["Bentos", "Peixes", "Sedimento"])
+        self.assertEqual(hot.any_of(["Peixes"]).tolist(), [True, False, False, True])
+        self.assertEqual(hot.any_of(["Sedimento", "Peixes"]).tolist(), [True, True, False, True])
+        self.assertEqual(hot.any_of(["Inexistente"]).tolist(), [False] * 4)
+        self.assertEqual(hot.counts().to_dict(), {"Bentos": 2, "Peixes": 2, "Sedimento": 1})
+        self.assertEqual(hot.to_frame().shape, (4, 3))
+
+    def test_multi_hot_empty_and_pickle(self):
+        self.assertEqual(len(MultiHot([])), 0)
+        self.assertEqual(MultiHot([]).any_of(["x"]).tolist(), [])
+        hot = pickle.loads(pickle.dumps(MultiHot([["a"], ["b"]])))
+        self.assertEqual(hot.any_of(["b"]).tolist(), [False, True])
+
+
+if __name__ == "__main__":
+    unittest.main()
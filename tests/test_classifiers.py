@@ -0,0 +1,90 @@
+import os
+import random
+import sys
+import unittest
+from datetime import date, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath("app"))
+
+from services.classifiers import (
+    day_array,
+    days_until,
+    delivery_date_status,
+    lab_situation,
+    labeled,
+    reimbursement_situation,
+)
+
+TODAY = date(2026, 6, 15)
+
+
+# Regras escalares de referência (versões por linha que foram vetorizadas).
+def _delivery_ref(prazo, entrega):
+    if entrega is None:
+        if prazo is None:
+            return "SEM_PRAZO"
+        return "ATRASADA" if prazo < TODAY else "PENDENTE"
+    if prazo is None or entrega <= prazo:
+        return "ENTREGUE_NO_PRAZO"
+    return "ENTREGUE_COM_ATRASO"
+
+
+def _lab_ref(status_ui, exp):
+    if status_ui == "CONCLUIDO":
+        return "CONCLUIDO"
+    if exp is not None and exp < TODAY:
+        return "ATRASO"
+    return "PENDENTE" if status_ui == "PENDENTE" else "EM_ANALISE"
+
+
+def _reimb_ref(status, due):
+    s = (status or "PENDENTE").strip().upper()
+    if s in ("PAGO", "GLOSADO"):
+        return s
+    if due is not None and due < TODAY:
+        return "ATRASADO"
+    return "APROVADO" if s == "APROVADO" else "PENDENTE"
+
+
+def _random_dates(rnd, n):
+    return [None if rnd.random() < 0.25 else TODAY + timedelta(days=rnd.randint(-20, 20)) for _ in range(n)]
+
+
+class ClassifierTests(unittest.TestCase):
+    def test_delivery_status_matches_scalar_rule(self):
+        rnd = random.Random(3)
+        prazo, entrega = _random_dates(rnd, 400), _random_dates(rnd, 400)
+        got = delivery_date_status(prazo, entrega, TODAY).tolist()
+        self.assertEqual(got, [_delivery_ref(p, e) for p, e in zip(prazo, entrega)])
+
+    def test_lab_situation_matches_scalar_rule(self):
+        rnd = random.Random(5)
+        status = [rnd.choice(["PENDENTE", "ENTREGUE_LAB", "CONCLUIDO", None]) for _ in range(300)]
+        exp = _random_dates(rnd, 300)
+        got = lab_situation(status, exp, TODAY).tolist()
+        self.assertEqual(got, [_lab_ref(s or "PENDENTE", e) for s, e in zip(status, exp)])
+
+    def test_reimbursement_situation_matches_scalar_rule(self):
+        rnd = random.Random(7)
+        status = [rnd.choice(["pendente", "APROVADO", "PAGO", "GLOSADO", None, ""]) for _ in range(300)]
+        due = _random_dates(rnd, 300)
+        got = reimbursement_situation(pd.Series(status, dtype=object), due, TODAY).tolist()
+        self.assertEqual(got, [_reimb_ref(s, d) for s, d in zip(status, due)])
+
+    def test_accepts_typed_columns_and_editor_strings(self):
+        typed = pd.Series(pd.to_datetime(["2026-06-10", None]), index=[10, 20])
+        self.assertEqual(days_until(typed, TODAY).tolist(), [-5, pd.NA])
+        arr = day_array(["14/06/2026", "2026-06-16", date(2026, 6, 17), "", None])
+        self.assertEqual([str(x) for x in arr], ["2026-06-14", "2026-06-16", "2026-06-17", "NaT", "NaT"])
+
+    def test_labeled_returns_categorical(self):
+        out = labeled(delivery_date_status([None], [None], TODAY), {"SEM_PRAZO": "⚪ Sem prazo"})
+        self.assertIsInstance(out.dtype, pd.CategoricalDtype)
+        self.assertEqual(out.tolist(), ["⚪ Sem prazo"])
+        self.assertTrue(delivery_date_status([], [], TODAY).empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,27 @@
 from datetime import date
+import re
+import threading
 import unittest
+from unittest import mock
 
 from scripts.notifications.send_due_alerts import (
     NotificationCandidate,
+    PeopleResolver,
+    Person,
     add_candidate,
     alert_for_due,
+    collect_due_items,
+    TokenBucket,
+    call_with_retry,
+    collect_produtos,
+    deliver_all,
+    fetch_existing_keys,
     group_by_recipient,
+    iter_due_items,
+    log_rows,
     parse_email_list,
+    run_collectors,
+    write_logs,
 )
 
 
@@ -62,6 +77,444 @@ class DueNotificationTests(unittest.TestCase):
         self.assertEqual(missing, [])
         self.assertEqual({item.recipient_email for item in candidates}, {"yurisimoes@opyta.com.br", "felipetalin@opyta.com.br"})
 
+    def test_responsible_prefers_assignee_ids(self):
+        ana = Person("1", "Ana", "ana@opyta.com.br")
+        bruno = Person("2", "Bruno", "bruno@opyta.com.br")
+        people = PeopleResolver([ana, bruno])
+
+        self.assertEqual(people.for_row({"assignee_ids": ["2", "1"], "assignee_names": "Ana + Bruno"}), [bruno, ana])
+        # array vazio (tarefa sem task_people, p.ex. importada do MS Project): cai no nome
+        self.assertEqual(people.for_row({"assignee_ids": [], "assignee_names": "Ana"}), [ana])
+        self.assertEqual(people.for_row({"assignee_ids": [], "assignee_names": ""}), [])
+        # view sem os arrays (migração pendente): compat por nome, todos os nomes
+        self.assertEqual(people.for_row({"assignee_names": "Ana + Bruno"}), [ana, bruno])
+
+    def test_resolver_folds_accents_and_case(self):
+        joao = Person("1", "João Simões", "joao@opyta.com.br")
+        inactive = Person("2", "Ana", "old@opyta.com.br", active=False)
+        ana = Person("3", "ANA", "ana@opyta.com.br")
+        people = PeopleResolver([joao, inactive, ana])
+
+        self.assertIs(people.named("  joao   simoes "), joao)
+        self.assertIs(people.named("Ana"), ana)  # homonimo ativo ganha
+        self.assertEqual(people.from_names("Joao Simoes + ana, Fulano; JOÃO SIMÕES"), [joao, ana])
+        self.assertEqual(people.for_row({"collaborator_id": "2"}, id_key="collaborator_id"), [inactive])
+        self.assertEqual(people.for_row({"assignee_name": "Ana"}, id_key="assignee_id", names_key="assignee_name"), [ana])
+
+    def test_every_assignee_with_email_is_a_recipient(self):
+        candidates = []
+        missing = []
+        people = [Person("1", "Ana", "ana@opyta.com.br"), Person("2", "Bruno", ""), Person("3", "Caio", "ANA@opyta.com.br")]
+
+        add_candidate(
+            candidates,
+            missing,
+            source="produtos",
+            source_id="1",
+            title="Relatorio",
+            project_code="P1",
+            project_name="",
+            responsible=people,
+            fallback_recipient="fallback@opyta.com.br",
+            forced_recipients=[],
+            due_date=date(2026, 7, 1),
+            today=date(2026, 7, 1),
+            windows={0},
+        )
+
+        self.assertEqual([item.recipient_email for item in candidates], ["ana@opyta.com.br"])
+        self.assertEqual(candidates[0].responsible_name, "Ana + Bruno + Caio")
+
+class RunCollectorsTests(unittest.TestCase):
+    def test_collectors_overlap_and_failures_are_isolated(self):
+        due = date(2026, 7, 1)
+        barrier = threading.Barrier(2, timeout=5)
+
+        def gantt():
+            barrier.wait()  # só passa se as duas fontes rodarem ao mesmo tempo
+            return [NotificationCandidate("gantt", "1", "A", "P1", "", "Ana", "a@opyta.com.br", due, "TODAY", 0)], []
+
+        def produtos():
+            barrier.wait()
+            return [], [{"source": "produtos", "source_id": "9"}]
+
+        def reembolsos():
+            raise RuntimeError("view ausente")
+
+        with mock.patch("sys.stderr"):
+            candidates, missing, stats = run_collectors(
+                {"gantt": gantt, "produtos": produtos, "reembolsos": reembolsos}, workers=3
+            )
+
+        self.assertEqual([c.source_id for c in candidates], ["1"])
+        self.assertEqual(missing, [{"source": "produtos", "source_id": "9"}])
+        self.assertEqual(list(stats), ["gantt", "produtos", "reembolsos"])
+        self.assertEqual(stats["gantt"]["status"], "ok")
+        self.assertEqual((stats["gantt"]["candidates"], stats["produtos"]["missing_recipient"]), (1, 1))
+        self.assertEqual(stats["reembolsos"]["status"], "error")
+        self.assertIn("view ausente", stats["reembolsos"]["error"])
+        self.assertTrue(all(entry["seconds"] >= 0 for entry in stats.values()))
+
+
+
+class _Query:
+    def __init__(self, client):
+        self.client = client
+        self.filters = []
+
+    def select(self, columns):
+        self.columns = columns
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(("eq", column, value))
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(("gte", column, value))
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(("lte", column, value))
+        return self
+
+    def execute(self):
+        self.client.queries.append((self.columns, self.filters))
+        if "effective_due_date" in self.columns and self.client.effective_due_error is not None:
+            raise self.client.effective_due_error
+        return type("Resp", (), {"data": self.client.rows})()
+
+
+class _Client:
+    def __init__(self, rows, effective_due_error=None):
+        self.rows = rows
+        self.effective_due_error = effective_due_error
+        self.queries = []
+
+    def table(self, _name):
+        return _Query(self)
+
+
+class CollectProdutosTests(unittest.TestCase):
+    today = date(2026, 7, 1)
+
+    def _collect(self, client):
+        return collect_produtos(
+            client, PeopleResolver([]), self.today, {0, 3}, date(2026, 6, 1), date(2026, 7, 4), "f@opyta.com.br", []
+        )
+
+    def test_window_and_status_pushed_to_database(self):
+        client = _Client([{"task_id": "1", "product_name": "Relatorio", "effective_due_date": "2026-07-04"}])
+        candidates, _ = self._collect(client)
+
+        self.assertEqual(len(client.queries), 1)
+        self.assertEqual(
+            client.queries[0][1],
+            [("eq", "is_terminal", False), ("gte", "effective_due_date", "2026-06-01"), ("lte", "effective_due_date", "2026-07-04")],
+        )
+        self.assertEqual([(c.source_id, c.alert_type) for c in candidates], [("1", "DAYS_BEFORE")])
+
+    def test_falls_back_to_python_filter_on_older_view(self):
+        rows = [
+            {"task_id": "1", "client_due_date": "2026-07-01"},
+            {"task_id": "2", "end_date": "2026-07-01", "delivery_status": "ENTREGUE"},
+            {"task_id": "3", "enterprise": "01/07/2026"},
+            {"task_id": "4", "end_date": "2026-09-01"},
+        ]
+        missing_column = RuntimeError({"code": "42703", "message": "column v_deliverables.effective_due_date does not exist"})
+        client = _Client(rows, effective_due_error=missing_column)
+        candidates, _ = self._collect(client)
+
+        self.assertEqual(len(client.queries), 2)
+        self.assertEqual(client.queries[1][1], [])
+        self.assertEqual([c.source_id for c in candidates], ["1", "3"])
+
+    def test_other_errors_do_not_download_the_whole_view(self):
+        client = _Client([], effective_due_error=RuntimeError({"code": "57014", "message": "statement timeout"}))
+
+        with self.assertRaises(RuntimeError):
+            self._collect(client)
+        self.assertEqual(len(client.queries), 1)
+
+
+
+class _DueItemsQuery:
+    def __init__(self, client):
+        self.client = client
+        self.after = None
+        self.size = None
+
+    def select(self, _columns):
+        return self
+
+    def in_(self, _column, values):
+        self.sources = set(values)
+        return self
+
+    def eq(self, *_a):
+        return self
+
+    def gte(self, *_a):
+        return self
+
+    def lte(self, *_a):
+        return self
+
+    def or_(self, expr):
+        self.client.keysets.append(expr)
+        due, key = re.fullmatch(r'due_date\.gt\.(.+),and\(due_date\.eq\.\1,item_key\.gt\."(.+)"\)', expr).groups()
+        self.after = (due, key)
+        return self
+
+    def order(self, *_a):
+        return self
+
+    def limit(self, size):
+        self.size = size
+        return self
+
+    def execute(self):
+        rows = sorted(
+            (r for r in self.client.rows if r["source"] in self.sources),
+            key=lambda r: (r["due_date"], r["item_key"]),
+        )
+        if self.after:
+            rows = [r for r in rows if (r["due_date"], r["item_key"]) > self.after]
+        return type("Resp", (), {"data": rows[: self.size]})()
+
+
+class _DueItemsClient:
+    def __init__(self, rows):
+        self.rows = rows
+        self.keysets = []
+
+    def table(self, name):
+        assert name == "v_due_items"
+        return _DueItemsQuery(self)
+
+
+def _due_row(source, source_id, due, **extra):
+    row = {"source": source, "source_id": source_id, "item_key": f"{source}/{source_id}", "due_date": due,
+           "title": "Item", "project_code": "P1", "project_name": "", "detail": "", "amount": None,
+           "responsible_ids": None, "responsible_names": ""}
+    row.update(extra)
+    return row
+
+
+SOURCES = ["gantt", "laboratorio", "produtos", "reembolsos"]
+
+
+class DueItemsTests(unittest.TestCase):
+    def test_keyset_pages_cover_every_row_once(self):
+        rows = [
+            _due_row("gantt", "b", "2026-07-01"),
+            _due_row("gantt", "a", "2026-07-01"),
+            _due_row("produtos", "a", "2026-07-01"),
+            _due_row("laboratorio", "c", "2026-07-02"),
+            _due_row("reembolsos", "d", "2026-07-03"),
+        ]
+        client = _DueItemsClient(rows)
+
+        streamed = list(iter_due_items(client, SOURCES, date(2026, 6, 1), date(2026, 7, 8), page_size=2))
+
+        self.assertEqual(
+            [r["item_key"] for r in streamed],
+            ["gantt/a", "gantt/b", "produtos/a", "laboratorio/c", "reembolsos/d"],
+        )
+        self.assertEqual(
+            client.keysets,
+            [
+                'due_date.gt.2026-07-01,and(due_date.eq.2026-07-01,item_key.gt."gantt/b")',
+                'due_date.gt.2026-07-02,and(due_date.eq.2026-07-02,item_key.gt."laboratorio/c")',
+            ],
+        )
+
+    def test_collect_due_items_builds_candidates_per_source(self):
+        ana = Person("1", "Ana", "ana@opyta.com.br")
+        rows = [
+            _due_row("gantt", "t1", "2026-07-01", responsible_ids=["1"]),
+            # tarefa importada: sem task_people, só o nome do lead
+            _due_row("gantt", "t2", "2026-07-01", responsible_ids=[], responsible_names="Ana"),
+            _due_row("reembolsos", "r1", "2026-07-01", detail="Combustivel", amount=10.5, responsible_names="Ana"),
+            _due_row("laboratorio", "s1", "2026-07-01"),  # sem responsavel nem fallback
+        ]
+        candidates, missing, stats = collect_due_items(
+            _DueItemsClient(rows), PeopleResolver([ana]), ["gantt", "laboratorio", "reembolsos"],
+            date(2026, 7, 1), {0}, date(2026, 6, 1), date(2026, 7, 1), "", [],
+        )
+
+        self.assertEqual([(c.source, c.recipient_email) for c in candidates],
+                         [("gantt", "ana@opyta.com.br"), ("gantt", "ana@opyta.com.br"), ("reembolsos", "ana@opyta.com.br")])
+        self.assertEqual(candidates[2].detail, "Combustivel | R$ 10,50")
+        self.assertEqual([m["source_id"] for m in missing], ["s1"])
+        self.assertEqual(stats["laboratorio"]["missing_recipient"], 1)
+        self.assertEqual(stats["gantt"]["rows"], 2)
+
+
+
+class _LogClient:
+    def __init__(self, sent_keys, rpc_available=True, upsert_available=True):
+        self.sent_keys = set(sent_keys)
+        self.rpc_available = rpc_available
+        self.upsert_available = upsert_available
+        self.calls = []
+
+    def rpc(self, name, params):
+        client = self
+
+        class _Rpc:
+            def execute(self):
+                client.calls.append(("rpc", name, len(params["p_keys"])))
+                if not client.rpc_available:
+                    raise RuntimeError("function not found")
+                data = [{"notification_key": k} for k in params["p_keys"] if k in client.sent_keys]
+                return type("Resp", (), {"data": data})()
+
+        return _Rpc()
+
+    def table(self, name):
+        client = self
+
+        class _Table:
+            def select(self, *_a):
+                return self
+
+            def eq(self, *_a):
+                return self
+
+            def in_(self, _column, values):
+                self.values = list(values)
+                return self
+
+            def upsert(self, rows, **kwargs):
+                client.calls.append(("upsert", len(rows), kwargs))
+                self.values = []
+                return self
+
+            def insert(self, rows, **kwargs):
+                client.calls.append(("insert", len(rows), kwargs))
+                self.values = []
+                return self
+
+            def execute(self):
+                if client.calls[-1][0] == "upsert" and not client.upsert_available:
+                    raise RuntimeError("there is no unique or exclusion constraint matching the ON CONFLICT specification")
+                if client.calls[-1][0] not in ("upsert", "insert"):
+                    client.calls.append(("select", name, len(self.values)))
+                data = [{"notification_key": k} for k in self.values if k in client.sent_keys]
+                return type("Resp", (), {"data": data})()
+
+        return _Table()
+
+
+class NotificationLogTests(unittest.TestCase):
+    def test_sent_keys_in_one_rpc_call(self):
+        client = _LogClient({"k1", "k250"})
+        keys = [f"k{i}" for i in range(300)] + ["k1"]
+
+        self.assertEqual(fetch_existing_keys(client, keys, dry_run=False), {"k1", "k250"})
+        self.assertEqual(client.calls, [("rpc", "rpc_due_notification_sent_keys", 300)])
+
+    def test_falls_back_to_chunked_lookup_without_rpc(self):
+        client = _LogClient({"k1", "k250"}, rpc_available=False)
+        keys = [f"k{i}" for i in range(300)]
+
+        with mock.patch("sys.stderr"):
+            self.assertEqual(fetch_existing_keys(client, keys, dry_run=False), {"k1", "k250"})
+        self.assertEqual([c[0] for c in client.calls], ["rpc", "select", "select", "select"])
+
+    def test_logs_are_upserted_ignoring_duplicates(self):
+        client = _LogClient(set())
+        due = date(2026, 7, 1)
+        items = [NotificationCandidate("gantt", str(i), "A", "P1", "", "Ana", "a@opyta.com.br", due, "TODAY", 0) for i in range(3)]
+
+        write_logs(client, log_rows(items, "Assunto", provider_message_id="msg-1"))
+
+        self.assertEqual(
+            client.calls,
+            [("upsert", 3, {"on_conflict": "notification_key,status", "ignore_duplicates": True, "returning": "minimal"})],
+        )
+
+    def test_logs_fall_back_to_insert_without_the_unique_index(self):
+        client = _LogClient(set(), upsert_available=False)
+        due = date(2026, 7, 1)
+        items = [NotificationCandidate("gantt", str(i), "A", "P1", "", "Ana", "a@opyta.com.br", due, "TODAY", 0) for i in range(3)]
+
+        with mock.patch("scripts.notifications.send_due_alerts.LOG_BATCH_SIZE", 2), mock.patch("sys.stderr"):
+            write_logs(client, log_rows(items, "Assunto", provider_message_id="msg-1"))
+
+        self.assertEqual([(op, n) for op, n, _ in client.calls], [("upsert", 2), ("insert", 2), ("insert", 1)])
+
+
+
+class _HttpError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.resp = type("Resp", (), {"status": status})()
+
+
+class DeliveryTests(unittest.TestCase):
+    def test_token_bucket_waits_for_refill(self):
+        now = [0.0]
+        waits = []
+
+        def sleep(seconds):
+            waits.append(round(seconds, 3))
+            now[0] += seconds
+
+        bucket = TokenBucket(2, clock=lambda: now[0], sleep=sleep)
+        for _ in range(4):
+            bucket.acquire()
+
+        self.assertEqual(waits, [0.5, 0.5])  # 2 de rajada, depois 1 a cada 0,5 s
+
+    def test_retry_only_on_429_and_5xx(self):
+        attempts = []
+        sleeps = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise _HttpError(429 if len(attempts) == 1 else 503)
+            return "ok"
+
+        self.assertEqual(call_with_retry(flaky, attempts=4, base_delay=1, sleep=sleeps.append), "ok")
+        self.assertEqual(len(sleeps), 2)
+        self.assertTrue(0 <= sleeps[0] <= 1 and 0 <= sleeps[1] <= 2)
+
+        def bad_request():
+            attempts.append(1)
+            raise _HttpError(400)
+
+        attempts.clear()
+        with self.assertRaises(_HttpError):
+            call_with_retry(bad_request, attempts=4, sleep=sleeps.append)
+        self.assertEqual(len(attempts), 1)
+
+    def test_failed_recipient_does_not_block_others_and_is_logged_as_error(self):
+        due = date(2026, 7, 1)
+        item_a = NotificationCandidate("gantt", "1", "A", "P1", "", "Ana", "a@opyta.com.br", due, "TODAY", 0)
+        item_b = NotificationCandidate("gantt", "2", "B", "P1", "", "Bia", "b@opyta.com.br", due, "TODAY", 0)
+        messages = [
+            ("a@opyta.com.br", [item_a], "S", "txt", "<p>"),
+            ("b@opyta.com.br", [item_b], "S", "txt", "<p>"),
+        ]
+
+        def send(recipient, subject, text_body, html_body):
+            if recipient.startswith("a"):
+                raise _HttpError(500)
+            return "msg-b"
+
+        deliveries = deliver_all(messages, send, workers=2, attempts=2, sleep=lambda _s: None)
+
+        self.assertEqual([d.recipient for d in deliveries], ["a@opyta.com.br", "b@opyta.com.br"])
+        self.assertIn("HTTP 500", deliveries[0].error)
+        self.assertEqual((deliveries[1].message_id, deliveries[1].error), ("msg-b", ""))
+
+        row = log_rows(deliveries[0].items, "S", status="ERROR", error_message=deliveries[0].error)[0]
+        self.assertEqual((row["status"], row["provider_message_id"]), ("ERROR", None))
+        self.assertIn("HTTP 500", row["error_message"])
+
 
 if __name__ == "__main__":
     unittest.main()
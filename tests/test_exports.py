@@ -0,0 +1,66 @@
+import os
+import re
+import sys
+import unittest
+import zipfile
+from datetime import date
+from io import BytesIO
+from types import SimpleNamespace
+
+import pandas as pd
+
+if "streamlit" not in sys.modules:
+    sys.modules["streamlit"] = SimpleNamespace(session_state={}, cache_data=lambda **_k: (lambda f: f))
+
+sys.path.insert(0, os.path.abspath("app"))
+
+from ui.exports import csv_bytes, summary_sheets, xlsx_bytes  # noqa: E402
+
+try:
+    import xlsxwriter  # noqa: F401
+    HAS_XLSXWRITER = True
+except ImportError:  # pragma: no cover
+    HAS_XLSXWRITER = False
+
+
+def _frame():
+    return pd.DataFrame(
+        {
+            "Projeto": ["A", "B", None],
+            "Data": [date(2026, 1, 1), None, date(2026, 1, 3)],
+            "Valor": [10.0, 2.5, None],
+            "Ok": [True, False, True],
+        }
+    )
+
+
+class ExportTests(unittest.TestCase):
+    def test_csv_matches_previous_format(self):
+        df = _frame()
+        expected = df.to_csv(index=False, sep=";", encoding="utf-8-sig").encode("utf-8-sig")
+        self.assertEqual(csv_bytes(df), expected)
+        self.assertTrue(csv_bytes(df).startswith(b"\xef\xbb\xbf"))
+
+    def test_summary_sheets(self):
+        sheets = summary_sheets(_frame(), ["Projeto"], "Valor")
+        self.assertEqual(list(sheets), ["Por Projeto"])
+        out = sheets["Por Projeto"]
+        self.assertEqual(out["Projeto"].tolist(), ["(vazio)", "A", "B"])
+        self.assertEqual(out["Linhas"].tolist(), [1, 1, 1])
+        self.assertEqual(out["Total Valor"].tolist(), [0.0, 10.0, 2.5])
+
+    @unittest.skipUnless(HAS_XLSXWRITER, "xlsxwriter não instalado")
+    def test_xlsx_streams_every_row_and_sheet(self):
+        big = pd.concat([_frame()] * 200, ignore_index=True)
+        data = xlsx_bytes({"Principal": big, **summary_sheets(big, ["Projeto"])})
+        with zipfile.ZipFile(BytesIO(data)) as zf:
+            workbook = zf.read("xl/workbook.xml").decode()
+            sheet1 = zf.read("xl/worksheets/sheet1.xml").decode()
+        self.assertEqual(re.findall(r'<sheet name="([^"]+)"', workbook), ["Principal", "Por Projeto"])
+        # cabeçalho + 600 linhas; a última ainda tem a coluna D (booleano)
+        self.assertEqual(len(re.findall(r"<row ", sheet1)), 601)
+        self.assertIn('r="D601"', sheet1)
+
+
+if __name__ == "__main__":
+    unittest.main()
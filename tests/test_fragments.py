@@ -0,0 +1,40 @@
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+if "streamlit" not in sys.modules:
+    sys.modules["streamlit"] = SimpleNamespace(session_state={})
+
+sys.path.insert(0, os.path.abspath("app"))
+
+import ui.fragments as fragments  # noqa: E402
+
+
+def _section(x):
+    return x * 2
+
+
+class FragmentTests(unittest.TestCase):
+    def test_uses_st_fragment(self):
+        wrapped = []
+        fake = SimpleNamespace(fragment=lambda f: wrapped.append(f) or f)
+        with mock.patch.object(fragments, "st", fake):
+            out = fragments.fragment(_section)
+        self.assertEqual(wrapped, [_section])
+        self.assertEqual(out(3), 6)
+
+    def test_falls_back_to_experimental_fragment(self):
+        fake = SimpleNamespace(experimental_fragment=lambda f: (lambda *a: ("exp", f(*a))))
+        with mock.patch.object(fragments, "st", fake):
+            out = fragments.fragment(_section)
+        self.assertEqual(out(2), ("exp", 4))
+
+    def test_without_fragment_support_is_identity(self):
+        with mock.patch.object(fragments, "st", SimpleNamespace()):
+            self.assertIs(fragments.fragment(_section), _section)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import sys
+import unittest
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath("app"))
+
+from services.global_search import HIT_COLUMNS, build_documents, build_index, hits_frame, local_search
+
+
+def _docs():
+    projects = pd.DataFrame(
+        {"id": ["p1", "p2"], "project_code": ["BRACE001", "ASSCAF"], "name": ["Brace", "Assessoria Café"],
+         "client": ["Cliente A", None], "notes": [None, "campanha de peixes"]}
+    )
+    tasks = pd.DataFrame(
+        {"task_id": ["t1"], "project_code": ["BRACE001"], "title": ["Relatório semestral"],
+         "tipo_atividade": ["RELATORIO"], "assignee_names": ["Fulano + Beltrana"], "notes": [None]}
+    )
+    samples = pd.DataFrame(
+        {"id": ["s1"], "project_code": ["ASSCAF"], "sample_types": ["Peixes, Bentos"], "lab_name": ["Biofile"],
+         "assignee_name": ["Beltrana"], "status": ["PENDENTE"], "notes": [None]}
+    )
+    reimbursements = pd.DataFrame(
+        {"id": ["r1"], "project_code": ["BRACE001"], "description": ["Hospedagem campanha"], "status": ["PAGO"],
+         "collaborator_name": ["Fulano"], "category_name": ["Hospedagem"], "observations": [None]}
+    )
+    return build_documents(projects, tasks, pd.DataFrame(), samples, reimbursements)
+
+
+class GlobalSearchTests(unittest.TestCase):
+    def setUp(self):
+        self.docs = _docs()
+        self.index = build_index(self.docs)
+
+    def test_documents_cover_all_modules(self):
+        self.assertEqual(self.docs["kind"].tolist(), ["PROJETO", "PROJETO", "TAREFA", "AMOSTRA", "REEMBOLSO"])
+        self.assertEqual(self.docs.loc[3, "title"], "Peixes, Bentos")
+        self.assertEqual(self.docs.loc[1, "subtitle"], "")
+
+    def test_people_and_labs_are_searchable(self):
+        hits = local_search(self.docs, self.index, "beltrana")
+        self.assertEqual(sorted(hits["id"]), ["s1", "t1"])
+        self.assertEqual(local_search(self.docs, self.index, "biofile")["id"].tolist(), ["s1"])
+        self.assertTrue(local_search(self.docs, self.index, "inexistente").empty)
+        self.assertTrue(local_search(self.docs, self.index, "  ").empty)
+
+    def test_ranking_prefers_code_title_and_projects(self):
+        hits = local_search(self.docs, self.index, "brace001")
+        self.assertEqual(hits["id"].tolist()[0], "p1")
+        self.assertEqual(len(hits), 3)
+        hits = local_search(self.docs, self.index, "campanha")
+        self.assertEqual(hits["id"].tolist(), ["r1", "p2"])
+        self.assertEqual(len(local_search(self.docs, self.index, "brace001", limit=1)), 1)
+
+    def test_hits_frame_from_rpc_rows(self):
+        df = hits_frame([{"kind": "TAREFA", "id": "t1", "project_code": None, "title": "X", "rank": "0.5"}])
+        self.assertEqual(list(df.columns), HIT_COLUMNS)
+        self.assertEqual(df.loc[0, "project_code"], "")
+        self.assertEqual(df.loc[0, "rank"], 0.5)
+        self.assertTrue(hits_frame(None).empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import pickle
+import sys
+import unittest
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath("app"))
+
+from services.interval_index import DateIntervalIndex
+
+
+def _brute_overlap(starts, ends, a, b):
+    out = []
+    for i, (s, e) in enumerate(zip(starts, ends)):
+        if s is None:
+            continue
+        e = e or s
+        if s <= b and e >= a:
+            out.append(i)
+    return out
+
+
+class DateIntervalIndexTests(unittest.TestCase):
+    def test_overlapping_matches_full_scan(self):
+        rng = np.random.default_rng(7)
+        base = date(2026, 1, 1)
+        starts, ends = [], []
+        for _ in range(400):
+            s = base + pd.Timedelta(days=int(rng.integers(0, 365)))
+            e = s + pd.Timedelta(days=int(rng.integers(0, 40)))
+            starts.append(s.date() if hasattr(s, "date") else s)
+            ends.append(e.date() if hasattr(e, "date") else e)
+        starts[3] = None
+        ends[5] = None
+
+        idx = DateIntervalIndex(starts, ends)
+        for a, b in [
+            (date(2026, 3, 1), date(2026, 3, 31)),
+            (date(2026, 12, 20), date(2027, 2, 1)),
+            (date(2025, 1, 1), date(2025, 12, 31)),
+            (date(2026, 6, 15), date(2026, 6, 15)),
+        ]:
+            got = idx.overlapping(a, b).tolist()
+            self.assertEqual(got, _brute_overlap(starts, ends, a, b))
+
+        self.assertEqual(idx.missing.tolist(), [3])
+
+    def test_point_index_between_before_and_bounds(self):
+        values = ["2026-05-10", None, "2026-04-01", "2026-05-31", "lixo"]
+        idx = DateIntervalIndex(pd.Series(values))
+
+        self.assertEqual(idx.between(date(2026, 5, 1), date(2026, 5, 31)).tolist(), [0, 3])
+        self.assertEqual(idx.before(date(2026, 5, 10)).tolist(), [2])
+        self.assertEqual(idx.missing.tolist(), [1, 4])
+        self.assertEqual(idx.bounds(), (date(2026, 4, 1), date(2026, 5, 31)))
+
+    def test_empty_and_inverted_window(self):
+        empty = DateIntervalIndex([])
+        self.assertEqual(len(empty), 0)
+        self.assertEqual(empty.overlapping(date(2026, 1, 1), date(2026, 1, 31)).tolist(), [])
+        self.assertEqual(empty.bounds(), (None, None))
+
+        idx = DateIntervalIndex([date(2026, 1, 10)])
+        self.assertEqual(idx.overlapping(date(2026, 2, 1), date(2026, 1, 1)).tolist(), [])
+        self.assertEqual(idx.overlapping(None, date(2026, 1, 1)).tolist(), [])
+
+    def test_survives_cache_pickle(self):
+        idx = DateIntervalIndex(["2026-01-01", "2026-01-20"], ["2026-01-31", None])
+        clone = pickle.loads(pickle.dumps(idx))
+        self.assertEqual(
+            clone.overlapping(date(2026, 1, 15), date(2026, 1, 25)).tolist(),
+            [0, 1],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import sys
+import unittest
+from contextlib import contextmanager
+from types import SimpleNamespace
+from unittest import mock
+
+if "streamlit" not in sys.modules:
+    sys.modules["streamlit"] = SimpleNamespace(session_state={})
+
+sys.path.insert(0, os.path.abspath("app"))
+
+import ui.layout as layout  # noqa: E402
+
+
+class _FakeSt:
+    def __init__(self):
+        self.session_state = {}
+        self.calls = []
+
+    @contextmanager
+    def form(self, key, **_k):
+        self.calls.append(("form", key))
+        yield
+
+    @contextmanager
+    def container(self, **_k):
+        self.calls.append(("container",))
+        yield
+
+    def form_submit_button(self, label, **_k):
+        self.calls.append(("submit", label))
+        return False
+
+    def toggle(self, label, key=None, **_k):
+        self.calls.append(("toggle", key))
+        return self.session_state.get(key)
+
+
+class FilterFormTests(unittest.TestCase):
+    def test_apply_mode_is_default_and_uses_form(self):
+        fake = _FakeSt()
+        with mock.patch.object(layout, "st", fake):
+            with layout.filter_form("f"):
+                fake.calls.append(("widget",))
+        self.assertTrue(fake.session_state["f__apply_mode"])
+        self.assertEqual(
+            fake.calls,
+            [("form", "f"), ("widget",), ("submit", "Aplicar filtros"), ("toggle", "f__apply_mode")],
+        )
+
+    def test_live_mode_uses_plain_container(self):
+        fake = _FakeSt()
+        fake.session_state["f__apply_mode"] = False
+        with mock.patch.object(layout, "st", fake):
+            with layout.filter_form("f"):
+                fake.calls.append(("widget",))
+        self.assertEqual(fake.calls, [("container",), ("widget",), ("toggle", "f__apply_mode")])
+
+
+class SectionSelectorTests(unittest.TestCase):
+    def test_segmented_control_deselected_falls_back_to_default(self):
+        fake = SimpleNamespace(segmented_control=lambda label, options, default=None, key=None: None)
+        with mock.patch.object(layout, "st", fake):
+            self.assertEqual(layout.section_selector("Seção", ["A", "B"], key="s"), "A")
+            self.assertEqual(layout.section_selector("Seção", ["A", "B"], key="s", default="B"), "B")
+
+    def test_radio_fallback(self):
+        seen = {}
+
+        def radio(label, options, index=0, horizontal=False, key=None):
+            seen.update(index=index, horizontal=horizontal, key=key)
+            return options[index]
+
+        with mock.patch.object(layout, "st", SimpleNamespace(radio=radio)):
+            self.assertEqual(layout.section_selector("Seção", ["A", "B"], key="s", default="B"), "B")
+        self.assertEqual(seen, {"index": 1, "horizontal": True, "key": "s"})
+
+
+if __name__ == "__main__":
+    unittest.main()
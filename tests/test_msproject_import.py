@@ -0,0 +1,345 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from scripts import import_msproject_xml_folder as importer
+from scripts.import_msproject_xml_folder import (
+    import_parsed,
+    iter_msproject,
+    load_msproject_xml,
+    plan_sync,
+    sync_parsed,
+    task_content_hash,
+)
+
+
+XML = """<?xml version="1.0" encoding="UTF-8"?>
+<Project xmlns="http://schemas.microsoft.com/project">
+  <Title>ABC001 - Monitoramento de fauna</Title>
+  <StartDate>2026-01-05T08:00:00</StartDate>
+  <FinishDate>2026-03-31T17:00:00</FinishDate>
+  <ExtendedAttributes><ExtendedAttribute><FieldID>1</FieldID></ExtendedAttribute></ExtendedAttributes>
+  <Calendars><Calendar><UID>1</UID><Name>Padrão</Name></Calendar></Calendars>
+  <Tasks>
+    <Task><UID>1</UID><Name>Campanha de campo</Name><OutlineLevel>1</OutlineLevel><Summary>1</Summary>
+      <Start>2026-01-05T08:00:00</Start><Finish>2026-01-30T17:00:00</Finish></Task>
+    <Task><UID>2</UID><Name>Coleta 1</Name><OutlineLevel>2</OutlineLevel><Summary>0</Summary>
+      <Start>2026-01-05T08:00:00</Start><Finish>2026-01-09T17:00:00</Finish>
+      <ExtendedAttribute><FieldID>188743731</FieldID><Value>x</Value></ExtendedAttribute>
+      <Baseline><Number>0</Number><Start>2026-01-01T08:00:00</Start></Baseline></Task>
+    <Task><UID>3</UID><Name>Sem data</Name><OutlineLevel>2</OutlineLevel><Summary>0</Summary></Task>
+    <Task><UID>4</UID><Name>Relatório final</Name><OutlineLevel>1</OutlineLevel><Summary>0</Summary>
+      <Start>2026-03-02T08:00:00</Start></Task>
+  </Tasks>
+  <Resources>
+    <Resource><UID>0</UID></Resource>
+    <Resource><UID>7</UID><Name> Fulana de Tal </Name></Resource>
+  </Resources>
+  <Assignments>
+    <Assignment><TaskUID>2</TaskUID><ResourceUID>7</ResourceUID>
+      <TimephasedData><Type>1</Type><Value>PT8H0M0S</Value></TimephasedData></Assignment>
+    <Assignment><TaskUID>2</TaskUID><ResourceUID>0</ResourceUID></Assignment>
+  </Assignments>
+</Project>
+"""
+
+
+class MsProjectImportTests(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".xml")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(XML)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_iter_keeps_only_needed_fields(self):
+        records = list(iter_msproject(self.path))
+        kinds = [k for k, _ in records]
+        self.assertEqual(kinds, ["Task"] * 4 + ["Resource"] * 2 + ["Assignment"] * 2 + ["Project"])
+        self.assertEqual(
+            set(records[1][1]), {"UID", "Name", "OutlineLevel", "Summary", "Start", "Finish"}
+        )
+        self.assertEqual(records[6][1], {"TaskUID": "2", "ResourceUID": "7"})
+        self.assertEqual(records[-1][1]["Title"], "ABC001 - Monitoramento de fauna")
+
+    def test_load_msproject_xml(self):
+        data = load_msproject_xml(self.path)
+        self.assertEqual(data["project_code"], "ABC001")
+        self.assertEqual(data["project_name"], "Monitoramento de fauna")
+        self.assertEqual((data["start"], data["end"]), ("2026-01-05", "2026-03-31"))
+        self.assertEqual(
+            data["tasks"],
+            [
+                {
+                    "title": "Coleta 1",
+                    "tipo_atividade": "CAMPO",
+                    "start_date": "2026-01-05",
+                    "end_date": "2026-01-09",
+                    "assignee_name": "Fulana de Tal",
+                    "msproject_uid": "2",
+                },
+                {
+                    "title": "Relatório final",
+                    # grupo vale até o próximo resumo de nível 1
+                    "tipo_atividade": "CAMPO",
+                    "start_date": "2026-03-02",
+                    "end_date": "2026-03-02",
+                    "assignee_name": None,
+                    "msproject_uid": "4",
+                },
+            ],
+        )
+        self.assertEqual(data["people"], {"Fulana de Tal"})
+
+
+class _Query:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.op = "select"
+        self.payload = None
+        self.ids = None
+        self.rng = None
+
+    def select(self, *_a, **_k):
+        return self
+
+    def insert(self, payload, **_k):
+        self.op, self.payload = "insert", payload
+        return self
+
+    def upsert(self, payload, **_k):
+        self.op, self.payload = "upsert", payload
+        return self
+
+    def in_(self, _col, values):
+        self.ids = list(values)
+        return self
+
+    def order(self, *_a, **_k):
+        return self
+
+    def range(self, a, b):
+        self.rng = (a, b)
+        return self
+
+    def execute(self):
+        self.client.calls.append((self.table, self.op, len(self.payload) if self.payload is not None else None))
+        db = self.client.db
+        if self.op == "select" and self.table == "people":
+            data = list(db["people"])
+        elif self.op == "select" and self.table == "tasks":
+            data = [r for r in db["tasks"] if r["project_id"] in self.ids][self.rng[0]: self.rng[1] + 1]
+        elif self.op == "select" and self.table == "projects":
+            data = [{"id": f"proj-{c}", "project_code": c} for c in self.ids if f"proj-{c}" in db.get("projects", ())]
+        elif self.op == "insert":
+            data = []
+            for r in self.payload:
+                row = dict(r, id=f"{self.table}-{len(db[self.table]) + 1}")
+                db[self.table].append(row)
+                data.append(row)
+        else:  # upsert de projetos
+            data = [dict(r, id=f"proj-{r['project_code']}") for r in self.payload]
+        return type("Resp", (), {"data": data})()
+
+
+class _Client:
+    def __init__(self, db):
+        self.db = db
+        self.calls = []
+
+    def table(self, name):
+        return _Query(self, name)
+
+    def rpc(self, name, params):
+        client = self
+
+        class _Rpc:
+            def execute(self):
+                client.calls.append((name, "rpc", params))
+                return type("Resp", (), {"data": None})()
+
+        return _Rpc()
+
+
+def _parsed(code, titles, people=("Fulana",)):
+    return {
+        "project_code": code,
+        "project_name": code,
+        "start": None,
+        "end": None,
+        "tasks": [
+            {"title": t, "tipo_atividade": "CAMPO", "start_date": "2026-01-01", "end_date": "2026-01-02",
+             "assignee_name": people[0]}
+            for t in titles
+        ],
+        "people": set(people),
+    }
+
+
+class ImportParsedTests(unittest.TestCase):
+    def test_batches_people_projects_and_tasks(self):
+        db = {
+            "people": [{"id": "p1", "name": "Fulana"}],
+            "tasks": [{"id": "t0", "project_id": "proj-A", "title": "Existente"}],
+        }
+        client = _Client(db)
+        parsed = [
+            _parsed("A", ["Existente", "Nova A"], people=("Beltrano",)),
+            _parsed("B", ["Nova B1", "Nova B2"]),
+            _parsed("A", ["Nova A", "Outra A"]),
+        ]
+        with mock.patch.object(importer, "TASK_BATCH", 2):
+            inserted = import_parsed(client, parsed, workers=2)
+
+        self.assertEqual(inserted, {"A": 2, "B": 2})
+        ops = [(t, op) for t, op, _ in client.calls]
+        # people: 1 select + 1 insert; projetos: 1 upsert; títulos: 1 select
+        self.assertEqual(ops[:4], [("people", "select"), ("people", "insert"), ("projects", "upsert"), ("tasks", "select")])
+        self.assertEqual(client.calls[1][2], 2)  # Beltrano + placeholder
+        self.assertEqual(client.calls[2][2], 2)  # A deduplicado
+        self.assertEqual(sorted(n for t, op, n in client.calls if (t, op) == ("tasks", "insert")), [2, 2])
+        by_title = {r["title"]: r for r in db["tasks"]}
+        self.assertEqual(by_title["Nova B1"]["assignee_id"], "p1")
+        self.assertEqual(by_title["Nova A"]["assignee_id"], "people-2")  # Beltrano, id do insert
+
+
+def _task(uid, title, start="2026-01-01", end="2026-01-02", assignee="Fulana"):
+    return {"title": title, "tipo_atividade": "CAMPO", "start_date": start, "end_date": end,
+            "assignee_name": assignee, "msproject_uid": uid}
+
+
+class SyncTests(unittest.TestCase):
+    people = {"Fulana": "p1", "Beltrano": "p2", importer.PLACEHOLDER_NAME: "p0"}
+
+    def _row(self, task_id, t, **over):
+        row = {"id": task_id, "project_id": "proj-A", "title": t["title"], "tipo_atividade": t["tipo_atividade"],
+               "start_date": t["start_date"], "end_date": t["end_date"], "assignee_id": "p1",
+               "msproject_uid": t["msproject_uid"], "msproject_hash": task_content_hash(t)}
+        row.update(over)
+        return row
+
+    def test_plan_matches_by_uid_then_title(self):
+        same = _task("1", "Igual")
+        moved = _task("2", "Coleta", start="2026-02-01", end="2026-02-05", assignee="Beltrano")
+        legacy = _task("3", "Relatório")
+        new = _task("4", "Nova")
+        existing = [
+            self._row("t1", same),
+            self._row("t2", _task("2", "Coleta antiga")),
+            self._row("t3", legacy, msproject_uid=None, msproject_hash=None),  # import antigo, sem UID
+            self._row("t9", _task("9", "Saiu do XML")),
+            self._row("t10", _task(None, "Criada no app"), msproject_uid=None, msproject_hash=None),
+        ]
+        plan = plan_sync({"tasks": [same, moved, legacy, new]}, "proj-A", existing, self.people)
+
+        self.assertEqual(plan["unchanged"], 1)
+        self.assertEqual([r["title"] for r in plan["insert"]], ["Nova"])
+        self.assertEqual(plan["insert"][0]["msproject_uid"], "4")
+        updates = {u["id"]: u for u in plan["update"]}
+        self.assertEqual(set(updates), {"t2", "t3"})
+        self.assertEqual(
+            updates["t2"],
+            {"id": "t2", "title": "Coleta", "start_date": "2026-02-01", "end_date": "2026-02-05",
+             "assignee_id": "p2", "msproject_uid": "2", "msproject_hash": task_content_hash(moved)},
+        )
+        # só ganha o vínculo com o UID; nada mudou no conteúdo
+        self.assertEqual(set(updates["t3"]), {"id", "msproject_uid", "msproject_hash"})
+        self.assertEqual([r["id"] for r in plan["delete"]], ["t9"])
+
+    def test_dry_run_reads_only(self):
+        t = _task("1", "Coleta", start="2026-03-01")
+        db = {"people": [{"id": "p1", "name": "Fulana"}], "projects": ["proj-A"],
+              "tasks": [self._row("t1", _task("1", "Coleta"))]}
+        client = _Client(db)
+        parsed = dict(_parsed("A", []), tasks=[t, _task("2", "Nova", assignee="Ciclana")], people={"Fulana", "Ciclana"})
+        with mock.patch("builtins.print"):
+            plans = sync_parsed(client, [parsed], dry_run=True)
+        self.assertEqual({op for _, op, _ in client.calls}, {"select"})
+        self.assertEqual(len(plans["A"]["insert"]), 1)
+        self.assertEqual(plans["A"]["changes"], [("Coleta", {"start_date": ("2026-01-01", "2026-03-01")})])
+
+    def test_apply_batches_updates_and_deletes_only_when_asked(self):
+        db = {"people": [{"id": "p1", "name": "Fulana"}, {"id": "p0", "name": importer.PLACEHOLDER_NAME}],
+              "tasks": [self._row("t1", _task("1", "A")), self._row("t2", _task("2", "B")),
+                        self._row("t3", _task("3", "C"))]}
+        parsed = dict(_parsed("A", []), tasks=[_task("1", "A", end="2026-01-09"), _task("2", "B2")])
+        for delete, expected in ((False, []), (True, [{"p_task_id": "t3"}])):
+            client = _Client({k: list(v) for k, v in db.items()})
+            with mock.patch.object(importer, "TASK_BATCH", 1), mock.patch("builtins.print"):
+                sync_parsed(client, [parsed], delete=delete, workers=2)
+            rpcs = [(name, params) for name, op, params in client.calls if op == "rpc"]
+            updates = [p["p_rows"] for n, p in rpcs if n == "rpc_msproject_update_tasks"]
+            self.assertEqual(sorted(len(b) for b in updates), [1, 1])
+            self.assertEqual([p for n, p in rpcs if n == "rpc_delete_task"], expected)
+
+
+class ManifestTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        for name, code in (("a.xml", "ABC001"), ("b.xml", "XYZ002")):
+            with open(os.path.join(self.folder, name), "w", encoding="utf-8") as fh:
+                fh.write(XML.replace("ABC001", code))
+        self.db = {"people": [], "tasks": []}
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _run(self, *extra):
+        client = _Client(self.db)
+        seen = []
+        real_parse = importer.parse_files
+
+        def parse_files(files, workers=None):
+            seen.extend(os.path.basename(str(f)) for f in files)
+            return real_parse(files, workers=1)
+
+        with mock.patch.object(importer, "supabase_connect", return_value=client), \
+                mock.patch.object(importer, "parse_files", parse_files), \
+                mock.patch("sys.argv", ["import", self.folder, *extra]), \
+                mock.patch("builtins.print"):
+            importer.main()
+        return seen, client
+
+    def _manifest(self):
+        with open(os.path.join(self.folder, importer.MANIFEST_NAME), encoding="utf-8") as fh:
+            return json.load(fh)["files"]
+
+    def test_unchanged_files_are_skipped(self):
+        seen, _ = self._run()
+        self.assertEqual(seen, ["a.xml", "b.xml"])
+        self.assertEqual(sorted(e["file"] for e in self._manifest().values()), ["a.xml", "b.xml"])
+
+        seen, client = self._run()
+        self.assertEqual(seen, [])
+        self.assertEqual(client.calls, [])  # nem conecta ao banco
+
+        with open(os.path.join(self.folder, "b.xml"), "a", encoding="utf-8") as fh:
+            fh.write("<!-- alterado -->\n")
+        seen, _ = self._run()
+        self.assertEqual(seen, ["b.xml"])
+        # entrada antiga de b.xml sai do manifest
+        self.assertEqual(sorted(e["file"] for e in self._manifest().values()), ["a.xml", "b.xml"])
+
+        seen, _ = self._run("--force")
+        self.assertEqual(seen, ["a.xml", "b.xml"])
+
+    def test_sync_mode_ignores_plain_import_entries(self):
+        self._run()
+        seen, client = self._run("--sync", "--dry-run")
+        self.assertEqual(seen, ["a.xml", "b.xml"])
+        self.assertEqual({op for _, op, _ in client.calls}, {"select"})
+        self.assertEqual({e["mode"] for e in self._manifest().values()}, {"import"})  # dry-run não grava
+
+        self._run("--sync")
+        self.assertEqual({e["mode"] for e in self._manifest().values()}, {"sync"})
+        seen, _ = self._run("--sync")
+        self.assertEqual(seen, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
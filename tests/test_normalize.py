@@ -0,0 +1,44 @@
+import os
+import sys
+import unittest
+from datetime import date
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath("app"))
+
+from services.normalize import clean_str, clean_text, label_list, norm_text, text_list, to_date
+
+
+class NormalizeTests(unittest.TestCase):
+    def test_text_list_replaces_nulls_and_sentinels(self):
+        s = pd.Series([" Ana ", None, float("nan"), "None", "nan", "NaT", "", 12, pd.NA])
+        self.assertEqual(text_list(s, "—"), ["Ana", "—", "—", "—", "—", "—", "—", "12", "—"])
+
+    def test_clean_text_matches_scalar_version(self):
+        values = [" x", None, "NaT", "", 3.5, True, "João Pereira "]
+        expected = [clean_str(v) or "-" for v in values]
+        self.assertEqual(clean_text(pd.Series(values, dtype=object), "-").tolist(), expected)
+
+    def test_categorical_and_empty_series(self):
+        s = pd.Series(["PAGO", "PENDENTE", None], dtype="category")
+        self.assertEqual(text_list(s, "PENDENTE"), ["PAGO", "PENDENTE", "PENDENTE"])
+        self.assertEqual(text_list(pd.Series([], dtype=object)), [])
+
+    def test_label_list_keeps_unknown_codes(self):
+        labels = {"PAGO": "🟢 Pago", "PENDENTE": "🟡 Pendente"}
+        s = pd.Series(["PAGO", "OUTRO", None])
+        self.assertEqual(label_list(s, labels, "PENDENTE"), ["🟢 Pago", "OUTRO", "🟡 Pendente"])
+
+    def test_scalars(self):
+        self.assertIsNone(norm_text("  None "))
+        self.assertEqual(norm_text(" obs "), "obs")
+        self.assertEqual(to_date("05/03/2026"), date(2026, 3, 5))
+        self.assertEqual(to_date("2026-03-05"), date(2026, 3, 5))
+        self.assertEqual(to_date(date(2026, 3, 5)), date(2026, 3, 5))
+        self.assertIsNone(to_date(pd.NaT))
+        self.assertIsNone(to_date("xx"))
+
+
+if __name__ == "__main__":
+    unittest.main()
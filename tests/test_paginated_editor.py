@@ -0,0 +1,176 @@
+"""
+Testes unitários para app/ui/paginated_editor.py
+Cobre: changed_mask, apply_data_editor_state, EditorPager e as edições
+pendentes entre páginas do paginated_editor.
+"""
+
+import os
+import sys
+import unittest
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pandas as pd
+
+if "streamlit" not in sys.modules:
+    sys.modules["streamlit"] = SimpleNamespace(session_state={})
+
+sys.path.insert(0, os.path.abspath("app"))
+
+from ui import paginated_editor as pe  # noqa: E402
+from ui.paginated_editor import EditorPager, apply_data_editor_state, changed_mask, paginated_editor  # noqa: E402
+
+
+class _FakeSt:
+    """session_state + data_editor que aplica `edits` (posição -> {coluna: valor})."""
+
+    def __init__(self):
+        self.session_state = {}
+        self.edits = {}
+        self.bases = []
+
+    def data_editor(self, df, key=None, **kwargs):
+        self.bases.append(df.copy())
+        state = self.session_state.setdefault(key, {"edited_rows": {}})
+        state["edited_rows"].update(self.edits)
+        self.edits = {}
+        return df.copy()
+
+    def caption(self, *a, **k):
+        return None
+
+
+def _frame(n=5):
+    return pd.DataFrame(
+        {
+            "id": [f"t{i}" for i in range(n)],
+            "Descrição": [f"Lanc {i}" for i in range(n)],
+            "Valor": [float(i + 1) for i in range(n)],
+            "Data": [date(2026, 1, i + 1) for i in range(n)],
+            "Excluir?": [False] * n,
+        }
+    )
+
+
+class ChangedMaskTests(unittest.TestCase):
+    def test_loose_equality(self):
+        before = pd.DataFrame({"a": [None, "x ", 1, date(2026, 1, 1)], "b": [False, True, 2.0, None]})
+        after = pd.DataFrame(
+            {"a": ["", "x", 1.0, pd.Timestamp("2026-01-01")], "b": [False, True, 2, float("nan")]}
+        )
+        self.assertEqual(changed_mask(before, after, ["a", "b"]).tolist(), [False] * 4)
+
+        after.loc[2, "b"] = 3
+        after.loc[0, "a"] = "novo"
+        self.assertEqual(changed_mask(before, after, ["a", "b"]).tolist(), [True, False, True, False])
+        self.assertEqual(changed_mask(before, after, ["b"]).tolist(), [False, False, True, False])
+
+
+class ApplyEditorStateTests(unittest.TestCase):
+    def test_reapplies_edited_rows_by_position(self):
+        base = pd.DataFrame({"Obs": ["a", "b"]}, index=["x", "y"])
+        returned = base.reset_index(drop=True)
+        fake = SimpleNamespace(session_state={"k": {"edited_rows": {"1": {"Obs": "B"}, "9": {"Obs": "?"}}}})
+        with patch.object(pe, "st", fake):
+            out = apply_data_editor_state(base, returned, "k")
+        self.assertEqual(out.index.tolist(), ["x", "y"])
+        self.assertEqual(out["Obs"].tolist(), ["a", "B"])
+
+    def test_date_column_edits_come_back_as_dates(self):
+        # DateColumn: edited_rows guarda texto ISO, não date
+        base = pd.DataFrame({"Data": [date(2026, 1, 1), None], "Quando": pd.to_datetime(["2026-01-01", "2026-01-02"])})
+        fake = SimpleNamespace(session_state={"k": {"edited_rows": {
+            "0": {"Data": "2026-02-10", "Quando": "2026-03-05"},
+            "1": {"Data": None},
+        }}})
+        with patch.object(pe, "st", fake):
+            out = apply_data_editor_state(base, base.copy(), "k")
+        self.assertEqual(out.loc[0, "Data"], date(2026, 2, 10))
+        self.assertIsNone(out.loc[1, "Data"])
+        self.assertEqual(out.loc[0, "Quando"], pd.Timestamp("2026-03-05"))
+
+
+class PaginatedEditorTests(unittest.TestCase):
+    def setUp(self):
+        self.st = _FakeSt()
+        self._patch = patch.object(pe, "st", self.st)
+        self._patch.start()
+
+    def tearDown(self):
+        self._patch.stop()
+
+    def _pager(self, *scope):
+        return EditorPager("ed", *scope, sizes=(2, 4), default_size=2)
+
+    def _goto(self, pager, number):
+        self.st.session_state["ed__page"]["number"] = number
+
+    def test_pager_state_and_cursors(self):
+        pager = self._pager("f1")
+        self.assertEqual((pager.number, pager.size, pager.after), (1, 2, None))
+        pager.remember(("2026-01-02", "t1"))
+        self._goto(pager, 2)
+        pager = self._pager("f1")
+        self.assertEqual(pager.window(), slice(2, 4))
+        self.assertEqual(pager.after, ("2026-01-02", "t1"))
+        # filtros novos (ou outro tamanho) -> volta à página 1, sem cursores
+        self.assertEqual(self._pager("f2").number, 1)
+        self.st.session_state["ed__page_size"] = 4
+        self.assertEqual(self._pager("f2").size, 4)
+
+    def test_string_date_edit_reaches_save_as_date(self):
+        df = _frame()
+        pager = self._pager("f")
+        self.st.edits = {"1": {"Data": "2026-02-10"}}
+        res = paginated_editor(df.iloc[pager.window()], pager, version="v1", id_col="id")
+        self.assertEqual(res.after["id"].tolist(), ["t1"])
+        self.assertEqual(res.after["Data"].tolist(), [date(2026, 2, 10)])
+        self.assertEqual(res.after["Data"].iloc[0].isoformat(), "2026-02-10")
+
+    def test_edits_survive_page_changes(self):
+        df = _frame()
+        pager = self._pager("f")
+
+        self.st.edits = {0: {"Descrição": "Editado"}}
+        res = paginated_editor(df.iloc[pager.window()], pager, version="v1", id_col="id")
+        self.assertEqual(res.after["id"].tolist(), ["t0"])
+        self.assertEqual(res.before["Descrição"].tolist(), ["Lanc 0"])
+        self.assertEqual(res.after["Descrição"].tolist(), ["Editado"])
+
+        # página 2: o widget da 1 some do session_state (como no Streamlit)
+        self.st.session_state = {k: v for k, v in self.st.session_state.items() if "::v1::" not in k}
+        self._goto(pager, 2)
+        pager = self._pager("f")
+        self.st.edits = {1: {"Valor": 40.0, "Excluir?": True}}
+        res = paginated_editor(df.iloc[pager.window()], pager, version="v1", id_col="id")
+        self.assertEqual(res.after["id"].tolist(), ["t0", "t3"])
+        self.assertEqual(res.after["Excluir?"].tolist(), [False, True])
+
+        # de volta à 1: a edição pendente reaparece na base do editor
+        self.st.session_state = {k: v for k, v in self.st.session_state.items() if "::v1::" not in k}
+        self._goto(pager, 1)
+        pager = self._pager("f")
+        res = paginated_editor(df.iloc[pager.window()], pager, version="v1", id_col="id")
+        self.assertEqual(self.st.bases[-1]["Descrição"].tolist(), ["Editado", "Lanc 1"])
+        self.assertEqual(sorted(res.after["id"]), ["t0", "t3"])
+
+        # desfazer a edição tira a linha dos pendentes
+        self.st.edits = {0: {"Descrição": "Lanc 0"}}
+        res = paginated_editor(df.iloc[pager.window()], pager, version="v1", id_col="id")
+        self.assertEqual(res.after["id"].tolist(), ["t3"])
+
+    def test_index_ids_and_scope_reset(self):
+        df = _frame().set_index("id")
+        pager = self._pager("f")
+        self.st.edits = {1: {"Data": date(2026, 2, 1)}}
+        res = paginated_editor(df.iloc[pager.window()], pager, version="v1")
+        self.assertEqual(res.after.index.tolist(), ["t1"])
+        self.assertEqual(res.before.loc["t1", "Data"], date(2026, 1, 2))
+
+        res = paginated_editor(df.iloc[pager.window()], self._pager("outro filtro"), version="v1")
+        self.assertTrue(res.after.empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath("app"))
+
+from services.prefetch import chunked, fetch_grouped, group_rows
+
+
+class _Query:
+    def __init__(self, client, rows):
+        self.client = client
+        self.rows = rows
+        self.ids = []
+        self.rng = (0, len(rows))
+
+    def select(self, *_a, **_k):
+        return self
+
+    def in_(self, _col, values):
+        self.ids = list(values)
+        return self
+
+    def order(self, *_a, **_k):
+        return self
+
+    def range(self, a, b):
+        self.rng = (a, b)
+        return self
+
+    def execute(self):
+        self.client.calls.append((tuple(self.ids), self.rng))
+        hits = [r for r in self.rows if r["parent_id"] in self.ids]
+        hits.sort(key=lambda r: (r["parent_id"], -r["at"]))
+        data = hits[self.rng[0]: self.rng[1] + 1]
+        return type("Resp", (), {"data": data})()
+
+
+class _Client:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def table(self, _name):
+        return _Query(self, self.rows)
+
+
+class PrefetchTests(unittest.TestCase):
+    def test_chunked(self):
+        self.assertEqual(list(chunked(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(chunked([], 2)), [])
+
+    def test_group_rows_limits_per_key(self):
+        rows = [{"k": "a", "v": 3}, {"k": "b", "v": 1}, {"k": "a", "v": 2}, {"k": "a", "v": 1}]
+        grouped = group_rows(rows, "k", per_key=2)
+        self.assertEqual(sorted(grouped), ["a", "b"])
+        self.assertEqual(grouped["a"]["v"].tolist(), [3, 2])
+        self.assertEqual(group_rows([], "k"), {})
+
+    def test_fetch_grouped_chunks_and_pages(self):
+        rows = [{"parent_id": f"p{i}", "at": j} for i in range(5) for j in range(3)]
+        client = _Client(rows)
+        grouped = fetch_grouped(
+            client, "events", "parent_id,at", "parent_id", ["p0", "p1", "p2", "p3", "p1", None],
+            order_col="at", chunk=2, page_size=4,
+        )
+        self.assertEqual(sorted(grouped), ["p0", "p1", "p2", "p3"])
+        self.assertTrue(all(len(f) == 3 for f in grouped.values()))
+        # 2 blocos de ids; cada bloco (6 linhas) precisa de 2 páginas de 4
+        self.assertEqual(
+            client.calls,
+            [(("p0", "p1"), (0, 3)), (("p0", "p1"), (4, 7)), (("p2", "p3"), (0, 3)), (("p2", "p3"), (4, 7))],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import sys
+import unittest
+from datetime import date
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath("app"))
+
+from services.schemas import SCHEMAS, apply_schema, date_values, parse_dates
+
+
+class SchemaRegistryTests(unittest.TestCase):
+    def test_dates_parse_with_explicit_format(self):
+        s = pd.Series(["2026-03-05", "2026-03-06T10:20:00+00:00", "", None, "05/03/2026"])
+        out = parse_dates(s)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(out))
+        self.assertEqual(date_values(out), [date(2026, 3, 5), date(2026, 3, 6), None, None, None])
+
+    def test_dates_dayfirst_accepts_br_format(self):
+        s = pd.Series(["2026-03-05", " 05/03/2026", "31/02/2026", "Vale", None])
+        out = parse_dates(s, dayfirst=True)
+        self.assertEqual(date_values(out), [date(2026, 3, 5), date(2026, 3, 5), None, None, None])
+
+    def test_reimbursements_schema_types_and_defaults(self):
+        df = pd.DataFrame(
+            [
+                {"expense_date": "2026-01-10", "amount": "12.5", "status": "pendente "},
+                {"expense_date": None, "amount": None, "status": None},
+            ]
+        )
+        apply_schema(df, "v_reimbursements")
+
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df["expense_date"]))
+        self.assertEqual(df["amount"].tolist(), [12.5, 0.0])
+        self.assertIsInstance(df["status"].dtype, pd.CategoricalDtype)
+        self.assertEqual(df["status"].tolist(), ["PENDENTE", "PENDENTE"])
+        # colunas de migração pendente são criadas com default
+        self.assertEqual(df["receipt_count"].tolist(), [0, 0])
+        self.assertEqual(df["observations"].tolist(), ["", ""])
+        self.assertTrue(df["due_date"].isna().all())
+
+    def test_optional_columns_are_not_created(self):
+        df = pd.DataFrame([{"end_date": "2026-02-01", "delivery_status": None}])
+        apply_schema(df, "v_deliverables")
+        self.assertNotIn("client_due_date", df.columns)
+        self.assertEqual(df["delivery_status"].tolist(), ["NAO_INICIADO"])
+
+    def test_list_columns_prefer_arrays_with_legacy_fallback(self):
+        df = pd.DataFrame(
+            {
+                "start_date": ["2026-01-01"] * 3,
+                "assignee_names": ["Ana + Bruno", None, "Caio"],
+                "assignee_list": [["Ana", "Bruno"], [], None],
+                "assignee_ids": [["a", "b"], [], "{c}"],
+            }
+        )
+        apply_schema(df, "v_portfolio_tasks")
+        self.assertEqual(df["assignee_list"].tolist(), [["Ana", "Bruno"], ["Profissional"], ["Caio"]])
+        self.assertEqual(df["assignee_ids"].tolist(), [["a", "b"], [], ["c"]])
+
+        legacy = apply_schema(pd.DataFrame({"assignee_names": ["Ana + Bruno"]}), "v_deliverables")
+        self.assertEqual(legacy["assignee_list"].tolist(), [["Ana", "Bruno"]])
+        self.assertEqual(legacy["assignee_ids"].tolist(), [[]])
+
+        lab = apply_schema(pd.DataFrame({"sample_types": [None, "{Peixes,Bentos}"], "sample_type": ["Água", None]}), "v_lab_samples")
+        self.assertEqual(lab["sample_types"].tolist(), [["Água"], ["Peixes", "Bentos"]])
+
+    def test_empty_frame_keeps_shape(self):
+        df = apply_schema(pd.DataFrame(columns=["date", "type", "amount"]), "finance_transactions")
+        self.assertTrue(df.empty)
+        self.assertIn("date", df.columns)
+
+    def test_registry_covers_loaded_views(self):
+        for view in ["v_portfolio_tasks", "v_deliverables", "v_lab_samples", "v_reimbursements", "finance_transactions"]:
+            self.assertIn(view, SCHEMAS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import pickle
+import random
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath("app"))
+
+from services.search_index import ROW_COL, SearchIndex, fold
+
+
+def _brute_force(df: pd.DataFrame, columns: list[str], query: str) -> list[int]:
+    hay = fold(df[columns[0]])
+    for c in columns[1:]:
+        hay = hay + " | " + fold(df[c])
+    terms = fold(pd.Series([query])).iloc[0].split()
+    return [i for i, text in enumerate(hay.tolist()) if all(t in text for t in terms)]
+
+
+class SearchIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame(
+            {
+                "project_code": ["PRJ001", "PRJ002", None, "PRJ010"],
+                "product_name": ["Relatório Semestral", "Relatório anual", "Plano de Ação", "Água - campanha 2"],
+                "notes": [None, "semestral adiado", "", "ok"],
+            }
+        )
+        self.index = SearchIndex.from_frame(self.df, ["project_code", "product_name", "notes", "missing"])
+
+    def test_accent_and_case_folding(self):
+        self.assertEqual(self.index.search("RELATORIO").tolist(), [0, 1])
+        self.assertEqual(self.index.search("agua").tolist(), [3])
+        self.assertEqual(self.index.search("ação").tolist(), [2])
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(self.index.search("relatório semestral").tolist(), [0, 1])
+        self.assertEqual(self.index.search("anual semestral").tolist(), [1])
+        self.assertEqual(self.index.search("prj01").tolist(), [3])
+        self.assertEqual(self.index.search("xyz").tolist(), [])
+        self.assertEqual(self.index.search("  ").tolist(), [0, 1, 2, 3])
+
+    def test_matches_brute_force_on_random_data(self):
+        rnd = random.Random(11)
+        words = ["relatório", "semestral", "biofile", "água", "peixes", "sedimento", "x", "ab", "PRJ"]
+        df = pd.DataFrame(
+            {c: [" ".join(rnd.choice(words) for _ in range(rnd.randint(0, 4))) for _ in range(300)] for c in "abc"}
+        )
+        index = SearchIndex.from_frame(df, list("abc"))
+        for q in ["rel", "água peixes", "ab", "x semes", "prj biofile sedimento", "zz", "a"]:
+            self.assertEqual(index.search(q).tolist(), _brute_force(df, list("abc"), q), q)
+
+    def test_mask_for_filtered_frame_and_extra_column(self):
+        self.df[ROW_COL] = range(len(self.df))
+        filtered = self.df.iloc[[3, 1, 0]].reset_index(drop=True)
+        self.assertEqual(self.index.mask(filtered[ROW_COL], "relatorio").tolist(), [False, True, True])
+
+        situation = pd.Series(["🔴 Atrasado", "🟢 Pago", "🔴 Atrasado", "🟡 Pendente"], dtype="category")
+        self.assertEqual(self.index.search("atrasado", extra=situation).tolist(), [0, 2])
+        self.assertEqual(self.index.search("atrasado relatório", extra=situation).tolist(), [0])
+
+    def test_empty_and_pickle(self):
+        self.assertEqual(len(SearchIndex.from_frame(pd.DataFrame(), ["a"])), 0)
+        restored = pickle.loads(pickle.dumps(self.index))
+        np.testing.assert_array_equal(restored.search("semestral"), self.index.search("semestral"))
+
+
+if __name__ == "__main__":
+    unittest.main()
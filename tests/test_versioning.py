@@ -0,0 +1,71 @@
+"""
+Testes unitários para app/services/versioning.py
+Cobre: frame_digest, stamp_version/data_version, editor_state_key, clear_editor_state.
+"""
+
+import os
+import pickle
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pandas as pd
+
+if "streamlit" not in sys.modules:
+    sys.modules["streamlit"] = SimpleNamespace(session_state={})
+
+sys.path.insert(0, os.path.abspath("app"))
+
+from services import versioning  # noqa: E402
+from services.versioning import data_version, editor_state_key, frame_digest, stamp_version  # noqa: E402
+
+
+def _frame():
+    return pd.DataFrame(
+        {
+            "id": ["a", "b", "c"],
+            "amount": [1.5, None, 3.0],
+            "date": pd.to_datetime(["2026-01-01", None, "2026-01-03"]),
+            "tags": [["x"], [], ["y", "z"]],
+        }
+    )
+
+
+class VersioningTests(unittest.TestCase):
+    def test_digest_is_content_based(self):
+        self.assertEqual(frame_digest(_frame()), frame_digest(_frame()))
+        changed = _frame()
+        changed.loc[1, "amount"] = 2.0
+        self.assertNotEqual(frame_digest(_frame()), frame_digest(changed))
+        self.assertNotEqual(
+            frame_digest(_frame(), ["id"]),
+            frame_digest(_frame().iloc[[1, 0, 2]].reset_index(drop=True), ["id"]),
+        )
+
+    def test_version_survives_pickle_and_filters(self):
+        df = stamp_version(_frame())
+        version = data_version(df)
+        self.assertTrue(version)
+        self.assertEqual(data_version(pickle.loads(pickle.dumps(df))), version)
+        self.assertEqual(data_version(df[df["amount"] > 1].copy()), version)
+        # mesmo conteúdo recarregado (refill do TTL) -> mesma versão
+        self.assertEqual(data_version(stamp_version(_frame())), version)
+        self.assertEqual(data_version(pd.DataFrame()), "")
+
+    def test_editor_key_changes_with_version_and_filters(self):
+        k1 = editor_state_key("ed", "v1", ("A",), "2026-01")
+        self.assertEqual(k1, editor_state_key("ed", "v1", ("A",), "2026-01"))
+        self.assertNotEqual(k1, editor_state_key("ed", "v2", ("A",), "2026-01"))
+        self.assertNotEqual(k1, editor_state_key("ed", "v1", ("B",), "2026-01"))
+        self.assertTrue(k1.startswith("ed::v1::"))
+
+    def test_clear_editor_state_only_removes_prefix(self):
+        session = {"ed::1::2": {}, "ed::3::4": {}, "edx::1": {}, "other": 1}
+        with patch.object(versioning, "st", SimpleNamespace(session_state=session)):
+            versioning.clear_editor_state("ed")
+        self.assertEqual(sorted(session), ["edx::1", "other"])
+
+
+if __name__ == "__main__":
+    unittest.main()